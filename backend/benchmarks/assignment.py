@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark da escolha de responsável por carga de trabalho
+
+Cria num SQLite temporário C equipes distribuídas em D departamentos, com
+J ocorrências ativas já atribuídas, e mede:
+- a latência de choose_assignee (uma decisão isolada, como no registro) e
+  quantas consultas SQL cada decisão faz;
+- a vazão de assign_backlog para B ocorrências triadas sem responsável;
+- que a carga gravada bate com a recalculada a partir das ocorrências.
+
+Uso (a partir de backend/):
+    python benchmarks/assignment.py --crews 300 --jobs 20000 --backlog 5000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAT, LON = -21.245, -45.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--crews', type=int, default=300)
+    parser.add_argument('--departments', type=int, default=7)
+    parser.add_argument('--jobs', type=int, default=20000)
+    parser.add_argument('--backlog', type=int, default=5000)
+    parser.add_argument('--decisions', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from sqlalchemy import event
+    from src.main import create_app
+    from src.models.models import db, Category, Department, Occurrence, OccurrenceStatus, User, UserType
+    from src.utils.init_database import init_database
+    from src.utils.workload import assign_backlog, choose_assignee, reconcile_workloads
+
+    rng = random.Random(args.seed)
+    directory = tempfile.TemporaryDirectory()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory.name, 'assignment.db')}",
+        'SQLALCHEMY_BINDS': {},
+        'ASSIGNMENT_MAX_ACTIVE_JOBS': 10 ** 6,
+    })
+    init_database(app, demo_data=False)
+
+    with app.app_context():
+        now = datetime.utcnow()
+        department_ids = [row[0] for row in db.session.query(Department.id).order_by(Department.id)][:args.departments]
+        category_by_department = dict(db.session.query(Category.department_id, Category.id))
+        department_ids = [department_id for department_id in department_ids if department_id in category_by_department]
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'equipe{i}@bench.test', 'password_hash': 'x', 'name': f'Equipe {i}',
+             'user_type': UserType.SERVICE_PROVIDER, 'department_id': department_ids[i % len(department_ids)],
+             'created_at': now}
+            for i in range(args.crews)
+        ])
+        citizen = User(email='cidadao@bench.test', password_hash='x', name='Cidadão')
+        db.session.add(citizen)
+        db.session.commit()
+        crews = db.session.query(User.id, User.department_id).filter(User.user_type == UserType.SERVICE_PROVIDER).all()
+
+        def occurrence(assigned_to, department_id, status):
+            return {
+                'title': 'Ocorrência de teste', 'description': 'Benchmark de atribuição',
+                'category_id': category_by_department[department_id], 'citizen_id': citizen.id,
+                'assigned_to': assigned_to, 'department_id': department_id, 'status': status,
+                'latitude': LAT + rng.uniform(-0.05, 0.05), 'longitude': LON + rng.uniform(-0.05, 0.05),
+                'address': 'Rua de Teste, 1, Centro', 'priority': 'MEDIUM', 'created_at': now, 'updated_at': now
+            }
+
+        rows = []
+        for _ in range(args.jobs):
+            crew = rng.choice(crews)
+            rows.append(occurrence(crew.id, crew.department_id, OccurrenceStatus.IN_PROGRESS))
+        for _ in range(args.backlog):
+            rows.append(occurrence(None, rng.choice(department_ids), OccurrenceStatus.IN_PROGRESS))
+        db.session.execute(Occurrence.__table__.insert(), rows)
+        db.session.commit()
+        reconcile_workloads(db.session)
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(1))
+        latencies = []
+        for _ in range(args.decisions):
+            department_id = rng.choice(department_ids)
+            start = time.perf_counter()
+            choose_assignee(db.session, app.config, department_id,
+                            LAT + rng.uniform(-0.05, 0.05), LON + rng.uniform(-0.05, 0.05))
+            latencies.append(time.perf_counter() - start)
+            db.session.rollback()
+        queries_per_decision = len(statements) / args.decisions
+        latencies.sort()
+
+        start = time.perf_counter()
+        proposals = assign_backlog(db.session, app.config)
+        backlog_s = time.perf_counter() - start
+        loads = [row[0] for row in db.session.query(User.active_jobs).filter(User.user_type == UserType.SERVICE_PROVIDER)]
+        drift = reconcile_workloads(db.session)
+
+    print(f'{args.crews} equipes em {len(department_ids)} departamentos, {args.jobs} tarefas ativas')
+    print(f'decisão isolada: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, '
+          f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, {queries_per_decision:.1f} consultas por decisão')
+    print(f'fila: {len(proposals)} atribuições em {backlog_s:.2f}s ({len(proposals) / backlog_s:.0f}/s)')
+    print(f'carga por equipe após a fila: média {statistics.mean(loads):.1f}, desvio {statistics.pstdev(loads):.1f}, '
+          f'mín {min(loads)}, máx {max(loads)}')
+    print('✅ carga gravada confere' if drift == 0 else f'❌ carga divergente em {drift} usuário(s)')
+    directory.cleanup()
+    sys.exit(0 if drift == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark da avaliação de regras de triagem automática
+
+Gera N regras sintéticas (categorias, bairros, palavras-chave, horários e
+apoios mínimos) e avalia M ocorrências sintéticas de duas formas:
+- compilada: RuleSet de src/utils/auto_triage.py (baldes por categoria,
+  máscaras de horário, índice invertido de palavras-chave);
+- ingênua: percorre todas as regras e analisa palavras-chave e bairros a
+  cada avaliação.
+Confere que as duas decidem igual e mostra o custo por ocorrência.
+
+Uso (a partir de backend/):
+    python benchmarks/auto_triage.py --rules 500 --occurrences 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.models import Priority  # noqa: E402
+from src.utils.auto_triage import Decision, Facts, RuleSet, hour_mask  # noqa: E402
+from src.utils.search import analyze, fold  # noqa: E402
+
+NEIGHBORHOODS = ['Centro', 'Vila Nova', 'São Cristóvão', 'Jardim Glória', 'Parque das Acácias',
+                 'Santa Efigênia', 'Bela Vista', 'Nova Lavras', 'Morada do Sol', 'Cascalho']
+WORDS = ['buraco', 'asfalto', 'poste', 'lâmpada', 'fio exposto', 'esgoto', 'vazamento', 'lixo',
+         'entulho', 'árvore caída', 'desabamento', 'alagamento', 'calçada', 'semáforo', 'bueiro',
+         'mato alto', 'animal morto', 'praça', 'iluminação', 'cratera']
+
+
+def synthetic_rules(count, categories, departments, rng):
+    rules = []
+    for rule_id in range(1, count + 1):
+        hour_start = rng.randrange(24) if rng.random() < 0.2 else None
+        rules.append(SimpleNamespace(
+            id=rule_id,
+            position=rng.randrange(1000),
+            category_ids=rng.sample(categories, rng.randint(1, 2)) if rng.random() < 0.8 else None,
+            neighborhoods=rng.sample(NEIGHBORHOODS, rng.randint(1, 3)) if rng.random() < 0.4 else None,
+            keywords=rng.sample(WORDS, rng.randint(1, 3)) if rng.random() < 0.5 else None,
+            min_support_count=rng.choice([None, None, 5, 20]),
+            hour_start=hour_start,
+            hour_end=(hour_start + rng.randint(2, 12)) % 24 if hour_start is not None else None,
+            department_id=rng.choice(departments) if rng.random() < 0.6 else None,
+            priority=rng.choice(list(Priority)) if rng.random() < 0.6 else None,
+            assigned_to=rng.randrange(1, 50) if rng.random() < 0.1 else None,
+            require_review=rng.random() < 0.05,
+            stop_processing=rng.random() < 0.05
+        ))
+    return rules
+
+
+def synthetic_facts(count, categories, rng):
+    facts = []
+    for _ in range(count):
+        words = rng.sample(WORDS, 3)
+        facts.append(Facts(
+            category_id=rng.choice(categories),
+            neighborhood=fold(rng.choice(NEIGHBORHOODS)),
+            text=f'Problema de {words[0]} na rua. Tem {words[1]} e {words[2]} perto da esquina, por favor resolvam.',
+            support_count=rng.choice([0, 0, 0, 3, 10, 40]),
+            hour=rng.randrange(24)
+        ))
+    return facts
+
+
+def naive_evaluate(rules, category_departments, facts):
+    """Avaliação direta, regra a regra, sem nada pré-calculado"""
+    department_id = priority = assigned_to = None
+    require_review = False
+    rule_ids = []
+    for rule in sorted(rules, key=lambda rule: (rule.position, rule.id)):
+        if rule.category_ids and facts.category_id not in rule.category_ids:
+            continue
+        if not hour_mask(rule.hour_start, rule.hour_end) & (1 << facts.hour):
+            continue
+        if facts.support_count < (rule.min_support_count or 0):
+            continue
+        if rule.neighborhoods and facts.neighborhood not in [fold(name) for name in rule.neighborhoods]:
+            continue
+        if rule.keywords:
+            tokens = set(analyze(facts.text))
+            if not any(analyze(keyword) and set(analyze(keyword)) <= tokens for keyword in rule.keywords):
+                continue
+        rule_ids.append(rule.id)
+        department_id = department_id if department_id is not None else rule.department_id
+        priority = priority if priority is not None else rule.priority
+        assigned_to = assigned_to if assigned_to is not None else rule.assigned_to
+        require_review = require_review or rule.require_review
+        if rule.stop_processing:
+            break
+    if department_id is None:
+        department_id = category_departments.get(facts.category_id)
+    return Decision(department_id, priority, assigned_to, require_review, rule_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, default=500)
+    parser.add_argument('--occurrences', type=int, default=20000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--naive-sample', type=int, default=1000, help='ocorrências avaliadas da forma ingênua')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    categories = list(range(1, args.categories + 1))
+    departments = list(range(1, 9))
+    category_departments = {category_id: rng.choice(departments) for category_id in categories}
+    rules = synthetic_rules(args.rules, categories, departments, rng)
+    facts = synthetic_facts(args.occurrences, categories, rng)
+
+    start = time.perf_counter()
+    ruleset = RuleSet(rules, category_departments)
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decisions = [ruleset.evaluate(item) for item in facts]
+    compiled_s = time.perf_counter() - start
+
+    sample = facts[:args.naive_sample]
+    start = time.perf_counter()
+    naive = [naive_evaluate(rules, category_departments, item) for item in sample]
+    naive_s = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(decisions, naive) if a != b)
+    triaged = sum(1 for decision in decisions if decision.department_id is not None and not decision.require_review)
+    compiled_us = compiled_s / len(facts) * 1e6
+    naive_us = naive_s / len(sample) * 1e6
+
+    print(f'{args.rules} regras compiladas em {compile_s * 1000:.1f} ms')
+    print(f'compilada: {len(facts)} avaliações em {compiled_s:.2f}s ({compiled_us:.1f} µs/ocorrência)')
+    print(f'ingênua:   {len(sample)} avaliações em {naive_s:.2f}s ({naive_us:.1f} µs/ocorrência, '
+          f'{naive_us / compiled_us:.0f}x mais lenta)')
+    print(f'triadas automaticamente: {triaged / len(decisions):.0%}')
+    print('✅ decisões idênticas' if mismatches == 0 else f'❌ {mismatches} decisões divergentes')
+    sys.exit(0 if mismatches == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
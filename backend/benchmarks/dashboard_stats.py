@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos agregados dos dashboards de administração e político
+
+Cria num SQLite temporário N ocorrências (status, prioridades, avaliações e
+datas de resolução variadas) e chama, com um token de administrador:
+- /api/admin/dashboard/stats
+- /api/admin/dashboard/performance-by-department
+- /api/political/dashboard/political-metrics
+- /api/political/dashboard/performance-trends
+
+Para cada rota mede a latência e conta as consultas SQL, que não podem passar
+do orçamento (não crescem com N), e confere os números com os recalculados
+em Python a partir das ocorrências. As mesmas conferências, com poucas
+ocorrências, rodam nos testes (tests/test_dashboard_stats.py).
+
+Uso (a partir de backend/):
+    python benchmarks/dashboard_stats.py --occurrences 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Consultas por requisição: usuário do token + agregados
+QUERY_BUDGET = {
+    '/api/admin/dashboard/stats': 3,
+    '/api/admin/dashboard/performance-by-department': 2,
+    '/api/political/dashboard/political-metrics': 1,
+    '/api/political/dashboard/performance-trends': 1,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--occurrences', type=int, default=50000)
+    parser.add_argument('--citizens', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from src.main import create_app
+    from src.models.models import db, Category, Department, Occurrence, OccurrenceStatus, Priority, User, UserType
+    from src.utils.init_database import init_database
+
+    rng = random.Random(args.seed)
+    directory = tempfile.TemporaryDirectory()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory.name, 'dashboard.db')}",
+        'SQLALCHEMY_BINDS': {},
+    })
+    init_database(app, demo_data=False)
+
+    with app.app_context():
+        now = datetime.utcnow()
+        admin = User(email='admin@bench.test', password_hash='x', name='Admin', user_type=UserType.ADMIN)
+        db.session.add(admin)
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'cidadao{i}@bench.test', 'password_hash': 'x', 'name': f'Cidadão {i}',
+             'user_type': UserType.CITIZEN, 'created_at': now}
+            for i in range(args.citizens)
+        ])
+        db.session.commit()
+        citizen_ids = [row[0] for row in db.session.query(User.id).filter(User.user_type == UserType.CITIZEN)]
+        department_by_category = dict(db.session.query(Category.id, Category.department_id))
+
+        rows = []
+        for _ in range(args.occurrences):
+            created_at = now - timedelta(days=rng.uniform(0, 240))
+            status = rng.choice(list(OccurrenceStatus))
+            resolved = status in (OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED)
+            category_id = rng.choice(list(department_by_category))
+            rows.append({
+                'title': 'Ocorrência de teste', 'description': 'Benchmark dos dashboards',
+                'category_id': category_id, 'department_id': department_by_category[category_id],
+                'citizen_id': rng.choice(citizen_ids), 'status': status, 'priority': rng.choice(list(Priority)),
+                'latitude': -21.245, 'longitude': -45.0, 'address': 'Rua de Teste, 1, Centro',
+                'rating': rng.randint(1, 5) if resolved and rng.random() < 0.6 else None,
+                'resolved_at': created_at + timedelta(hours=rng.uniform(1, 400)) if resolved else None,
+                'created_at': created_at, 'updated_at': created_at
+            })
+        db.session.execute(Occurrence.__table__.insert(), rows)
+        db.session.commit()
+        token = create_access_token(identity=str(admin.id))
+
+        # Referência em Python
+        finished = [row for row in rows if row['resolved_at'] is not None]
+        rated = [row['rating'] for row in rows if row['rating'] is not None]
+        thirty_days_ago = now - timedelta(days=30)
+        status_counts = Counter(row['status'] for row in rows)
+        priority_counts = Counter(row['priority'] for row in rows)
+        avg_hours = round(sum((row['resolved_at'] - row['created_at']).total_seconds() / 3600
+                              for row in finished) / len(finished), 1)
+        avg_rating = round(sum(rated) / len(rated), 1)
+        expected_stats = {
+            'total_occurrences': len(rows),
+            'status_breakdown': {status.value: status_counts[status] for status in OccurrenceStatus},
+            'priority_breakdown': {'urgent': priority_counts[Priority.URGENT], 'high': priority_counts[Priority.HIGH]},
+            'recent_occurrences': sum(1 for row in rows if row['created_at'] >= thirty_days_ago),
+            'avg_resolution_time_hours': avg_hours,
+            'avg_rating': avg_rating,
+            'total_citizens': args.citizens
+        }
+        department_totals = Counter(row['department_id'] for row in rows)
+        department_resolved = Counter(row['department_id'] for row in finished)
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    statements = []
+    with app.app_context():
+        # O BEGIN explícito do SQLite (src/utils/database.py) não conta
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *a: statement.startswith('SELECT') and statements.append(1))
+
+    ok = True
+    responses = {}
+    print(f'{args.occurrences} ocorrências, {args.citizens} cidadãos')
+    for path, budget in QUERY_BUDGET.items():
+        latencies = []
+        for _ in range(args.repeat):
+            statements.clear()
+            start = time.perf_counter()
+            response = client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+        queries = len(statements)
+        within = response.status_code == 200 and queries <= budget
+        ok = ok and within
+        responses[path] = response.get_json()
+        print(f'{"✅" if within else "❌"} {path}: HTTP {response.status_code}, {queries} consulta(s) '
+              f'(orçamento {budget}), mediana {sorted(latencies)[len(latencies) // 2] * 1000:.1f} ms')
+
+    checks = []
+    stats = responses['/api/admin/dashboard/stats']
+    checks.append(('estatísticas gerais', stats == expected_stats))
+    metrics = responses['/api/political/dashboard/political-metrics']
+    checks.append(('métricas políticas', (
+        metrics.get('total_occurrences') == len(rows)
+        and metrics.get('avg_resolution_hours') == avg_hours
+        and metrics.get('avg_rating') == avg_rating
+        and metrics.get('active_citizens') == len({row['citizen_id'] for row in rows})
+    )))
+    with app.app_context():
+        names = dict(db.session.query(Department.id, Department.name))
+    by_department = {
+        item['name']: (item['total'], item['resolved'])
+        for item in responses['/api/admin/dashboard/performance-by-department']['departments']
+    }
+    checks.append(('desempenho por departamento', by_department == {
+        names[department_id]: (total, department_resolved[department_id])
+        for department_id, total in department_totals.items()
+    }))
+    six_months_ago = now - timedelta(days=180)
+    trends = responses['/api/political/dashboard/performance-trends']['trends']
+    checks.append(('tendência mensal', sum(item['total'] for item in trends) == sum(
+        1 for row in rows if row['created_at'] >= six_months_ago
+    ) and sum(item['resolved'] for item in trends) == sum(1 for row in finished if row['created_at'] >= six_months_ago)))
+
+    for name, passed in checks:
+        ok = ok and passed
+        print(f'{"✅" if passed else "❌"} {name} conferem com o cálculo em Python')
+    directory.cleanup()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
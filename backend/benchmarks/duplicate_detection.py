@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark da detecção de duplicatas no registro de ocorrências
+
+Gera N ocorrências abertas espalhadas por uma área quadrada da cidade e mede
+a latência de find_duplicates (consulta na grade espacial + semelhança de
+texto) para pontos aleatórios, com o cache de shingles frio e quente.
+
+Uso (a partir de backend/):
+    python benchmarks/duplicate_detection.py --occurrences 100000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CENTER = (-21.2264, -43.7742)  # Barbacena/MG
+PROBLEMS = [
+    ('Buraco na rua', 'Buraco grande no meio da pista, carros desviando'),
+    ('Lâmpada queimada', 'Poste sem luz na esquina há vários dias'),
+    ('Vazamento de água', 'Água escorrendo pela calçada desde ontem'),
+    ('Lixo acumulado', 'Lixo jogado no terreno baldio atraindo bichos'),
+    ('Árvore caída', 'Galho grande caiu e bloqueia a passagem'),
+    ('Bueiro entupido', 'Bueiro transborda quando chove'),
+    ('Calçada quebrada', 'Calçada com desnível perigoso para pedestres'),
+    ('Sinalização apagada', 'Faixa de pedestre totalmente apagada'),
+]
+STREETS = ['Rua da Paz', 'Av. Brasil', 'Rua Tiradentes', 'Rua XV de Novembro', 'Av. Governador Bias Fortes']
+
+
+def random_point(area_km):
+    half = area_km / 2
+    lat = CENTER[0] + random.uniform(-half, half) / 111.32
+    lon = CENTER[1] + random.uniform(-half, half) / 103.8
+    return lat, lon
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def populate(total, area_km):
+    from src.models.models import db, Category, Occurrence, OccurrenceStatus, Priority, User
+    from src.utils.geo import cell_id
+
+    categories = [category.id for category in Category.query.all()]
+    citizen_id = User.query.first().id
+    now = datetime.utcnow()
+    rows = []
+    for index in range(total):
+        lat, lon = random_point(area_km)
+        title, description = random.choice(PROBLEMS)
+        rows.append({
+            'title': title, 'description': f'{description} ({index})',
+            'category_id': random.choice(categories), 'citizen_id': citizen_id,
+            'latitude': lat, 'longitude': lon, 'geo_cell': cell_id(lat, lon),
+            'address': f'{random.choice(STREETS)}, {random.randint(1, 3000)}',
+            'status': OccurrenceStatus.OPEN, 'priority': Priority.MEDIUM,
+            'created_at': now, 'updated_at': now,
+        })
+        if len(rows) == 5000:
+            db.session.execute(Occurrence.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Occurrence.__table__.insert(), rows)
+    db.session.commit()
+    return categories
+
+
+def measure(categories, queries, area_km, config):
+    from src.utils.duplicates import find_duplicates
+
+    latencies = []
+    found = 0
+    for _ in range(queries):
+        lat, lon = random_point(area_km)
+        title, description = random.choice(PROBLEMS)
+        start = time.perf_counter()
+        matches = find_duplicates(
+            random.choice(categories), lat, lon, title, description,
+            radius_m=config['DUPLICATE_RADIUS_M'],
+            threshold=config['DUPLICATE_SIMILARITY_THRESHOLD'],
+            limit=config['DUPLICATE_MAX_RESULTS']
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += bool(matches)
+    latencies.sort()
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--occurrences', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--area-km', type=float, default=10.0, help='lado da área da cidade em km')
+    parser.add_argument('--budget-ms', type=float, default=20.0)
+    args = parser.parse_args()
+
+    from src.main import create_app
+    from src.utils.init_database import init_database
+
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {},
+            'SQLALCHEMY_BINDS': {},
+        })
+        init_database(app, demo_data=False)
+        with app.app_context():
+            start = time.perf_counter()
+            categories = populate(args.occurrences, args.area_km)
+            print(f'\n{args.occurrences} ocorrências abertas geradas em {time.perf_counter() - start:.1f}s\n')
+
+            failed = False
+            for label in ('cache frio', 'cache quente'):
+                random.seed(7)  # mesmos pontos nas duas rodadas
+                latencies, found = measure(categories, args.queries, args.area_km, app.config)
+                p95 = percentile(latencies, 0.95)
+                failed = failed or p95 > args.budget_ms
+                print(f'{label:13s} p50={percentile(latencies, 0.5):6.2f}ms  p95={p95:6.2f}ms  '
+                      f'p99={percentile(latencies, 0.99):6.2f}ms  max={latencies[-1]:6.2f}ms  '
+                      f'com duplicata={found}/{args.queries}')
+
+    print(f"\nOrçamento de {args.budget_ms:.0f}ms no p95: {'estourado' if failed else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Relatório do custo de import da aplicação (python -X importtime)
+
+Mostra o tempo total de `import src.main`, os pacotes de topo mais caros e
+quais módulos de rotas ficaram fora do cold start (blueprints adiados).
+
+Uso (a partir de backend/):
+    python benchmarks/import_report.py --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def collect(module):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='src.main')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    entries = collect(args.module)
+    total = next(cumulative for name, _, cumulative in entries if name.strip() == args.module)
+
+    # Tempo próprio somado por pacote de topo
+    by_package = defaultdict(int)
+    for name, self_us, _ in entries:
+        by_package[name.strip().split('.')[0]] += self_us
+
+    print(f'import {args.module}: {total / 1000:.0f} ms\n')
+    print(f'{"pacote":<30} {"ms":>8} {"%":>6}')
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f'{package:<30} {self_us / 1000:>8.1f} {self_us / total * 100:>6.1f}')
+
+    imported = {name.strip() for name, _, _ in entries}
+    routes_dir = os.path.join(BACKEND_DIR, 'src', 'routes')
+    deferred = sorted(
+        f'src.routes.{filename[:-3]}' for filename in os.listdir(routes_dir)
+        if filename.endswith('.py') and f'src.routes.{filename[:-3]}' not in imported
+    )
+    print('\nmódulos de rotas fora do cold start:')
+    for module in deferred:
+        print(f'  {module}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escritas concorrentes no SQLite
+
+N processos (como workers do gunicorn) fazem POSTs que leem uma categoria,
+inserem uma ocorrência e uma entrada de timeline e fazem commit, no mesmo
+arquivo SQLite. Compara o modo padrão do driver com SQLITE_PRODUCTION_MODE
+(WAL + pragmas + BEGIN IMMEDIATE com retentativas).
+
+Uso (a partir de backend/):
+    python benchmarks/sqlite_write_concurrency.py --workers 8 --seconds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_app(database_path, production_mode):
+    from src.main import create_app
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'SQLALCHEMY_BINDS': {},
+        'SQLITE_PRODUCTION_MODE': production_mode,
+    })
+
+
+def worker(database_path, production_mode, seconds, results):
+    from flask import jsonify
+    from src.models.models import db, Category, Occurrence, OccurrenceTimeline, User
+
+    app = build_app(database_path, production_mode)
+
+    @app.route('/bench/write', methods=['POST'])
+    def bench_write():
+        try:
+            category = Category.query.first()
+            citizen = User.query.first()
+            occurrence = Occurrence(
+                title='Buraco na rua', description='Benchmark de escrita',
+                category_id=category.id, citizen_id=citizen.id,
+                latitude=-21.24, longitude=-44.99, address='Rua Tiradentes, 100, Centro'
+            )
+            db.session.add(occurrence)
+            db.session.flush()
+            db.session.add(OccurrenceTimeline(occurrence_id=occurrence.id, user_id=citizen.id, action='created'))
+            db.session.commit()
+            return jsonify({'id': occurrence.id}), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+
+    client = app.test_client()
+    ok = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = client.post('/bench/write')
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 201:
+            ok += 1
+        else:
+            errors += 1
+    latencies.sort()
+    results.put((ok, errors, latencies[int(len(latencies) * 0.99) - 1] if latencies else 0))
+
+
+def run(workers, seconds, production_mode):
+    from src.utils.init_database import init_database
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, 'bench.db')
+        init_database(build_app(database_path, production_mode), demo_data=False)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(database_path, production_mode, seconds, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    ok = sum(item[0] for item in collected)
+    errors = sum(item[1] for item in collected)
+    p99 = max(item[2] for item in collected)
+    label = 'modo produção' if production_mode else 'padrão do driver'
+    print(f'{label:<18} {workers} workers: {ok / seconds:8.1f} escritas/s, '
+          f'{errors} erros, p99 {p99 * 1000:.0f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('fork')
+    run(args.workers, args.seconds, production_mode=False)
+    run(args.workers, args.seconds, production_mode=True)
+
+
+if __name__ == '__main__':
+    main()
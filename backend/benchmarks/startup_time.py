@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização: tempo até a primeira requisição respondida
+
+Sobe o servidor de desenvolvimento em um subprocesso e mede o tempo até
+GET /api/health responder 200. Com --with-init o `flask init-db` roda antes,
+reproduzindo o comportamento antigo (inicialização do banco no import).
+
+Uso (a partir de backend/):
+    python benchmarks/startup_time.py --runs 5
+    python benchmarks/startup_time.py --runs 5 --with-init
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(with_init, timeout=120):
+    port = free_port()
+    start = time.perf_counter()
+
+    if with_init:
+        subprocess.run(
+            [sys.executable, '-m', 'flask', '--app', 'src.main', 'init-db'],
+            cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL
+        )
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'src.main', 'run', '--port', str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f'http://127.0.0.1:{port}/api/health'
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError('servidor não respondeu a tempo')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def time_import():
+    code = 'import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR,
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--with-init', action='store_true', help='executa init-db antes de subir o servidor')
+    args = parser.parse_args()
+
+    imports = [time_import() for _ in range(args.runs)]
+    first_requests = [time_to_first_request(args.with_init) for _ in range(args.runs)]
+
+    print(f'import src.main:          mediana {statistics.median(imports) * 1000:.0f} ms '
+          f'(min {min(imports) * 1000:.0f} ms)')
+    print(f'tempo até 1ª requisição:  mediana {statistics.median(first_requests) * 1000:.0f} ms '
+          f'(min {min(first_requests) * 1000:.0f} ms){" com init-db" if args.with_init else ""}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do registro de apoios
+
+N cidadãos apoiam a mesma ocorrência ao mesmo tempo, cada um com um toque
+duplo (duas requisições simultâneas), distribuídos em processos (como workers
+do gunicorn) com várias threads cada. Ao final confere que existe exatamente
+um apoio por cidadão, que support_count bate com a tabela e quantas entradas
+de timeline foram criadas.
+
+Uso (a partir de backend/):
+    python benchmarks/support_load.py --supporters 500 --workers 10
+    python benchmarks/support_load.py --database-url postgresql://...   # banco vazio de teste
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_app(database_url, threads):
+    from src.main import create_app
+    # Threads excedentes esperam conexão no pool, como num worker real
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': min(threads, 20), 'max_overflow': 5, 'pool_timeout': 120},
+        'SQLALCHEMY_BINDS': {},
+    })
+
+
+def setup(database_url, supporters):
+    from src.models.models import db, Category, Occurrence, User, UserType
+    from src.utils.init_database import init_database
+
+    app = build_app(database_url, 1)
+    init_database(app, demo_data=False)
+    with app.app_context():
+        now = datetime.utcnow()
+        stamp = int(time.time())
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'apoio{stamp}_{i}@carga.test', 'password_hash': 'x', 'name': f'Apoiador {i}',
+             'user_type': UserType.CITIZEN, 'created_at': now}
+            for i in range(supporters)
+        ])
+        citizen_ids = db.session.query(User.id).filter(User.email.like(f'apoio{stamp}_%')).order_by(User.id).all()
+        occurrence = Occurrence(
+            title='Ocorrência viral', description='Teste de carga de apoios',
+            category_id=Category.query.first().id, citizen_id=citizen_ids[0][0],
+            latitude=-21.2264, longitude=-43.7742, address='Rua da Paz, 1'
+        )
+        db.session.add(occurrence)
+        db.session.commit()
+        return occurrence.id, [row[0] for row in citizen_ids]
+
+
+def worker(database_url, occurrence_id, citizen_ids, start_event, results):
+    from flask_jwt_extended import create_access_token
+
+    app = build_app(database_url, 2 * len(citizen_ids))
+    with app.app_context():
+        tokens = [create_access_token(identity=str(citizen_id)) for citizen_id in citizen_ids]
+
+    statuses = []
+    latencies = []
+    lock = threading.Lock()
+
+    def tap(token):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post(f'/api/occurrences/{occurrence_id}/support',
+                               headers={'Authorization': f'Bearer {token}'})
+        with lock:
+            statuses.append(response.status_code)
+            latencies.append(time.perf_counter() - start)
+
+    # Toque duplo: duas requisições por cidadão
+    threads = [threading.Thread(target=tap, args=(token,)) for token in tokens for _ in range(2)]
+    start_event.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((statuses, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--supporters', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--database-url', default=None, help='padrão: SQLite temporário')
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('fork')
+    directory = tempfile.TemporaryDirectory()
+    database_url = args.database_url or f"sqlite:///{os.path.join(directory.name, 'load.db')}"
+    occurrence_id, citizen_ids = setup(database_url, args.supporters)
+
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(
+            database_url, occurrence_id, citizen_ids[index::args.workers], start_event, results
+        ))
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(2)  # workers prontos com os tokens gerados
+    started = time.perf_counter()
+    start_event.set()
+    collected = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    statuses = [status for item in collected for status in item[0]]
+    latencies = sorted(latency for item in collected for latency in item[1])
+
+    from sqlalchemy import func
+    from src.models.models import db, Occurrence, OccurrenceSupport, OccurrenceTimeline
+    app = build_app(database_url, 1)
+    with app.app_context():
+        rows = db.session.query(func.count(OccurrenceSupport.id)).filter_by(occurrence_id=occurrence_id).scalar()
+        distinct = db.session.query(func.count(func.distinct(OccurrenceSupport.citizen_id))).filter_by(
+            occurrence_id=occurrence_id).scalar()
+        counter = db.session.get(Occurrence, occurrence_id).support_count
+        timeline = db.session.query(func.count(OccurrenceTimeline.id)).filter_by(
+            occurrence_id=occurrence_id, action='supported').scalar()
+
+    created = statuses.count(201)
+    rejected = statuses.count(400)
+    errors = len(statuses) - created - rejected
+    print(f'\n{len(statuses)} requisições de {args.supporters} cidadãos em {elapsed:.1f}s '
+          f'(p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms)')
+    print(f'201 criados: {created}   400 já apoiado: {rejected}   outros erros: {errors}')
+    print(f'apoios gravados: {rows} (cidadãos distintos: {distinct})   support_count: {counter}   '
+          f'entradas de timeline: {timeline}')
+
+    ok = rows == distinct == counter == created == args.supporters and errors == 0
+    print('✅ contagens corretas' if ok else '❌ contagens divergentes')
+    directory.cleanup()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ Servidor de produção otimizado
 """
 
 import multiprocessing
+import sys
 
 # Endereço e porta
 bind = "0.0.0.0:5000"
@@ -17,9 +18,9 @@ worker_connections = 1000
 timeout = 120
 keepalive = 5
 
-# Logs
-accesslog = "/tmp/gunicorn_access.log"
-errorlog = "/tmp/gunicorn_error.log"
+# Logs (stdout/stderr, lidos pelo Docker e pelo Render)
+accesslog = "-"
+errorlog = "-"
 loglevel = "info"
 
 # Daemon
@@ -36,3 +37,16 @@ limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
 
+# Hooks
+def post_fork(server, worker):
+    # Com preload_app as engines foram criadas no master; cada worker descarta
+    # o pool herdado e abre as próprias conexões
+    database = sys.modules.get('src.utils.database')
+    if database is not None:
+        database.dispose_engines()
+
+def post_worker_init(worker):
+    # O worker reinicia os handlers de sinal em init_signals; o handler de
+    # dump do profiler precisa ser instalado depois disso
+    from src.utils.profiler import profiler
+    profiler.install_signal_handler()
@@ -0,0 +1,338 @@
+"""
+Comandos de linha de comando da aplicação
+
+Uso (a partir de backend/):
+    flask --app src.main init-db
+    flask --app src.main search-reindex
+    flask --app src.main merge-duplicates [--apply]
+    flask --app src.main reconcile-counters [--dry-run]
+    flask --app src.main auto-triage [--dry-run]
+    flask --app src.main auto-assign [--apply]
+    flask --app src.main sla-scan [--dry-run] [--interval SEGUNDOS]
+    flask --app src.main jobs-worker [--queue FILA] [--processes N] [--burst]
+    flask --app src.main outbox-relay [--interval SEGUNDOS] [--batch-size N] [--once]
+    flask --app src.main rollups-rebuild
+    flask --app src.main analytics-export [--full]
+    flask --app src.main forecasts-refresh
+    flask --app src.main analytics-parity [--days N] [--no-export]
+"""
+
+import functools
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+def writes(command):
+    """Comandos que escrevem no banco (ver write_intent em src/utils/database.py)"""
+    @functools.wraps(command)
+    def wrapper(*args, **kwargs):
+        from src.utils.database import write_intent
+        write_intent()
+        return command(*args, **kwargs)
+    return wrapper
+
+
+@click.command('init-db')
+@click.option('--demo-data/--no-demo-data', default=True,
+              help='Gera cidadãos e ocorrências de demonstração quando o banco está vazio.')
+@with_appcontext
+def init_db_command(demo_data):
+    """Cria tabelas e dados iniciais. Idempotente: pode rodar a cada deploy."""
+    from src.utils.init_database import init_database
+    init_database(current_app, demo_data=demo_data)
+
+
+@click.command('search-reindex')
+@with_appcontext
+@writes
+def search_reindex_command():
+    """Reconstrói o índice de busca textual das ocorrências."""
+    from src.models.models import db
+    from src.utils.search import ensure_search_index, reindex_all
+    ensure_search_index(db.session)
+    total = reindex_all(db.session)
+    click.echo(f'✅ {total} ocorrências indexadas')
+
+
+@click.command('merge-duplicates')
+@click.option('--apply', is_flag=True, help='Aplica as mesclagens; sem a opção apenas lista as propostas.')
+@click.option('--category', 'category_ids', type=int, multiple=True, help='Restringe a uma ou mais categorias.')
+@click.option('--radius', type=float, default=None, help='Raio em metros (padrão: DUPLICATE_RADIUS_M).')
+@click.option('--threshold', type=float, default=None, help='Semelhança mínima (padrão: DUPLICATE_SIMILARITY_THRESHOLD).')
+@click.option('--chunk-size', type=int, default=2000, show_default=True, help='Ocorrências lidas por consulta.')
+@click.option('--show', type=int, default=20, show_default=True, help='Quantos grupos listar.')
+@with_appcontext
+@writes
+def merge_duplicates_command(apply, category_ids, radius, threshold, chunk_size, show):
+    """Agrupa ocorrências abertas duplicadas e mescla cada grupo na mais antiga."""
+    from src.models.models import db
+    from src.utils.clustering import recluster
+
+    listed = []
+
+    def on_cluster(category_id, canonical_id, duplicate_ids):
+        if len(listed) < show:
+            listed.append(canonical_id)
+            click.echo(f'  categoria {category_id}: #{canonical_id} <- ' + ', '.join(f'#{i}' for i in duplicate_ids))
+
+    stats = recluster(
+        db.session,
+        apply=apply,
+        category_ids=list(category_ids) or None,
+        radius_m=radius or current_app.config['DUPLICATE_RADIUS_M'],
+        threshold=threshold or current_app.config['DUPLICATE_SIMILARITY_THRESHOLD'],
+        chunk_size=chunk_size,
+        on_cluster=on_cluster
+    )
+
+    click.echo(
+        f"{stats.get('scanned', 0)} ocorrências lidas em {stats['elapsed_s']:.1f}s "
+        f"({stats['per_second']:.0f}/s, {stats.get('compared', 0)} comparações)"
+    )
+    click.echo(f"{stats.get('clusters', 0)} grupos, {stats.get('duplicates', 0)} duplicatas")
+    if apply:
+        click.echo(
+            f"✅ Mescladas: {stats.get('moved_supports', 0)} apoios, {stats.get('moved_photos', 0)} fotos "
+            f"e {stats.get('moved_timeline', 0)} eventos de timeline movidos"
+        )
+    else:
+        click.echo('Nada foi alterado; use --apply para mesclar.')
+
+
+@click.command('reconcile-counters')
+@click.option('--dry-run', is_flag=True, help='Apenas conta as divergências, sem corrigir.')
+@click.option('--batch-size', type=int, default=5000, show_default=True)
+@with_appcontext
+@writes
+def reconcile_counters_command(dry_run, batch_size):
+    """Recalcula support_count e photo_count das ocorrências e a carga das equipes."""
+    from src.models.models import db
+    from src.utils.counters import reconcile_counters
+    from src.utils.workload import reconcile_workloads
+    stats = reconcile_counters(db.session, batch_size=batch_size, fix=not dry_run)
+    action = 'encontradas' if dry_run else 'corrigidas'
+    click.echo(f"✅ {stats['checked']} ocorrências verificadas, {stats['drifted']} divergências {action}")
+    if not dry_run:
+        click.echo(f"✅ Carga de trabalho corrigida em {reconcile_workloads(db.session)} usuário(s)")
+
+
+@click.command('auto-triage')
+@click.option('--dry-run', is_flag=True, help='Apenas avalia as regras, sem gravar.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+@with_appcontext
+@writes
+def auto_triage_command(dry_run, batch_size):
+    """Aplica as regras de triagem automática à fila de triagem."""
+    from src.models.models import db
+    from src.utils.auto_triage import run_auto_triage
+    stats = run_auto_triage(db.session, current_app.config, batch_size=batch_size, apply=not dry_run)
+    click.echo(
+        f"{stats['scanned']} ocorrências na fila avaliadas em {stats['elapsed_s']:.1f}s: "
+        f"{stats['triaged']} triadas, {stats['reprioritized']} com prioridade ajustada"
+    )
+    if dry_run:
+        click.echo('Nada foi alterado; rode sem --dry-run para aplicar.')
+
+
+@click.command('auto-assign')
+@click.option('--apply', is_flag=True, help='Grava as atribuições; sem a opção apenas lista as propostas.')
+@click.option('--department', 'department_ids', type=int, multiple=True, help='Restringe a um ou mais departamentos.')
+@click.option('--show', type=int, default=20, show_default=True, help='Quantas propostas listar.')
+@with_appcontext
+@writes
+def auto_assign_command(apply, department_ids, show):
+    """Distribui as ocorrências triadas e sem responsável entre as equipes."""
+    import time
+    from src.models.models import db
+    from src.utils.workload import assign_backlog
+    start = time.perf_counter()
+    proposals = assign_backlog(db.session, current_app.config, department_ids=list(department_ids) or None, apply=apply)
+    for item in proposals[:show]:
+        click.echo(f"  #{item['occurrence_id']} -> {item['name']} (usuário {item['assigned_to']})")
+    click.echo(f'{len(proposals)} atribuições em {time.perf_counter() - start:.1f}s')
+    if not apply:
+        click.echo('Nada foi alterado; use --apply para gravar.')
+
+
+@click.command('sla-scan')
+@click.option('--dry-run', is_flag=True, help='Lista os eventos sem gravar.')
+@click.option('--interval', type=int, default=0, help='Repete a varredura a cada N segundos (0 = uma vez).')
+@with_appcontext
+@writes
+def sla_scan_command(dry_run, interval):
+    """Registra avisos de prazo próximo e estouros de prazo (rodar periodicamente, ex.: cron)."""
+    import time
+    from src.models.models import db
+    from src.utils.sla import scan_sla
+    while True:
+        start = time.perf_counter()
+        events = scan_sla(db.session, current_app.config, apply=not dry_run)
+        for item in events:
+            click.echo(f"  #{item['occurrence_id']} {item['event']} (prazo {item['sla_due_at']})")
+        click.echo(f'{len(events)} evento(s) em {time.perf_counter() - start:.2f}s')
+        if not interval:
+            break
+        time.sleep(interval)
+    if dry_run:
+        click.echo('Nada foi alterado.')
+
+
+def _outbox_idle(session, config, log=print):
+    """Rodada do relay do outbox entre tarefas (OUTBOX_RELAY_IN_WORKER)"""
+    if not config['OUTBOX_RELAY_IN_WORKER']:
+        return None
+    from src.utils.outbox import relay
+    return lambda: any(relay(session, config, log=log).values())
+
+
+def _jobs_worker_process(queues, burst):
+    """Processo filho do jobs-worker: cria a própria aplicação e conexões"""
+    from src.main import create_app
+    import time
+    from sqlalchemy.exc import OperationalError
+    from src.models.models import db
+    from src.utils.database import write_intent
+    from src.utils.jobs import busy_delay, run_worker
+    app = create_app()
+    with app.app_context():
+        write_intent()
+        failures = 0
+        while True:
+            try:
+                run_worker(db.session, app.config, queues, burst=burst, idle=_outbox_idle(db.session, app.config))
+                return
+            except OperationalError as e:
+                # Falhas fora do laço do worker (ex.: ao carregar os handlers): recomeça depois de esperar
+                db.session.rollback()
+                failures += 1
+                delay = busy_delay(failures, app.config)
+                print(f'⚠️ Banco indisponível ({e.orig}); worker reinicia em {delay:.2f}s')
+                time.sleep(delay)
+            except KeyboardInterrupt:
+                return
+
+
+@click.command('jobs-worker')
+@click.option('--queue', 'queues', multiple=True, help='Filas atendidas (padrão: todas as registradas).')
+@click.option('--processes', type=int, default=1, show_default=True, help='Quantos processos de worker iniciar.')
+@click.option('--burst', is_flag=True, help='Encerra quando não houver mais tarefas prontas.')
+@with_appcontext
+@writes
+def jobs_worker_command(queues, processes, burst):
+    """Executa as tarefas em segundo plano (notificações etc.)."""
+    from src.models.models import db
+    from src.utils.jobs import run_worker
+    if processes > 1:
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        children = [context.Process(target=_jobs_worker_process, args=(list(queues), burst)) for _ in range(processes)]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+        return
+    try:
+        stats = run_worker(db.session, current_app.config, list(queues), burst=burst, log=click.echo,
+                           idle=_outbox_idle(db.session, current_app.config, click.echo))
+        click.echo(f"{stats['done']} concluída(s), {stats['failed']} com falha")
+    except KeyboardInterrupt:
+        click.echo('Worker encerrado')
+
+
+@click.command('outbox-relay')
+@click.option('--interval', type=float, default=None, help='Segundos de espera quando não há eventos (padrão: OUTBOX_POLL_SECONDS).')
+@click.option('--batch-size', type=int, default=None, help='Eventos por lote (padrão: OUTBOX_BATCH_SIZE).')
+@click.option('--once', is_flag=True, help='Encerra quando todos os consumidores alcançarem o fim do outbox.')
+@with_appcontext
+@writes
+def outbox_relay_command(interval, batch_size, once):
+    """Entrega os eventos das ocorrências aos consumidores (notificações, agregados)."""
+    from src.models.models import db
+    from src.utils.outbox import outbox_stats, run_relay
+    try:
+        run_relay(db.session, current_app.config, interval=interval, batch_size=batch_size, once=once, log=click.echo)
+    except KeyboardInterrupt:
+        click.echo('Relay encerrado')
+    for item in outbox_stats(db.session)['consumers']:
+        click.echo(f"  {item['consumer']}: evento {item['last_event_id']} ({item['pending']} pendente(s))")
+
+
+@click.command('rollups-rebuild')
+@with_appcontext
+@writes
+def rollups_rebuild_command():
+    """Refaz os agregados diários e as contagens por célula a partir do histórico (com o relay parado)."""
+    from src.models.models import db
+    from src.utils.hotspots import rebuild_cell_stats
+    from src.utils.rollups import rebuild_daily_stats
+    click.echo(f'✅ {rebuild_daily_stats(db.session, current_app.config)} linha(s) de agregados diários')
+    click.echo(f'✅ {rebuild_cell_stats(db.session, current_app.config)} linha(s) de contagem por célula')
+
+
+@click.command('forecasts-refresh')
+@with_appcontext
+@writes
+def forecasts_refresh_command():
+    """Recalcula as previsões de volume de ocorrências a partir dos agregados diários."""
+    from src.models.models import db
+    from src.utils.forecasting import refresh_forecasts
+    refresh_forecasts(db.session, current_app.config, log=click.echo)
+
+
+@click.command('analytics-export')
+@click.option('--full', is_flag=True, help='Regrava todo o instantâneo; sem a opção, só o que mudou desde a última exportação.')
+@click.option('--dir', 'directory', default=None, help='Diretório de destino (padrão: ANALYTICS_DIR).')
+@with_appcontext
+def analytics_export_command(full, directory):
+    """Exporta ocorrências e timeline em Parquet particionado por mês."""
+    from src.models.models import db
+    from src.utils.analytics import AnalyticsUnavailable, export_analytics
+    try:
+        export_analytics(db.session, current_app.config, directory=directory, full=full, log=click.echo)
+    except AnalyticsUnavailable as e:
+        raise click.ClickException(str(e))
+
+
+@click.command('analytics-parity')
+@click.option('--days', type=int, default=30, show_default=True, help='Período das métricas.')
+@click.option('--export/--no-export', default=True, help='Atualiza o instantâneo (sem folga) antes de comparar.')
+@with_appcontext
+def analytics_parity_command(days, export):
+    """Compara as métricas estratégicas calculadas no banco e no instantâneo DuckDB."""
+    from src.models.models import db
+    from src.routes.strategic_dashboard import LIVE_METRICS
+    from src.utils.analytics import AnalyticsUnavailable, export_analytics, parity
+    try:
+        if export:
+            export_analytics(db.session, current_app.config, lag_seconds=0, log=click.echo)
+        report = parity(current_app.config, LIVE_METRICS, days)
+    except AnalyticsUnavailable as e:
+        raise click.ClickException(str(e))
+    for name, found in report.items():
+        click.echo(f"{'✅' if not found else '❌'} {name}")
+        for line in found:
+            click.echo(f'    {line}')
+    if any(report.values()):
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(merge_duplicates_command)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(auto_triage_command)
+    app.cli.add_command(auto_assign_command)
+    app.cli.add_command(sla_scan_command)
+    app.cli.add_command(jobs_worker_command)
+    app.cli.add_command(outbox_relay_command)
+    app.cli.add_command(rollups_rebuild_command)
+    app.cli.add_command(forecasts_refresh_command)
+    app.cli.add_command(analytics_export_command)
+    app.cli.add_command(analytics_parity_command)
@@ -0,0 +1,195 @@
+"""
+Configurações da aplicação, lidas de variáveis de ambiente
+
+A configuração ativa é escolhida por FLASK_ENV (development, production ou
+testing) ou passada explicitamente para create_app().
+"""
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(name, default=''):
+    return [item.strip() for item in os.environ.get(name, default).split(',') if item.strip()]
+
+
+def env_limits(name, default=''):
+    """'fila=4,outra=2' -> {'fila': 4, 'outra': 2}"""
+    limits = {}
+    for item in env_list(name, default):
+        key, _, value = item.partition('=')
+        limits[key.strip()] = int(value)
+    return limits
+
+
+def database_url(name, default=None):
+    url = os.environ.get(name, default)
+    # Render e Heroku ainda entregam o esquema antigo "postgres://"
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Opções de pool do SQLAlchemy; o SQLite mantém os padrões do driver"""
+    if not url or url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+    }
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'portal-cidadao-secret-key-2024')
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string-portal-cidadao')
+    SQLALCHEMY_DATABASE_URI = database_url(
+        'DATABASE_URL', f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"
+    )
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Réplica de leitura opcional (PostgreSQL) para dashboards e listagens
+    DATABASE_REPLICA_URL = database_url('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL)}
+    } if DATABASE_REPLICA_URL else {}
+    DB_REPLICA_READ_ENDPOINTS = env_list(
+        'DB_REPLICA_READ_ENDPOINTS', 'occurrences.get_occurrences,occurrences.export_occurrences,occurrences.export_timeline'
+    )
+
+    # Modo de produção do SQLite: WAL, pragmas ajustados e escritas com
+    # BEGIN IMMEDIATE (um escritor por vez) com retentativas
+    SQLITE_PRODUCTION_MODE = env_bool('SQLITE_PRODUCTION_MODE', True)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_WRITE_RETRIES = int(os.environ.get('SQLITE_WRITE_RETRIES', 5))
+    SQLITE_RETRY_BACKOFF_MS = int(os.environ.get('SQLITE_RETRY_BACKOFF_MS', 50))
+
+    # statement_timeout por classe de rota (PostgreSQL), em milissegundos; 0 desliga
+    DB_DASHBOARD_PREFIXES = env_list('DB_DASHBOARD_PREFIXES', '/api/political,/api/strategic,/api/admin/dashboard')
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 10000))
+    DB_DASHBOARD_TIMEOUT_MS = int(os.environ.get('DB_DASHBOARD_TIMEOUT_MS', 30000))
+    DB_WRITE_TIMEOUT_MS = int(os.environ.get('DB_WRITE_TIMEOUT_MS', 5000))
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    CORS_ORIGINS = env_list('CORS_ORIGINS', '*')
+
+    # Detecção de duplicatas no registro de ocorrências
+    DUPLICATE_DETECTION_ENABLED = env_bool('DUPLICATE_DETECTION_ENABLED', True)
+    DUPLICATE_RADIUS_M = float(os.environ.get('DUPLICATE_RADIUS_M', 150))
+    DUPLICATE_SIMILARITY_THRESHOLD = float(os.environ.get('DUPLICATE_SIMILARITY_THRESHOLD', 0.5))
+    DUPLICATE_MAX_RESULTS = int(os.environ.get('DUPLICATE_MAX_RESULTS', 3))
+
+    # Apoios: entradas de timeline agrupadas por janela e limite do apoio em lote
+    SUPPORT_TIMELINE_WINDOW_MINUTES = int(os.environ.get('SUPPORT_TIMELINE_WINDOW_MINUTES', 60))
+    SUPPORT_BULK_MAX = int(os.environ.get('SUPPORT_BULK_MAX', 100))
+
+    # Triagem em lote: máximo de itens por requisição
+    TRIAGE_BULK_MAX = int(os.environ.get('TRIAGE_BULK_MAX', 500))
+
+    # Triagem automática por regras (src/utils/auto_triage.py); desligada por padrão
+    AUTO_TRIAGE_ENABLED = env_bool('AUTO_TRIAGE_ENABLED', False)
+    AUTO_TRIAGE_CATEGORY_FALLBACK = env_bool('AUTO_TRIAGE_CATEGORY_FALLBACK', False)  # Departamento da categoria quando nenhuma regra define
+    AUTO_TRIAGE_RULES_TTL = int(os.environ.get('AUTO_TRIAGE_RULES_TTL', 30))  # Segundos até recompilar as regras
+    LOCAL_TIMEZONE = os.environ.get('LOCAL_TIMEZONE', 'America/Sao_Paulo')
+
+    # Escolha do responsável por carga de trabalho e proximidade (src/utils/workload.py)
+    ASSIGNMENT_AUTO_ENABLED = env_bool('ASSIGNMENT_AUTO_ENABLED', False)  # Responsável escolhido na triagem automática
+    ASSIGNMENT_MAX_ACTIVE_JOBS = int(os.environ.get('ASSIGNMENT_MAX_ACTIVE_JOBS', 15))
+    ASSIGNMENT_LOAD_WEIGHT_KM = float(os.environ.get('ASSIGNMENT_LOAD_WEIGHT_KM', 1.0))  # Cada tarefa ativa "custa" esta distância
+    ASSIGNMENT_IDLE_TRAVEL_KM = float(os.environ.get('ASSIGNMENT_IDLE_TRAVEL_KM', 2.0))  # Distância assumida para equipe sem tarefas
+
+    # Rota de visitas das equipes (src/utils/routing.py)
+    ROUTE_URGENCY_WEIGHT = float(os.environ.get('ROUTE_URGENCY_WEIGHT', 0.1))  # 0 = só distância
+    ROUTE_TWO_OPT_MAX_STOPS = int(os.environ.get('ROUTE_TWO_OPT_MAX_STOPS', 80))
+    ROUTE_START_LATITUDE = float(os.environ.get('ROUTE_START_LATITUDE', -21.2453))  # Padrão: centro de Lavras
+    ROUTE_START_LONGITUDE = float(os.environ.get('ROUTE_START_LONGITUDE', -44.9997))
+
+    # Prazos de atendimento (src/utils/sla.py)
+    SLA_AT_RISK_HOURS = int(os.environ.get('SLA_AT_RISK_HOURS', 24))  # Antecedência do aviso quando a política não define
+    SLA_POLICIES_TTL = int(os.environ.get('SLA_POLICIES_TTL', 60))  # Segundos até recarregar as políticas
+
+    # Fila de tarefas em segundo plano (src/utils/jobs.py)
+    JOB_QUEUE_CONCURRENCY = env_limits('JOB_QUEUE_CONCURRENCY', 'default=4,notifications=4')  # Tarefas simultâneas por fila
+    JOB_DEFAULT_CONCURRENCY = int(os.environ.get('JOB_DEFAULT_CONCURRENCY', 2))  # Filas fora da lista acima
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_BASE_SECONDS = int(os.environ.get('JOB_RETRY_BASE_SECONDS', 30))
+    JOB_RETRY_MAX_SECONDS = int(os.environ.get('JOB_RETRY_MAX_SECONDS', 3600))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))  # Tarefa em execução há mais tempo volta para a fila
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1.0))
+    JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 7))  # Tarefas concluídas são apagadas depois disso
+
+    # Exportação CSV/XLSX (src/utils/export.py): linhas por leitura do cursor e por bloco enviado
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+
+    # Instantâneo analítico em Parquet e backend DuckDB (src/utils/analytics.py; pyarrow e duckdb opcionais)
+    ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR', os.path.join(os.path.dirname(BASE_DIR), 'instance', 'analytics'))  # Fora do código (backend/instance)
+    ANALYTICS_BACKEND = os.environ.get('ANALYTICS_BACKEND', 'sql')  # 'duckdb' lê os dashboards estratégicos do instantâneo
+    ANALYTICS_MAX_AGE_HOURS = float(os.environ.get('ANALYTICS_MAX_AGE_HOURS', 26))  # Instantâneo mais velho volta para o banco
+    ANALYTICS_EXPORT_LAG_SECONDS = float(os.environ.get('ANALYTICS_EXPORT_LAG_SECONDS', 60))  # Linhas mais novas esperam a próxima exportação
+
+    # Pontos críticos e mapa de calor (src/utils/hotspots.py; NumPy opcional)
+    HOTSPOT_BANDWIDTH_M = float(os.environ.get('HOTSPOT_BANDWIDTH_M', 150))  # Desvio do kernel gaussiano
+    HOTSPOT_MAX_GRID_CELLS = int(os.environ.get('HOTSPOT_MAX_GRID_CELLS', 4_000_000))  # Área maior é suavizada célula a célula
+
+    # Previsão de volume por categoria e bairro (src/utils/forecasting.py)
+    FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', 182))
+    FORECAST_HORIZON_DAYS = int(os.environ.get('FORECAST_HORIZON_DAYS', 28))
+    FORECAST_MIN_OCCURRENCES = int(os.environ.get('FORECAST_MIN_OCCURRENCES', 28))  # Mínimo no histórico para prever um bairro
+
+    # Outbox de eventos das ocorrências (src/utils/outbox.py)
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 500))
+    OUTBOX_POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', 1.0))
+    OUTBOX_RELAY_LAG_SECONDS = float(os.environ.get('OUTBOX_RELAY_LAG_SECONDS', 2.0))  # Eventos mais novos esperam a próxima rodada
+    OUTBOX_GAP_TIMEOUT_SECONDS = float(os.environ.get('OUTBOX_GAP_TIMEOUT_SECONDS', 10))  # Espera por um id faltando (transação aberta ou desfeita) antes de pulá-lo; acima de DB_WRITE_TIMEOUT_MS
+    OUTBOX_RELAY_IN_WORKER = env_bool('OUTBOX_RELAY_IN_WORKER', True)  # O jobs-worker também roda o relay quando está ocioso
+    OUTBOX_RETENTION_DAYS = int(os.environ.get('OUTBOX_RETENTION_DAYS', 7))  # Eventos já entregues são apagados depois disso
+
+    # Blueprints pouco usados (dashboards estratégicos) são importados apenas
+    # na primeira requisição que os atinge
+    LAZY_BLUEPRINTS = env_bool('LAZY_BLUEPRINTS', True)
+
+    # Profiler por amostragem (opt-in, ver src/utils/profiler.py)
+    PROFILER_ENABLED = env_bool('PROFILER_ENABLED', False)
+    PROFILER_SAMPLE_RATE = int(os.environ.get('PROFILER_SAMPLE_RATE', 100))  # 1 em N requisições
+    PROFILER_ROUTES = env_list('PROFILER_ROUTES')
+    PROFILER_HEADER_TOKEN = os.environ.get('PROFILER_HEADER_TOKEN')
+    PROFILER_DUMP_DIR = os.environ.get('PROFILER_DUMP_DIR', '/tmp/portal-profiles')
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    LAZY_BLUEPRINTS = env_bool('LAZY_BLUEPRINTS', False)
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = {}
+    LAZY_BLUEPRINTS = False
+
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def get_config(name=None):
+    name = name or os.environ.get('FLASK_ENV', 'production')
+    return config_by_name.get(name, ProductionConfig)
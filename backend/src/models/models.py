@@ -2,8 +2,11 @@ from datetime import datetime
 import enum
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.utils.database import RoutingSession
+from src.utils.geo import cell_id
+from sqlalchemy import event
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class UserType(enum.Enum):
     CITIZEN = "citizen"
@@ -23,6 +26,12 @@ class Priority(enum.Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+class JobStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -32,11 +41,17 @@ class User(db.Model):
     phone = db.Column(db.String(20))
     password_hash = db.Column(db.String(255), nullable=False)
     user_type = db.Column(db.Enum(UserType), nullable=False, default=UserType.CITIZEN)
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=True, index=True)
     address = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Carga de trabalho: ocorrências ativas atribuídas e soma das suas
+    # coordenadas, para o centroide (src/utils/workload.py)
+    active_jobs = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    active_jobs_lat_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    active_jobs_lon_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    
     # Relacionamentos
     department = db.relationship('Department', backref='users')
     occurrences = db.relationship('Occurrence', backref='citizen', lazy=True, foreign_keys='Occurrence.citizen_id')
@@ -108,13 +123,19 @@ class Category(db.Model):
 
 class Occurrence(db.Model):
     __tablename__ = 'occurrences'
+    __table_args__ = (
+        db.Index('ix_occurrences_category_geo_cell', 'category_id', 'geo_cell'),
+        db.Index('ix_occurrences_support_count', 'support_count', 'created_at'),
+        db.Index('ix_occurrences_status_sla_due_at', 'status', 'sla_due_at'),
+        db.Index('ix_occurrences_created_at', 'created_at', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     citizen_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=True)
     approved_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     validated_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
@@ -123,6 +144,7 @@ class Occurrence(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     address = db.Column(db.String(500), nullable=False)
+    geo_cell = db.Column(db.BigInteger, nullable=True)  # célula da grade espacial (src/utils/geo.py)
     
     # Status e prioridade
     status = db.Column(db.Enum(OccurrenceStatus), nullable=False, default=OccurrenceStatus.OPEN)
@@ -137,6 +159,11 @@ class Occurrence(db.Model):
     completed_at = db.Column(db.DateTime, nullable=True)
     validated_at = db.Column(db.DateTime, nullable=True)
     rejection_reason = db.Column(db.Text, nullable=True)
+    
+    # Prazo de atendimento (src/utils/sla.py), calculado na triagem
+    sla_due_at = db.Column(db.DateTime, nullable=True)
+    sla_warned_at = db.Column(db.DateTime, nullable=True)  # Aviso de prazo próximo já emitido
+    sla_breached_at = db.Column(db.DateTime, nullable=True)  # Estouro de prazo já emitido
     blocking_reason = db.Column(db.Text, nullable=True)
     materials_used = db.Column(db.Text, nullable=True)
     execution_notes = db.Column(db.Text, nullable=True)
@@ -145,6 +172,13 @@ class Occurrence(db.Model):
     rating = db.Column(db.Integer, nullable=True) # 1 a 5 estrelas
     feedback = db.Column(db.Text, nullable=True)
     
+    # Contadores denormalizados (src/utils/counters.py)
+    support_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    photo_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Duplicata fechada e mesclada em outra ocorrência (ver `flask merge-duplicates`)
+    merged_into_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=True)
+    
     # Relacionamentos
     category = db.relationship('Category', backref='occurrences')
     department = db.relationship('Department', backref='occurrences')
@@ -154,7 +188,8 @@ class Occurrence(db.Model):
     timeline = db.relationship('OccurrenceTimeline', backref='occurrence', lazy=True, cascade='all, delete-orphan')
     supports = db.relationship('OccurrenceSupport', backref='occurrence', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self, include_timeline=False):
+    def to_dict(self, include_timeline=False, include_photos=True):
+        # Listagens passam include_photos=False: photo_count basta e evita uma consulta por linha
         data = {
             'id': self.id,
             'title': self.title,
@@ -187,16 +222,21 @@ class Occurrence(db.Model):
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'validated_at': self.validated_at.isoformat() if self.validated_at else None,
+            'sla_due_at': self.sla_due_at.isoformat() if self.sla_due_at else None,
+            'sla_breached_at': self.sla_breached_at.isoformat() if self.sla_breached_at else None,
             'rejection_reason': self.rejection_reason,
             'blocking_reason': self.blocking_reason,
             'materials_used': self.materials_used,
             'execution_notes': self.execution_notes,
             'rating': self.rating,
             'feedback': self.feedback,
-            'photos': [photo.to_dict() for photo in self.photos],
-            'support_count': len(self.supports)
+            'merged_into_id': self.merged_into_id,
+            'photo_count': self.photo_count,
+            'support_count': self.support_count
         }
         
+        if include_photos:
+            data['photos'] = [photo.to_dict() for photo in self.photos]
         if include_timeline:
             data['timeline'] = [item.to_dict() for item in self.timeline]
             
@@ -206,7 +246,7 @@ class OccurrencePhoto(db.Model):
     __tablename__ = 'occurrence_photos'
     
     id = db.Column(db.Integer, primary_key=True)
-    occurrence_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=False)
+    occurrence_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=False)
     file_size = db.Column(db.Integer)
@@ -226,13 +266,24 @@ class OccurrenceTimeline(db.Model):
     __tablename__ = 'occurrence_timeline'
     
     id = db.Column(db.Integer, primary_key=True)
-    occurrence_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=False)
+    occurrence_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True) # Pode ser nulo se for ação do sistema
-    action = db.Column(db.String(100), nullable=False) # Ex: created, assigned, status_changed, resolved, commented
+    action = db.Column(db.String(100), nullable=False, default='status_changed') # Ex: created, assigned, status_changed, resolved, commented
     description = db.Column(db.Text)
+    old_status = db.Column(db.Enum(OccurrenceStatus), nullable=True)
+    new_status = db.Column(db.Enum(OccurrenceStatus), nullable=True)
+    status_change = db.Column(db.String(100), nullable=True) # Etapa do workflow, ex: "Execução Iniciada"
+    details = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Entradas agrupadas (apoios da mesma janela): chave única por ocorrência e quantos eventos somam
+    group_key = db.Column(db.String(40), nullable=True)
+    group_count = db.Column(db.Integer, nullable=True)
     
     user = db.relationship('User', backref='timeline_events')
+
+    __table_args__ = (
+        db.Index('uq_occurrence_timeline_group', 'occurrence_id', 'group_key', unique=True),
+    )
     
     def to_dict(self):
         return {
@@ -240,12 +291,19 @@ class OccurrenceTimeline(db.Model):
             'occurrence_id': self.occurrence_id,
             'user': self.user.to_dict() if self.user else None,
             'action': self.action,
-            'description': self.description,
+            'description': self.description or self.details,
+            'old_status': self.old_status.value if self.old_status else None,
+            'new_status': self.new_status.value if self.new_status else None,
+            'status_change': self.status_change,
             'created_at': self.created_at.isoformat()
         }
 
 class OccurrenceSupport(db.Model):
     __tablename__ = 'occurrence_supports'
+    __table_args__ = (
+        # Um apoio por cidadão (src/utils/supports.py)
+        db.Index('uq_occurrence_supports_occurrence_citizen', 'occurrence_id', 'citizen_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     occurrence_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=False)
@@ -262,3 +320,234 @@ class OccurrenceSupport(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class TriageRule(db.Model):
+    """Regra de triagem automática (src/utils/auto_triage.py)"""
+    __tablename__ = 'triage_rules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=100)  # Ordem de avaliação (menor primeiro)
+    is_active = db.Column(db.Boolean, default=True)
+
+    # Condições: campo vazio casa com qualquer ocorrência
+    category_ids = db.Column(db.JSON, nullable=True)
+    neighborhoods = db.Column(db.JSON, nullable=True)
+    keywords = db.Column(db.JSON, nullable=True)
+    min_support_count = db.Column(db.Integer, nullable=True)
+    hour_start = db.Column(db.Integer, nullable=True)  # Horário local, [início, fim); pode virar a meia-noite
+    hour_end = db.Column(db.Integer, nullable=True)
+
+    # Ações
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=True)
+    priority = db.Column(db.Enum(Priority), nullable=True)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    require_review = db.Column(db.Boolean, default=False)  # Mantém na fila de triagem manual
+    stop_processing = db.Column(db.Boolean, default=False)  # Não avalia as regras seguintes
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    department = db.relationship('Department')
+    assigned_to_user = db.relationship('User')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'position': self.position,
+            'is_active': self.is_active,
+            'category_ids': self.category_ids or [],
+            'neighborhoods': self.neighborhoods or [],
+            'keywords': self.keywords or [],
+            'min_support_count': self.min_support_count,
+            'hour_start': self.hour_start,
+            'hour_end': self.hour_end,
+            'department_id': self.department_id,
+            'department_name': self.department.name if self.department else None,
+            'priority': self.priority.value if self.priority else None,
+            'assigned_to': self.assigned_to,
+            'assigned_to_name': self.assigned_to_user.name if self.assigned_to_user else None,
+            'require_review': self.require_review,
+            'stop_processing': self.stop_processing,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class SlaPolicy(db.Model):
+    """Prazo de atendimento por categoria, departamento e/ou prioridade (src/utils/sla.py)"""
+    __tablename__ = 'sla_policies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+
+    # Escopo: campo vazio vale para qualquer valor; a política mais específica vence
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=True)
+    priority = db.Column(db.Enum(Priority), nullable=True)
+
+    hours = db.Column(db.Integer, nullable=False)  # Prazo contado a partir do registro
+    at_risk_hours = db.Column(db.Integer, nullable=True)  # Antecedência do aviso (padrão SLA_AT_RISK_HOURS)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    category = db.relationship('Category')
+    department = db.relationship('Department')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'is_active': self.is_active,
+            'category_id': self.category_id,
+            'category_name': self.category.name if self.category else None,
+            'department_id': self.department_id,
+            'department_name': self.department.name if self.department else None,
+            'priority': self.priority.value if self.priority else None,
+            'hours': self.hours,
+            'at_risk_hours': self.at_risk_hours,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class Job(db.Model):
+    """Tarefa em segundo plano (src/utils/jobs.py)"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_queue_status_run_at', 'queue', 'status', 'run_at'),
+        db.Index('uq_jobs_idempotency_key', 'idempotency_key', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    queue = db.Column(db.String(50), nullable=False, default='default')
+    name = db.Column(db.String(100), nullable=False)  # Nome do handler registrado
+    payload = db.Column(db.JSON, nullable=True)
+    idempotency_key = db.Column(db.String(200), nullable=True)  # Mesma chave = mesma tarefa
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Próxima execução
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'queue': self.queue,
+            'name': self.name,
+            'payload': self.payload,
+            'idempotency_key': self.idempotency_key,
+            'status': self.status.value,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'locked_by': self.locked_by,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class OutboxEvent(db.Model):
+    """Evento de mudança de estado de uma ocorrência (src/utils/outbox.py); o id é a posição no fluxo"""
+    __tablename__ = 'outbox_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    occurrence_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    old_status = db.Column(db.Enum(OccurrenceStatus), nullable=True)
+    new_status = db.Column(db.Enum(OccurrenceStatus), nullable=True)
+    actor_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OutboxOffset(db.Model):
+    """Último evento do outbox processado por cada consumidor"""
+    __tablename__ = 'outbox_offsets'
+
+    consumer = db.Column(db.String(50), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class OccurrenceDailyStat(db.Model):
+    """Contagens diárias por categoria e bairro, mantidas pelo outbox (src/utils/rollups.py)"""
+    __tablename__ = 'occurrence_daily_stats'
+    __table_args__ = (
+        db.Index('uq_occurrence_daily_stats_key', 'day', 'category_id', 'neighborhood', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # Dia no fuso LOCAL_TIMEZONE
+    category_id = db.Column(db.Integer, nullable=False)
+    neighborhood = db.Column(db.String(100), nullable=False, default='')  # '' = sem bairro identificado
+    created = db.Column(db.Integer, nullable=False, default=0)
+    triaged = db.Column(db.Integer, nullable=False, default=0)
+    resolved = db.Column(db.Integer, nullable=False, default=0)
+    closed = db.Column(db.Integer, nullable=False, default=0)
+    reopened = db.Column(db.Integer, nullable=False, default=0)
+
+class OccurrenceCellStat(db.Model):
+    """Ocorrências registradas por dia, categoria e célula da grade, mantidas pelo outbox (src/utils/hotspots.py)"""
+    __tablename__ = 'occurrence_cell_stats'
+    __table_args__ = (
+        db.Index('uq_occurrence_cell_stats_key', 'day', 'category_id', 'geo_cell', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # Dia do registro no fuso LOCAL_TIMEZONE
+    category_id = db.Column(db.Integer, nullable=False)
+    geo_cell = db.Column(db.BigInteger, nullable=False)
+    occurrences = db.Column(db.Integer, nullable=False, default=0)
+
+class OccurrenceForecast(db.Model):
+    """Previsão diária de ocorrências por série, recalculada em lote (src/utils/forecasting.py)"""
+    __tablename__ = 'occurrence_forecasts'
+    __table_args__ = (
+        db.Index('ix_occurrence_forecasts_series', 'category_id', 'neighborhood', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer, nullable=True)  # None = todas as categorias
+    neighborhood = db.Column(db.String(100), nullable=True)  # None = todos os bairros
+    day = db.Column(db.Date, nullable=False)  # Dia no fuso LOCAL_TIMEZONE
+    forecast = db.Column(db.Float, nullable=False)
+    lower = db.Column(db.Float, nullable=False)  # Intervalo de 95%
+    upper = db.Column(db.Float, nullable=False)
+    model = db.Column(db.String(30), nullable=False)
+    generated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Notification(db.Model):
+    """Notificação exibida no sino do usuário (NotificationCenter)"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_created_at', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    occurrence_id = db.Column(db.Integer, db.ForeignKey('occurrences.id'), nullable=True)
+    type = db.Column(db.String(20), nullable=False, default='info')  # info, success, warning, error
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    read_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'title': self.title,
+            'message': self.message,
+            'occurrence_id': self.occurrence_id,
+            'read': self.read_at is not None,
+            'created_at': self.created_at.isoformat()
+        }
+
+@event.listens_for(Occurrence, 'before_insert')
+@event.listens_for(Occurrence, 'before_update')
+def _set_geo_cell(mapper, connection, target):
+    if target.latitude is not None and target.longitude is not None:
+        target.geo_cell = cell_id(target.latitude, target.longitude)
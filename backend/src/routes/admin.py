@@ -1,6 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.models import db, User, Department, Category, Occurrence, OccurrenceStatus, Priority, UserType
+from src.models.models import db, User, Department, Category, Occurrence, OccurrenceStatus, Priority, UserType, Job, JobStatus
+from src.utils.jobs import queue_stats
+from src.utils.occurrence_stats import count_if, finished, summary
+from src.utils.outbox import outbox_stats
+from src.utils.profiler import profiler
+from src.utils.timeseries import occurrence_series, parse_series_args
 from sqlalchemy import func, extract
 from datetime import datetime, timedelta
 
@@ -117,62 +122,24 @@ def get_dashboard_stats():
         if not admin_required():
             return jsonify({'error': 'Acesso negado'}), 403
         
-        # Estatísticas gerais
-        total_occurrences = Occurrence.query.count()
-        open_occurrences = Occurrence.query.filter_by(status=OccurrenceStatus.OPEN).count()
-        in_progress_occurrences = Occurrence.query.filter_by(status=OccurrenceStatus.IN_PROGRESS).count()
-        resolved_occurrences = Occurrence.query.filter_by(status=OccurrenceStatus.RESOLVED).count()
-        closed_occurrences = Occurrence.query.filter_by(status=OccurrenceStatus.CLOSED).count()
-        
-        # Estatísticas por prioridade
-        urgent_occurrences = Occurrence.query.filter_by(priority=Priority.URGENT).count()
-        high_occurrences = Occurrence.query.filter_by(priority=Priority.HIGH).count()
-        
-        # Ocorrências dos últimos 30 dias
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_occurrences = Occurrence.query.filter(
-            Occurrence.created_at >= thirty_days_ago
-        ).count()
-        
-        # Tempo médio de resolução (em horas)
-        resolved_with_time = Occurrence.query.filter(
-            Occurrence.resolved_at.isnot(None)
-        ).all()
-        
-        avg_resolution_time = 0
-        if resolved_with_time:
-            total_time = sum([
-                (occ.resolved_at - occ.created_at).total_seconds() / 3600
-                for occ in resolved_with_time
-            ])
-            avg_resolution_time = round(total_time / len(resolved_with_time), 1)
-        
-        # Avaliação média
-        rated_occurrences = Occurrence.query.filter(
-            Occurrence.rating.isnot(None)
-        ).all()
-        
-        avg_rating = 0
-        if rated_occurrences:
-            avg_rating = round(
-                sum([occ.rating for occ in rated_occurrences]) / len(rated_occurrences), 1
-            )
+        # Contagens, médias e cidadãos em duas consultas (src/utils/occurrence_stats.py)
+        stats = summary(db.session, datetime.utcnow() - timedelta(days=30))
         
         return jsonify({
-            'total_occurrences': total_occurrences,
+            'total_occurrences': stats['total'],
             'status_breakdown': {
-                'open': open_occurrences,
-                'in_progress': in_progress_occurrences,
-                'resolved': resolved_occurrences,
-                'closed': closed_occurrences
+                'open': stats['open'],
+                'in_progress': stats['in_progress'],
+                'resolved': stats['resolved'],
+                'closed': stats['closed']
             },
             'priority_breakdown': {
-                'urgent': urgent_occurrences,
-                'high': high_occurrences
+                'urgent': stats['urgent'],
+                'high': stats['high']
             },
-            'recent_occurrences': recent_occurrences,
-            'avg_resolution_time_hours': avg_resolution_time,
-            'avg_rating': avg_rating,
+            'recent_occurrences': stats['recent'],
+            'avg_resolution_time_hours': round(stats['avg_resolution_hours'], 1),
+            'avg_rating': round(stats['avg_rating'], 1),
             'total_citizens': User.query.filter_by(user_type=UserType.CITIZEN).count()
         }), 200
         
@@ -218,32 +185,14 @@ def get_occurrences_timeline():
         if not admin_required():
             return jsonify({'error': 'Acesso negado'}), 403
         
-        # Últimos 30 dias
-        days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Ocorrências por dia
-        daily_stats = db.session.query(
-            func.date(Occurrence.created_at).label('date'),
-            func.count(Occurrence.id).label('count')
-        ).filter(
-            Occurrence.created_at >= start_date
-        ).group_by(
-            func.date(Occurrence.created_at)
-        ).order_by(
-            func.date(Occurrence.created_at)
-        ).all()
-        
-        return jsonify({
-            'timeline': [
-                {
-                    'date': stat.date.isoformat(),
-                    'count': stat.count
-                }
-                for stat in daily_stats
-            ]
-        }), 200
+        # ?days=30 (ou ?start=&end=), ?granularity=hour|day|week|month, ?breakdown=status|category
+        granularity, breakdown, start_day, end_day = parse_series_args(request.args, current_app.config)
+        return jsonify(occurrence_series(
+            db.session, current_app.config, granularity, breakdown, start_day, end_day
+        )), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -258,13 +207,7 @@ def get_performance_by_department():
         dept_stats = db.session.query(
             Department.name,
             func.count(Occurrence.id).label('total'),
-            func.sum(
-                func.case(
-                    (Occurrence.status == OccurrenceStatus.RESOLVED, 1),
-                    (Occurrence.status == OccurrenceStatus.CLOSED, 1),
-                    else_=0
-                )
-            ).label('resolved')
+            count_if(finished()).label('resolved')
         ).join(
             Category, Department.id == Category.department_id
         ).join(
@@ -347,3 +290,91 @@ def create_admin_user():
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+# Profiler por amostragem
+@admin_bp.route('/profiler', methods=['GET'])
+@jwt_required()
+def get_profiler_stats():
+    try:
+        if not admin_required():
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        return jsonify(profiler.stats()), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/profiler/dump', methods=['POST'])
+@jwt_required()
+def dump_profiler():
+    try:
+        if not admin_required():
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        if not profiler.enabled:
+            return jsonify({'error': 'Profiler desabilitado (PROFILER_ENABLED)'}), 400
+        
+        # O dump cobre apenas o worker que atendeu esta requisição
+        data = request.get_json(silent=True) or {}
+        result = profiler.dump(reset=bool(data.get('reset', False)))
+        
+        return jsonify({
+            'message': 'Perfil gravado com sucesso',
+            **result
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Fila de tarefas em segundo plano (src/utils/jobs.py)
+@admin_bp.route('/jobs', methods=['GET'])
+@jwt_required()
+def get_jobs():
+    """Situação das filas e as últimas tarefas com ?status= (padrão: failed)"""
+    try:
+        if not admin_required():
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        try:
+            status = JobStatus[request.args.get('status', 'failed').upper()]
+        except KeyError:
+            return jsonify({'error': 'Status inválido'}), 400
+        query = Job.query.filter(Job.status == status)
+        if request.args.get('queue'):
+            query = query.filter(Job.queue == request.args['queue'])
+        jobs = query.order_by(Job.id.desc()).limit(min(request.args.get('limit', 50, type=int), 200)).all()
+        
+        return jsonify({
+            'queues': queue_stats(db.session),
+            'outbox': outbox_stats(db.session),
+            'jobs': [job.to_dict() for job in jobs]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@jwt_required()
+def retry_job(job_id):
+    """Devolve uma tarefa que falhou à fila, com as tentativas zeradas"""
+    try:
+        if not admin_required():
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        job = db.session.get(Job, job_id)
+        if not job:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+        if job.status != JobStatus.FAILED:
+            return jsonify({'error': 'Só tarefas que falharam podem ser reenviadas'}), 400
+        
+        job.status = JobStatus.PENDING
+        job.attempts = 0
+        job.run_at = datetime.utcnow()
+        job.finished_at = None
+        db.session.commit()
+        
+        return jsonify(job.to_dict()), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
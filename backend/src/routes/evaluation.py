@@ -206,7 +206,7 @@ def get_pending_evaluations():
         ).order_by(Occurrence.resolved_at.desc()).all()
         
         return jsonify({
-            'pending_evaluations': [occ.to_dict() for occ in pending],
+            'pending_evaluations': [occ.to_dict(include_photos=False) for occ in pending],
             'total': len(pending)
         }), 200
         
@@ -230,7 +230,7 @@ def get_low_rated_occurrences():
         ).order_by(Occurrence.evaluated_at.desc()).all()
         
         return jsonify({
-            'low_rated_occurrences': [occ.to_dict() for occ in low_rated],
+            'low_rated_occurrences': [occ.to_dict(include_photos=False) for occ in low_rated],
             'total': len(low_rated)
         }), 200
         
@@ -254,7 +254,7 @@ def get_contested_occurrences():
         ).order_by(Occurrence.contested_at.desc()).all()
         
         return jsonify({
-            'contested_occurrences': [occ.to_dict() for occ in contested],
+            'contested_occurrences': [occ.to_dict(include_photos=False) for occ in contested],
             'total': len(contested)
         }), 200
         
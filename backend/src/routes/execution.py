@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.models import db, Occurrence, OccurrenceStatus, OccurrenceTimeline, User
+from src.models.models import db, Occurrence, OccurrenceStatus, User, UserType
 from src.utils.decorators import service_provider_required
+from src.utils.priority import PRIORITY_RANK
+from src.utils.routing import plan_route
+from src.utils.transitions import TransitionError, transition
 from datetime import datetime
 
 execution_bp = Blueprint('execution', __name__)
@@ -35,10 +38,46 @@ def get_my_assignments():
         # Combina e remove duplicatas (embora a lógica acima deva evitar)
         occurrences = list(set(list(assigned_to_me) + list(assigned_to_department)))
         
-        # Ordena por prioridade e data de criação
-        occurrences.sort(key=lambda x: (x.priority.value, x.created_at), reverse=True)
+        # Ordena por prioridade (urgente primeiro) e data de criação
+        occurrences.sort(key=lambda x: (PRIORITY_RANK[x.priority], x.created_at), reverse=True)
 
-        return jsonify([occ.to_dict() for occ in occurrences]), 200
+        return jsonify([occ.to_dict(include_photos=False) for occ in occurrences]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@execution_bp.route('/my-route', methods=['GET'])
+@jwt_required()
+@service_provider_required
+def get_my_route():
+    """
+    Ordem de visita das ocorrências em andamento da equipe a partir de
+    ?lat=&lon= (padrão: ROUTE_START_LATITUDE/LONGITUDE). Gestores e
+    administradores podem consultar a rota de outra equipe com ?user_id=.
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = db.session.get(User, current_user_id)
+        crew_id = request.args.get('user_id', type=int) or current_user_id
+        
+        if crew_id != current_user_id:
+            crew = db.session.get(User, crew_id)
+            if not crew:
+                return jsonify({'error': 'Usuário não encontrado'}), 404
+            allowed = user.user_type == UserType.ADMIN or (
+                user.user_type == UserType.DEPARTMENT_MANAGER and user.department_id == crew.department_id
+            )
+            if not allowed:
+                return jsonify({'error': 'Sem permissão para ver a rota desta equipe'}), 403
+        
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lon', type=float)
+        if latitude is None or longitude is None:
+            latitude = current_app.config['ROUTE_START_LATITUDE']
+            longitude = current_app.config['ROUTE_START_LONGITUDE']
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({'error': 'Coordenadas inválidas'}), 400
+        
+        return jsonify(plan_route(db.session, crew_id, (latitude, longitude), current_app.config)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -54,30 +93,25 @@ def start_execution(occurrence_id):
         if not occurrence:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
 
-        if occurrence.status != OccurrenceStatus.IN_PROGRESS:
-            return jsonify({'error': 'A ocorrência não está em progresso para ser iniciada.'}), 400
-
         if occurrence.started_at:
             return jsonify({'error': 'A execução desta ocorrência já foi iniciada.'}), 400
 
         current_user_id = get_jwt_identity()
         
-        # Atualizar a Ocorrência
-        occurrence.started_at = datetime.utcnow()
-        occurrence.updated_at = datetime.utcnow()
-        
-        # Registrar na Timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence.id,
-            user_id=current_user_id,
+        # Atualizar a Ocorrência e registrar na Timeline
+        now = datetime.utcnow()
+        transition(
+            db.session, occurrence, 'start', current_user_id, fields={'started_at': now}, now=now,
             status_change="Execução Iniciada",
             details=f"O Prestador de Serviço {User.query.get(current_user_id).name} iniciou a execução."
         )
-        db.session.add(timeline_entry)
         db.session.commit()
 
         return jsonify(occurrence.to_dict()), 200
 
+    except TransitionError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -98,32 +132,23 @@ def complete_execution(occurrence_id):
         if not occurrence:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
 
-        if occurrence.status != OccurrenceStatus.IN_PROGRESS:
-            return jsonify({'error': 'A ocorrência não está em progresso para ser concluída.'}), 400
-
         current_user_id = get_jwt_identity()
         
-        # Atualizar a Ocorrência
-        occurrence.completed_at = datetime.utcnow()
-        occurrence.updated_at = datetime.utcnow()
-        occurrence.execution_notes = execution_notes
-        occurrence.materials_used = materials_used
-        occurrence.status = OccurrenceStatus.RESOLVED # Muda para RESOLVED, aguardando validação
-        
-        # Registrar na Timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence.id,
-            user_id=current_user_id,
+        # Muda para RESOLVED, aguardando validação
+        now = datetime.utcnow()
+        transition(
+            db.session, occurrence, 'complete', current_user_id, now=now,
+            fields={'completed_at': now, 'execution_notes': execution_notes, 'materials_used': materials_used},
             status_change="Execução Concluída",
             details=f"O Prestador de Serviço {User.query.get(current_user_id).name} concluiu a execução. Aguardando validação."
         )
-        db.session.add(timeline_entry)
         db.session.commit()
 
-        # TODO: Implementar Notificação para o Gestor do Departamento para validação
-
         return jsonify(occurrence.to_dict()), 200
 
+    except TransitionError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,62 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models.models import db, Notification
+from datetime import datetime
+
+notifications_bp = Blueprint('notifications', __name__)
+
+@notifications_bp.route('', methods=['GET'])
+@jwt_required()
+def get_notifications():
+    """Notificações mais recentes do usuário logado e quantas não foram lidas"""
+    try:
+        user_id = int(get_jwt_identity())
+        limit = min(request.args.get('limit', 30, type=int), 100)
+        
+        notifications = Notification.query.filter_by(user_id=user_id).order_by(
+            Notification.created_at.desc(), Notification.id.desc()
+        ).limit(limit).all()
+        unread_count = Notification.query.filter(
+            Notification.user_id == user_id, Notification.read_at.is_(None)
+        ).count()
+        
+        return jsonify({
+            'notifications': [notification.to_dict() for notification in notifications],
+            'unread_count': unread_count
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@notifications_bp.route('/<int:notification_id>/read', methods=['PATCH'])
+@jwt_required()
+def mark_notification_read(notification_id):
+    try:
+        notification = Notification.query.filter_by(id=notification_id, user_id=int(get_jwt_identity())).first()
+        if not notification:
+            return jsonify({'error': 'Notificação não encontrada'}), 404
+        
+        if notification.read_at is None:
+            notification.read_at = datetime.utcnow()
+            db.session.commit()
+        
+        return jsonify(notification.to_dict()), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@notifications_bp.route('/mark-all-read', methods=['POST'])
+@jwt_required()
+def mark_all_notifications_read():
+    try:
+        updated = Notification.query.filter(
+            Notification.user_id == int(get_jwt_identity()), Notification.read_at.is_(None)
+        ).update({Notification.read_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        
+        return jsonify({'message': f'{updated} notificação(ões) marcada(s) como lida(s)'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
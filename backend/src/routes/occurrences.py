@@ -1,6 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.models import db, Occurrence, OccurrencePhoto, OccurrenceTimeline, OccurrenceSupport, User, Category, OccurrenceStatus, Priority
+from src.utils.search import apply_search
+from src.utils.duplicates import find_duplicates
+from src.utils.counters import increment_counter
+from src.utils.supports import add_supports, existing_occurrence_ids, record_support_timeline
+from src.utils.auto_triage import auto_triage_occurrence
+from src.utils.decorators import admin_required
+from src.utils.occurrence_detail import MAX_TIMELINE_PER_PAGE, TIMELINE_PER_PAGE, detail_etag, occurrence_detail, occurrence_version
+from src.utils.export import FORMATS as EXPORT_FORMATS, OCCURRENCE_HEADERS, TIMELINE_HEADERS, export_stream, occurrence_rows, timeline_rows
+from src.utils.transitions import CREATED_EVENT, TransitionError, event_row, record_events, transition
 from werkzeug.utils import secure_filename
 import os
 import uuid
@@ -15,58 +24,178 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def apply_occurrence_filters(query, args):
+    """Filtros de listagem compartilhados (status, categoria, prioridade, cidadão)"""
+    status = args.get('status')
+    category_id = args.get('category_id', type=int)
+    priority = args.get('priority')
+    citizen_id = args.get('citizen_id', type=int)
+    
+    if status:
+        query = query.filter(Occurrence.status == OccurrenceStatus(status))
+    if category_id:
+        query = query.filter(Occurrence.category_id == category_id)
+    if priority:
+        query = query.filter(Occurrence.priority == Priority(priority))
+    if citizen_id:
+        query = query.filter(Occurrence.citizen_id == citizen_id)
+    return query
+
+def find_similar_occurrences(data):
+    """Ocorrências abertas parecidas com os dados enviados, próximas ao local"""
+    config = current_app.config
+    return find_duplicates(
+        int(data['category_id']),
+        float(data['latitude']),
+        float(data['longitude']),
+        data['title'],
+        data['description'],
+        radius_m=config['DUPLICATE_RADIUS_M'],
+        threshold=config['DUPLICATE_SIMILARITY_THRESHOLD'],
+        limit=config['DUPLICATE_MAX_RESULTS']
+    )
+
+# Ordenações da listagem; "most_supported" usa o índice (support_count, created_at)
+SORT_ORDERS = {
+    'recent': (Occurrence.created_at.desc(),),
+    'most_supported': (Occurrence.support_count.desc(), Occurrence.created_at.desc()),
+}
+
+def paginated_response(base_query, page, per_page, **extra):
+    occurrences = base_query.paginate(
+        page=page, 
+        per_page=per_page, 
+        error_out=False
+    )
+    
+    return jsonify({
+        'occurrences': [occ.to_dict(include_photos=False) for occ in occurrences.items],
+        'total': occurrences.total,
+        'pages': occurrences.pages,
+        'current_page': page,
+        'per_page': per_page,
+        **extra
+    }), 200
+
+def occurrence_list_query(args):
+    """
+    Consulta da listagem (filtros, busca textual por relevância ou ordenação),
+    compartilhada com a exportação. Retorna (query, termos da busca ou None).
+    """
+    query = apply_occurrence_filters(Occurrence.query, args)
+    search = args.get('search', '').strip()
+    
+    # Busca textual ordenada por relevância (quando informada)
+    if search:
+        ranked = apply_search(query, search, db.engine.dialect.name)
+        if ranked is not None:
+            return ranked, search
+    
+    # Ordenação
+    return query.order_by(*SORT_ORDERS.get(args.get('sort'), SORT_ORDERS['recent'])), None
+
 @occurrences_bp.route('', methods=['GET'])
 def get_occurrences():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        status = request.args.get('status')
-        category_id = request.args.get('category_id', type=int)
-        priority = request.args.get('priority')
-        citizen_id = request.args.get('citizen_id', type=int)
-        
-        query = Occurrence.query
-        
-        # Filtros
-        if status:
-            query = query.filter(Occurrence.status == OccurrenceStatus(status))
-        if category_id:
-            query = query.filter(Occurrence.category_id == category_id)
-        if priority:
-            query = query.filter(Occurrence.priority == Priority(priority))
-        if citizen_id:
-            query = query.filter(Occurrence.citizen_id == citizen_id)
-        
-        # Ordenação
-        query = query.order_by(Occurrence.created_at.desc())
-        
-        # Paginação
-        occurrences = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
         
-        return jsonify({
-            'occurrences': [occ.to_dict() for occ in occurrences.items],
-            'total': occurrences.total,
-            'pages': occurrences.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        query, search = occurrence_list_query(request.args)
+        if search:
+            return paginated_response(query, page, per_page, query=search)
+        return paginated_response(query, page, per_page)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def export_response(rows, headers, name, sheet_name):
+    """Resposta em streaming no formato pedido (?format=csv|xlsx)"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Formato inválido. Use csv ou xlsx.'}), 400
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d-%H%M')}.{extension}"
+    return Response(
+        stream_with_context(export_stream(export_format, sheet_name, headers, rows(batch_size), batch_size)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'  # nginx: repassa os blocos sem acumular
+        }
+    )
+
+@occurrences_bp.route('/export', methods=['GET'])
+@jwt_required()
+@admin_required
+def export_occurrences():
+    """Ocorrências com os mesmos filtros da listagem, em CSV ou XLSX"""
+    try:
+        query, _ = occurrence_list_query(request.args)
+        return export_response(lambda batch_size: occurrence_rows(query, batch_size),
+                               OCCURRENCE_HEADERS, 'ocorrencias', 'Ocorrências')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@occurrences_bp.route('/export/timeline', methods=['GET'])
+@jwt_required()
+@admin_required
+def export_timeline():
+    """Timeline das ocorrências que passam pelos filtros da listagem, em CSV ou XLSX"""
+    try:
+        query, _ = occurrence_list_query(request.args)
+        return export_response(lambda batch_size: timeline_rows(query, batch_size),
+                               TIMELINE_HEADERS, 'timeline', 'Timeline')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@occurrences_bp.route('/search', methods=['GET'])
+def search_occurrences():
+    """
+    Busca textual em título, descrição, endereço e notas de execução,
+    combinável com os filtros da listagem.
+    """
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        terms = request.args.get('q', '').strip()
+        
+        if not terms:
+            return jsonify({'error': 'Parâmetro q é obrigatório'}), 400
+        
+        query = apply_occurrence_filters(Occurrence.query, request.args)
+        ranked = apply_search(query, terms, db.engine.dialect.name)
+        if ranked is None:
+            return jsonify({'occurrences': [], 'total': 0, 'pages': 0, 'current_page': page, 'per_page': per_page, 'query': terms}), 200
+        
+        return paginated_response(ranked, page, per_page, query=terms)
+        
+    except ValueError:
+        return jsonify({'error': 'Filtro inválido'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @occurrences_bp.route('/<int:occurrence_id>', methods=['GET'])
 def get_occurrence(occurrence_id):
+    """Detalhe com a timeline paginada (?timeline_page=&timeline_per_page=) e ETag"""
     try:
-        occurrence = Occurrence.query.get(occurrence_id)
+        page = max(request.args.get('timeline_page', 1, type=int), 1)
+        per_page = min(max(request.args.get('timeline_per_page', TIMELINE_PER_PAGE, type=int), 1),
+                       MAX_TIMELINE_PER_PAGE)
+        version = occurrence_version(db.session, occurrence_id)
         
-        if not occurrence:
+        if not version:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
         
-        return jsonify({'occurrence': occurrence.to_dict(include_timeline=True)}), 200
+        # Sem mudança desde a última leitura: 304 sem carregar a ocorrência
+        etag = detail_etag(occurrence_id, version.updated_at, page, per_page)
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(occurrence_detail(db.session, occurrence_id, page, per_page))
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -94,6 +223,17 @@ def create_occurrence():
         if not category:
             return jsonify({'error': 'Categoria não encontrada'}), 404
         
+        # Ocorrência parecida já aberta por perto: sugerir apoio em vez de duplicar.
+        # O cidadão pode confirmar o registro reenviando com force_create.
+        if current_app.config['DUPLICATE_DETECTION_ENABLED'] and not data.get('force_create'):
+            duplicates = find_similar_occurrences(data)
+            if duplicates:
+                return jsonify({
+                    'error': 'Já existe uma ocorrência parecida registrada próxima a este local',
+                    'duplicates': duplicates,
+                    'suggestion': 'support'
+                }), 409
+        
         # Criar ocorrência
         occurrence = Occurrence(
             title=data['title'],
@@ -118,6 +258,13 @@ def create_occurrence():
             new_status=OccurrenceStatus.OPEN
         )
         db.session.add(timeline_entry)
+        record_events(db.session, [event_row(occurrence.id, CREATED_EVENT, None, OccurrenceStatus.OPEN,
+                                             user_id, now=occurrence.created_at)])
+        
+        # Regras de triagem: departamento, prioridade e responsável; os casos
+        # ambíguos ficam na fila de triagem manual
+        if current_app.config['AUTO_TRIAGE_ENABLED']:
+            auto_triage_occurrence(occurrence, current_app.config)
         
         db.session.commit()
         
@@ -130,6 +277,25 @@ def create_occurrence():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@occurrences_bp.route('/duplicates', methods=['POST'])
+@jwt_required()
+def check_duplicates():
+    """Verifica, antes do envio, se já existe ocorrência parecida por perto"""
+    try:
+        data = request.get_json()
+        
+        required_fields = ['title', 'description', 'category_id', 'latitude', 'longitude']
+        for field in required_fields:
+            if not data.get(field):
+                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+        
+        return jsonify({'duplicates': find_similar_occurrences(data)}), 200
+        
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Dados inválidos'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @occurrences_bp.route('/<int:occurrence_id>/photos', methods=['POST'])
 @jwt_required()
 def upload_photos(occurrence_id):
@@ -175,6 +341,8 @@ def upload_photos(occurrence_id):
                 uploaded_photos.append(photo)
         
         if uploaded_photos:
+            increment_counter(occurrence_id, 'photo_count', len(uploaded_photos))
+            
             # Adicionar entrada na timeline
             timeline_entry = OccurrenceTimeline(
                 occurrence_id=occurrence_id,
@@ -223,29 +391,17 @@ def update_status(occurrence_id):
         except ValueError:
             return jsonify({'error': 'Status inválido'}), 400
         
-        old_status = occurrence.status
-        occurrence.status = new_status_enum
-        occurrence.updated_at = datetime.utcnow()
-        
+        now = datetime.utcnow()
+        fields = {}
         # Se foi resolvida, marcar data de resolução
         if new_status_enum == OccurrenceStatus.RESOLVED:
-            occurrence.resolved_at = datetime.utcnow()
-        
+            fields['resolved_at'] = now
         # Atribuir ao usuário se não estiver atribuída
         if not occurrence.assigned_to:
-            occurrence.assigned_to = user_id
-        
-        # Adicionar entrada na timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence_id,
-            user_id=user_id,
-            action='status_changed',
-            description=comment or f'Status alterado para {new_status_enum.value}',
-            old_status=old_status,
-            new_status=new_status_enum
-        )
-        db.session.add(timeline_entry)
+            fields['assigned_to'] = int(user_id)
         
+        transition(db.session, occurrence, 'set_status', user_id, to_status=new_status_enum, fields=fields, now=now,
+                   description=comment or f'Status alterado para {new_status_enum.value}')
         db.session.commit()
         
         return jsonify({
@@ -323,30 +479,12 @@ def support_occurrence(occurrence_id):
         if not occurrence:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
         
-        # Verificar se já apoiou
-        existing_support = OccurrenceSupport.query.filter_by(
-            occurrence_id=occurrence_id,
-            citizen_id=user_id
-        ).first()
-        
-        if existing_support:
+        # O índice único (ocorrência, cidadão) resolve toques duplos concorrentes
+        if not add_supports(user.id, [occurrence_id]):
             return jsonify({'error': 'Você já apoiou esta ocorrência'}), 400
         
-        # Criar apoio
-        support = OccurrenceSupport(
-            occurrence_id=occurrence_id,
-            citizen_id=user_id
-        )
-        db.session.add(support)
-        
-        # Adicionar entrada na timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence_id,
-            user_id=user_id,
-            action='supported',
-            description=f'{user.name} apoiou esta ocorrência'
-        )
-        db.session.add(timeline_entry)
+        # Apoios próximos no tempo são agrupados em uma entrada da timeline
+        record_support_timeline(occurrence_id, user, current_app.config['SUPPORT_TIMELINE_WINDOW_MINUTES'])
         
         db.session.commit()
         
@@ -356,6 +494,60 @@ def support_occurrence(occurrence_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@occurrences_bp.route('/support', methods=['POST'])
+@jwt_required()
+def support_many_occurrences():
+    """Apoia várias ocorrências de uma vez; resultado individual por ocorrência"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.user_type.value != 'citizen':
+            return jsonify({'error': 'Apenas cidadãos podem apoiar ocorrências'}), 403
+        
+        data = request.get_json() or {}
+        occurrence_ids = data.get('occurrence_ids')
+        if not isinstance(occurrence_ids, list) or not occurrence_ids:
+            return jsonify({'error': 'Informe a lista occurrence_ids'}), 400
+        
+        max_items = current_app.config['SUPPORT_BULK_MAX']
+        if len(occurrence_ids) > max_items:
+            return jsonify({'error': f'Máximo de {max_items} ocorrências por requisição'}), 400
+        
+        try:
+            occurrence_ids = list(dict.fromkeys(int(occurrence_id) for occurrence_id in occurrence_ids))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'occurrence_ids deve conter apenas números'}), 400
+        
+        found = existing_occurrence_ids(occurrence_ids)
+        inserted = set(add_supports(user.id, [occurrence_id for occurrence_id in occurrence_ids if occurrence_id in found]))
+        
+        window = current_app.config['SUPPORT_TIMELINE_WINDOW_MINUTES']
+        for occurrence_id in inserted:
+            record_support_timeline(occurrence_id, user, window)
+        
+        db.session.commit()
+        
+        results = []
+        for occurrence_id in occurrence_ids:
+            if occurrence_id not in found:
+                result = 'not_found'
+            elif occurrence_id in inserted:
+                result = 'supported'
+            else:
+                result = 'already_supported'
+            results.append({'occurrence_id': occurrence_id, 'result': result})
+        
+        return jsonify({
+            'message': f'{len(inserted)} apoio(s) registrado(s)',
+            'supported': len(inserted),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @occurrences_bp.route('/<int:occurrence_id>/rating', methods=['POST'])
 @jwt_required()
 def rate_occurrence(occurrence_id):
@@ -366,14 +558,10 @@ def rate_occurrence(occurrence_id):
         if not occurrence:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
         
-        # Verificar se é o criador da ocorrência
-        if occurrence.citizen_id != user_id:
+        # Verificar se é o criador da ocorrência (a identidade do token é texto)
+        if occurrence.citizen_id != int(user_id):
             return jsonify({'error': 'Apenas o criador pode avaliar a ocorrência'}), 403
         
-        # Verificar se está resolvida
-        if occurrence.status != OccurrenceStatus.RESOLVED:
-            return jsonify({'error': 'Apenas ocorrências resolvidas podem ser avaliadas'}), 400
-        
         data = request.get_json()
         rating = data.get('rating')
         feedback = data.get('feedback', '')
@@ -381,22 +569,8 @@ def rate_occurrence(occurrence_id):
         if not rating or rating < 1 or rating > 5:
             return jsonify({'error': 'Avaliação deve ser entre 1 e 5'}), 400
         
-        occurrence.rating = rating
-        occurrence.feedback = feedback
-        occurrence.status = OccurrenceStatus.CLOSED
-        occurrence.updated_at = datetime.utcnow()
-        
-        # Adicionar entrada na timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence_id,
-            user_id=user_id,
-            action='rated',
-            description=f'Avaliação: {rating} estrelas',
-            old_status=OccurrenceStatus.RESOLVED,
-            new_status=OccurrenceStatus.CLOSED
-        )
-        db.session.add(timeline_entry)
-        
+        transition(db.session, occurrence, 'rate', user_id, fields={'rating': rating, 'feedback': feedback},
+                   payload={'rating': rating}, description=f'Avaliação: {rating} estrelas')
         db.session.commit()
         
         return jsonify({
@@ -404,6 +578,9 @@ def rate_occurrence(occurrence_id):
             'occurrence': occurrence.to_dict()
         }), 200
         
+    except TransitionError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.models import db, Occurrence, User, Category, Department, OccurrenceStatus, Priority
+from src.utils.occurrence_stats import count_if, finished, summary
 from sqlalchemy import func, extract, desc
 from datetime import datetime, timedelta
 import re
@@ -26,50 +27,23 @@ def extract_neighborhood(address):
 def get_political_metrics():
     """Métricas estratégicas para popularidade política"""
     try:
-        # Métricas gerais
-        total_occurrences = Occurrence.query.count()
-        resolved_occurrences = Occurrence.query.filter(
-            Occurrence.status.in_([OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED])
-        ).count()
+        # Métricas gerais em uma consulta (src/utils/occurrence_stats.py)
+        stats = summary(db.session, datetime.utcnow() - timedelta(days=30))
+        total_occurrences = stats["total"]
+        resolved_occurrences = stats["finished"]
         
         # Taxa de resolução (KPI principal)
         resolution_rate = (resolved_occurrences / total_occurrences * 100) if total_occurrences > 0 else 0
         
-        # Ocorrências dos últimos 30 dias
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_occurrences = Occurrence.query.filter(
-            Occurrence.created_at >= thirty_days_ago
-        ).count()
-        
-        recent_resolved = Occurrence.query.filter(
-            Occurrence.created_at >= thirty_days_ago,
-            Occurrence.status.in_([OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED])
-        ).count()
+        avg_resolution_hours = round(stats["avg_resolution_hours"], 1)
+        avg_rating = round(stats["avg_rating"], 1)
         
-        # Tempo médio de resolução (em horas)
-        resolved_with_time = Occurrence.query.filter(
-            Occurrence.resolved_at.isnot(None)
-        ).all()
-        
-        avg_resolution_hours = 0
-        if resolved_with_time:
-            total_hours = sum([
-                (occ.resolved_at - occ.created_at).total_seconds() / 3600
-                for occ in resolved_with_time
-            ])
-            avg_resolution_hours = round(total_hours / len(resolved_with_time), 1)
-        
-        # Avaliação média
-        rated_occurrences = Occurrence.query.filter(
-            Occurrence.rating.isnot(None)
-        ).all()
-        
-        avg_rating = 0
-        if rated_occurrences:
-            avg_rating = round(sum([occ.rating for occ in rated_occurrences]) / len(rated_occurrences), 1)
+        # Ocorrências dos últimos 30 dias
+        recent_occurrences = stats["recent"]
+        recent_resolved = stats["recent_finished"]
         
         # Cidadãos ativos (que fizeram pelo menos uma ocorrência)
-        active_citizens = db.session.query(Occurrence.citizen_id).distinct().count()
+        active_citizens = stats["citizens"]
         
         return jsonify({
             "total_occurrences": total_occurrences,
@@ -203,7 +177,7 @@ def get_success_stories():
                 "feedback": occ.feedback,
                 "resolution_time": resolution_time,
                 "resolved_at": occ.resolved_at.strftime("%d/%m/%Y") if occ.resolved_at else None,
-                "photos_count": len(occ.photos)
+                "photos_count": occ.photo_count
             })
         
         return jsonify({
@@ -226,12 +200,7 @@ def get_performance_trends():
             extract("year", Occurrence.created_at).label("year"),
             extract("month", Occurrence.created_at).label("month"),
             func.count(Occurrence.id).label("total"),
-            func.sum(
-                func.case(
-                    (Occurrence.status.in_([OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED]), 1),
-                    else_=0
-                )
-            ).label("resolved")
+            count_if(finished()).label("resolved")
         ).filter(
             Occurrence.created_at >= six_months_ago
         ).group_by(
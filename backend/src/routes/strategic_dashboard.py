@@ -3,92 +3,107 @@ Endpoints Estratégicos para Dashboard Político
 Métricas de Popularidade e Relatórios Gerenciais
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from sqlalchemy import func, and_, or_, desc
 from datetime import datetime, timedelta
 from src.models.models import db, Occurrence, User, Category, Department, OccurrenceStatus, Priority, UserType, OccurrenceTimeline
+from src.utils.analytics import REJECTED_STEP, TRIAGE_STEP, VALIDATED_STEP, evolution_windows, offline_metrics
+from src.utils.forecasting import stored_forecast
+from src.utils.geo import GRID_CELL_DEG
+from src.utils.hotspots import heatmap_cells, merged_density, top_hotspots, window_density
+from src.utils.neighborhood_priority import neighborhood_stats, parse_weights, rank_neighborhoods
+from src.utils.sla import get_policies
 import json
 
 strategic_bp = Blueprint('strategic', __name__)
 
+def political_kpis_metrics(now, days):
+    """Totais, resolvidas, cidadãos, tempo médio de resolução e avaliação média no período"""
+    start_date = now - timedelta(days=days)
+    
+    # Total de ocorrências
+    total_occurrences = Occurrence.query.filter(
+        Occurrence.created_at >= start_date
+    ).count()
+    
+    # Ocorrências resolvidas
+    resolved_occurrences = Occurrence.query.filter(
+        and_(
+            Occurrence.created_at >= start_date,
+            Occurrence.status.in_([OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED])
+        )
+    ).count()
+    
+    # Cidadãos únicos atendidos
+    unique_citizens = db.session.query(func.count(func.distinct(Occurrence.citizen_id))).filter(
+        Occurrence.created_at >= start_date
+    ).scalar()
+    
+    # Tempo médio de resolução (em horas)
+    resolved_with_time = Occurrence.query.filter(
+        and_(
+            Occurrence.created_at >= start_date,
+            Occurrence.resolved_at.isnot(None)
+        )
+    ).all()
+    
+    if resolved_with_time:
+        total_hours = sum([
+            (occ.resolved_at - occ.created_at).total_seconds() / 3600 
+            for occ in resolved_with_time
+        ])
+        avg_resolution_time = total_hours / len(resolved_with_time)
+    else:
+        avg_resolution_time = 0
+    
+    # Média das avaliações
+    rated_occurrences = Occurrence.query.filter(
+        and_(
+            Occurrence.created_at >= start_date,
+            Occurrence.rating.isnot(None)
+        )
+    ).all()
+    
+    if rated_occurrences:
+        avg_rating = sum([occ.rating for occ in rated_occurrences]) / len(rated_occurrences)
+    else:
+        avg_rating = 0
+    
+    return {
+        'total': total_occurrences,
+        'resolved': resolved_occurrences,
+        'citizens': unique_citizens,
+        'avg_resolution_hours': avg_resolution_time,
+        'avg_rating': avg_rating
+    }
+
 @strategic_bp.route('/political-kpis', methods=['GET'])
 def get_political_kpis():
     """KPIs principais para o dashboard político"""
     try:
         # Período de análise (últimos 30 dias por padrão)
         days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
+        metrics = strategic_metrics('political_kpis', datetime.utcnow(), days)
         
-        # Total de ocorrências
-        total_occurrences = Occurrence.query.filter(
-            Occurrence.created_at >= start_date
-        ).count()
-        
-        # Ocorrências resolvidas
-        resolved_occurrences = Occurrence.query.filter(
-            and_(
-                Occurrence.created_at >= start_date,
-                Occurrence.status.in_([OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED])
-            )
-        ).count()
+        total_occurrences = metrics['total']
+        resolved_occurrences = metrics['resolved']
         
         # Taxa de resolução
         resolution_rate = (resolved_occurrences / total_occurrences * 100) if total_occurrences > 0 else 0
         
-        # Cidadãos únicos atendidos
-        unique_citizens = db.session.query(func.count(func.distinct(Occurrence.citizen_id))).filter(
-            Occurrence.created_at >= start_date
-        ).scalar()
-        
-        # Tempo médio de resolução (em horas)
-        resolved_with_time = Occurrence.query.filter(
-            and_(
-                Occurrence.created_at >= start_date,
-                Occurrence.resolved_at.isnot(None)
-            )
-        ).all()
-        
-        if resolved_with_time:
-            total_hours = sum([
-                (occ.resolved_at - occ.created_at).total_seconds() / 3600 
-                for occ in resolved_with_time
-            ])
-            avg_resolution_time = total_hours / len(resolved_with_time)
-        else:
-            avg_resolution_time = 0
-        
         # Índice de satisfação (média das avaliações)
-        rated_occurrences = Occurrence.query.filter(
-            and_(
-                Occurrence.created_at >= start_date,
-                Occurrence.rating.isnot(None)
-            )
-        ).all()
-        
-        if rated_occurrences:
-            satisfaction_index = sum([occ.rating for occ in rated_occurrences]) / len(rated_occurrences)
-            satisfaction_percentage = (satisfaction_index / 5.0) * 100
-        else:
-            satisfaction_index = 0
-            satisfaction_percentage = 0
-        
-        # Avaliação média
-        avg_rating = satisfaction_index
-        
-        # Ocorrências nos últimos 30 dias (para comparação)
-        last_30_days = Occurrence.query.filter(
-            Occurrence.created_at >= start_date
-        ).count()
+        avg_rating = metrics['avg_rating']
+        satisfaction_percentage = (avg_rating / 5.0) * 100
         
         return jsonify({
             'success': True,
             'data': {
                 'satisfaction_index': round(satisfaction_percentage, 1),
                 'resolution_rate': round(resolution_rate, 1),
-                'citizens_served': unique_citizens,
-                'avg_resolution_time': round(avg_resolution_time, 1),
+                'citizens_served': metrics['citizens'],
+                'avg_resolution_time': round(metrics['avg_resolution_hours'], 1),
                 'avg_rating': round(avg_rating, 2),
-                'last_30_days': last_30_days,
+                'last_30_days': total_occurrences,
                 'total_occurrences': total_occurrences,
                 'resolved_occurrences': resolved_occurrences,
                 'period_days': days
@@ -102,81 +117,21 @@ def get_political_kpis():
 def get_neighborhood_priority():
     """Análise de bairros prioritários para força-tarefa"""
     try:
-        # Últimos 90 dias
-        start_date = datetime.utcnow() - timedelta(days=90)
-        
-        # Buscar ocorrências por bairro
-        occurrences = Occurrence.query.filter(
-            Occurrence.created_at >= start_date
-        ).all()
-        
-        neighborhood_stats = {}
-        
-        for occ in occurrences:
-            # Extrair bairro do endereço
-            address_parts = occ.address.split(',')
-            if len(address_parts) >= 3:
-                neighborhood = address_parts[2].strip()
-            else:
-                neighborhood = 'Não identificado'
-            
-            if neighborhood not in neighborhood_stats:
-                neighborhood_stats[neighborhood] = {
-                    'name': neighborhood,
-                    'total_occurrences': 0,
-                    'open_occurrences': 0,
-                    'resolved_occurrences': 0,
-                    'avg_priority': 0,
-                    'avg_rating': 0,
-                    'total_ratings': 0,
-                    'priority_sum': 0
-                }
-            
-            stats = neighborhood_stats[neighborhood]
-            stats['total_occurrences'] += 1
-            
-            if occ.status == OccurrenceStatus.OPEN:
-                stats['open_occurrences'] += 1
-            elif occ.status in [OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED]:
-                stats['resolved_occurrences'] += 1
-            
-            # Somar prioridade (LOW=1, MEDIUM=2, HIGH=3, URGENT=4)
-            priority_values = {
-                Priority.LOW: 1,
-                Priority.MEDIUM: 2,
-                Priority.HIGH: 3,
-                Priority.URGENT: 4
-            }
-            stats['priority_sum'] += priority_values.get(occ.priority, 2)
-            
-            if occ.rating:
-                stats['avg_rating'] = ((stats['avg_rating'] * stats['total_ratings']) + occ.rating) / (stats['total_ratings'] + 1)
-                stats['total_ratings'] += 1
-        
-        # Calcular médias e score de prioridade
-        for neighborhood, stats in neighborhood_stats.items():
-            if stats['total_occurrences'] > 0:
-                stats['avg_priority'] = stats['priority_sum'] / stats['total_occurrences']
-                stats['resolution_rate'] = (stats['resolved_occurrences'] / stats['total_occurrences']) * 100
-                
-                # Score de prioridade para força-tarefa
-                # Mais ocorrências + maior prioridade média + menor taxa de resolução = maior score
-                urgency_score = stats['avg_priority'] * 25  # 0-100
-                volume_score = min(stats['total_occurrences'] * 2, 100)  # 0-100
-                efficiency_score = 100 - stats['resolution_rate']  # Inverso da eficiência
-                
-                stats['priority_score'] = (urgency_score + volume_score + efficiency_score) / 3
-        
-        # Ordenar por score de prioridade
-        sorted_neighborhoods = sorted(
-            neighborhood_stats.values(),
-            key=lambda x: x['priority_score'],
-            reverse=True
-        )[:10]  # Top 10
+        # Últimos 90 dias por padrão; pesos do score ajustáveis para simular cenários
+        days = int(request.args.get('days', 90))
+        limit = int(request.args.get('limit', 10))
+        weights = parse_weights(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        start_date = datetime.utcnow() - timedelta(days=days)
+        neighborhoods = rank_neighborhoods(neighborhood_stats(db.session, start_date), weights, limit)
         
         return jsonify({
             'success': True,
-            'data': sorted_neighborhoods
+            'data': neighborhoods,
+            'weights': weights
         })
         
     except Exception as e:
@@ -189,20 +144,12 @@ def get_performance_by_department():
         # Últimos 60 dias
         start_date = datetime.utcnow() - timedelta(days=60)
         
-        # Mapeamento categoria -> departamento
-        category_dept_map = {
-            'Buraco na Rua': 'Obras Públicas',
-            'Calçada Danificada': 'Obras Públicas',
-            'Lâmpada Queimada': 'Iluminação Pública',
-            'Lixo Acumulado': 'Serviços Urbanos',
-            'Esgoto Entupido': 'Saneamento',
-            'Poda de Árvore': 'Meio Ambiente',
-            'Semáforo Defeituoso': 'Trânsito',
-            'Animal Abandonado': 'Meio Ambiente'
-        }
+        # Departamento da triagem; sem triagem, o departamento da categoria
+        departments = {dept.id: dept.name for dept in Department.query.all()}
+        category_departments = {cat.id: cat.department_id for cat in Category.query.all()}
         
-        # Buscar categorias
-        categories = {cat.id: cat.name for cat in Category.query.all()}
+        # Prazos das políticas de SLA (src/utils/sla.py)
+        policies = get_policies(current_app.config)
         
         # Buscar ocorrências
         occurrences = Occurrence.query.filter(
@@ -212,8 +159,8 @@ def get_performance_by_department():
         dept_stats = {}
         
         for occ in occurrences:
-            cat_name = categories.get(occ.category_id, 'Outros')
-            dept_name = category_dept_map.get(cat_name, 'Administração')
+            dept_id = occ.department_id or category_departments.get(occ.category_id)
+            dept_name = departments.get(dept_id) or 'Administração'
             
             if dept_name not in dept_stats:
                 dept_stats[dept_name] = {
@@ -225,23 +172,12 @@ def get_performance_by_department():
                     'total_ratings': 0,
                     'resolution_times': [],
                     'within_sla': 0,
-                    'sla_days': 7  # Padrão
+                    'sla_days': policies.lookup(None, dept_id, None).hours / 24
                 }
             
             stats = dept_stats[dept_name]
             stats['total_occurrences'] += 1
             
-            # SLA específico por departamento
-            sla_map = {
-                'Iluminação Pública': 2,
-                'Serviços Urbanos': 1,
-                'Saneamento': 1,
-                'Obras Públicas': 10,
-                'Meio Ambiente': 5,
-                'Trânsito': 1
-            }
-            stats['sla_days'] = sla_map.get(dept_name, 7)
-            
             if occ.status in [OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED]:
                 stats['resolved_occurrences'] += 1
                 
@@ -249,8 +185,9 @@ def get_performance_by_department():
                     resolution_time = (occ.resolved_at - occ.created_at).total_seconds() / 3600  # horas
                     stats['resolution_times'].append(resolution_time)
                     
-                    # Verificar se está dentro do SLA
-                    if resolution_time <= (stats['sla_days'] * 24):
+                    # Verificar se está dentro do SLA (prazo da triagem ou da política)
+                    due_at = occ.sla_due_at or policies.due_at(occ.category_id, dept_id, occ.priority, occ.created_at)
+                    if occ.resolved_at <= due_at:
                         stats['within_sla'] += 1
             
             if occ.rating:
@@ -358,43 +295,60 @@ def get_success_stories():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def management_evolution_metrics(now, days=None):
+    """{janela: métricas} das janelas de evolution_windows que têm ocorrências"""
+    metrics = {}
+    
+    for index, (month_start, month_end) in enumerate(evolution_windows(now)):
+        # Ocorrências do mês
+        month_occurrences = Occurrence.query.filter(
+            and_(
+                Occurrence.created_at >= month_start,
+                Occurrence.created_at < month_end
+            )
+        ).all()
+        
+        if month_occurrences:
+            resolved = len([o for o in month_occurrences if o.status in [OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED]])
+            rated = [o for o in month_occurrences if o.rating]
+            
+            # Tempo médio de resolução
+            resolved_with_time = [o for o in month_occurrences if o.resolved_at]
+            if resolved_with_time:
+                avg_time = sum([
+                    (o.resolved_at - o.created_at).total_seconds() / 3600 
+                    for o in resolved_with_time
+                ]) / len(resolved_with_time)
+            else:
+                avg_time = 0
+            
+            metrics[index] = {
+                'total': len(month_occurrences),
+                'resolved': resolved,
+                'avg_rating': sum([o.rating for o in rated]) / len(rated) if rated else 0,
+                'avg_resolution_hours': avg_time
+            }
+    
+    return metrics
+
 @strategic_bp.route('/management-evolution', methods=['GET'])
 def get_management_evolution():
     """Evolução da gestão ao longo do tempo"""
     try:
         # Últimos 12 meses
+        now = datetime.utcnow()
+        metrics = strategic_metrics('management_evolution', now)
         months_data = []
         
-        for i in range(12):
-            month_start = datetime.utcnow().replace(day=1) - timedelta(days=30*i)
-            month_end = month_start + timedelta(days=30)
-            
-            # Ocorrências do mês
-            month_occurrences = Occurrence.query.filter(
-                and_(
-                    Occurrence.created_at >= month_start,
-                    Occurrence.created_at < month_end
-                )
-            ).all()
-            
-            if month_occurrences:
+        for index, (month_start, month_end) in enumerate(evolution_windows(now)):
+            if index in metrics:
                 # Métricas do mês
-                total = len(month_occurrences)
-                resolved = len([o for o in month_occurrences if o.status in [OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED]])
-                rated = [o for o in month_occurrences if o.rating]
+                month = metrics[index]
+                total = month['total']
+                resolved = month['resolved']
+                avg_rating = month['avg_rating']
                 
                 resolution_rate = (resolved / total) * 100 if total > 0 else 0
-                avg_rating = sum([o.rating for o in rated]) / len(rated) if rated else 0
-                
-                # Tempo médio de resolução
-                resolved_with_time = [o for o in month_occurrences if o.resolved_at]
-                if resolved_with_time:
-                    avg_time = sum([
-                        (o.resolved_at - o.created_at).total_seconds() / 3600 
-                        for o in resolved_with_time
-                    ]) / len(resolved_with_time)
-                else:
-                    avg_time = 0
                 
                 months_data.append({
                     'month': month_start.strftime('%Y-%m'),
@@ -403,7 +357,7 @@ def get_management_evolution():
                     'resolved_occurrences': resolved,
                     'resolution_rate': round(resolution_rate, 1),
                     'avg_rating': round(avg_rating, 2),
-                    'avg_resolution_time': round(avg_time, 1),
+                    'avg_resolution_time': round(month['avg_resolution_hours'], 1),
                     'satisfaction_index': round((avg_rating / 5.0) * 100, 1) if avg_rating > 0 else 0
                 })
         
@@ -541,75 +495,86 @@ def get_campaign_material():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def workflow_metrics_data(now, days):
+    """Funil por status, tempos médios de triagem e execução e validações do período"""
+    start_date = now - timedelta(days=days)
+    
+    # Ocorrências criadas no período
+    occurrences_in_period = Occurrence.query.filter(
+        Occurrence.created_at >= start_date
+    ).all()
+    
+    # 1. Funil de Ocorrências (Status atual de todas as ocorrências)
+    funnel = {
+        'open': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.OPEN).count(),
+        'in_progress': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.IN_PROGRESS).count(),
+        'resolved': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.RESOLVED).count(),
+        'closed': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.CLOSED).count(),
+    }
+
+    # 2. Tempo Médio de Triagem (Criação -> Atribuição)
+    triage_times = []
+    for occ in occurrences_in_period:
+        if occ.department_id and occ.created_at:
+            # Ocorrência foi triada se tem department_id
+            # O tempo de triagem é o tempo entre a criação e a primeira alteração de status para IN_PROGRESS
+            triage_timeline = OccurrenceTimeline.query.filter(
+                OccurrenceTimeline.occurrence_id == occ.id,
+                OccurrenceTimeline.status_change.like(TRIAGE_STEP)
+            ).order_by(OccurrenceTimeline.created_at.asc()).first()
+            
+            if triage_timeline:
+                time_diff = (triage_timeline.created_at - occ.created_at).total_seconds() / 3600 # em horas
+                triage_times.append(time_diff)
+    
+    # 3. Tempo Médio de Execução (Início -> Conclusão)
+    execution_times = []
+    for occ in occurrences_in_period:
+        if occ.started_at and occ.completed_at:
+            time_diff = (occ.completed_at - occ.started_at).total_seconds() / 3600 # em horas
+            execution_times.append(time_diff)
+
+    # 4. Validações concluídas e rejeitadas
+    total_validations = OccurrenceTimeline.query.filter(
+        OccurrenceTimeline.created_at >= start_date,
+        or_(
+            OccurrenceTimeline.status_change.like(VALIDATED_STEP),
+            OccurrenceTimeline.status_change.like(REJECTED_STEP)
+        )
+    ).count()
+    
+    rejected_validations = OccurrenceTimeline.query.filter(
+        OccurrenceTimeline.created_at >= start_date,
+        OccurrenceTimeline.status_change.like(REJECTED_STEP)
+    ).count()
+    
+    return {
+        'funnel': funnel,
+        'avg_triage_hours': sum(triage_times) / len(triage_times) if triage_times else 0,
+        'avg_execution_hours': sum(execution_times) / len(execution_times) if execution_times else 0,
+        'validations': total_validations,
+        'rejected_validations': rejected_validations
+    }
+
+
 @strategic_bp.route('/workflow-metrics', methods=['GET'])
 def get_workflow_metrics():
     """Métricas de eficiência do workflow (Triagem, Execução, Validação)"""
     try:
         # Período de análise (últimos 30 dias por padrão)
         days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Ocorrências criadas no período
-        occurrences_in_period = Occurrence.query.filter(
-            Occurrence.created_at >= start_date
-        ).all()
-        
-        # 1. Funil de Ocorrências (Status atual de todas as ocorrências)
-        funnel = {
-            'open': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.OPEN).count(),
-            'in_progress': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.IN_PROGRESS).count(),
-            'resolved': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.RESOLVED).count(),
-            'closed': Occurrence.query.filter(Occurrence.status == OccurrenceStatus.CLOSED).count(),
-        }
+        metrics = strategic_metrics('workflow_metrics', datetime.utcnow(), days)
 
-        # 2. Tempo Médio de Triagem (Criação -> Atribuição)
-        triage_times = []
-        for occ in occurrences_in_period:
-            if occ.department_id and occ.created_at:
-                # Ocorrência foi triada se tem department_id
-                # O tempo de triagem é o tempo entre a criação e a primeira alteração de status para IN_PROGRESS
-                triage_timeline = OccurrenceTimeline.query.filter(
-                    OccurrenceTimeline.occurrence_id == occ.id,
-                    OccurrenceTimeline.status_change.like('%Triagem e Atribuição Concluída%')
-                ).order_by(OccurrenceTimeline.created_at.asc()).first()
-                
-                if triage_timeline:
-                    time_diff = (triage_timeline.created_at - occ.created_at).total_seconds() / 3600 # em horas
-                    triage_times.append(time_diff)
-        
-        avg_triage_time = sum(triage_times) / len(triage_times) if triage_times else 0
-
-        # 3. Tempo Médio de Execução (Início -> Conclusão)
-        execution_times = []
-        for occ in occurrences_in_period:
-            if occ.started_at and occ.completed_at:
-                time_diff = (occ.completed_at - occ.started_at).total_seconds() / 3600 # em horas
-                execution_times.append(time_diff)
-        
-        avg_execution_time = sum(execution_times) / len(execution_times) if execution_times else 0
-
-        # 4. Taxa de Rejeição de Validação
-        total_validations = OccurrenceTimeline.query.filter(
-            OccurrenceTimeline.created_at >= start_date,
-            or_(
-                OccurrenceTimeline.status_change.like('%Validação Concluída%'),
-                OccurrenceTimeline.status_change.like('%Validação Rejeitada%')
-            )
-        ).count()
-        
-        rejected_validations = OccurrenceTimeline.query.filter(
-            OccurrenceTimeline.created_at >= start_date,
-            OccurrenceTimeline.status_change.like('%Validação Rejeitada%')
-        ).count()
-        
-        rejection_rate = (rejected_validations / total_validations * 100) if total_validations > 0 else 0
+        # Taxa de Rejeição de Validação
+        total_validations = metrics['validations']
+        rejection_rate = (metrics['rejected_validations'] / total_validations * 100) if total_validations > 0 else 0
 
         return jsonify({
             'success': True,
             'data': {
-                'funnel': funnel,
-                'avg_triage_time': round(avg_triage_time, 1), # em horas
-                'avg_execution_time': round(avg_execution_time, 1), # em horas
+                'funnel': metrics['funnel'],
+                'avg_triage_time': round(metrics['avg_triage_hours'], 1), # em horas
+                'avg_execution_time': round(metrics['avg_execution_hours'], 1), # em horas
                 'rejection_rate': round(rejection_rate, 1), # em porcentagem
                 'period_days': days
             }
@@ -617,3 +582,109 @@ def get_workflow_metrics():
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+
+
+def _hotspot_args():
+    """days, category_id, bandwidth_m da requisição; ValueError se inválidos"""
+    days = int(request.args.get('days', 30))
+    category_id = request.args.get('category_id', type=int)
+    bandwidth_m = float(request.args.get('bandwidth_m', current_app.config['HOTSPOT_BANDWIDTH_M']))
+    if days < 1 or not 10 <= bandwidth_m <= 5000:
+        raise ValueError('Use days >= 1 e bandwidth_m entre 10 e 5000')
+    return days, category_id, bandwidth_m
+
+
+@strategic_bp.route('/hotspots', methods=['GET'])
+def get_hotspots():
+    """Pontos críticos: células de maior densidade de ocorrências no período"""
+    try:
+        days, category_id, bandwidth_m = _hotspot_args()
+        k = min(int(request.args.get('k', 10)), 100)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        result = window_density(db.session, current_app.config, days, category_id, bandwidth_m)
+        counts, density = merged_density(result)
+        data = {
+            'hotspots': top_hotspots(density, counts, k, bandwidth_m),
+            'period_days': days,
+            'bandwidth_m': bandwidth_m
+        }
+        # Também por categoria: ?per_category=true
+        if request.args.get('per_category', 'false').lower() == 'true':
+            names = {cat.id: cat.name for cat in Category.query.all()}
+            data['categories'] = [
+                {
+                    'category_id': category,
+                    'category': names.get(category, 'N/A'),
+                    'hotspots': top_hotspots(category_density, category_counts, k, bandwidth_m)
+                }
+                for category, (category_counts, category_density) in sorted(result.items())
+            ]
+        return jsonify({'success': True, 'data': data})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@strategic_bp.route('/heatmap', methods=['GET'])
+def get_heatmap():
+    """Mapa de calor: densidade suavizada por célula da grade"""
+    try:
+        days, category_id, bandwidth_m = _hotspot_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        _, density = merged_density(window_density(db.session, current_app.config, days, category_id, bandwidth_m))
+        return jsonify({
+            'success': True,
+            'data': {
+                'cell_deg': GRID_CELL_DEG,
+                'cells': heatmap_cells(density),  # [latitude, longitude, densidade]
+                'period_days': days,
+                'bandwidth_m': bandwidth_m
+            }
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@strategic_bp.route('/forecast', methods=['GET'])
+def get_forecast():
+    """Previsão de ocorrências por dia (total, categoria ou categoria e bairro), gerada em lote"""
+    try:
+        category_id = request.args.get('category_id', type=int)
+        neighborhood = request.args.get('neighborhood') or None
+        days = min(int(request.args.get('days', 14)), current_app.config['FORECAST_HORIZON_DAYS'])
+        if neighborhood and category_id is None:
+            raise ValueError('Informe category_id junto com neighborhood')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        data = stored_forecast(db.session, current_app.config, category_id, neighborhood, days)
+        if data is None:
+            return jsonify({'success': False, 'error': 'Sem previsão para esta série'}), 404
+        return jsonify({'success': True, 'data': data})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Métricas com consulta equivalente no instantâneo analítico (src/utils/analytics.py)
+LIVE_METRICS = {
+    'political_kpis': political_kpis_metrics,
+    'management_evolution': management_evolution_metrics,
+    'workflow_metrics': workflow_metrics_data,
+}
+
+
+def strategic_metrics(name, now, days=None):
+    """Lê do instantâneo com ANALYTICS_BACKEND=duckdb; sem ele (ou se falhar), calcula no banco"""
+    metrics = offline_metrics(name, current_app.config, now, days, current_app.logger)
+    if metrics is None:
+        metrics = LIVE_METRICS[name](now, days)
+    return metrics
@@ -1,14 +1,43 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.models import db, Occurrence, OccurrenceStatus, Priority, User, Department, OccurrenceTimeline
+from src.models.models import (
+    db, Category, Occurrence, OccurrenceStatus, Priority, User, UserType, Department, OccurrenceTimeline, SlaPolicy,
+    TriageRule
+)
+from src.utils.priority import priority_order
+from src.utils.auto_triage import facts_for, invalidate_rules, is_triaged, load_ruleset
+from src.utils.sla import apply_sla, at_risk_queue, compliance, get_policies, invalidate_policies, sla_fields
+from src.utils.transitions import TransitionError, check, event_row, record_events, transition
+from src.utils.workload import (
+    ASSIGNABLE_USER_TYPES, WorkloadBoard, apply_workload_changes, assign_backlog, choose_assignee,
+    job_state, suggest_assignees
+)
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.decorators import admin_required, department_manager_required
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
 
 triage_bp = Blueprint('triage', __name__)
 
+# assigned_to_id "auto": equipe escolhida por carga de trabalho e proximidade
+AUTO_ASSIGN = 'auto'
+
+def parse_priority(value):
+    """Aceita o nome ('HIGH') ou o valor ('high') da prioridade"""
+    try:
+        return Priority[str(value).upper()]
+    except KeyError:
+        raise ValueError(value)
+
+def triage_details(department_name, priority, assigned_name, notes=None):
+    details = (
+        f"Atribuída ao departamento: {department_name}. Prioridade: {priority.name}. "
+        f"Atribuída a: {assigned_name or 'Nenhum usuário específico'}."
+    )
+    return f"{details} Notas: {notes}" if notes else details
+
 @triage_bp.route('/occurrences/pending-triage', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -23,7 +52,7 @@ def get_pending_triage():
             Occurrence.department_id.is_(None)
         ).order_by(Occurrence.created_at.asc()).all()
 
-        return jsonify([occ.to_dict() for occ in pending_occurrences]), 200
+        return jsonify([occ.to_dict(include_photos=False) for occ in pending_occurrences]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -51,9 +80,17 @@ def assign_occurrence(occurrence_id):
         if not department:
             return jsonify({'error': 'Departamento não encontrado'}), 404
 
+        # Ocorrências finalizadas não voltam para a triagem
+        check('triage', occurrence.status)
+
         # 1. Atualizar a Ocorrência
         occurrence.department_id = department_id
-        occurrence.priority = Priority(priority.upper())
+        occurrence.priority = parse_priority(priority)
+        
+        if assigned_to_id == AUTO_ASSIGN:
+            assigned_to_id = choose_assignee(
+                db.session, current_app.config, department.id, occurrence.latitude, occurrence.longitude
+            )
         
         # Opcional: Atribuir a um usuário específico (prestador de serviço ou gestor)
         if assigned_to_id:
@@ -64,46 +101,548 @@ def assign_occurrence(occurrence_id):
         else:
             occurrence.assigned_to = None
 
-        # 2. Atualizar o Status para 'IN_PROGRESS' (Triagem Completa)
-        occurrence.status = OccurrenceStatus.IN_PROGRESS
-        occurrence.updated_at = datetime.utcnow()
-        
-        # 3. Registrar na Timeline
-        current_user_id = get_jwt_identity()
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence.id,
-            user_id=current_user_id,
-            status_change=f"Triagem e Atribuição Concluída",
-            details=f"Atribuída ao departamento: {department.name}. Prioridade: {priority.upper()}. Atribuída a: {assigned_to_user.name if assigned_to_id else 'Nenhum usuário específico'}."
+        # 2. Status 'IN_PROGRESS' (Triagem Completa), timeline e evento
+        transition(
+            db.session, occurrence, 'triage', get_jwt_identity(),
+            status_change="Triagem e Atribuição Concluída",
+            details=triage_details(department.name, occurrence.priority, assigned_to_user.name if assigned_to_id else None, data.get('notes'))
         )
-        db.session.add(timeline_entry)
+        apply_sla(occurrence, current_app.config)
         db.session.commit()
 
-        # TODO: Implementar Notificação para o Gestor do Departamento/Usuário Atribuído
-
         return jsonify(occurrence.to_dict()), 200
 
+    except TransitionError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except ValueError:
         return jsonify({'error': 'Prioridade inválida. Use LOW, MEDIUM, HIGH ou URGENT.'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@triage_bp.route('/occurrences/bulk-assign', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_assign_occurrences():
+    """
+    Triagem em lote: recebe {"items": [{occurrence_id, department_id, priority,
+    assigned_to_id, notes}]} (assigned_to_id pode ser "auto"), valida tudo contra mapas carregados em poucas
+    consultas e grava as atualizações e a timeline com instruções em lote numa
+    única transação. Itens inválidos são reportados e não impedem os demais,
+    a menos que "atomic": true seja enviado.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('items')
+        atomic = bool(data.get('atomic'))
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Informe a lista items'}), 400
+        max_items = current_app.config['TRIAGE_BULK_MAX']
+        if len(items) > max_items:
+            return jsonify({'error': f'Máximo de {max_items} itens por requisição'}), 400
+        if not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': 'Cada item deve ser um objeto'}), 400
+
+        def as_int(value):
+            try:
+                return int(value) if value not in (None, '') else None
+            except (TypeError, ValueError):
+                return None
+
+        # Mapas de consulta: uma query para ocorrências, departamentos e usuários
+        occurrence_ids = {as_int(item.get('occurrence_id')) for item in items} - {None}
+        user_ids = {as_int(item.get('assigned_to_id')) for item in items} - {None}
+        occurrences = {
+            row.id: row for row in db.session.query(
+                Occurrence.id, Occurrence.status, Occurrence.assigned_to, Occurrence.latitude, Occurrence.longitude,
+                Occurrence.category_id, Occurrence.created_at
+            ).filter(
+                Occurrence.id.in_(occurrence_ids)
+            )
+        } if occurrence_ids else {}
+        departments = dict(db.session.query(Department.id, Department.name))
+        users = {
+            row.id: row for row in db.session.query(User.id, User.name, User.user_type).filter(User.id.in_(user_ids))
+        } if user_ids else {}
+        policies = get_policies(current_app.config)
+
+        current_user_id = int(get_jwt_identity())
+        now = datetime.utcnow()
+        results = []
+        updates = []
+        timeline_rows = []
+        workload_changes = []
+        seen = set()
+        board = None
+
+        for index, item in enumerate(items):
+            occurrence_id = as_int(item.get('occurrence_id'))
+            department_id = as_int(item.get('department_id'))
+            assigned_to_id = as_int(item.get('assigned_to_id'))
+            auto_assign = item.get('assigned_to_id') == AUTO_ASSIGN
+            result = {'index': index, 'occurrence_id': occurrence_id}
+            results.append(result)
+
+            error = None
+            priority = None
+            if occurrence_id is None or department_id is None or not item.get('priority'):
+                error = 'occurrence_id, department_id e priority são obrigatórios'
+            elif occurrence_id in seen:
+                error = 'Ocorrência repetida no lote'
+            elif occurrence_id not in occurrences:
+                error = 'Ocorrência não encontrada'
+            elif department_id not in departments:
+                error = 'Departamento não encontrado'
+            elif not auto_assign and item.get('assigned_to_id') not in (None, '') and assigned_to_id not in users:
+                error = 'Usuário de atribuição não encontrado'
+            else:
+                try:
+                    check('triage', occurrences[occurrence_id].status)
+                    priority = parse_priority(item['priority'])
+                except TransitionError as e:
+                    error = str(e)
+                except ValueError:
+                    error = 'Prioridade inválida. Use LOW, MEDIUM, HIGH ou URGENT.'
+
+            if error:
+                result.update(success=False, error=error)
+                continue
+
+            seen.add(occurrence_id)
+            result['success'] = True
+            occurrence = occurrences[occurrence_id]
+            assigned_name = users[assigned_to_id].name if assigned_to_id else None
+            if auto_assign:
+                if board is None:
+                    board = WorkloadBoard.load(db.session, current_app.config)
+                crew = board.assign(department_id, occurrence.latitude, occurrence.longitude)
+                assigned_to_id, assigned_name = (crew.id, crew.name) if crew else (None, None)
+                result['assigned_to_id'] = assigned_to_id
+            workload_changes.append((
+                job_state(occurrence.assigned_to, occurrence.status, occurrence.latitude, occurrence.longitude),
+                job_state(assigned_to_id, OccurrenceStatus.IN_PROGRESS, occurrence.latitude, occurrence.longitude)
+            ))
+            updates.append({
+                'id': occurrence_id,
+                'department_id': department_id,
+                'priority': priority,
+                'assigned_to': assigned_to_id,
+                'status': OccurrenceStatus.IN_PROGRESS,
+                'updated_at': now,
+                **sla_fields(policies, occurrence.category_id, department_id, priority, occurrence.created_at)
+            })
+            timeline_rows.append({
+                'occurrence_id': occurrence_id,
+                'user_id': current_user_id,
+                'action': 'status_changed',
+                'old_status': occurrence.status,
+                'new_status': OccurrenceStatus.IN_PROGRESS,
+                'status_change': 'Triagem e Atribuição Concluída',
+                'details': triage_details(departments[department_id], priority, assigned_name, item.get('notes')),
+                'created_at': now
+            })
+
+        failed = len(items) - len(updates)
+        if atomic and failed:
+            return jsonify({'error': f'{failed} item(ns) inválido(s); nada foi gravado', 'results': results}), 400
+
+        if updates:
+            db.session.execute(update(Occurrence), updates)
+            db.session.execute(insert(OccurrenceTimeline), timeline_rows)
+            apply_workload_changes(db.session.connection(), workload_changes)
+            record_events(db.session, [
+                event_row(row['occurrence_id'], 'occurrence_triaged', row['old_status'], row['new_status'],
+                          current_user_id, now=now)
+                for row in timeline_rows
+            ])
+            db.session.commit()
+
+        return jsonify({
+            'message': f'{len(updates)} ocorrência(s) triada(s)',
+            'succeeded': len(updates),
+            'failed': failed,
+            'results': results
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Regras de triagem automática (src/utils/auto_triage.py)
+RULE_LIST_FIELDS = ('category_ids', 'neighborhoods', 'keywords')
+
+def apply_rule_payload(rule, data):
+    """Valida e copia os campos enviados para a regra; ValueError com a mensagem de erro"""
+    if 'name' in data:
+        if not str(data['name'] or '').strip():
+            raise ValueError('name é obrigatório')
+        rule.name = str(data['name']).strip()
+    for field in RULE_LIST_FIELDS:
+        if field in data:
+            values = data[field] or []
+            if not isinstance(values, list):
+                raise ValueError(f'{field} deve ser uma lista')
+            if field == 'category_ids':
+                try:
+                    values = [int(value) for value in values]
+                except (TypeError, ValueError):
+                    raise ValueError('category_ids deve conter ids numéricos')
+            else:
+                values = [str(value).strip() for value in values if str(value).strip()]
+            setattr(rule, field, values or None)
+    for field, low, high in (('hour_start', 0, 23), ('hour_end', 0, 24), ('min_support_count', 0, None), ('position', None, None)):
+        if field in data:
+            value = data[field]
+            if value in (None, ''):
+                setattr(rule, field, 100 if field == 'position' else None)
+                continue
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'{field} deve ser um número inteiro')
+            if (low is not None and value < low) or (high is not None and value > high):
+                raise ValueError(f'{field} fora do intervalo permitido')
+            setattr(rule, field, value)
+    if 'department_id' in data:
+        department_id = data['department_id'] or None
+        if department_id and not db.session.get(Department, department_id):
+            raise ValueError('Departamento não encontrado')
+        rule.department_id = department_id
+    if 'assigned_to' in data:
+        assigned_to = data['assigned_to'] or None
+        if assigned_to and not db.session.get(User, assigned_to):
+            raise ValueError('Usuário de atribuição não encontrado')
+        rule.assigned_to = assigned_to
+    if 'priority' in data:
+        try:
+            rule.priority = parse_priority(data['priority']) if data['priority'] else None
+        except ValueError:
+            raise ValueError('Prioridade inválida. Use LOW, MEDIUM, HIGH ou URGENT.')
+    for field in ('is_active', 'require_review', 'stop_processing'):
+        if field in data:
+            setattr(rule, field, bool(data[field]))
+    if not (rule.department_id or rule.priority or rule.assigned_to or rule.require_review):
+        raise ValueError('A regra precisa definir departamento, prioridade, responsável ou revisão manual')
+
+@triage_bp.route('/rules', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_triage_rules():
+    try:
+        rules = TriageRule.query.order_by(TriageRule.position, TriageRule.id).all()
+        return jsonify([rule.to_dict() for rule in rules]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/rules', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_triage_rule():
+    try:
+        data = request.get_json() or {}
+        if not data.get('name'):
+            return jsonify({'error': 'name é obrigatório'}), 400
+        rule = TriageRule()
+        apply_rule_payload(rule, data)
+        db.session.add(rule)
+        db.session.commit()
+        invalidate_rules()
+        return jsonify(rule.to_dict()), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/rules/<int:rule_id>', methods=['PUT'])
+@jwt_required()
+@admin_required
+def update_triage_rule(rule_id):
+    try:
+        rule = db.session.get(TriageRule, rule_id)
+        if not rule:
+            return jsonify({'error': 'Regra não encontrada'}), 404
+        apply_rule_payload(rule, request.get_json() or {})
+        db.session.commit()
+        invalidate_rules()
+        return jsonify(rule.to_dict()), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/rules/<int:rule_id>', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def delete_triage_rule(rule_id):
+    try:
+        rule = db.session.get(TriageRule, rule_id)
+        if not rule:
+            return jsonify({'error': 'Regra não encontrada'}), 404
+        db.session.delete(rule)
+        db.session.commit()
+        invalidate_rules()
+        return jsonify({'message': 'Regra removida'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/rules/preview/<int:occurrence_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def preview_triage_rules(occurrence_id):
+    """Mostra o que as regras atuais decidiriam para a ocorrência, sem alterá-la"""
+    try:
+        occurrence = db.session.get(Occurrence, occurrence_id)
+        if not occurrence:
+            return jsonify({'error': 'Ocorrência não encontrada'}), 404
+        config = current_app.config
+        decision = load_ruleset(config['AUTO_TRIAGE_CATEGORY_FALLBACK']).evaluate(facts_for(
+            occurrence.category_id, occurrence.address, occurrence.title, occurrence.description,
+            occurrence.support_count, occurrence.created_at, config['LOCAL_TIMEZONE']
+        ))
+        return jsonify({
+            'occurrence_id': occurrence.id,
+            'department_id': decision.department_id,
+            'priority': decision.priority.value if decision.priority else None,
+            'assigned_to': decision.assigned_to,
+            'require_review': decision.require_review,
+            'rule_ids': decision.rule_ids,
+            'auto_triaged': is_triaged(decision)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @triage_bp.route('/departments/<int:department_id>/users', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_department_users(department_id):
     """
-    Retorna a lista de usuários (gestores e prestadores de serviço) de um departamento.
-    Usado para o modal de atribuição.
+    Retorna a lista de usuários (gestores e prestadores de serviço) de um departamento,
+    com a carga de trabalho atual. Usado para o modal de atribuição.
     """
     try:
         users = User.query.filter(
             User.department_id == department_id,
-            User.user_type.in_(['admin', 'department_manager']) # Assumindo que 'admin' e 'department_manager' podem ser atribuídos
-        ).all()
+            User.is_active.is_(True),
+            User.user_type.in_(ASSIGNABLE_USER_TYPES)
+        ).order_by(User.active_jobs, User.name).all()
         
-        return jsonify([{'id': user.id, 'name': user.name, 'user_type': user.user_type.value} for user in users]), 200
+        return jsonify([
+            {'id': user.id, 'name': user.name, 'user_type': user.user_type.value, 'active_jobs': user.active_jobs}
+            for user in users
+        ]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/occurrences/<int:occurrence_id>/assignee-suggestions', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_assignee_suggestions(occurrence_id):
+    """
+    Equipes sugeridas para a ocorrência, da melhor para a pior: menor distância
+    até as tarefas atuais da equipe somada a uma penalidade por tarefa ativa.
+    ?department_id= permite simular antes de triar.
+    """
+    try:
+        occurrence = db.session.get(Occurrence, occurrence_id)
+        if not occurrence:
+            return jsonify({'error': 'Ocorrência não encontrada'}), 404
+        department_id = request.args.get('department_id', type=int) or occurrence.department_id
+        if not department_id:
+            return jsonify({'error': 'Informe department_id'}), 400
+        limit = min(request.args.get('limit', 5, type=int), 50)
+        return jsonify({
+            'occurrence_id': occurrence.id,
+            'department_id': department_id,
+            'suggestions': suggest_assignees(
+                db.session, current_app.config, department_id, occurrence.latitude, occurrence.longitude, limit
+            )
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/occurrences/auto-assign', methods=['POST'])
+@jwt_required()
+@admin_required
+def auto_assign_occurrences():
+    """
+    Distribui entre as equipes as ocorrências triadas e sem responsável.
+    Corpo opcional: {"occurrence_ids": [...], "department_id": ..., "apply": true}.
+    Sem apply apenas retorna as propostas.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        occurrence_ids = data.get('occurrence_ids')
+        if occurrence_ids is not None and not isinstance(occurrence_ids, list):
+            return jsonify({'error': 'occurrence_ids deve ser uma lista'}), 400
+        department_id = data.get('department_id')
+        apply = bool(data.get('apply'))
+        proposals = assign_backlog(
+            db.session, current_app.config,
+            occurrence_ids=[int(value) for value in occurrence_ids] if occurrence_ids is not None else None,
+            department_ids=[int(department_id)] if department_id else None,
+            apply=apply
+        )
+        return jsonify({
+            'message': f"{len(proposals)} ocorrência(s) {'atribuída(s)' if apply else 'com proposta'}",
+            'applied': apply,
+            'assignments': proposals
+        }), 200
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Dados inválidos'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Prazos de atendimento (src/utils/sla.py)
+def apply_sla_policy_payload(policy, data):
+    """Valida e copia os campos enviados para a política; ValueError com a mensagem de erro"""
+    if 'name' in data:
+        if not str(data['name'] or '').strip():
+            raise ValueError('name é obrigatório')
+        policy.name = str(data['name']).strip()
+    for field, minimum in (('hours', 1), ('at_risk_hours', 0)):
+        if field in data:
+            value = data[field]
+            if value in (None, '') and field == 'at_risk_hours':
+                policy.at_risk_hours = None
+                continue
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'{field} deve ser um número inteiro')
+            if value < minimum:
+                raise ValueError(f'{field} fora do intervalo permitido')
+            setattr(policy, field, value)
+    if 'category_id' in data:
+        category_id = data['category_id'] or None
+        if category_id and not db.session.get(Category, category_id):
+            raise ValueError('Categoria não encontrada')
+        policy.category_id = category_id
+    if 'department_id' in data:
+        department_id = data['department_id'] or None
+        if department_id and not db.session.get(Department, department_id):
+            raise ValueError('Departamento não encontrado')
+        policy.department_id = department_id
+    if 'priority' in data:
+        try:
+            policy.priority = parse_priority(data['priority']) if data['priority'] else None
+        except ValueError:
+            raise ValueError('Prioridade inválida. Use LOW, MEDIUM, HIGH ou URGENT.')
+    if 'is_active' in data:
+        policy.is_active = bool(data['is_active'])
+    if not policy.hours:
+        raise ValueError('hours é obrigatório')
+
+@triage_bp.route('/sla-policies', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_sla_policies():
+    try:
+        policies = SlaPolicy.query.order_by(SlaPolicy.id).all()
+        return jsonify([policy.to_dict() for policy in policies]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/sla-policies', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_sla_policy():
+    """Novos prazos valem para as próximas triagens; as já triadas mantêm o prazo calculado"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('name'):
+            return jsonify({'error': 'name é obrigatório'}), 400
+        policy = SlaPolicy()
+        apply_sla_policy_payload(policy, data)
+        db.session.add(policy)
+        db.session.commit()
+        invalidate_policies()
+        return jsonify(policy.to_dict()), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/sla-policies/<int:policy_id>', methods=['PUT'])
+@jwt_required()
+@admin_required
+def update_sla_policy(policy_id):
+    try:
+        policy = db.session.get(SlaPolicy, policy_id)
+        if not policy:
+            return jsonify({'error': 'Política não encontrada'}), 404
+        apply_sla_policy_payload(policy, request.get_json() or {})
+        db.session.commit()
+        invalidate_policies()
+        return jsonify(policy.to_dict()), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/sla-policies/<int:policy_id>', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def delete_sla_policy(policy_id):
+    try:
+        policy = db.session.get(SlaPolicy, policy_id)
+        if not policy:
+            return jsonify({'error': 'Política não encontrada'}), 404
+        db.session.delete(policy)
+        db.session.commit()
+        invalidate_policies()
+        return jsonify({'message': 'Política removida'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def sla_department_scope():
+    """Gestores só enxergam o próprio departamento; administradores podem filtrar por ?department_id="""
+    user = db.session.get(User, int(get_jwt_identity()))
+    if user.user_type == UserType.ADMIN:
+        return request.args.get('department_id', type=int)
+    return user.department_id or -1
+
+@triage_bp.route('/sla/at-risk', methods=['GET'])
+@jwt_required()
+@department_manager_required
+def get_sla_at_risk():
+    """
+    Fila de prazos: ocorrências ativas que vencem nas próximas ?hours= horas
+    (padrão SLA_AT_RISK_HOURS) ou já venceram, da mais urgente para a menos.
+    """
+    try:
+        hours = request.args.get('hours', current_app.config['SLA_AT_RISK_HOURS'], type=int)
+        limit = min(request.args.get('limit', 100, type=int), 500)
+        items = at_risk_queue(db.session, hours, sla_department_scope(), limit)
+        return jsonify({'hours': hours, 'count': len(items), 'items': items}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@triage_bp.route('/sla/compliance', methods=['GET'])
+@jwt_required()
+@department_manager_required
+def get_sla_compliance():
+    """Cumprimento do prazo por departamento para as ocorrências que venceram nos últimos ?days= dias"""
+    try:
+        days = request.args.get('days', 30, type=int)
+        end = datetime.utcnow()
+        start = end - timedelta(days=days)
+        return jsonify({
+            'days': days,
+            **compliance(db.session, start, end, sla_department_scope(), now=end)
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -124,9 +663,9 @@ def get_department_occurrences():
 
         department_occurrences = Occurrence.query.filter(
             Occurrence.department_id == user.department_id
-        ).order_by(Occurrence.priority.desc(), Occurrence.created_at.asc()).all()
+        ).order_by(priority_order().desc(), Occurrence.created_at.asc()).all()
 
-        return jsonify([occ.to_dict() for occ in department_occurrences]), 200
+        return jsonify([occ.to_dict(include_photos=False) for occ in department_occurrences]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.models import db, Occurrence, OccurrenceStatus, OccurrenceTimeline, User
+from src.models.models import db, Occurrence, OccurrenceStatus, User
 from src.utils.decorators import department_manager_required
+from src.utils.transitions import TransitionError, check, transition
 from datetime import datetime
 
 validation_bp = Blueprint('validation', __name__)
@@ -25,7 +26,7 @@ def get_pending_validation():
             Occurrence.status == OccurrenceStatus.RESOLVED
         ).order_by(Occurrence.completed_at.asc()).all()
 
-        return jsonify([occ.to_dict() for occ in pending_occurrences]), 200
+        return jsonify([occ.to_dict(include_photos=False) for occ in pending_occurrences]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -41,8 +42,7 @@ def approve_occurrence(occurrence_id):
         if not occurrence:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
 
-        if occurrence.status != OccurrenceStatus.RESOLVED:
-            return jsonify({'error': 'A ocorrência não está no status de RESOLVIDA para ser aprovada.'}), 400
+        check('approve', occurrence.status)
 
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -50,26 +50,20 @@ def approve_occurrence(occurrence_id):
         if occurrence.department_id != user.department_id:
             return jsonify({'error': 'Você não tem permissão para validar ocorrências de outro departamento.'}), 403
 
-        # Atualizar a Ocorrência
-        occurrence.status = OccurrenceStatus.CLOSED
-        occurrence.validated_at = datetime.utcnow()
-        occurrence.validated_by_id = current_user_id
-        occurrence.updated_at = datetime.utcnow()
-        
-        # Registrar na Timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence.id,
-            user_id=current_user_id,
+        # Atualizar a Ocorrência e registrar na Timeline
+        now = datetime.utcnow()
+        transition(
+            db.session, occurrence, 'approve', current_user_id, now=now,
+            fields={'validated_at': now, 'validated_by_id': int(current_user_id)},
             status_change="Validação Concluída",
             details=f"O Gestor de Departamento {user.name} aprovou a conclusão. Status final: FECHADA."
         )
-        db.session.add(timeline_entry)
         db.session.commit()
 
-        # TODO: Implementar Notificação para o Cidadão (Ocorrência Fechada)
-
         return jsonify(occurrence.to_dict()), 200
 
+    except TransitionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -92,8 +86,7 @@ def reject_occurrence(occurrence_id):
         if not occurrence:
             return jsonify({'error': 'Ocorrência não encontrada'}), 404
 
-        if occurrence.status != OccurrenceStatus.RESOLVED:
-            return jsonify({'error': 'A ocorrência não está no status de RESOLVIDA para ser rejeitada.'}), 400
+        check('reject', occurrence.status)
 
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -101,25 +94,19 @@ def reject_occurrence(occurrence_id):
         if occurrence.department_id != user.department_id:
             return jsonify({'error': 'Você não tem permissão para validar ocorrências de outro departamento.'}), 403
 
-        # Atualizar a Ocorrência
-        occurrence.status = OccurrenceStatus.IN_PROGRESS
-        occurrence.rejection_reason = rejection_reason
-        occurrence.updated_at = datetime.utcnow()
-        
-        # Registrar na Timeline
-        timeline_entry = OccurrenceTimeline(
-            occurrence_id=occurrence.id,
-            user_id=current_user_id,
+        # Atualizar a Ocorrência e registrar na Timeline
+        transition(
+            db.session, occurrence, 'reject', current_user_id,
+            fields={'rejection_reason': rejection_reason}, payload={'reason': rejection_reason},
             status_change="Validação Rejeitada",
             details=f"O Gestor de Departamento {user.name} rejeitou a conclusão. Motivo: {rejection_reason}. Status: EM PROGRESSO."
         )
-        db.session.add(timeline_entry)
         db.session.commit()
 
-        # TODO: Implementar Notificação para o Prestador de Serviço (Rejeição)
-
         return jsonify(occurrence.to_dict()), 200
 
+    except TransitionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
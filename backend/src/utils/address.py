@@ -0,0 +1,19 @@
+"""
+Partes do endereço das ocorrências
+
+Os endereços chegam como "Rua, número, Bairro" ou "Rua, número, Bairro, Lavras-MG".
+"""
+
+CITY_MARKERS = ('lavras',)
+
+
+def extract_neighborhood(address):
+    """Bairro do endereço, ou None quando não dá para identificar"""
+    if not address:
+        return None
+    parts = [part.strip() for part in address.split(',') if part.strip()]
+    if parts and any(marker in parts[-1].lower() for marker in CITY_MARKERS):
+        parts = parts[:-1]
+    if len(parts) < 2 or parts[-1].isdigit():
+        return None
+    return parts[-1]
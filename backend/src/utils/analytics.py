@@ -0,0 +1,422 @@
+"""
+Instantâneo analítico em Parquet e backend DuckDB dos dashboards estratégicos
+
+export_analytics grava occurrences e occurrence_timeline em arquivos Parquet
+particionados por mês de registro (ANALYTICS_DIR):
+
+    occurrences/month=AAAA-MM/part.parquet
+    occurrence_timeline/month=AAAA-MM/part-<primeiro id>.parquet
+    _state.json
+
+- a exportação completa (--full, de madrugada) regrava tudo num diretório
+  temporário e troca no fim;
+- a incremental regrava só os meses com ocorrências alteradas desde a última
+  (updated_at) e acrescenta as entradas novas da timeline (id). Ocorrências
+  apagadas só somem na completa. Linhas mais novas que
+  ANALYTICS_EXPORT_LAG_SECONDS ficam para a próxima, como no outbox.
+
+Com ANALYTICS_BACKEND=duckdb, os endpoints de /api/strategic que têm consulta
+em QUERIES leem o instantâneo com o DuckDB (execução vetorizada, fora do banco
+da aplicação). Sem as dependências, sem instantâneo ou com instantâneo mais
+velho que ANALYTICS_MAX_AGE_HOURS, o endpoint volta para o banco. O comando
+analytics-parity compara as duas fontes.
+
+pyarrow e duckdb são opcionais (pip install pyarrow duckdb).
+"""
+
+import json
+import math
+import os
+import shutil
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+
+from sqlalchemy import select
+
+from src.models.models import Occurrence, OccurrenceStatus, OccurrenceTimeline
+from src.utils.address import extract_neighborhood
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # dependência opcional
+    pyarrow = None
+
+try:
+    import duckdb
+except ImportError:  # dependência opcional
+    duckdb = None
+
+STATE_FILE = '_state.json'
+FINISHED = [OccurrenceStatus.RESOLVED.value, OccurrenceStatus.CLOSED.value]
+TRIAGE_STEP = '%Triagem e Atribuição Concluída%'
+VALIDATED_STEP = '%Validação Concluída%'
+REJECTED_STEP = '%Validação Rejeitada%'
+
+# (coluna, tipo no Parquet/DuckDB)
+OCCURRENCE_COLUMNS = (
+    ('id', 'BIGINT'), ('citizen_id', 'BIGINT'), ('category_id', 'BIGINT'), ('department_id', 'BIGINT'),
+    ('assigned_to', 'BIGINT'), ('status', 'VARCHAR'), ('priority', 'VARCHAR'), ('neighborhood', 'VARCHAR'),
+    ('rating', 'BIGINT'), ('support_count', 'BIGINT'), ('merged_into_id', 'BIGINT'),
+    ('created_at', 'TIMESTAMP'), ('updated_at', 'TIMESTAMP'), ('started_at', 'TIMESTAMP'),
+    ('completed_at', 'TIMESTAMP'), ('resolved_at', 'TIMESTAMP'), ('validated_at', 'TIMESTAMP'),
+    ('sla_due_at', 'TIMESTAMP'),
+)
+TIMELINE_COLUMNS = (
+    ('id', 'BIGINT'), ('occurrence_id', 'BIGINT'), ('user_id', 'BIGINT'), ('action', 'VARCHAR'),
+    ('old_status', 'VARCHAR'), ('new_status', 'VARCHAR'), ('status_change', 'VARCHAR'), ('created_at', 'TIMESTAMP'),
+)
+TABLES = {'occurrences': OCCURRENCE_COLUMNS, 'occurrence_timeline': TIMELINE_COLUMNS}
+
+
+class AnalyticsUnavailable(RuntimeError):
+    """Dependência opcional ausente ou instantâneo inexistente"""
+
+
+def _schema(columns):
+    types = {'BIGINT': pyarrow.int64(), 'VARCHAR': pyarrow.string(), 'TIMESTAMP': pyarrow.timestamp('us')}
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _plain(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def _month(moment):
+    return moment.strftime('%Y-%m') if moment else '1970-01'
+
+
+def _month_range(month):
+    start = datetime.strptime(month, '%Y-%m')
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def occurrence_select():
+    return select(
+        Occurrence.id, Occurrence.citizen_id, Occurrence.category_id, Occurrence.department_id,
+        Occurrence.assigned_to, Occurrence.status, Occurrence.priority, Occurrence.address, Occurrence.rating,
+        Occurrence.support_count, Occurrence.merged_into_id, Occurrence.created_at, Occurrence.updated_at,
+        Occurrence.started_at, Occurrence.completed_at, Occurrence.resolved_at, Occurrence.validated_at,
+        Occurrence.sla_due_at
+    )
+
+
+def occurrence_record(row):
+    record = {name: _plain(value) for name, value in row._mapping.items()}
+    record['neighborhood'] = extract_neighborhood(record.pop('address'))
+    return record
+
+
+def timeline_select():
+    timeline = OccurrenceTimeline
+    return select(timeline.id, timeline.occurrence_id, timeline.user_id, timeline.action, timeline.old_status,
+                  timeline.new_status, timeline.status_change, timeline.created_at)
+
+
+class PartitionWriter:
+    """Arquivos Parquet abertos por partição; cada um só aparece no lugar final ao fechar"""
+
+    def __init__(self, root, columns, file_name):
+        self.root = Path(root)
+        self.schema = _schema(columns)
+        self.file_name = file_name
+        self.writers = {}
+        self.rows = 0
+
+    def write(self, month, records):
+        if not records:
+            return
+        if month not in self.writers:
+            path = self.root / f'month={month}' / self.file_name(records[0])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.writers[month] = (path, pyarrow.parquet.ParquetWriter(f'{path}.tmp', self.schema))
+        self.writers[month][1].write_batch(pyarrow.RecordBatch.from_pylist(records, schema=self.schema))
+        self.rows += len(records)
+
+    def close(self):
+        for path, writer in self.writers.values():
+            writer.close()
+            os.replace(f'{path}.tmp', path)
+        self.writers.clear()
+        return self.rows
+
+
+def _write_grouped(writer, rows, to_record, batch_size):
+    """Distribui as linhas pelos meses, gravando em blocos de batch_size"""
+    pending = {}
+    for row in rows:
+        record = to_record(row)
+        bucket = pending.setdefault(_month(record['created_at']), [])
+        bucket.append(record)
+        if len(bucket) >= batch_size:
+            writer.write(_month(record['created_at']), bucket)
+            bucket.clear()
+    for month, bucket in pending.items():
+        writer.write(month, bucket)
+
+
+def read_state(directory):
+    path = Path(directory) / STATE_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_state(directory, state):
+    path = Path(directory) / STATE_FILE
+    path.with_suffix('.tmp').write_text(json.dumps(state, indent=2))
+    os.replace(path.with_suffix('.tmp'), path)
+
+
+def _timeline_rows(session, after_id, cutoff, batch_size):
+    """Entradas da timeline depois de after_id, parando na primeira mais nova que o corte"""
+    rows = session.execute(
+        timeline_select().where(OccurrenceTimeline.id > after_id).order_by(OccurrenceTimeline.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in rows:
+        if row.created_at is not None and row.created_at > cutoff:
+            break
+        yield row
+
+
+def _timeline_record(row, last):
+    last[0] = max(last[0], row.id)
+    return {name: _plain(value) for name, value in row._mapping.items()}
+
+
+def export_analytics(session, config, directory=None, full=False, lag_seconds=None, now=None, log=print):
+    """Exporta o instantâneo (completo ou incremental); retorna o estado gravado"""
+    if pyarrow is None:
+        raise AnalyticsUnavailable('pyarrow não está instalado (pip install pyarrow)')
+    directory = Path(directory or config['ANALYTICS_DIR'])
+    batch_size = config['EXPORT_BATCH_SIZE']
+    lag = config['ANALYTICS_EXPORT_LAG_SECONDS'] if lag_seconds is None else lag_seconds
+    started = now or datetime.utcnow()
+    cutoff = started - timedelta(seconds=lag)
+    state = None if full else read_state(directory)
+    last_timeline_id = [state['timeline_last_id'] if state else 0]
+
+    if state is None:
+        staging = directory / '.staging'
+        shutil.rmtree(staging, ignore_errors=True)
+        occurrences = PartitionWriter(staging / 'occurrences', OCCURRENCE_COLUMNS, lambda record: 'part.parquet')
+        _write_grouped(occurrences, session.execute(
+            occurrence_select().order_by(Occurrence.id).execution_options(yield_per=batch_size)
+        ), occurrence_record, batch_size)
+        occurrences.close()
+        timeline = PartitionWriter(staging / 'occurrence_timeline', TIMELINE_COLUMNS,
+                                   lambda record: f"part-{record['id']}.parquet")
+        _write_grouped(timeline, _timeline_rows(session, 0, cutoff, batch_size),
+                       lambda row: _timeline_record(row, last_timeline_id), batch_size)
+        timeline.close()
+        for table in TABLES:
+            shutil.rmtree(directory / table, ignore_errors=True)
+            (staging / table).mkdir(parents=True, exist_ok=True)
+            os.replace(staging / table, directory / table)
+        shutil.rmtree(staging, ignore_errors=True)
+        log(f'Exportação completa: {occurrences.rows} ocorrência(s), {timeline.rows} entrada(s) da timeline')
+    else:
+        watermark = datetime.fromisoformat(state['occurrences_watermark'])
+        months = {
+            _month(created_at) for created_at in session.execute(
+                select(Occurrence.created_at).where(Occurrence.updated_at > watermark)
+                .execution_options(yield_per=batch_size)
+            ).scalars() if created_at
+        }
+        rewritten = 0
+        for month in sorted(months):
+            start, end = _month_range(month)
+            writer = PartitionWriter(directory / 'occurrences', OCCURRENCE_COLUMNS, lambda record: 'part.parquet')
+            _write_grouped(writer, session.execute(
+                occurrence_select().where(Occurrence.created_at >= start, Occurrence.created_at < end)
+                .order_by(Occurrence.id).execution_options(yield_per=batch_size)
+            ), occurrence_record, batch_size)
+            if not writer.close():
+                shutil.rmtree(directory / 'occurrences' / f'month={month}', ignore_errors=True)
+            rewritten += writer.rows
+        timeline = PartitionWriter(directory / 'occurrence_timeline', TIMELINE_COLUMNS,
+                                   lambda record: f"part-{record['id']}.parquet")
+        _write_grouped(timeline, _timeline_rows(session, last_timeline_id[0], cutoff, batch_size),
+                       lambda row: _timeline_record(row, last_timeline_id), batch_size)
+        timeline.close()
+        log(f'Exportação incremental: {len(months)} mês(es) regravado(s) ({rewritten} ocorrência(s)), '
+            f'{timeline.rows} entrada(s) nova(s) da timeline')
+
+    session.rollback()
+    state = {
+        'exported_at': started.isoformat(),
+        'occurrences_watermark': cutoff.isoformat(),
+        'timeline_last_id': last_timeline_id[0],
+        'full_export_at': started.isoformat() if state is None else state['full_export_at'],
+    }
+    _write_state(directory, state)
+    return state
+
+
+# Leitura com o DuckDB
+
+def _empty_view(name, columns):
+    fields = ', '.join(f'CAST(NULL AS {kind}) AS {column}' for column, kind in columns)
+    return f'CREATE VIEW {name} AS SELECT {fields} WHERE false'
+
+
+def connect(directory):
+    """Conexão DuckDB em memória com as views occurrences e timeline sobre o instantâneo"""
+    if duckdb is None:
+        raise AnalyticsUnavailable('duckdb não está instalado (pip install duckdb)')
+    if read_state(directory) is None:
+        raise AnalyticsUnavailable(f'Nenhum instantâneo em {directory} (rode analytics-export)')
+    connection = duckdb.connect()
+    for table, view in (('occurrences', 'occurrences'), ('occurrence_timeline', 'timeline')):
+        files = Path(directory) / table
+        if any(files.glob('month=*/*.parquet')):
+            pattern = str(files / 'month=*' / '*.parquet').replace("'", "''")
+            connection.execute(
+                f"CREATE VIEW {view} AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)"
+            )
+        else:
+            connection.execute(_empty_view(view, TABLES[table]))
+    return connection
+
+
+def _hours(start, end):
+    return f"date_diff('microsecond', {start}, {end}) / 3600000000.0"
+
+
+def evolution_windows(now):
+    """Janelas de 30 dias da evolução da gestão, da mais recente para a mais antiga"""
+    windows = []
+    for index in range(12):
+        month_start = now.replace(day=1) - timedelta(days=30 * index)
+        windows.append((month_start, month_start + timedelta(days=30)))
+    return windows
+
+
+def political_kpis(connection, now, days):
+    row = connection.execute(f"""
+        SELECT count(*),
+               count(*) FILTER (WHERE status IN (?, ?)),
+               count(DISTINCT citizen_id),
+               avg({_hours('created_at', 'resolved_at')}) FILTER (WHERE resolved_at IS NOT NULL),
+               avg(rating)
+        FROM occurrences WHERE created_at >= ?
+    """, [*FINISHED, now - timedelta(days=days)]).fetchone()
+    return {
+        'total': row[0], 'resolved': row[1], 'citizens': row[2],
+        'avg_resolution_hours': row[3] or 0, 'avg_rating': row[4] or 0
+    }
+
+
+def management_evolution(connection, now, days=None):
+    connection.execute('CREATE TEMP TABLE windows (idx INTEGER, start_at TIMESTAMP, end_at TIMESTAMP)')
+    connection.executemany('INSERT INTO windows VALUES (?, ?, ?)', [
+        [index, start, end] for index, (start, end) in enumerate(evolution_windows(now))
+    ])
+    rows = connection.execute(f"""
+        SELECT w.idx, count(*),
+               count(*) FILTER (WHERE o.status IN (?, ?)),
+               avg(o.rating) FILTER (WHERE o.rating <> 0),
+               avg({_hours('o.created_at', 'o.resolved_at')}) FILTER (WHERE o.resolved_at IS NOT NULL)
+        FROM windows w JOIN occurrences o ON o.created_at >= w.start_at AND o.created_at < w.end_at
+        GROUP BY w.idx
+    """, FINISHED).fetchall()
+    return {
+        row[0]: {'total': row[1], 'resolved': row[2], 'avg_rating': row[3] or 0, 'avg_resolution_hours': row[4] or 0}
+        for row in rows
+    }
+
+
+def workflow_metrics(connection, now, days):
+    start = now - timedelta(days=days)
+    funnel = dict(connection.execute('SELECT status, count(*) FROM occurrences GROUP BY status').fetchall())
+    triage = connection.execute(f"""
+        SELECT avg({_hours('o.created_at', 't.first_at')})
+        FROM occurrences o JOIN (
+            SELECT occurrence_id, min(created_at) AS first_at FROM timeline
+            WHERE status_change LIKE ? GROUP BY occurrence_id
+        ) t ON t.occurrence_id = o.id
+        WHERE o.created_at >= ? AND o.department_id IS NOT NULL
+    """, [TRIAGE_STEP, start]).fetchone()[0]
+    execution = connection.execute(f"""
+        SELECT avg({_hours('started_at', 'completed_at')}) FROM occurrences
+        WHERE created_at >= ? AND started_at IS NOT NULL AND completed_at IS NOT NULL
+    """, [start]).fetchone()[0]
+    validations, rejected = connection.execute("""
+        SELECT count(*) FILTER (WHERE status_change LIKE ? OR status_change LIKE ?),
+               count(*) FILTER (WHERE status_change LIKE ?)
+        FROM timeline WHERE created_at >= ?
+    """, [VALIDATED_STEP, REJECTED_STEP, REJECTED_STEP, start]).fetchone()
+    return {
+        'funnel': {status.value: funnel.get(status.value, 0) for status in OccurrenceStatus},
+        'avg_triage_hours': triage or 0,
+        'avg_execution_hours': execution or 0,
+        'validations': validations,
+        'rejected_validations': rejected
+    }
+
+
+QUERIES = {
+    'political_kpis': political_kpis,
+    'management_evolution': management_evolution,
+    'workflow_metrics': workflow_metrics,
+}
+
+
+def snapshot_age_hours(directory, now=None):
+    state = read_state(directory)
+    if state is None:
+        return None
+    return ((now or datetime.utcnow()) - datetime.fromisoformat(state['exported_at'])).total_seconds() / 3600
+
+
+def offline_metrics(name, config, now, days=None, logger=None):
+    """Métricas `name` lidas do instantâneo, ou None para calcular no banco"""
+    if config['ANALYTICS_BACKEND'] != 'duckdb' or name not in QUERIES:
+        return None
+    directory = config['ANALYTICS_DIR']
+    age = snapshot_age_hours(directory, now)
+    if age is None or age > config['ANALYTICS_MAX_AGE_HOURS']:
+        return None
+    try:
+        connection = connect(directory)
+        try:
+            return QUERIES[name](connection, now, days)
+        finally:
+            connection.close()
+    except Exception as e:
+        if logger:
+            logger.warning('Backend analítico indisponível para %s: %s', name, e)
+        return None
+
+
+def differences(live, offline, path=''):
+    """Caminhos em que os dois resultados divergem (números com tolerância de arredondamento)"""
+    if isinstance(live, dict) and isinstance(offline, dict):
+        found = []
+        for key in sorted(set(live) | set(offline), key=str):
+            if key not in live or key not in offline:
+                found.append(f'{path}{key}: só em {"banco" if key in live else "instantâneo"}')
+            else:
+                found.extend(differences(live[key], offline[key], f'{path}{key}.'))
+        return found
+    if isinstance(live, (int, float)) and isinstance(offline, (int, float)):
+        if math.isclose(live, offline, rel_tol=1e-9, abs_tol=1e-9):
+            return []
+    elif live == offline:
+        return []
+    return [f'{path.rstrip(".")}: banco={live!r} instantâneo={offline!r}']
+
+
+def parity(config, live_metrics, days, now=None):
+    """{nome: [divergências]} entre as métricas do banco e as do instantâneo"""
+    now = now or datetime.utcnow()
+    connection = connect(config['ANALYTICS_DIR'])
+    try:
+        return {
+            name: differences(live_metrics[name](now, days), query(connection, now, days))
+            for name, query in QUERIES.items()
+        }
+    finally:
+        connection.close()
@@ -0,0 +1,343 @@
+"""
+Triagem automática de ocorrências
+
+As regras ativas (tabela triage_rules) são compiladas em memória numa lista
+de decisão:
+
+- regras com categoria ficam em baldes por categoria, já intercaladas com as
+  regras sem categoria na ordem de avaliação; uma ocorrência só percorre o
+  balde da sua categoria;
+- faixas de horário viram máscaras de 24 bits e bairros um conjunto
+  normalizado (minúsculas, sem acentos);
+- palavras-chave passam pelo analisador da busca e formam um índice invertido
+  pelo primeiro radical. O texto da ocorrência só é analisado quando alguma
+  regra candidata exige palavra-chave.
+
+Cada ação (departamento, prioridade, responsável) vem da primeira regra que
+casa e a define; stop_processing encerra a avaliação. Sem regra de
+departamento vale o departamento da categoria, só se
+AUTO_TRIAGE_CATEGORY_FALLBACK estiver ligado (desligado por padrão, como
+AUTO_TRIAGE_ENABLED e ASSIGNMENT_AUTO_ENABLED).
+Ocorrências que casam uma regra com require_review, ou que ficam sem
+departamento, continuam na fila de triagem manual, só com a prioridade
+ajustada. Sem regra de responsável, a equipe é escolhida pela carga de
+trabalho e proximidade (src/utils/workload.py, ASSIGNMENT_AUTO_ENABLED).
+
+O compilado é refeito a cada AUTO_TRIAGE_RULES_TTL segundos em cada processo
+e, no processo que alterou as regras, imediatamente (invalidate_rules).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import insert, update
+
+from src.models.models import (
+    db, Category, Department, Occurrence, OccurrenceStatus, OccurrenceTimeline, TriageRule, User
+)
+from src.utils.address import extract_neighborhood
+from src.utils.search import analyze, fold
+from src.utils.sla import apply_sla, get_policies, sla_fields
+from src.utils.transitions import event_row, record_events, transition
+from src.utils.workload import WorkloadBoard, apply_workload_changes, choose_assignee, job_state
+
+HOURS = 24
+ALL_HOURS = (1 << HOURS) - 1
+TIMELINE_ACTION = 'auto_triaged'
+
+Facts = namedtuple('Facts', 'category_id neighborhood text support_count hour')
+CompiledRule = namedtuple('CompiledRule', (
+    'id hours min_support_count neighborhoods has_keywords '
+    'department_id priority assigned_to require_review stop_processing'
+))
+Decision = namedtuple('Decision', 'department_id priority assigned_to require_review rule_ids')
+
+
+def hour_mask(start, end):
+    """Máscara das horas em [início, fim); início > fim vira a meia-noite"""
+    if start is None and end is None:
+        return ALL_HOURS
+    start = 0 if start is None else start
+    end = HOURS if end is None else end
+    if start == end:
+        return ALL_HOURS
+    hours = range(start, end) if start < end else list(range(start, HOURS)) + list(range(0, end))
+    mask = 0
+    for hour in hours:
+        mask |= 1 << hour
+    return mask
+
+
+def is_triaged(decision):
+    return decision.department_id is not None and not decision.require_review
+
+
+class RuleSet:
+    """Regras compiladas; evaluate não acessa o banco"""
+
+    def __init__(self, rules, category_departments=None):
+        ordered = sorted(rules, key=lambda rule: (rule.position, rule.id))
+        self.rules = []
+        self.keyword_index = {}  # primeiro radical -> [(regra, radicais)]
+        by_category = {}
+        generic = []
+
+        for index, rule in enumerate(ordered):
+            keywords = [tuple(analyze(keyword)) for keyword in rule.keywords or ()]
+            keywords = [stems for stems in keywords if stems]
+            for stems in keywords:
+                self.keyword_index.setdefault(stems[0], []).append((index, frozenset(stems)))
+            self.rules.append(CompiledRule(
+                id=rule.id,
+                hours=hour_mask(rule.hour_start, rule.hour_end),
+                min_support_count=rule.min_support_count or 0,
+                neighborhoods=frozenset(fold(name).strip() for name in rule.neighborhoods) if rule.neighborhoods else None,
+                has_keywords=bool(keywords),
+                department_id=rule.department_id,
+                priority=rule.priority,
+                assigned_to=rule.assigned_to,
+                require_review=bool(rule.require_review),
+                stop_processing=bool(rule.stop_processing)
+            ))
+            if rule.category_ids:
+                for category_id in rule.category_ids:
+                    by_category.setdefault(int(category_id), []).append(index)
+            else:
+                generic.append(index)
+
+        self.generic = tuple(generic)
+        self.by_category = {
+            category_id: tuple(sorted(set(indexes) | set(generic)))
+            for category_id, indexes in by_category.items()
+        }
+        self.category_departments = dict(category_departments or {})
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _keyword_hits(self, text):
+        tokens = set(analyze(text))
+        hits = set()
+        for token in tokens:
+            for index, stems in self.keyword_index.get(token, ()):
+                if stems <= tokens:
+                    hits.add(index)
+        return hits
+
+    def evaluate(self, facts):
+        department_id = priority = assigned_to = None
+        require_review = False
+        rule_ids = []
+        hits = None
+        hour_bit = 1 << facts.hour
+
+        for index in self.by_category.get(facts.category_id, self.generic):
+            rule = self.rules[index]
+            if not rule.hours & hour_bit or facts.support_count < rule.min_support_count:
+                continue
+            if rule.neighborhoods is not None and facts.neighborhood not in rule.neighborhoods:
+                continue
+            if rule.has_keywords:
+                if hits is None:
+                    hits = self._keyword_hits(facts.text)
+                if index not in hits:
+                    continue
+
+            rule_ids.append(rule.id)
+            if department_id is None:
+                department_id = rule.department_id
+            if priority is None:
+                priority = rule.priority
+            if assigned_to is None:
+                assigned_to = rule.assigned_to
+            require_review = require_review or rule.require_review
+            if rule.stop_processing:
+                break
+
+        if department_id is None:
+            department_id = self.category_departments.get(facts.category_id)
+        return Decision(department_id, priority, assigned_to, require_review, rule_ids)
+
+
+_ruleset = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def load_ruleset(category_fallback=False):
+    rules = TriageRule.query.filter_by(is_active=True).all()
+    category_departments = dict(db.session.query(Category.id, Category.department_id)) if category_fallback else {}
+    return RuleSet(rules, category_departments)
+
+
+def get_ruleset(config):
+    """Regras compiladas do processo, recarregadas após o TTL"""
+    global _ruleset, _loaded_at
+    ruleset = _ruleset
+    if ruleset is not None and time.monotonic() - _loaded_at < config['AUTO_TRIAGE_RULES_TTL']:
+        return ruleset
+    with _lock:
+        if _ruleset is None or time.monotonic() - _loaded_at >= config['AUTO_TRIAGE_RULES_TTL']:
+            _ruleset = load_ruleset(config['AUTO_TRIAGE_CATEGORY_FALLBACK'])
+            _loaded_at = time.monotonic()
+        return _ruleset
+
+
+def invalidate_rules():
+    global _ruleset
+    _ruleset = None
+
+
+def local_hour(moment, timezone_name):
+    """Hora local de um datetime UTC sem fuso (como gravado no banco)"""
+    moment = moment or datetime.utcnow()
+    return moment.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(timezone_name)).hour
+
+
+def facts_for(category_id, address, title, description, support_count, created_at, timezone_name):
+    neighborhood = extract_neighborhood(address)
+    return Facts(
+        category_id=category_id,
+        neighborhood=fold(neighborhood) if neighborhood else None,
+        text=f'{title or ""} {description or ""}',
+        support_count=support_count or 0,
+        hour=local_hour(created_at, timezone_name)
+    )
+
+
+def describe(decision, department_name, assigned_name):
+    details = f'Regras aplicadas: {", ".join(f"#{rule_id}" for rule_id in decision.rule_ids) or "departamento da categoria"}.'
+    if department_name:
+        details += f' Departamento: {department_name}.'
+    if decision.priority:
+        details += f' Prioridade: {decision.priority.name}.'
+    if assigned_name:
+        details += f' Atribuída a: {assigned_name}.'
+    return details
+
+
+def auto_triage_occurrence(occurrence, config, now=None):
+    """
+    Aplica as regras a uma ocorrência recém-criada (já com id, ainda na
+    transação do registro). Retorna a decisão.
+    """
+    now = now or datetime.utcnow()
+    decision = get_ruleset(config).evaluate(facts_for(
+        occurrence.category_id, occurrence.address, occurrence.title, occurrence.description,
+        occurrence.support_count, occurrence.created_at or now, config['LOCAL_TIMEZONE']
+    ))
+    if decision.priority:
+        occurrence.priority = decision.priority
+    if not is_triaged(decision):
+        return decision
+
+    department = db.session.get(Department, decision.department_id)
+    assigned_to = decision.assigned_to
+    if assigned_to is None and config['ASSIGNMENT_AUTO_ENABLED']:
+        assigned_to = choose_assignee(
+            db.session, config, decision.department_id, occurrence.latitude, occurrence.longitude
+        )
+    assigned = db.session.get(User, assigned_to) if assigned_to else None
+    transition(
+        db.session, occurrence, 'auto_triage', now=now,
+        fields={'department_id': decision.department_id, 'assigned_to': assigned.id if assigned else None},
+        status_change='Triagem Automática',
+        details=describe(decision, department.name if department else None, assigned.name if assigned else None)
+    )
+    apply_sla(occurrence, config)
+    return decision
+
+
+def run_auto_triage(session, config, batch_size=1000, apply=True):
+    """
+    Passada em segundo plano sobre a fila de triagem (abertas sem
+    departamento), em lotes por id. Útil depois de criar regras ou para regras
+    de apoios mínimos. Retorna {'scanned', 'triaged', 'reprioritized', 'elapsed_s'}.
+    """
+    start = time.perf_counter()
+    ruleset = load_ruleset(config['AUTO_TRIAGE_CATEGORY_FALLBACK'])
+    departments = dict(session.query(Department.id, Department.name))
+    users = dict(session.query(User.id, User.name).filter(User.id.in_(
+        {rule.assigned_to for rule in ruleset.rules if rule.assigned_to}
+    )))
+    board = WorkloadBoard.load(session, config) if config['ASSIGNMENT_AUTO_ENABLED'] else None
+    policies = get_policies(config)
+    stats = {'scanned': 0, 'triaged': 0, 'reprioritized': 0}
+    last_id = 0
+
+    while True:
+        rows = session.query(
+            Occurrence.id, Occurrence.category_id, Occurrence.address, Occurrence.title,
+            Occurrence.description, Occurrence.support_count, Occurrence.created_at, Occurrence.priority,
+            Occurrence.assigned_to, Occurrence.latitude, Occurrence.longitude
+        ).filter(
+            Occurrence.status == OccurrenceStatus.OPEN,
+            Occurrence.department_id.is_(None),
+            Occurrence.id > last_id
+        ).order_by(Occurrence.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        now = datetime.utcnow()
+        updates = []
+        timeline_rows = []
+        workload_changes = []
+        for row in rows:
+            stats['scanned'] += 1
+            decision = ruleset.evaluate(facts_for(
+                row.category_id, row.address, row.title, row.description,
+                row.support_count, row.created_at, config['LOCAL_TIMEZONE']
+            ))
+            priority = decision.priority or row.priority
+            if is_triaged(decision):
+                assigned_to = decision.assigned_to if decision.assigned_to in users else None
+                if assigned_to is None and board:
+                    crew = board.assign(decision.department_id, row.latitude, row.longitude)
+                    if crew:
+                        assigned_to = crew.id
+                        users[crew.id] = crew.name
+                workload_changes.append((
+                    job_state(row.assigned_to, OccurrenceStatus.OPEN, row.latitude, row.longitude),
+                    job_state(assigned_to, OccurrenceStatus.IN_PROGRESS, row.latitude, row.longitude)
+                ))
+                stats['triaged'] += 1
+                updates.append({
+                    'id': row.id, 'department_id': decision.department_id, 'priority': priority,
+                    'assigned_to': assigned_to, 'status': OccurrenceStatus.IN_PROGRESS, 'updated_at': now,
+                    **sla_fields(policies, row.category_id, decision.department_id, priority, row.created_at)
+                })
+                timeline_rows.append({
+                    'occurrence_id': row.id, 'action': TIMELINE_ACTION,
+                    'old_status': OccurrenceStatus.OPEN, 'new_status': OccurrenceStatus.IN_PROGRESS,
+                    'status_change': 'Triagem Automática',
+                    'details': describe(decision, departments.get(decision.department_id), users.get(assigned_to)),
+                    'created_at': now
+                })
+            elif priority != row.priority:
+                stats['reprioritized'] += 1
+                updates.append({
+                    'id': row.id, 'department_id': None, 'priority': priority,
+                    'assigned_to': row.assigned_to, 'status': OccurrenceStatus.OPEN, 'updated_at': now,
+                    'sla_due_at': None, 'sla_warned_at': None, 'sla_breached_at': None
+                })
+
+        if apply:
+            if updates:
+                session.execute(update(Occurrence), updates)
+            if timeline_rows:
+                session.execute(insert(OccurrenceTimeline), timeline_rows)
+                record_events(session, [
+                    event_row(item['occurrence_id'], 'occurrence_triaged', item['old_status'], item['new_status'], now=now)
+                    for item in timeline_rows
+                ])
+            apply_workload_changes(session.connection(), workload_changes)
+            session.commit()
+
+    if not apply:
+        session.rollback()
+    stats['elapsed_s'] = time.perf_counter() - start
+    return stats
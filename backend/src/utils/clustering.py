@@ -0,0 +1,250 @@
+"""
+Reagrupamento em lote de ocorrências duplicadas já gravadas
+
+Para cada categoria, as ocorrências abertas são lidas em blocos ordenados por
+célula da grade (paginação por (geo_cell, id)), o que faz uma varredura linha
+a linha do mapa. Cada ocorrência é comparada apenas com os líderes de grupo
+já lidos nas células vizinhas: entra no grupo mais parecido ou vira líder de
+um novo. Comparar com o líder, e não com qualquer membro, evita encadear
+ocorrências distantes (todo membro fica a até um raio do líder). Ficam em
+memória só as linhas da grade ao alcance do raio e os grupos com duplicatas.
+
+Em cada grupo a ocorrência canônica é a que já está em andamento ou, entre
+as abertas, a mais antiga. As demais são fechadas com merged_into_id e têm
+apoios, fotos e timeline movidos para a canônica; o autor de cada duplicata
+passa a apoiar a canônica.
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, select, tuple_, update
+
+from src.models.models import (
+    Occurrence, OccurrencePhoto, OccurrenceStatus, OccurrenceSupport, OccurrenceTimeline
+)
+from src.utils.counters import refresh_counters
+from src.utils.duplicates import OPEN_STATUSES, signature, similarity
+from src.utils.geo import cell_position, cell_reach, haversine_m
+from src.utils.transitions import MERGED_EVENT, event_row, record_events
+from src.utils.workload import apply_workload_changes, job_state
+
+
+def stream_open_occurrences(session, category_id, chunk_size):
+    """Ocorrências abertas da categoria em blocos, ordenadas por (geo_cell, id)"""
+    last = (-1, 0)
+    while True:
+        rows = session.query(
+            Occurrence.id, Occurrence.title, Occurrence.description, Occurrence.latitude,
+            Occurrence.longitude, Occurrence.geo_cell, Occurrence.status, Occurrence.created_at
+        ).filter(
+            Occurrence.category_id == category_id,
+            Occurrence.status.in_(OPEN_STATUSES),
+            Occurrence.geo_cell.isnot(None),
+            tuple_(Occurrence.geo_cell, Occurrence.id) > tuple_(*last)
+        ).order_by(Occurrence.geo_cell, Occurrence.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1].geo_cell, rows[-1].id)
+
+
+def _canonical_key(meta):
+    status, created_at, occurrence_id = meta
+    return (status != OccurrenceStatus.IN_PROGRESS, created_at or datetime.max, occurrence_id)
+
+
+def _signature(entry):
+    if entry[3] is None:
+        occ = entry[5]
+        entry[3] = signature(occ.title, occ.description)
+        entry[5] = None
+    return entry[3]
+
+
+def cluster_category(session, category_id, radius_m, threshold, chunk_size, stats):
+    """Grupos de duplicatas da categoria: lista de (canônica, [duplicatas])"""
+    band = {}  # linha da grade -> {coluna -> [líderes]}
+    members = {}  # id do líder -> dados dos membros (só grupos com duplicata)
+    row_reach = 0
+
+    for chunk in stream_open_occurrences(session, category_id, chunk_size):
+        for occ in chunk:
+            stats['scanned'] += 1
+            row, col = cell_position(occ.geo_cell)
+            rows, cols = cell_reach(occ.latitude, radius_m)
+            row_reach = max(row_reach, rows)
+
+            # Linhas que saíram do alcance não casam com mais nada
+            while band and next(iter(band)) < row - row_reach:
+                del band[next(iter(band))]
+
+            # A assinatura só é calculada quando há candidata dentro do raio
+            entry = [occ.id, occ.latitude, occ.longitude, None, (occ.status, occ.created_at, occ.id), occ]
+            best, best_score = None, threshold
+            for neighbor_row in range(row - rows, row + 1):
+                columns = band.get(neighbor_row)
+                if not columns:
+                    continue
+                for neighbor_col in range(col - cols, col + cols + 1):
+                    for leader in columns.get(neighbor_col, ()):
+                        stats['compared'] += 1
+                        if haversine_m(occ.latitude, occ.longitude, leader[1], leader[2]) > radius_m:
+                            continue
+                        score = similarity(_signature(entry), _signature(leader))
+                        if score >= best_score:
+                            best, best_score = leader, score
+
+            if best:
+                members.setdefault(best[0], [best[4]]).append(entry[4])
+            else:
+                band.setdefault(row, {}).setdefault(col, []).append(entry)
+
+    clusters = []
+    for group in members.values():
+        ids = [meta[2] for meta in sorted(group, key=_canonical_key)]
+        clusters.append((ids[0], ids[1:]))
+    return clusters
+
+
+def merge_clusters(session, clusters, now=None):
+    """
+    Mescla um lote de grupos [(canônica, [duplicatas])]: move apoios, fotos e
+    timeline das duplicatas para a canônica e as fecha. Poucas instruções por
+    lote, com executemany, em vez de várias por grupo.
+    """
+    now = now or datetime.utcnow()
+    supports = OccurrenceSupport.__table__
+    occurrences = Occurrence.__table__
+    timeline = OccurrenceTimeline.__table__
+    target = {duplicate_id: canonical_id for canonical_id, duplicate_ids in clusters for duplicate_id in duplicate_ids}
+    canonical_ids = [canonical_id for canonical_id, _ in clusters]
+    all_ids = canonical_ids + list(target)
+    moved = {'supports': 0, 'photos': 0, 'timeline': 0}
+
+    # Quem já apoia (ou é autor de) cada canônica
+    authors = dict(session.execute(select(occurrences.c.id, occurrences.c.citizen_id).where(occurrences.c.id.in_(all_ids))).all())
+    supporters = {canonical_id: {authors[canonical_id]} for canonical_id in canonical_ids}
+    support_rows = session.execute(
+        select(supports.c.id, supports.c.occurrence_id, supports.c.citizen_id)
+        .where(supports.c.occurrence_id.in_(all_ids)).order_by(supports.c.id)
+    ).all()
+    for _, occurrence_id, citizen_id in support_rows:
+        if occurrence_id in supporters:
+            supporters[occurrence_id].add(citizen_id)
+
+    # Apoios das duplicatas: move um por cidadão, descarta os repetidos
+    keep, drop = [], []
+    for support_id, occurrence_id, citizen_id in support_rows:
+        canonical_id = target.get(occurrence_id)
+        if canonical_id is None:
+            continue
+        if citizen_id in supporters[canonical_id]:
+            drop.append(support_id)
+        else:
+            supporters[canonical_id].add(citizen_id)
+            keep.append({'support_id': support_id, 'target': canonical_id})
+    if drop:
+        session.execute(supports.delete().where(supports.c.id.in_(drop)))
+    if keep:
+        session.execute(
+            update(supports).where(supports.c.id == bindparam('support_id')).values(occurrence_id=bindparam('target')),
+            keep
+        )
+
+    # Autores das duplicatas passam a apoiar a canônica
+    new_supports = []
+    for duplicate_id, canonical_id in target.items():
+        citizen_id = authors[duplicate_id]
+        if citizen_id not in supporters[canonical_id]:
+            supporters[canonical_id].add(citizen_id)
+            new_supports.append({'occurrence_id': canonical_id, 'citizen_id': citizen_id, 'created_at': now})
+    if new_supports:
+        session.execute(insert(supports), new_supports)
+    moved['supports'] = len(keep) + len(new_supports)
+
+    pairs = [{'duplicate_id': duplicate_id, 'target': canonical_id} for duplicate_id, canonical_id in target.items()]
+    # Entradas agrupadas movidas perdem a chave, que poderia colidir com a da canônica
+    for model, key, extra in ((OccurrencePhoto, 'photos', {}), (OccurrenceTimeline, 'timeline', {'group_key': None})):
+        table = model.__table__
+        moved[key] = session.execute(
+            update(table).where(table.c.occurrence_id == bindparam('duplicate_id')).values(
+                occurrence_id=bindparam('target'), **extra
+            ),
+            pairs
+        ).rowcount
+
+    # Duplicatas fechadas deixam de contar na carga de quem as atendia
+    apply_workload_changes(session.connection(), [
+        (job_state(*row), None) for row in session.execute(
+            select(occurrences.c.assigned_to, occurrences.c.status, occurrences.c.latitude, occurrences.c.longitude)
+            .where(occurrences.c.id.in_(list(target)), occurrences.c.assigned_to.isnot(None))
+        )
+    ])
+    old_statuses = dict(session.execute(
+        select(occurrences.c.id, occurrences.c.status).where(occurrences.c.id.in_(list(target)))
+    ).all())
+    session.execute(
+        update(occurrences).where(occurrences.c.id == bindparam('duplicate_id')).values(
+            status=OccurrenceStatus.CLOSED, merged_into_id=bindparam('target'), updated_at=now
+        ),
+        pairs
+    )
+    record_events(session, [
+        event_row(duplicate_id, MERGED_EVENT, old_statuses.get(duplicate_id), OccurrenceStatus.CLOSED,
+                  payload={'merged_into_id': canonical_id}, now=now)
+        for duplicate_id, canonical_id in target.items()
+    ])
+    session.execute(update(occurrences).where(occurrences.c.id.in_(canonical_ids)).values(updated_at=now))
+    refresh_counters(session, all_ids)
+
+    session.execute(insert(timeline), [
+        {
+            'occurrence_id': canonical_id, 'action': 'merged', 'created_at': now, 'new_status': None,
+            'description': 'Duplicatas mescladas nesta ocorrência: ' + ', '.join(f'#{i}' for i in duplicate_ids)
+        }
+        for canonical_id, duplicate_ids in clusters
+    ] + [
+        {
+            'occurrence_id': duplicate_id, 'action': 'merged', 'created_at': now,
+            'new_status': OccurrenceStatus.CLOSED,
+            'description': f'Ocorrência duplicada, mesclada na #{canonical_id}'
+        }
+        for duplicate_id, canonical_id in target.items()
+    ])
+    return moved
+
+
+def recluster(session, apply=False, category_ids=None, radius_m=150, threshold=0.5,
+              chunk_size=2000, merge_batch_size=200, on_cluster=None):
+    """
+    Varre as categorias e propõe (ou aplica, com apply=True) as mesclagens.
+    Retorna as estatísticas da execução.
+    """
+    stats = defaultdict(int)
+    start = time.perf_counter()
+
+    if category_ids is None:
+        category_ids = [row[0] for row in session.query(Occurrence.category_id).filter(
+            Occurrence.status.in_(OPEN_STATUSES)
+        ).distinct().order_by(Occurrence.category_id)]
+
+    for category_id in category_ids:
+        clusters = cluster_category(session, category_id, radius_m, threshold, chunk_size, stats)
+        session.rollback()  # encerra a transação de leitura antes das escritas
+        for canonical_id, duplicate_ids in clusters:
+            stats['clusters'] += 1
+            stats['duplicates'] += len(duplicate_ids)
+            if on_cluster:
+                on_cluster(category_id, canonical_id, duplicate_ids)
+        if apply:
+            for start_index in range(0, len(clusters), merge_batch_size):
+                moved = merge_clusters(session, clusters[start_index:start_index + merge_batch_size])
+                for key, count in moved.items():
+                    stats[f'moved_{key}'] += count
+                session.commit()
+
+    stats['elapsed_s'] = time.perf_counter() - start
+    stats['per_second'] = stats['scanned'] / stats['elapsed_s'] if stats['elapsed_s'] else 0
+    return dict(stats)
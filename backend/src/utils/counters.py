@@ -0,0 +1,72 @@
+"""
+Contadores denormalizados de Occurrence (support_count e photo_count)
+
+As rotas incrementam os contadores com UPDATE atômico
+(`support_count = support_count + 1`) na mesma transação que grava o apoio
+ou a foto, então requisições concorrentes não perdem incrementos.
+reconcile_counters recalcula a partir das tabelas de apoios e fotos e corrige
+divergências (cargas diretas no banco, scripts antigos, falhas parciais).
+"""
+
+from sqlalchemy import func, or_, select, update
+
+from src.models.models import Occurrence, OccurrencePhoto, OccurrenceSupport
+
+COUNTER_SOURCES = {
+    'support_count': OccurrenceSupport,
+    'photo_count': OccurrencePhoto,
+}
+
+
+def increment_counter(occurrence_id, column, amount=1):
+    """UPDATE atômico do contador; não carrega os apoios nem as fotos"""
+    counter = getattr(Occurrence, column)
+    Occurrence.query.filter_by(id=occurrence_id).update({counter: counter + amount})
+
+
+def _actual_count(column):
+    model = COUNTER_SOURCES[column]
+    table = Occurrence.__table__
+    return select(func.count(model.id)).where(model.occurrence_id == table.c.id).scalar_subquery()
+
+
+def refresh_counters(session, occurrence_ids):
+    """Recalcula os contadores das ocorrências informadas"""
+    if occurrence_ids:
+        table = Occurrence.__table__
+        session.execute(
+            update(table).where(table.c.id.in_(occurrence_ids)).values(
+                {column: _actual_count(column) for column in COUNTER_SOURCES}
+            )
+        )
+
+
+def reconcile_counters(session, batch_size=5000, fix=True):
+    """
+    Compara os contadores com as contagens reais em lotes de ids e corrige
+    os divergentes. Retorna {'checked': ..., 'drifted': ...}.
+    """
+    table = Occurrence.__table__
+    stats = {'checked': 0, 'drifted': 0}
+    last_id = 0
+    while True:
+        ids = session.execute(
+            select(table.c.id).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        drifted = session.execute(
+            select(table.c.id).where(
+                table.c.id.between(ids[0], ids[-1]),
+                or_(*(table.c[column] != _actual_count(column) for column in COUNTER_SOURCES))
+            )
+        ).scalars().all()
+        stats['checked'] += len(ids)
+        stats['drifted'] += len(drifted)
+        if fix:
+            refresh_counters(session, drifted)
+            session.commit()
+        last_id = ids[-1]
+    if not fix:
+        session.rollback()
+    return stats
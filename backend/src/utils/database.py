@@ -0,0 +1,157 @@
+"""
+Infraestrutura de banco de dados: roteamento para réplica de leitura,
+statement_timeout por classe de rota e descarte dos pools após o fork.
+
+- Dashboards (DB_DASHBOARD_PREFIXES) e os endpoints de listagem em
+  DB_REPLICA_READ_ENDPOINTS leem da réplica configurada em
+  DATABASE_REPLICA_URL; escritas e flushes sempre vão para o primário.
+- No PostgreSQL, cada transação recebe `SET LOCAL statement_timeout` de
+  acordo com a classe da requisição (dashboard, write ou read).
+- Com preload_app o master do gunicorn cria as engines; os workers chamam
+  dispose_engines() no post_fork para não herdar conexões do master. O
+  mesmo descarte fica registrado em os.register_at_fork, para servidores
+  iniciados sem gunicorn_config.py e outros forks.
+- No SQLite (SQLITE_PRODUCTION_MODE), cada conexão liga WAL,
+  synchronous=NORMAL, busy_timeout, mmap e cache_size. As transações são
+  abertas por nós: BEGIN IMMEDIATE em requisições de escrita e nos processos
+  marcados com write_intent() (jobs-worker, outbox-relay, sla-scan e os demais
+  comandos que escrevem), que assim disputam o lock de escrita logo no início
+  (esperando busy_timeout e depois com backoff exponencial) em vez de falhar
+  no meio com "database is locked". Com o lock obtido no BEGIN, o restante da
+  transação não disputa mais nada; leituras (BEGIN simples) não bloqueiam no WAL.
+"""
+
+import os
+import random
+import time
+import weakref
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = 'replica'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+_engines = weakref.WeakSet()
+
+
+class RoutingSession(Session):
+    """Sessão que envia SELECTs de requisições somente-leitura para a réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_request_context() and g.get('db_use_replica')):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def classify_request():
+    path = request.path
+    if any(path.startswith(prefix) for prefix in current_app.config.get('DB_DASHBOARD_PREFIXES', ())):
+        return 'dashboard'
+    if request.method in WRITE_METHODS:
+        return 'write'
+    return 'read'
+
+
+def _before_request():
+    route_class = classify_request()
+    g.db_route_class = route_class
+    g.db_use_replica = route_class == 'dashboard' or (
+        route_class == 'read' and request.endpoint in current_app.config.get('DB_REPLICA_READ_ENDPOINTS', ())
+    )
+
+
+def write_intent():
+    """
+    Marca o contexto da aplicação como escritor, como uma requisição de
+    escrita. Para comandos e processos de fundo, que não passam por
+    classify_request(); no SQLite as transações abrem com BEGIN IMMEDIATE.
+    """
+    g.db_route_class = 'write'
+
+
+def _statement_timeout_ms():
+    config = current_app.config
+    route_class = g.get('db_route_class')
+    if route_class == 'dashboard':
+        return config.get('DB_DASHBOARD_TIMEOUT_MS', 0)
+    if route_class == 'write':
+        return config.get('DB_WRITE_TIMEOUT_MS', 0)
+    return config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+
+
+def _on_begin(connection):
+    if not has_request_context():
+        return
+    timeout = int(_statement_timeout_ms())
+    if timeout > 0:
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout}')
+
+
+def _is_locked(exc):
+    message = str(exc.orig if isinstance(exc, OperationalError) else exc).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def _configure_sqlite(engine, config):
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+    retries = int(config['SQLITE_WRITE_RETRIES'])
+    backoff = config['SQLITE_RETRY_BACKOFF_MS'] / 1000
+
+    @event.listens_for(engine, 'connect')
+    def _sqlite_connect(dbapi_connection, connection_record):
+        # O BEGIN passa a ser emitido por _on_begin, não pelo driver
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _sqlite_begin(connection):
+        write = has_app_context() and g.get('db_route_class') == 'write'
+        statement = 'BEGIN IMMEDIATE' if write else 'BEGIN'
+        delay = backoff
+        for attempt in range(retries + 1):
+            try:
+                connection.exec_driver_sql(statement)
+                return
+            except OperationalError as exc:
+                if attempt == retries or not _is_locked(exc):
+                    raise
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay *= 2
+
+
+def init_app(app, db):
+    app.before_request(_before_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            _engines.add(engine)
+            if engine.dialect.name == 'postgresql':
+                event.listen(engine, 'begin', _on_begin)
+            elif engine.dialect.name == 'sqlite' and app.config.get('SQLITE_PRODUCTION_MODE'):
+                _configure_sqlite(engine, app.config)
+
+
+def dispose_engines():
+    """Descarta os pools herdados do processo pai sem fechar as conexões dele."""
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=dispose_engines)
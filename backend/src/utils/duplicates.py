@@ -0,0 +1,119 @@
+"""
+Detecção de ocorrências quase duplicadas no registro
+
+Candidatas: ocorrências abertas da mesma categoria nas células da grade
+espacial ao redor do ponto (índice em category_id + geo_cell), filtradas pela
+distância real. A semelhança de texto é o Jaccard de shingles de caracteres
+do título e do título + descrição, já normalizados pelo analisador da busca.
+Os shingles das ocorrências existentes ficam em cache por (id, updated_at).
+"""
+
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from src.models.models import db, Occurrence, OccurrenceStatus
+from src.utils.geo import cell_id, cells_within, haversine_m
+from src.utils.search import analyze
+
+SHINGLE_SIZE = 3
+TITLE_WEIGHT = 0.6
+OPEN_STATUSES = (OccurrenceStatus.OPEN, OccurrenceStatus.IN_PROGRESS)
+CACHE_SIZE = 50000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _shingle_set(normalized):
+    if len(normalized) <= SHINGLE_SIZE:
+        return frozenset([normalized]) if normalized else frozenset()
+    return frozenset(normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1))
+
+
+def signature(title, description):
+    normalized_title = ' '.join(analyze(title))
+    normalized = f"{normalized_title} {' '.join(analyze(description))}"
+    return _shingle_set(normalized_title), _shingle_set(normalized)
+
+
+def _cached_signature(occurrence_id, updated_at, title, description):
+    key = (occurrence_id, updated_at)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    cached = signature(title, description)
+    with _cache_lock:
+        _cache[key] = cached
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return cached
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def similarity(sig_a, sig_b):
+    return TITLE_WEIGHT * jaccard(sig_a[0], sig_b[0]) + (1 - TITLE_WEIGHT) * jaccard(sig_a[1], sig_b[1])
+
+
+def find_duplicates(category_id, latitude, longitude, title, description,
+                    radius_m=150, threshold=0.5, limit=3):
+    """Ocorrências abertas parecidas, da mais semelhante para a menos"""
+    candidates = db.session.query(
+        Occurrence.id, Occurrence.title, Occurrence.description, Occurrence.address,
+        Occurrence.latitude, Occurrence.longitude, Occurrence.status,
+        Occurrence.created_at, Occurrence.updated_at
+    ).filter(
+        Occurrence.category_id == category_id,
+        Occurrence.geo_cell.in_(cells_within(latitude, longitude, radius_m)),
+        Occurrence.status.in_(OPEN_STATUSES)
+    ).all()
+
+    target = signature(title, description)
+    matches = []
+    for candidate in candidates:
+        distance = haversine_m(latitude, longitude, candidate.latitude, candidate.longitude)
+        if distance > radius_m:
+            continue
+        score = similarity(target, _cached_signature(
+            candidate.id, candidate.updated_at, candidate.title, candidate.description
+        ))
+        if score >= threshold:
+            matches.append({
+                'id': candidate.id,
+                'title': candidate.title,
+                'address': candidate.address,
+                'status': candidate.status.value,
+                'created_at': candidate.created_at.isoformat() if candidate.created_at else None,
+                'distance_m': round(distance, 1),
+                'similarity': round(score, 3)
+            })
+
+    matches.sort(key=lambda match: (-match['similarity'], match['distance_m']))
+    return matches[:limit]
+
+
+def backfill_geo_cells(session, batch_size=1000):
+    """Preenche geo_cell das ocorrências antigas; retorna o total atualizado"""
+    total = 0
+    while True:
+        rows = session.query(Occurrence.id, Occurrence.latitude, Occurrence.longitude).filter(
+            Occurrence.geo_cell.is_(None)
+        ).limit(batch_size).all()
+        if not rows:
+            break
+        # SQL direto para não disparar o onupdate de updated_at
+        session.execute(
+            text('UPDATE occurrences SET geo_cell = :cell WHERE id = :id'),
+            [{'id': row.id, 'cell': cell_id(row.latitude, row.longitude)} for row in rows]
+        )
+        total += len(rows)
+    session.commit()
+    return total
@@ -0,0 +1,234 @@
+"""
+Exportação de ocorrências e timeline em CSV ou XLSX
+
+As linhas são lidas com yield_per (cursor do lado do servidor no
+PostgreSQL) e escritas em blocos à medida que chegam: a resposta começa a
+sair logo e a memória fica constante, seja qual for o número de linhas.
+
+O XLSX é montado sem dependências: um zip (zipfile sobre um destino sem
+seek, com descritores de dados) com planilhas em XML de strings inline.
+Cada planilha leva até XLSX_MAX_ROWS linhas; as seguintes continuam numa
+nova aba.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from enum import Enum
+from xml.sax.saxutils import escape
+
+from sqlalchemy.orm import aliased
+
+from src.models.models import Category, Department, Occurrence, OccurrenceTimeline, User
+from src.utils.address import extract_neighborhood
+
+XLSX_MAX_ROWS = 1_000_000  # O Excel aceita 1.048.576 linhas por planilha
+XLSX_MAX_CELL = 32_767
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+OCCURRENCE_HEADERS = (
+    'id', 'titulo', 'status', 'prioridade', 'categoria', 'departamento', 'bairro', 'endereco',
+    'latitude', 'longitude', 'responsavel', 'apoios', 'avaliacao', 'criada_em', 'atualizada_em',
+    'concluida_em', 'validada_em', 'prazo_sla', 'mesclada_na_ocorrencia'
+)
+TIMELINE_HEADERS = (
+    'id', 'ocorrencia_id', 'acao', 'status_anterior', 'status_novo', 'etapa', 'descricao', 'usuario', 'data'
+)
+
+
+def occurrence_rows(query, batch_size):
+    """Linhas de exportação das ocorrências de `query` (listagem filtrada sobre Occurrence), na mesma ordem"""
+    assignee = aliased(User)
+    rows = query.outerjoin(Category, Category.id == Occurrence.category_id).outerjoin(
+        Department, Department.id == Occurrence.department_id
+    ).outerjoin(assignee, assignee.id == Occurrence.assigned_to).with_entities(
+        Occurrence.id, Occurrence.title, Occurrence.status, Occurrence.priority, Category.name,
+        Department.name, Occurrence.address, Occurrence.latitude, Occurrence.longitude, assignee.name,
+        Occurrence.support_count, Occurrence.rating, Occurrence.created_at, Occurrence.updated_at,
+        Occurrence.completed_at, Occurrence.validated_at, Occurrence.sla_due_at, Occurrence.merged_into_id
+    ).yield_per(batch_size)
+    for row in rows:
+        # Bairro extraído do endereço, antes dele
+        yield (*row[:6], extract_neighborhood(row.address), *row[6:])
+
+
+def timeline_rows(query, batch_size):
+    """Timeline das ocorrências de `query`, por ocorrência e data"""
+    ids = query.with_entities(Occurrence.id).order_by(None).subquery()
+    rows = OccurrenceTimeline.query.outerjoin(User, User.id == OccurrenceTimeline.user_id).filter(
+        OccurrenceTimeline.occurrence_id.in_(ids.select())
+    ).with_entities(
+        OccurrenceTimeline.id, OccurrenceTimeline.occurrence_id, OccurrenceTimeline.action,
+        OccurrenceTimeline.old_status, OccurrenceTimeline.new_status, OccurrenceTimeline.status_change,
+        OccurrenceTimeline.description, OccurrenceTimeline.details, User.name, OccurrenceTimeline.created_at
+    ).order_by(OccurrenceTimeline.occurrence_id, OccurrenceTimeline.id).yield_per(batch_size)
+    for row in rows:
+        yield (*row[:6], row.description or row.details, *row[8:])
+
+
+def cell_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def csv_stream(headers, rows, batch_size):
+    """CSV em UTF-8 com BOM (abre com acentos no Excel), em blocos de batch_size linhas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for count, row in enumerate(rows, start=1):
+        values = [cell_value(value) for value in row]
+        # Texto do cidadão não pode virar fórmula na planilha
+        writer.writerow([
+            "'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+            for value in values
+        ])
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _Sink(io.RawIOBase):
+    """Destino sem seek para o zipfile; os bytes escritos são recolhidos com drain()"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        value = cell_value(value)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            text = INVALID_XML.sub('', str(value))[:XLSX_MAX_CELL]
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>')
+        else:
+            cells.append(f'<c><v>{value}</v></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+
+def _xlsx_parts(sheet_names):
+    sheets = ''.join(
+        f'<sheet name="{escape(name)}" sheetId="{index}" r:id="rId{index}"/>'
+        for index, name in enumerate(sheet_names, start=1)
+    )
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for index in range(1, len(sheet_names) + 1)
+    )
+    relationships = ''.join(
+        f'<Relationship Id="rId{index}" Target="worksheets/sheet{index}.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        for index in range(1, len(sheet_names) + 1)
+    )
+    return {
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheets}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relationships}</Relationships>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ),
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{overrides}</Types>'
+        ),
+    }
+
+
+def xlsx_stream(sheet_name, headers, rows, batch_size, max_rows=XLSX_MAX_ROWS):
+    """Pasta de trabalho XLSX em blocos; abre uma nova aba a cada max_rows linhas"""
+    sink = _Sink()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED)
+    sheet_names = []
+    sheet = None
+    header_row = _xlsx_row(headers)
+    in_sheet = 0
+    pending = []
+
+    def open_sheet():
+        sheet_names.append(sheet_name if not sheet_names else f'{sheet_name} {len(sheet_names) + 1}')
+        opened = archive.open(f'xl/worksheets/sheet{len(sheet_names)}.xml', 'w', force_zip64=True)
+        opened.write((SHEET_START + header_row).encode('utf-8'))
+        return opened
+
+    sheet = open_sheet()
+    for row in rows:
+        if in_sheet == max_rows:
+            sheet.write(''.join(pending).encode('utf-8'))
+            pending.clear()
+            sheet.write(SHEET_END.encode('utf-8'))
+            sheet.close()
+            sheet = open_sheet()
+            in_sheet = 0
+        pending.append(_xlsx_row(row))
+        in_sheet += 1
+        if len(pending) == batch_size:
+            sheet.write(''.join(pending).encode('utf-8'))
+            pending.clear()
+            yield sink.drain()
+    sheet.write((''.join(pending) + SHEET_END).encode('utf-8'))
+    sheet.close()
+    for name, content in _xlsx_parts(sheet_names).items():
+        archive.writestr(name, content)
+    archive.close()
+    yield sink.drain()
+
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+def export_stream(export_format, sheet_name, headers, rows, batch_size):
+    if export_format == 'xlsx':
+        return xlsx_stream(sheet_name, headers, rows, batch_size)
+    return csv_stream(headers, rows, batch_size)
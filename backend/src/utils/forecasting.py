@@ -0,0 +1,217 @@
+"""
+Previsão do volume diário de ocorrências
+
+Roda em lote (`flask --app src.main forecasts-refresh`, uma vez por dia) sobre
+occurrence_daily_stats (src/utils/rollups.py), nunca na requisição. Para cada
+série — o total, cada categoria e cada par categoria/bairro com pelo menos
+FORECAST_MIN_OCCURRENCES registros no histórico — a contagem diária de
+ocorrências registradas (dias sem registro = 0) nos últimos
+FORECAST_HISTORY_DAYS dias é ajustada com dois modelos leves:
+
+- weekday_mean: média das últimas quatro ocorrências do mesmo dia da semana;
+- holt_winters: Holt-Winters aditivo com tendência amortecida e sazonalidade
+  semanal, com os parâmetros escolhidos numa pequena grade.
+
+Vence o de menor erro absoluto médio nos últimos HOLDOUT_DAYS dias, previstos
+a partir do restante do histórico. O intervalo de 95% usa o desvio dos erros
+de um passo, alargado com o horizonte (aproximação). As previsões dos
+próximos FORECAST_HORIZON_DAYS dias substituem as anteriores na tabela
+occurrence_forecasts, numa única transação.
+"""
+
+import math
+from datetime import datetime, timedelta
+from itertools import product
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert, select
+
+from src.models.models import OccurrenceDailyStat, OccurrenceForecast
+from src.utils.rollups import local_day
+
+SEASON = 7
+WEEKS = 4  # semanas na média por dia da semana
+HOLDOUT_DAYS = 14
+INTERVAL_Z = 1.96
+DAMPING = 0.9
+HW_GRID = list(product((0.1, 0.3, 0.5), (0.0, 0.1), (0.1, 0.3)))  # (alfa, beta, gama)
+MIN_HISTORY_DAYS = SEASON * WEEKS + HOLDOUT_DAYS
+
+
+def _std(errors):
+    if len(errors) < 2:
+        return 0.0
+    mean = sum(errors) / len(errors)
+    return math.sqrt(sum((error - mean) ** 2 for error in errors) / (len(errors) - 1))
+
+
+def weekday_mean(values, horizon):
+    """(previsões, erros de um passo, fator de largura por horizonte)"""
+    history = list(values)
+    errors = [
+        values[t] - sum(values[t - SEASON * week] for week in range(1, WEEKS + 1)) / WEEKS
+        for t in range(SEASON * WEEKS, len(values))
+    ]
+    forecasts = []
+    for _ in range(horizon):
+        forecast = sum(history[-SEASON * week] for week in range(1, WEEKS + 1)) / WEEKS
+        forecasts.append(forecast)
+        history.append(forecast)
+    return forecasts, errors, lambda h: 1.0
+
+
+def holt_winters(values, horizon, alpha, beta, gamma):
+    """Holt-Winters aditivo com tendência amortecida; mesmo retorno de weekday_mean"""
+    level = sum(values[:SEASON]) / SEASON
+    trend = (sum(values[SEASON:2 * SEASON]) - sum(values[:SEASON])) / SEASON ** 2
+    seasonals = [value - level for value in values[:SEASON]]
+    errors = []
+    for t in range(SEASON, len(values)):
+        seasonal = seasonals[t % SEASON]
+        errors.append(values[t] - (level + DAMPING * trend + seasonal))
+        previous = level
+        level = alpha * (values[t] - seasonal) + (1 - alpha) * (previous + DAMPING * trend)
+        trend = beta * (level - previous) + (1 - beta) * DAMPING * trend
+        seasonals[t % SEASON] = gamma * (values[t] - level) + (1 - gamma) * seasonal
+    forecasts = []
+    damped = 0.0
+    for h in range(1, horizon + 1):
+        damped += DAMPING ** h
+        forecasts.append(level + damped * trend + seasonals[(len(values) + h - 1) % SEASON])
+    return forecasts, errors[SEASON:], lambda h: math.sqrt(1 + (h - 1) * alpha ** 2 * (1 + beta) ** 2)
+
+
+def candidates():
+    yield 'weekday_mean', weekday_mean, ()
+    for params in HW_GRID:
+        yield 'holt_winters', holt_winters, params
+
+
+def fit_series(values, horizon):
+    """
+    Escolhe o modelo pelo erro no período reservado e prevê `horizon` dias.
+    Retorna (modelo, [(previsão, inferior, superior)]) ou None se o histórico é curto.
+    """
+    if len(values) < MIN_HISTORY_DAYS:
+        return None
+    train, holdout = values[:-HOLDOUT_DAYS], values[-HOLDOUT_DAYS:]
+    best = None
+    for name, model, params in candidates():
+        predicted = model(train, HOLDOUT_DAYS, *params)[0]
+        error = sum(abs(actual - forecast) for actual, forecast in zip(holdout, predicted)) / HOLDOUT_DAYS
+        if best is None or error < best[0] - 1e-9:
+            best = (error, name, model, params)
+    _, name, model, params = best
+    forecasts, errors, widen = model(values, horizon, *params)
+    sigma = _std(errors)
+    points = []
+    for h, forecast in enumerate(forecasts, start=1):
+        forecast = max(forecast, 0.0)
+        margin = INTERVAL_Z * sigma * widen(h)
+        points.append((forecast, max(forecast - margin, 0.0), forecast + margin))
+    return name, points
+
+
+def daily_series(session, start_day, end_day, min_occurrences):
+    """{(categoria, bairro): [contagem por dia]} de start_day a end_day, com zeros; None = todos"""
+    days = (end_day - start_day).days + 1
+    series = {}
+
+    def add(key, index, count):
+        series.setdefault(key, [0] * days)[index] += count
+
+    for row in session.execute(
+        select(OccurrenceDailyStat.day, OccurrenceDailyStat.category_id, OccurrenceDailyStat.neighborhood,
+               OccurrenceDailyStat.created)
+        .where(OccurrenceDailyStat.day >= start_day, OccurrenceDailyStat.day <= end_day,
+               OccurrenceDailyStat.created > 0)
+    ):
+        index = (row.day - start_day).days
+        add((None, None), index, row.created)
+        add((row.category_id, None), index, row.created)
+        if row.neighborhood:
+            add((row.category_id, row.neighborhood), index, row.created)
+    return {
+        key: values for key, values in series.items()
+        if key[1] is None or sum(values) >= min_occurrences
+    }
+
+
+def refresh_forecasts(session, config, now=None, log=print):
+    """Recalcula todas as séries e substitui as previsões; retorna {séries, sem histórico, linhas}"""
+    now = now or datetime.utcnow()
+    today = local_day(now, ZoneInfo(config['LOCAL_TIMEZONE']))
+    # O dia de hoje ainda está incompleto: o histórico termina ontem
+    end_day = today - timedelta(days=1)
+    start_day = end_day - timedelta(days=config['FORECAST_HISTORY_DAYS'] - 1)
+    horizon = config['FORECAST_HORIZON_DAYS']
+
+    rows = []
+    skipped = 0
+    series = daily_series(session, start_day, end_day, config['FORECAST_MIN_OCCURRENCES'])
+    for (category_id, neighborhood), values in series.items():
+        # Série nova: o histórico começa no primeiro registro, não em zeros anteriores a ela
+        first = next(index for index, value in enumerate(values) if value)
+        fitted = fit_series(values[first:], horizon)
+        if fitted is None:
+            skipped += 1
+            continue
+        model, points = fitted
+        for h, (forecast, lower, upper) in enumerate(points):
+            rows.append({
+                'category_id': category_id, 'neighborhood': neighborhood, 'day': today + timedelta(days=h),
+                'forecast': round(forecast, 3), 'lower': round(lower, 3), 'upper': round(upper, 3),
+                'model': model, 'generated_at': now
+            })
+
+    session.execute(delete(OccurrenceForecast))
+    if rows:
+        session.execute(insert(OccurrenceForecast), rows)
+    session.commit()
+    log(f'{len(series) - skipped} série(s) prevista(s), {skipped} com histórico curto, {len(rows)} linha(s)')
+    return {'series': len(series) - skipped, 'skipped': skipped, 'rows': len(rows)}
+
+
+def actual_counts(session, category_id, neighborhood, start_day, end_day):
+    """{dia: ocorrências registradas} da série no intervalo"""
+    query = session.query(OccurrenceDailyStat.day, func.sum(OccurrenceDailyStat.created)).filter(
+        OccurrenceDailyStat.day >= start_day, OccurrenceDailyStat.day <= end_day
+    )
+    if category_id is not None:
+        query = query.filter(OccurrenceDailyStat.category_id == category_id)
+    if neighborhood is not None:
+        query = query.filter(OccurrenceDailyStat.neighborhood == neighborhood)
+    return {day: int(total or 0) for day, total in query.group_by(OccurrenceDailyStat.day)}
+
+
+def stored_forecast(session, config, category_id=None, neighborhood=None, days=14, history_days=28, now=None):
+    """Previsão gravada da série a partir de hoje, com o realizado recente; None se não houver"""
+    today = local_day(now or datetime.utcnow(), ZoneInfo(config['LOCAL_TIMEZONE']))
+
+    def matches(column, value):
+        return column.is_(None) if value is None else column == value
+
+    rows = session.query(OccurrenceForecast).filter(
+        matches(OccurrenceForecast.category_id, category_id),
+        matches(OccurrenceForecast.neighborhood, neighborhood),
+        OccurrenceForecast.day >= today
+    ).order_by(OccurrenceForecast.day).limit(days).all()
+    if not rows:
+        return None
+    start_day = today - timedelta(days=history_days)
+    actual = actual_counts(session, category_id, neighborhood, start_day, today)
+    return {
+        'category_id': category_id,
+        'neighborhood': neighborhood,
+        'model': rows[0].model,
+        'generated_at': rows[0].generated_at.isoformat(),
+        'history': [
+            {'day': (start_day + timedelta(days=offset)).isoformat(),
+             'occurrences': actual.get(start_day + timedelta(days=offset), 0)}
+            for offset in range(history_days + 1)
+        ],
+        'forecast': [
+            {'day': row.day.isoformat(), 'forecast': row.forecast, 'lower': row.lower, 'upper': row.upper}
+            for row in rows
+        ]
+    }
@@ -13,6 +13,7 @@ from werkzeug.security import generate_password_hash
 import random
 from datetime import datetime, timedelta
 import uuid
+from src.utils.counters import reconcile_counters
 
 # Dados realistas de Lavras-MG
 NEIGHBORHOODS = [
@@ -404,6 +405,7 @@ def create_massive_data():
                 photo_count += 1
         
         db.session.commit()
+        reconcile_counters(db.session)
         print(f"✅ {photo_count} fotos registradas!")
         
         # Estatísticas finais
@@ -0,0 +1,72 @@
+"""
+Funções geográficas: distância e grade espacial
+
+A grade divide o mapa em células de GRID_CELL_DEG graus (~110 m no equador).
+Cada ocorrência guarda a célula onde está (Occurrence.geo_cell), o que permite
+buscar vizinhas por igualdade em um índice comum, sem extensão espacial.
+"""
+
+import math
+
+EARTH_RADIUS_M = 6371000.0
+GRID_CELL_DEG = 0.001
+METERS_PER_DEG_LAT = 111320.0
+
+# Deslocamentos para codificar (linha, coluna) da célula em um único inteiro
+_ROW_OFFSET = int(90 / GRID_CELL_DEG)
+_COL_OFFSET = int(180 / GRID_CELL_DEG)
+_COL_SPAN = 2 * _COL_OFFSET + 1
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Distância em metros entre dois pontos"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def cell_index(lat, lon):
+    return math.floor(lat / GRID_CELL_DEG), math.floor(lon / GRID_CELL_DEG)
+
+
+def cell_at(row, col):
+    """Identificador inteiro da célula (linha, coluna)"""
+    return (row + _ROW_OFFSET) * _COL_SPAN + (col + _COL_OFFSET)
+
+
+def cell_id(lat, lon):
+    """Identificador inteiro da célula que contém o ponto"""
+    return cell_at(*cell_index(lat, lon))
+
+
+def cell_position(cell):
+    """(linha, coluna) da célula a partir do identificador inteiro"""
+    row, col = divmod(cell, _COL_SPAN)
+    return row - _ROW_OFFSET, col - _COL_OFFSET
+
+
+def cell_center(cell):
+    """(latitude, longitude) do centro da célula"""
+    row, col = cell_position(cell)
+    return (row + 0.5) * GRID_CELL_DEG, (col + 0.5) * GRID_CELL_DEG
+
+
+def cell_reach(lat, radius_m):
+    """Quantas células, em linhas e colunas, cobrem `radius_m` metros na latitude dada"""
+    rows = math.ceil(radius_m / (GRID_CELL_DEG * METERS_PER_DEG_LAT))
+    meters_per_deg_lon = METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01)
+    cols = math.ceil(radius_m / (GRID_CELL_DEG * meters_per_deg_lon))
+    return rows, cols
+
+
+def cells_within(lat, lon, radius_m):
+    """Células que podem conter pontos a até `radius_m` metros do ponto"""
+    row, col = cell_index(lat, lon)
+    rows, cols = cell_reach(lat, radius_m)
+    return [
+        cell_at(r, c)
+        for r in range(row - rows, row + rows + 1)
+        for c in range(col - cols, col + cols + 1)
+    ]
@@ -0,0 +1,263 @@
+"""
+Pontos críticos (hotspots) e mapa de calor das ocorrências
+
+occurrence_cell_stats conta as ocorrências registradas por dia local,
+categoria e célula da grade (GRID_CELL_DEG, ~110 m; src/utils/geo.py). O
+consumidor 'hotspot_cells' do outbox soma cada ocorrência nova e desconta as
+duplicatas mescladas, então a tabela acompanha os registros sem varrer
+occurrences.
+
+A densidade de uma janela soma as células do período e aplica um kernel
+gaussiano de desvio HOTSPOT_BANDWIDTH_M (cortado em dois desvios). Com NumPy a
+suavização é uma convolução separável sobre a grade densa da área; sem NumPy,
+ou se a área passar de HOTSPOT_MAX_GRID_CELLS células, cada célula espalha a
+sua contagem para as vizinhas. Os pontos críticos são as células de maior
+densidade, descartando as que ficam a menos de uma banda de um ponto já
+escolhido.
+
+A densidade calculada fica em cache no processo, marcada com a posição do
+consumidor: quando chegam eventos novos, a próxima leitura recalcula.
+"""
+
+import math
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.models import Occurrence, OccurrenceCellStat, OutboxEvent, OutboxOffset
+from src.utils.geo import GRID_CELL_DEG, METERS_PER_DEG_LAT, cell_at, cell_center, cell_id, cell_position, haversine_m
+from src.utils.outbox import consumer, set_offset
+from src.utils.rollups import UPSERT_CHUNK, local_day
+from src.utils.transitions import CREATED_EVENT, MERGED_EVENT
+
+try:
+    import numpy
+except ImportError:  # dependência opcional
+    numpy = None
+
+CONSUMER = 'hotspot_cells'
+CACHE_SIZE = 64
+MIN_DENSITY = 0.05  # células abaixo disso ficam fora do mapa de calor
+
+
+def _cell(row):
+    if row.geo_cell is not None:
+        return row.geo_cell
+    if row.latitude is None or row.longitude is None:
+        return None
+    return cell_id(row.latitude, row.longitude)
+
+
+def upsert_cells(session, totals):
+    """Soma {(dia, categoria, célula): quantidade} na tabela"""
+    rows = [
+        {'day': day, 'category_id': category_id, 'geo_cell': cell, 'occurrences': count}
+        for (day, category_id, cell), count in totals.items() if count
+    ]
+    if not rows:
+        return 0
+    module = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+    table = OccurrenceCellStat.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        statement = module.insert(table).values(rows[start:start + UPSERT_CHUNK])
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['day', 'category_id', 'geo_cell'],
+            set_={'occurrences': table.c.occurrences + statement.excluded.occurrences}
+        ))
+    return len(rows)
+
+
+@consumer(CONSUMER, event_types=(CREATED_EVENT, MERGED_EVENT))
+def apply_events(session, events, config):
+    zone = ZoneInfo(config['LOCAL_TIMEZONE'])
+    rows = {row.id: row for row in session.execute(select(
+        Occurrence.id, Occurrence.category_id, Occurrence.geo_cell, Occurrence.latitude, Occurrence.longitude,
+        Occurrence.created_at
+    ).where(Occurrence.id.in_({event.occurrence_id for event in events})))}
+    totals = Counter()
+    for event in events:
+        row = rows.get(event.occurrence_id)
+        cell = _cell(row) if row else None
+        if cell is None or row.created_at is None:
+            continue
+        # A duplicata mesclada sai do dia em que foi registrada
+        totals[(local_day(row.created_at, zone), row.category_id, cell)] += -1 if event.event_type == MERGED_EVENT else 1
+    return upsert_cells(session, totals)
+
+
+def rebuild_cell_stats(session, config, batch_size=5000):
+    """Recalcula a tabela a partir das ocorrências não mescladas; retorna o número de linhas gravadas"""
+    zone = ZoneInfo(config['LOCAL_TIMEZONE'])
+    last_event_id = session.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+    totals = Counter()
+    for row in session.execute(
+        select(Occurrence.category_id, Occurrence.geo_cell, Occurrence.latitude, Occurrence.longitude,
+               Occurrence.created_at)
+        .where(Occurrence.merged_into_id.is_(None))
+        .execution_options(yield_per=batch_size)
+    ):
+        cell = _cell(row)
+        if cell is not None and row.created_at is not None:
+            totals[(local_day(row.created_at, zone), row.category_id, cell)] += 1
+    session.execute(delete(OccurrenceCellStat))
+    written = upsert_cells(session, totals)
+    set_offset(session, CONSUMER, last_event_id)
+    session.commit()
+    return written
+
+
+def cell_counts(session, start_day, category_id=None):
+    """{(categoria, célula): ocorrências} registradas a partir de start_day"""
+    query = session.query(
+        OccurrenceCellStat.category_id, OccurrenceCellStat.geo_cell, func.sum(OccurrenceCellStat.occurrences)
+    ).filter(OccurrenceCellStat.day >= start_day)
+    if category_id:
+        query = query.filter(OccurrenceCellStat.category_id == category_id)
+    return {
+        (row[0], row[1]): int(row[2])
+        for row in query.group_by(OccurrenceCellStat.category_id, OccurrenceCellStat.geo_cell) if row[2] and row[2] > 0
+    }
+
+
+def _kernel(latitude, bandwidth_m):
+    """Pesos gaussianos por deslocamento de linha e de coluna"""
+    cell_height = GRID_CELL_DEG * METERS_PER_DEG_LAT
+    cell_width = cell_height * max(math.cos(math.radians(latitude)), 0.01)
+    rows = math.ceil(2 * bandwidth_m / cell_height)
+    cols = math.ceil(2 * bandwidth_m / cell_width)
+
+    def weights(reach, size):
+        return [math.exp(-((step * size) ** 2) / (2 * bandwidth_m ** 2)) for step in range(-reach, reach + 1)]
+
+    return weights(rows, cell_height), weights(cols, cell_width)
+
+
+def _smooth_sparse(positions, row_weights, col_weights):
+    rows, cols = len(row_weights) // 2, len(col_weights) // 2
+    density = Counter()
+    for (row, col), count in positions.items():
+        for dr, row_weight in enumerate(row_weights, start=-rows):
+            for dc, col_weight in enumerate(col_weights, start=-cols):
+                density[cell_at(row + dr, col + dc)] += count * row_weight * col_weight
+    return density
+
+
+def _smooth_numpy(positions, row_weights, col_weights, max_cells):
+    rows, cols = len(row_weights) // 2, len(col_weights) // 2
+    first_row = min(row for row, _ in positions) - rows
+    first_col = min(col for _, col in positions) - cols
+    height = max(row for row, _ in positions) + rows - first_row + 1
+    width = max(col for _, col in positions) + cols - first_col + 1
+    if height * width > max_cells:
+        return None
+    grid = numpy.zeros((height, width))
+    for (row, col), count in positions.items():
+        grid[row - first_row, col - first_col] += count
+    grid = numpy.apply_along_axis(numpy.convolve, 0, grid, numpy.array(row_weights), 'same')
+    grid = numpy.apply_along_axis(numpy.convolve, 1, grid, numpy.array(col_weights), 'same')
+    found = numpy.nonzero(grid > 1e-12)
+    return {
+        cell_at(int(row) + first_row, int(col) + first_col): float(grid[row, col])
+        for row, col in zip(*found)
+    }
+
+
+def smooth(counts, bandwidth_m, max_cells):
+    """{célula: ocorrências} -> {célula: densidade}"""
+    if not counts:
+        return {}
+    positions = {cell_position(cell): count for cell, count in counts.items()}
+    latitude = sum((row + 0.5) * GRID_CELL_DEG for row, _ in positions) / len(positions)
+    row_weights, col_weights = _kernel(latitude, bandwidth_m)
+    if numpy is not None:
+        density = _smooth_numpy(positions, row_weights, col_weights, max_cells)
+        if density is not None:
+            return density
+    return dict(_smooth_sparse(positions, row_weights, col_weights))
+
+
+def top_hotspots(density, counts, k, bandwidth_m):
+    """As k células mais densas, a pelo menos uma banda umas das outras"""
+    chosen = []
+    for cell, value in sorted(density.items(), key=lambda item: (-item[1], item[0])):
+        if len(chosen) == k:
+            break
+        latitude, longitude = cell_center(cell)
+        if any(haversine_m(latitude, longitude, spot['latitude'], spot['longitude']) < bandwidth_m
+               for spot in chosen):
+            continue
+        nearby = sum(
+            count for other, count in counts.items()
+            if haversine_m(latitude, longitude, *cell_center(other)) <= 2 * bandwidth_m
+        )
+        chosen.append({
+            'cell': cell,
+            'latitude': round(latitude, 6),
+            'longitude': round(longitude, 6),
+            'density': round(value, 3),
+            'occurrences_nearby': nearby
+        })
+    return chosen
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _version(session):
+    offset = session.get(OutboxOffset, CONSUMER)
+    return offset.last_event_id if offset else 0
+
+
+def window_density(session, config, days, category_id=None, bandwidth_m=None, now=None):
+    """
+    Densidade dos últimos `days` dias (dia local de hoje incluído), por
+    categoria: {categoria: ({célula: ocorrências}, {célula: densidade})}.
+    Guardada em cache até o consumidor avançar.
+    """
+    bandwidth_m = bandwidth_m or config['HOTSPOT_BANDWIDTH_M']
+    zone = ZoneInfo(config['LOCAL_TIMEZONE'])
+    start_day = local_day(now or datetime.utcnow(), zone) - timedelta(days=days - 1)
+    key = (start_day, category_id, bandwidth_m)
+    version = _version(session)
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == version:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    by_category = {}
+    for (category, cell), count in cell_counts(session, start_day, category_id).items():
+        by_category.setdefault(category, {})[cell] = count
+    result = {
+        category: (counts, smooth(counts, bandwidth_m, config['HOTSPOT_MAX_GRID_CELLS']))
+        for category, counts in by_category.items()
+    }
+    with _lock:
+        _cache[key] = (version, result)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def merged_density(result):
+    """Soma as categorias: ({célula: ocorrências}, {célula: densidade})"""
+    counts, density = Counter(), Counter()
+    for category_counts, category_density in result.values():
+        counts.update(category_counts)
+        density.update(category_density)
+    return dict(counts), dict(density)
+
+
+def heatmap_cells(density, min_density=MIN_DENSITY):
+    """[[latitude, longitude, densidade]] das células visíveis no mapa"""
+    return [
+        [round(latitude, 6), round(longitude, 6), round(value, 3)]
+        for cell, value in sorted(density.items()) if value >= min_density
+        for latitude, longitude in [cell_center(cell)]
+    ]
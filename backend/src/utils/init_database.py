@@ -4,9 +4,19 @@ Script unificado de inicialização do banco de dados
 Resolve problemas de importação circular e ordem de execução
 """
 
-from src.models.models import db, User, Department, Category, Occurrence, OccurrenceTimeline, OccurrenceStatus, Priority, UserType
+from src.models.models import db, User, Department, Category, Occurrence, OccurrenceCellStat, OccurrenceDailyStat, OccurrenceTimeline, OccurrenceStatus, Priority, SlaPolicy, UserType
+from src.utils.search import ensure_search_index
+from src.utils.duplicates import backfill_geo_cells
+from src.utils.counters import reconcile_counters
+from src.utils.supports import remove_duplicate_supports
+from src.utils.workload import reconcile_workloads
+from src.utils.sla import backfill_sla_due_dates
+from src.utils.hotspots import rebuild_cell_stats
+from src.utils.rollups import rebuild_daily_stats
+from sqlalchemy import inspect, text
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
+import os
 import random
 
 
@@ -68,6 +78,28 @@ def create_departments_and_categories():
     print(f"✅ {len(categories_data)} categorias criadas!")
 
 
+def create_default_sla_policies():
+    """Cria os prazos padrão por departamento (antes fixos no dashboard estratégico)"""
+    
+    if SlaPolicy.query.first():
+        return
+    
+    sla_days = {
+        'Iluminação Pública': 2,
+        'Serviços Urbanos': 1,
+        'Saneamento': 1,
+        'Obras Públicas': 10,
+        'Meio Ambiente': 5,
+        'Trânsito': 1,
+        'Administração': 7
+    }
+    departments = Department.query.filter(Department.name.in_(sla_days)).all()
+    for dept in departments:
+        db.session.add(SlaPolicy(name=f'Prazo padrão - {dept.name}', department_id=dept.id, hours=sla_days[dept.name] * 24))
+    db.session.commit()
+    print(f"✅ {len(departments)} políticas de prazo criadas!")
+
+
 def create_admin_users():
     """Cria usuários administrativos"""
     
@@ -87,6 +119,8 @@ def create_admin_users():
         {'name': 'Pedro Lima', 'email': 'pedro.lima@lavras.mg.gov.br', 'department': 'Trânsito', 'phone': '(35) 99999-0005'}
     ]
     
+    password_hash = generate_password_hash("admin123")
+    
     admin_users_to_add = []
     for user_data in admin_users_data:
         if not User.query.filter_by(email=user_data["email"]).first():
@@ -97,7 +131,7 @@ def create_admin_users():
                 phone=user_data["phone"],
                 user_type=UserType.ADMIN,
                 department_id=dept.id if dept else None,
-                password_hash=generate_password_hash("admin123"),
+                password_hash=password_hash,
                 is_active=True
             )
             db.session.add(user)
@@ -132,6 +166,10 @@ def create_realistic_citizens_and_occurrences():
         'Simone Oliveira Santos', 'Daniel Lima Costa', 'Roberta Silva Alves', 'Henrique Santos Lima'
     ]
     
+    # Todos os cidadãos de demonstração usam a mesma senha: um único hash
+    # evita repetir a derivação de chave (lenta por design) 40 vezes
+    password_hash = generate_password_hash('123456')
+    
     citizens_to_add = []
     for name in citizen_names:
         email = name.lower().replace(' ', '.') + '@email.com'
@@ -140,7 +178,7 @@ def create_realistic_citizens_and_occurrences():
                 name=name,
                 email=email,
                 phone=f'(35) 9{random.randint(1000, 9999)}-{random.randint(1000, 9999)}',
-                password_hash=generate_password_hash('123456'),
+                password_hash=password_hash,
                 user_type=UserType.CITIZEN,
                 is_active=True
             )
@@ -266,9 +304,99 @@ def create_realistic_citizens_and_occurrences():
     print("✅ 1000 ocorrências criadas!")
 
 
-def init_database(app):
+def ensure_sqlite_directory(app):
+    """Cria o diretório do arquivo SQLite, se for o caso"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if uri.startswith('sqlite:///'):
+        directory = os.path.dirname(uri[len('sqlite:///'):])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+
+def add_missing_columns():
+    """
+    Adiciona às tabelas existentes as colunas novas dos modelos.
+    O create_all só cria tabelas que não existem; sem isso bancos antigos
+    ficariam sem as colunas adicionadas depois.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing_columns:
+                    continue
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=connection.dialect)}'
+                if col.server_default is not None:
+                    ddl += f' DEFAULT {col.server_default.arg}'
+                    if not col.nullable:
+                        ddl += ' NOT NULL'
+                connection.execute(text(ddl))
+                added.append(f'{table.name}.{col.name}')
+                print(f"🔧 Coluna {table.name}.{col.name} adicionada")
+    return added
+
+
+def add_missing_indexes():
+    """Cria nas tabelas existentes os índices declarados depois da criação"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.engine)
+                print(f"🔧 Índice {index.name} criado")
+
+
+def remove_duplicate_supports_if_needed():
+    """Bancos anteriores ao índice único de apoios podem ter apoios repetidos"""
+    inspector = inspect(db.engine)
+    if 'occurrence_supports' not in inspector.get_table_names():
+        return 0
+    existing_indexes = {index['name'] for index in inspector.get_indexes('occurrence_supports')}
+    if 'uq_occurrence_supports_occurrence_citizen' in existing_indexes:
+        return 0
+    removed = remove_duplicate_supports(db.session)
+    if removed:
+        print(f"🔧 {removed} apoios repetidos removidos")
+    return removed
+
+
+def init_database(app, demo_data=True):
+    """
+    Cria tabelas e dados iniciais. Cada etapa verifica se os dados já existem,
+    então o comando pode ser executado a cada deploy.
+    """
+    ensure_sqlite_directory(app)
     with app.app_context():
         db.create_all()
+        added_columns = add_missing_columns()
+        removed_supports = remove_duplicate_supports_if_needed()
+        add_missing_indexes()
+        backfill_geo_cells(db.session)
+        if removed_supports or 'occurrences.support_count' in added_columns or 'occurrences.photo_count' in added_columns:
+            reconcile_counters(db.session)
+        if 'users.active_jobs' in added_columns:
+            reconcile_workloads(db.session)
+        ensure_search_index(db.session)
         create_departments_and_categories()
+        create_default_sla_policies()
+        if 'occurrences.sla_due_at' in added_columns:
+            backfill_sla_due_dates(db.session, app.config)
         create_admin_users()
-        create_realistic_citizens_and_occurrences()
+        if demo_data:
+            create_realistic_citizens_and_occurrences()
+        # Agregados diários: a partir do histórico na primeira vez, depois pelo outbox
+        if not OccurrenceDailyStat.query.first():
+            rows = rebuild_daily_stats(db.session, app.config)
+            print(f"📊 {rows} linhas de agregados diários calculadas")
+        if not OccurrenceCellStat.query.first():
+            rows = rebuild_cell_stats(db.session, app.config)
+            print(f"🗺️ {rows} linhas de contagem por célula calculadas")
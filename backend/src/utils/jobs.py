@@ -0,0 +1,292 @@
+"""
+Fila de tarefas em segundo plano
+
+Efeitos colaterais (notificações e, no futuro, processamento de imagens ou
+agregações) não rodam dentro da requisição. A rota chama enqueue na mesma
+transação da alteração: a tarefa só fica visível para os workers depois do
+commit e não se perde se o processo cair logo em seguida. Para a requisição
+cada efeito custa um INSERT, então a latência das escritas não cresce com
+eles.
+
+- Tarefas são funções registradas com @job(nome, queue=...) que recebem a
+  sessão e o payload (JSON).
+- idempotency_key tem índice único: enfileirar de novo a mesma chave não cria
+  outra tarefa (INSERT ... ON CONFLICT DO NOTHING).
+- Os workers (`flask --app src.main jobs-worker`) reservam uma tarefa com um
+  UPDATE condicional, que só passa se ela ainda está pendente e se a fila tem
+  menos tarefas em execução que o limite em JOB_QUEUE_CONCURRENCY; o limite
+  vale para todos os processos juntos. A contagem só é confiável se as
+  reservas da mesma fila forem serializadas: no SQLite claim() marca o
+  contexto com write_intent() e a transação da reserva abre com BEGIN
+  IMMEDIATE, que toma o lock de escrita do banco antes da leitura; no
+  PostgreSQL (READ COMMITTED) cada reserva toma antes um advisory lock da
+  fila (pg_advisory_xact_lock), liberado no commit.
+- Banco ocupado ou fora do ar (OperationalError) não derruba o worker: ele
+  desfaz a transação e tenta de novo com espera exponencial, até
+  JOB_POLL_SECONDS entre tentativas.
+- O handler roda na transação que marca a tarefa como concluída: o que ele
+  grava no banco e a conclusão são confirmados juntos.
+- Uma falha devolve a tarefa à fila com espera exponencial
+  (JOB_RETRY_BASE_SECONDS × 2^(tentativa - 1), até JOB_RETRY_MAX_SECONDS, com
+  variação aleatória). Esgotado max_attempts, ela fica FAILED para inspeção e
+  nova tentativa manual.
+- Tarefas em execução há mais de JOB_LEASE_SECONDS (worker que morreu)
+  voltam para a fila.
+"""
+
+import os
+import random
+import socket
+import time
+import traceback
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+from importlib import import_module
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+
+from src.models.models import Job, JobStatus
+from src.utils.database import write_intent
+
+# Módulos que registram handlers; o worker os importa antes de começar
+HANDLER_MODULES = ('src.utils.notifications',)
+
+Handler = namedtuple('Handler', 'func queue max_attempts')
+HANDLERS = {}
+
+
+def job(name, queue='default', max_attempts=None):
+    """Registra func(session, payload) como a tarefa `name`"""
+    def register(func):
+        HANDLERS[name] = Handler(func, queue, max_attempts)
+        return func
+    return register
+
+
+def load_handlers():
+    for module in HANDLER_MODULES:
+        import_module(module)
+
+
+def _insert(dialect):
+    module = postgresql if dialect == 'postgresql' else sqlite
+    return module.insert(Job.__table__)
+
+
+def enqueue_many(session, items, config, now=None):
+    """
+    Enfileira [{name, payload, idempotency_key, delay_seconds}] na transação da
+    sessão. Chaves já enfileiradas são ignoradas. Retorna os ids criados.
+    """
+    if not items:
+        return []
+    now = now or datetime.utcnow()
+    rows = []
+    for item in items:
+        handler = HANDLERS[item['name']]
+        rows.append({
+            'queue': handler.queue,
+            'name': item['name'],
+            'payload': item.get('payload'),
+            'idempotency_key': item.get('idempotency_key'),
+            'status': JobStatus.PENDING,
+            'attempts': 0,
+            'max_attempts': handler.max_attempts or config['JOB_MAX_ATTEMPTS'],
+            'run_at': now + timedelta(seconds=item.get('delay_seconds', 0)),
+            'created_at': now
+        })
+    table = Job.__table__
+    statement = _insert(session.get_bind().dialect.name).values(rows).on_conflict_do_nothing(
+        index_elements=['idempotency_key']
+    ).returning(table.c.id)
+    return session.execute(statement).scalars().all()
+
+
+def enqueue(session, name, payload=None, config=None, idempotency_key=None, delay_seconds=0):
+    """Enfileira uma tarefa; retorna o id ou None se a chave já existia"""
+    ids = enqueue_many(session, [{
+        'name': name, 'payload': payload, 'idempotency_key': idempotency_key, 'delay_seconds': delay_seconds
+    }], config)
+    return ids[0] if ids else None
+
+
+def retry_delay(attempts, config):
+    delay = min(config['JOB_RETRY_BASE_SECONDS'] * 2 ** max(attempts - 1, 0), config['JOB_RETRY_MAX_SECONDS'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def busy_delay(failures, config):
+    """Espera depois de `failures` erros seguidos do banco: 50 ms dobrando até JOB_POLL_SECONDS"""
+    return min(0.05 * 2 ** (failures - 1), config['JOB_POLL_SECONDS']) * random.uniform(0.5, 1.5)
+
+
+def requeue_stale(session, config, now=None):
+    """Devolve à fila as tarefas de workers que pararam de responder; retorna quantas"""
+    now = now or datetime.utcnow()
+    table = Job.__table__
+    stale = [table.c.status == JobStatus.RUNNING,
+             table.c.locked_at < now - timedelta(seconds=config['JOB_LEASE_SECONDS'])]
+    failed = session.execute(update(table).where(*stale, table.c.attempts >= table.c.max_attempts).values(
+        status=JobStatus.FAILED, locked_by=None, locked_at=None, finished_at=now, last_error='Tempo de execução esgotado'
+    )).rowcount
+    requeued = session.execute(update(table).where(*stale).values(
+        status=JobStatus.PENDING, locked_by=None, locked_at=None, run_at=now, last_error='Tempo de execução esgotado'
+    )).rowcount
+    session.commit()
+    return failed + requeued
+
+
+# Primeira chave dos advisory locks das filas (a segunda é a fila)
+QUEUE_LOCK_CLASS = 4101
+
+
+def queue_lock_key(queue):
+    """Chave estável (entre processos) de 32 bits com sinal para a fila"""
+    key = zlib.crc32(queue.encode())
+    return key - 2 ** 32 if key >= 2 ** 31 else key
+
+
+def lock_queue(session, queue):
+    """Serializa as reservas da fila até o fim da transação (só PostgreSQL)"""
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(select(func.pg_advisory_xact_lock(QUEUE_LOCK_CLASS, queue_lock_key(queue))))
+
+
+def claim(session, queues, worker_id, config, now=None):
+    """Reserva a próxima tarefa pronta das filas, respeitando o limite de cada uma; None se não houver"""
+    now = now or datetime.utcnow()
+    # No SQLite a contagem e a reserva ficam na mesma transação com o lock de escrita
+    write_intent()
+    table = Job.__table__
+    running = table.alias('running')
+    for queue in queues:
+        limit = config['JOB_QUEUE_CONCURRENCY'].get(queue, config['JOB_DEFAULT_CONCURRENCY'])
+        candidates = session.execute(
+            select(table.c.id).where(
+                table.c.queue == queue, table.c.status == JobStatus.PENDING, table.c.run_at <= now
+            ).order_by(table.c.run_at, table.c.id).limit(5)
+        ).scalars().all()
+        for job_id in candidates:
+            # Sem o lock, reservas concorrentes veriam a mesma contagem e passariam do limite
+            lock_queue(session, queue)
+            claimed = session.execute(
+                update(table).where(
+                    table.c.id == job_id,
+                    table.c.status == JobStatus.PENDING,
+                    select(func.count()).select_from(running).where(
+                        running.c.queue == queue, running.c.status == JobStatus.RUNNING
+                    ).scalar_subquery() < limit
+                ).values(status=JobStatus.RUNNING, locked_by=worker_id, locked_at=now, attempts=table.c.attempts + 1)
+            ).rowcount
+            session.commit()
+            if claimed:
+                return session.execute(select(table).where(table.c.id == job_id)).one()
+    return None
+
+
+def run_job(session, row, worker_id, config):
+    """Executa a tarefa reservada; retorna True se concluiu"""
+    table = Job.__table__
+    mine = [table.c.id == row.id, table.c.locked_by == worker_id, table.c.status == JobStatus.RUNNING]
+    handler = HANDLERS.get(row.name)
+    try:
+        if handler is None:
+            raise LookupError(f'Tarefa desconhecida: {row.name}')
+        handler.func(session, row.payload or {})
+        finished = session.execute(update(table).where(*mine).values(
+            status=JobStatus.DONE, locked_by=None, locked_at=None, finished_at=datetime.utcnow(), last_error=None
+        )).rowcount
+        if not finished:
+            # A reserva expirou e a tarefa foi para outro worker: descarta o que foi feito aqui
+            session.rollback()
+            return False
+        session.commit()
+        return True
+    except Exception:
+        session.rollback()
+        now = datetime.utcnow()
+        error = traceback.format_exc(limit=5)[-4000:]
+        if handler is None or row.attempts >= row.max_attempts:
+            values = {'status': JobStatus.FAILED, 'finished_at': now}
+        else:
+            values = {'status': JobStatus.PENDING, 'run_at': now + timedelta(seconds=retry_delay(row.attempts, config))}
+        session.execute(update(table).where(*mine).values(locked_by=None, locked_at=None, last_error=error, **values))
+        session.commit()
+        return False
+
+
+def prune_jobs(session, retention_days, now=None):
+    """Apaga as tarefas concluídas há mais de retention_days; retorna quantas"""
+    now = now or datetime.utcnow()
+    table = Job.__table__
+    removed = session.execute(delete(table).where(
+        table.c.status == JobStatus.DONE, table.c.finished_at < now - timedelta(days=retention_days)
+    )).rowcount
+    session.commit()
+    return removed
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def run_worker(session, config, queues=None, burst=False, max_jobs=None, log=print, idle=None):
+    """
+    Laço do worker: reserva e executa tarefas até parar (Ctrl+C). Com burst,
+    termina quando as filas esvaziam. idle() roda quando não há tarefa pronta
+    (ex.: o relay do outbox); se fez algo, o worker procura tarefas de novo
+    sem esperar. Erros do banco (OperationalError) desfazem a transação e a
+    volta é repetida depois de uma espera. Retorna {'done', 'failed'}.
+    """
+    load_handlers()
+    queues = list(queues or sorted({handler.queue for handler in HANDLERS.values()}))
+    worker_id = worker_name()
+    stats = {'done': 0, 'failed': 0}
+    last_maintenance = 0.0
+    busy = 0
+    while max_jobs is None or stats['done'] + stats['failed'] < max_jobs:
+        try:
+            if time.monotonic() - last_maintenance >= config['JOB_LEASE_SECONDS'] / 2:
+                requeue_stale(session, config)
+                prune_jobs(session, config['JOB_RETENTION_DAYS'])
+                last_maintenance = time.monotonic()
+            row = claim(session, queues, worker_id, config)
+            if row is None:
+                if idle and idle():
+                    continue
+                if burst:
+                    break
+                time.sleep(config['JOB_POLL_SECONDS'])
+                continue
+            ok = run_job(session, row, worker_id, config)
+        except OperationalError as exc:
+            session.rollback()
+            busy += 1
+            delay = busy_delay(busy, config)
+            log(f'⚠️ Banco indisponível ({exc.orig}); nova tentativa em {delay:.2f}s')
+            time.sleep(delay)
+            continue
+        busy = 0
+        stats['done' if ok else 'failed'] += 1
+        log(f"{'✅' if ok else '❌'} #{row.id} {row.queue}/{row.name} (tentativa {row.attempts})")
+    return stats
+
+
+def queue_stats(session, now=None):
+    """Contagem por fila e status e a idade da tarefa pendente mais antiga"""
+    now = now or datetime.utcnow()
+    table = Job.__table__
+    queues = {}
+    for queue, status, count, oldest in session.execute(
+        select(table.c.queue, table.c.status, func.count(), func.min(table.c.run_at))
+        .group_by(table.c.queue, table.c.status)
+    ):
+        entry = queues.setdefault(queue, {'queue': queue, **{item.value: 0 for item in JobStatus},
+                                          'oldest_pending_s': None})
+        entry[status.value] = count
+        if status == JobStatus.PENDING and oldest:
+            entry['oldest_pending_s'] = max(round((now - oldest).total_seconds()), 0)
+    return sorted(queues.values(), key=lambda entry: entry['queue'])
@@ -0,0 +1,94 @@
+"""
+Registro adiado de blueprints
+
+O Flask não permite registrar blueprints depois da primeira requisição, então
+o prefixo do blueprint é registrado com uma rota coringa. Na primeira chamada
+o módulo é importado e as regras do blueprint são gravadas em um mapa de URLs
+próprio, usado para despachar esta e as próximas requisições.
+
+Apenas rotas são suportadas: blueprints adiados não devem declarar
+before_request, errorhandler ou afins.
+"""
+
+import threading
+from importlib import import_module
+
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+LAZY_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+MATCH_KEY = 'lazy_blueprint.match'
+
+
+class _RuleRecorder:
+    """Faz o papel da app durante o setup do blueprint, apenas coletando as regras."""
+
+    def __init__(self):
+        self.url_map = Map()
+        self.view_functions = {}
+
+    def add_url_rule(self, rule, endpoint=None, view_func=None, provide_automatic_options=None, **options):
+        methods = options.pop('methods', None) or getattr(view_func, 'methods', None) or ('GET',)
+        self.url_map.add(Rule(rule, endpoint=endpoint, methods=methods, **options))
+        self.view_functions[endpoint] = view_func
+
+
+class LazyBlueprintView:
+    def __init__(self, import_name, url_prefix):
+        self.import_name = import_name  # 'pacote.modulo:blueprint'
+        self.url_prefix = url_prefix
+        self._lock = threading.Lock()
+        self._routes = None
+
+    def load(self):
+        if self._routes is None:
+            with self._lock:
+                if self._routes is None:
+                    module_name, attribute = self.import_name.split(':')
+                    blueprint = getattr(import_module(module_name), attribute)
+                    recorder = _RuleRecorder()
+                    state = blueprint.make_setup_state(recorder, {'url_prefix': self.url_prefix}, True)
+                    for deferred in blueprint.deferred_functions:
+                        deferred(state)
+                    self._routes = recorder
+        return self._routes
+
+    def match(self):
+        """
+        Regra e argumentos da requisição atual no mapa do blueprint, guardados
+        no environ da requisição (o g pode durar várias requisições). Quem
+        precisa da rota real em vez da coringa usa matched_rule().
+        """
+        found = request.environ.get(MATCH_KEY)
+        if found is None:
+            routes = self.load()
+            # NotFound/MethodNotAllowed são HTTPExceptions tratadas pelo Flask
+            found = routes.url_map.bind_to_environ(request.environ).match(return_rule=True)
+            request.environ[MATCH_KEY] = found
+        return found
+
+    def __call__(self, **kwargs):
+        rule, args = self.match()
+        return self._routes.view_functions[rule.endpoint](**args)
+
+
+def matched_rule():
+    """Regra da requisição atual, resolvendo a rota real dos blueprints adiados"""
+    if request.url_rule is None:
+        return None
+    view = current_app.view_functions.get(request.url_rule.endpoint)
+    if isinstance(view, LazyBlueprintView):
+        try:
+            return view.match()[0].rule
+        except HTTPException:
+            pass
+    return request.url_rule.rule
+
+
+def register_lazy_blueprint(app, import_name, url_prefix):
+    view = LazyBlueprintView(import_name, url_prefix)
+    endpoint = 'lazy_' + import_name.split(':')[-1]
+    app.add_url_rule(url_prefix, endpoint, view, methods=LAZY_METHODS, defaults={'subpath': ''})
+    app.add_url_rule(f'{url_prefix}/<path:subpath>', endpoint, view, methods=LAZY_METHODS)
+    return view
@@ -0,0 +1,115 @@
+"""
+Bairros prioritários para força-tarefa
+
+Os números de cada bairro (ocorrências por status, soma das prioridades e das
+avaliações) saem de um único GROUP BY por endereço; os endereços são somados
+por bairro (extract_neighborhood) em Python. O score combina três notas de 0
+a 100 com pesos ajustáveis na requisição, para simular cenários:
+
+- urgência: prioridade média (1 a 4) x 25;
+- volume: 2 pontos por ocorrência, até 100;
+- eficiência: 100 menos a taxa de resolução.
+
+Com NumPy instalado as notas são calculadas em vetores; sem ele, em Python.
+"""
+
+from sqlalchemy import case, func
+
+from src.models.models import Occurrence, OccurrenceStatus
+from src.utils.address import extract_neighborhood
+from src.utils.priority import priority_order
+
+try:
+    import numpy
+except ImportError:  # dependência opcional
+    numpy = None
+
+UNKNOWN_NEIGHBORHOOD = 'Não identificado'
+DEFAULT_WEIGHTS = {'urgency': 1.0, 'volume': 1.0, 'efficiency': 1.0}
+VOLUME_POINTS = 2  # pontos por ocorrência na nota de volume
+FINISHED = (OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED)
+
+
+def parse_weights(args):
+    """Pesos de ?urgency_weight=&volume_weight=&efficiency_weight=; ValueError se inválidos"""
+    weights = {}
+    for name, default in DEFAULT_WEIGHTS.items():
+        value = float(args.get(f'{name}_weight', default))
+        if value < 0:
+            raise ValueError('Os pesos não podem ser negativos')
+        weights[name] = value
+    if not sum(weights.values()):
+        raise ValueError('Informe ao menos um peso maior que zero')
+    return weights
+
+
+def neighborhood_stats(session, start_date):
+    """Totais por bairro das ocorrências registradas desde start_date"""
+    rated = Occurrence.rating > 0
+    rows = session.query(
+        Occurrence.address,
+        func.count(Occurrence.id).label('total'),
+        func.sum(case((Occurrence.status == OccurrenceStatus.OPEN, 1), else_=0)).label('open'),
+        func.sum(case((Occurrence.status.in_(FINISHED), 1), else_=0)).label('resolved'),
+        func.sum(priority_order()).label('priority_sum'),
+        func.sum(case((rated, Occurrence.rating), else_=0)).label('rating_sum'),
+        func.sum(case((rated, 1), else_=0)).label('ratings')
+    ).filter(Occurrence.created_at >= start_date).group_by(Occurrence.address)
+
+    stats = {}
+    for row in rows:
+        name = extract_neighborhood(row.address) or UNKNOWN_NEIGHBORHOOD
+        item = stats.setdefault(name, {
+            'name': name, 'total_occurrences': 0, 'open_occurrences': 0, 'resolved_occurrences': 0,
+            'priority_sum': 0, 'rating_sum': 0, 'total_ratings': 0
+        })
+        item['total_occurrences'] += row.total
+        item['open_occurrences'] += int(row.open or 0)
+        item['resolved_occurrences'] += int(row.resolved or 0)
+        item['priority_sum'] += int(row.priority_sum or 0)
+        item['rating_sum'] += int(row.rating_sum or 0)
+        item['total_ratings'] += int(row.ratings or 0)
+    return list(stats.values())
+
+
+def _scores_numpy(stats, weights):
+    total = numpy.array([item['total_occurrences'] for item in stats], dtype=float)
+    resolved = numpy.array([item['resolved_occurrences'] for item in stats], dtype=float)
+    priority_sum = numpy.array([item['priority_sum'] for item in stats], dtype=float)
+    urgency = priority_sum / total * 25
+    volume = numpy.minimum(total * VOLUME_POINTS, 100)
+    efficiency = 100 - resolved / total * 100
+    score = (weights['urgency'] * urgency + weights['volume'] * volume
+             + weights['efficiency'] * efficiency) / sum(weights.values())
+    return [tuple(map(float, values)) for values in zip(urgency, volume, efficiency, score)]
+
+
+def _scores_python(stats, weights):
+    scores = []
+    for item in stats:
+        total = item['total_occurrences']
+        urgency = item['priority_sum'] / total * 25
+        volume = min(total * VOLUME_POINTS, 100)
+        efficiency = 100 - item['resolved_occurrences'] / total * 100
+        score = (weights['urgency'] * urgency + weights['volume'] * volume
+                 + weights['efficiency'] * efficiency) / sum(weights.values())
+        scores.append((urgency, float(volume), efficiency, score))
+    return scores
+
+
+def rank_neighborhoods(stats, weights=None, limit=10):
+    """Bairros com médias, notas e score, do maior score para o menor"""
+    weights = weights or DEFAULT_WEIGHTS
+    stats = [item for item in stats if item['total_occurrences']]
+    if not stats:
+        return []
+    scores = _scores_numpy(stats, weights) if numpy is not None else _scores_python(stats, weights)
+    for item, (urgency, volume, efficiency, score) in zip(stats, scores):
+        item['avg_priority'] = item['priority_sum'] / item['total_occurrences']
+        item['avg_rating'] = item['rating_sum'] / item['total_ratings'] if item['total_ratings'] else 0
+        item['resolution_rate'] = item['resolved_occurrences'] / item['total_occurrences'] * 100
+        item['urgency_score'] = urgency
+        item['volume_score'] = volume
+        item['efficiency_score'] = efficiency
+        item['priority_score'] = score
+    return sorted(stats, key=lambda item: (-item['priority_score'], item['name']))[:limit]
@@ -0,0 +1,116 @@
+"""
+Notificações dos usuários
+
+O consumidor 'notifications' do outbox (src/utils/outbox.py) transforma os
+eventos das ocorrências em tarefas `notify.occurrence_event`, idempotentes
+pelo id do evento. A tarefa roda no worker (src/utils/jobs.py), descobre os
+destinatários e grava as notificações exibidas no NotificationCenter. Quem
+executou a ação não é notificado.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from src.models.models import Notification, Occurrence, User, UserType
+from src.utils.jobs import enqueue_many, job
+from src.utils.outbox import consumer
+
+OCCURRENCE_EVENT = 'notify.occurrence_event'
+
+# evento -> [(público, tipo, título, mensagem)]; público: citizen, assignee ou managers
+EVENT_TEMPLATES = {
+    'occurrence_triaged': [
+        ('citizen', 'info', 'Em Andamento', 'Sua ocorrência "{title}" foi encaminhada ao departamento responsável.'),
+        ('assignee', 'info', 'Nova Ocorrência Atribuída', 'A ocorrência "{title}" foi atribuída a você.'),
+        ('managers', 'info', 'Nova Ocorrência no Departamento', 'A ocorrência "{title}" foi encaminhada ao seu departamento.'),
+    ],
+    'execution_completed': [
+        ('citizen', 'success', 'Resolvida!', 'Sua ocorrência "{title}" foi resolvida e está em validação.'),
+        ('managers', 'warning', 'Validação Pendente', 'A execução da ocorrência "{title}" foi concluída e aguarda validação.'),
+    ],
+    'occurrence_closed': [
+        ('citizen', 'success', 'Finalizada', 'Sua ocorrência "{title}" foi finalizada. Avalie o atendimento!'),
+        ('assignee', 'success', 'Execução Aprovada', 'A conclusão da ocorrência "{title}" foi aprovada.'),
+    ],
+    'completion_rejected': [
+        ('assignee', 'warning', 'Conclusão Rejeitada', 'A conclusão da ocorrência "{title}" foi rejeitada. Motivo: {reason}'),
+    ],
+    'occurrence_rated': [
+        ('assignee', 'info', 'Atendimento Avaliado', 'O cidadão avaliou o atendimento da ocorrência "{title}" com {rating} estrela(s).'),
+        ('managers', 'info', 'Atendimento Avaliado', 'O cidadão avaliou o atendimento da ocorrência "{title}" com {rating} estrela(s).'),
+    ],
+    'status_changed': [
+        ('citizen', 'info', 'Status Atualizado', 'O status da sua ocorrência "{title}" foi alterado para {status}.'),
+    ],
+    'sla_at_risk': [
+        ('assignee', 'warning', 'Prazo Próximo', 'O prazo da ocorrência "{title}" vence em breve.'),
+        ('managers', 'warning', 'Prazo Próximo', 'O prazo da ocorrência "{title}" vence em breve.'),
+    ],
+    'sla_breached': [
+        ('assignee', 'warning', 'Prazo Estourado', 'O prazo da ocorrência "{title}" venceu.'),
+        ('managers', 'warning', 'Prazo Estourado', 'O prazo da ocorrência "{title}" venceu.'),
+    ],
+}
+
+
+def notification_item(occurrence_id, event, actor_id=None, key=None, **extra):
+    """Item para enqueue_many; key torna o evento idempotente"""
+    return {
+        'name': OCCURRENCE_EVENT,
+        'payload': {'occurrence_id': occurrence_id, 'event': event, 'actor_id': actor_id, **extra},
+        'idempotency_key': f'{event}:{occurrence_id}:{key}' if key is not None else None
+    }
+
+
+@consumer('notifications', event_types=EVENT_TEMPLATES)
+def enqueue_event_notifications(session, events, config):
+    """Uma tarefa de notificação por evento do outbox"""
+    return enqueue_many(session, [
+        notification_item(
+            event.occurrence_id, event.event_type, event.actor_id, key=f'outbox{event.id}',
+            status=event.new_status.value if event.new_status else None, **(event.payload or {})
+        )
+        for event in events
+    ], config)
+
+
+def recipients(session, occurrence, audience):
+    if audience == 'citizen':
+        return [occurrence.citizen_id]
+    if audience == 'assignee':
+        return [occurrence.assigned_to] if occurrence.assigned_to else []
+    if audience == 'managers' and occurrence.department_id:
+        return session.execute(select(User.id).where(
+            User.department_id == occurrence.department_id,
+            User.user_type == UserType.DEPARTMENT_MANAGER,
+            User.is_active.is_(True)
+        )).scalars().all()
+    return []
+
+
+@job(OCCURRENCE_EVENT, queue='notifications')
+def send_occurrence_notifications(session, payload):
+    occurrence = session.execute(select(
+        Occurrence.id, Occurrence.title, Occurrence.citizen_id, Occurrence.assigned_to, Occurrence.department_id
+    ).where(Occurrence.id == payload['occurrence_id'])).one_or_none()
+    if occurrence is None:
+        return 0
+    actor_id = int(payload['actor_id']) if payload.get('actor_id') else None
+    now = datetime.utcnow()
+    values = {field: payload.get(field) or '-' for field in ('reason', 'rating', 'status')}
+    seen = set()
+    rows = []
+    for audience, kind, title, message in EVENT_TEMPLATES.get(payload['event'], ()):
+        for user_id in recipients(session, occurrence, audience):
+            if user_id in seen or user_id == actor_id:
+                continue
+            seen.add(user_id)
+            rows.append({
+                'user_id': user_id, 'occurrence_id': occurrence.id, 'type': kind, 'title': title,
+                'message': message.format(title=occurrence.title, **values),
+                'created_at': now
+            })
+    if rows:
+        session.execute(insert(Notification), rows)
+    return len(rows)
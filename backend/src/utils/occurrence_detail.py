@@ -0,0 +1,87 @@
+"""
+Detalhe de uma ocorrência com a timeline paginada
+
+A timeline vem da mais recente para a mais antiga, em páginas de
+TIMELINE_PER_PAGE entradas (ocorrências muito apoiadas acumulam milhares de
+entradas 'supported'). As entradas e os autores (id, nome e tipo) são lidos
+com duas consultas diretas, sem carregar os objetos do ORM nem o departamento
+de cada usuário.
+
+O ETag é derivado de updated_at e da página pedida. Apoios, fotos, transições
+e mesclagens atualizam updated_at, então um If-None-Match igual responde 304
+depois de uma única consulta pela coluna.
+"""
+
+import hashlib
+import math
+
+from sqlalchemy import func, select
+
+from src.models.models import Occurrence, OccurrenceTimeline, User
+
+TIMELINE_PER_PAGE = 50
+MAX_TIMELINE_PER_PAGE = 200
+
+
+def occurrence_version(session, occurrence_id):
+    """updated_at da ocorrência, ou None se ela não existe"""
+    return session.execute(select(Occurrence.updated_at).where(Occurrence.id == occurrence_id)).first()
+
+
+def detail_etag(occurrence_id, updated_at, page, per_page):
+    key = f'{occurrence_id}:{updated_at.isoformat() if updated_at else ""}:{page}:{per_page}'
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def timeline_page(session, occurrence_id, page, per_page):
+    """(entradas da página, total de entradas)"""
+    timeline = OccurrenceTimeline
+    total = session.execute(
+        select(func.count(timeline.id)).where(timeline.occurrence_id == occurrence_id)
+    ).scalar()
+    rows = session.execute(
+        select(timeline.id, timeline.user_id, timeline.action, timeline.description, timeline.details,
+               timeline.old_status, timeline.new_status, timeline.status_change, timeline.created_at)
+        .where(timeline.occurrence_id == occurrence_id)
+        .order_by(timeline.created_at.desc(), timeline.id.desc())
+        .limit(per_page).offset((page - 1) * per_page)
+    ).all()
+
+    user_ids = {row.user_id for row in rows if row.user_id}
+    users = {
+        row.id: {'id': row.id, 'name': row.name, 'user_type': row.user_type.value}
+        for row in session.execute(select(User.id, User.name, User.user_type).where(User.id.in_(user_ids)))
+    } if user_ids else {}
+
+    entries = [
+        {
+            'id': row.id,
+            'occurrence_id': occurrence_id,
+            'user': users.get(row.user_id),
+            'action': row.action,
+            'description': row.description or row.details,
+            'old_status': row.old_status.value if row.old_status else None,
+            'new_status': row.new_status.value if row.new_status else None,
+            'status_change': row.status_change,
+            'created_at': row.created_at.isoformat()
+        }
+        for row in rows
+    ]
+    return entries, total
+
+
+def occurrence_detail(session, occurrence_id, page, per_page):
+    """Resposta do detalhe: a ocorrência com uma página da timeline"""
+    occurrence = session.get(Occurrence, occurrence_id)
+    entries, total = timeline_page(session, occurrence_id, page, per_page)
+    data = occurrence.to_dict()
+    data['timeline'] = entries
+    return {
+        'occurrence': data,
+        'timeline_page': {
+            'total': total,
+            'pages': math.ceil(total / per_page),
+            'current_page': page,
+            'per_page': per_page
+        }
+    }
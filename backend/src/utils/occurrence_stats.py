@@ -0,0 +1,58 @@
+"""
+Agregados das ocorrências para os dashboards (administração e político)
+
+Cada métrica é uma expressão SQL agregada; summary() monta todas numa única
+consulta sem GROUP BY, e as rotas agrupadas (por mês, por departamento)
+reutilizam as mesmas expressões. Contagens condicionais usam case() do
+SQLAlchemy, que gera CASE WHEN (func.case geraria uma chamada de função
+"case" inexistente).
+"""
+
+from sqlalchemy import and_, case, func
+
+from src.models.models import Occurrence, OccurrenceStatus, Priority
+
+FINISHED = (OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED)
+
+
+def count_if(condition):
+    """Quantas linhas satisfazem a condição (0 quando não há linhas)"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def finished():
+    return Occurrence.status.in_(FINISHED)
+
+
+def hours_between(session, start, end):
+    """Horas entre duas colunas de data, no dialeto do banco"""
+    if session.get_bind().dialect.name == 'postgresql':
+        return func.extract('epoch', end - start) / 3600
+    return (func.julianday(end) - func.julianday(start)) * 24
+
+
+def summary(session, since):
+    """
+    Totais em uma consulta: por status, por prioridade, registradas desde
+    `since` (e quantas delas já resolvidas), tempo médio de resolução em horas,
+    avaliação média e cidadãos distintos.
+    """
+    recent = Occurrence.created_at >= since
+    resolution_hours = case((Occurrence.resolved_at.isnot(None),
+                             hours_between(session, Occurrence.created_at, Occurrence.resolved_at)))
+    row = session.query(
+        func.count(Occurrence.id).label('total'),
+        *[count_if(Occurrence.status == status).label(status.value) for status in OccurrenceStatus],
+        *[count_if(Occurrence.priority == priority).label(priority.value) for priority in Priority],
+        count_if(finished()).label('finished'),
+        count_if(recent).label('recent'),
+        count_if(and_(recent, finished())).label('recent_finished'),
+        func.avg(resolution_hours).label('avg_resolution_hours'),
+        func.avg(Occurrence.rating).label('avg_rating'),
+        func.count(func.distinct(Occurrence.citizen_id)).label('citizens')
+    ).one()
+    stats = {key: int(value or 0) for key, value in row._mapping.items()
+             if key not in ('avg_resolution_hours', 'avg_rating')}
+    stats['avg_resolution_hours'] = float(row.avg_resolution_hours or 0)
+    stats['avg_rating'] = float(row.avg_rating or 0)
+    return stats
@@ -0,0 +1,186 @@
+"""
+Relay do outbox de eventos das ocorrências
+
+Os eventos gravados por src/utils/transitions.py (tabela outbox_events) são
+entregues em lotes, na ordem do id, a cada consumidor registrado com
+@consumer(nome). Cada consumidor tem a própria posição (outbox_offsets):
+
+- o lote é lido a partir da posição, o handler grava o que precisa e a
+  posição avança na mesma transação. Uma falha desfaz tudo e o lote é
+  entregue de novo na rodada seguinte; um consumidor atrasado ou com erro
+  não segura os outros;
+- a posição avança com um UPDATE condicional (ainda na posição lida): com
+  vários relays rodando, só um entrega cada lote;
+- eventos mais novos que OUTBOX_RELAY_LAG_SECONDS ficam para a próxima
+  rodada;
+- no PostgreSQL uma transação pode confirmar um id menor depois de um
+  maior já entregue. Por isso um buraco na sequência de ids conta como
+  evento ainda invisível: o lote para antes dele até o evento seguinte ao
+  buraco ter mais de OUTBOX_GAP_TIMEOUT_SECONDS; só então o id é dado como
+  perdido. Todo rollback de uma transação que gravou evento deixa um buraco
+  assim, então a espera é curta: os eventos são gravados no fim da
+  transação (record_events), a poucas consultas do commit, cada uma
+  limitada pelo statement_timeout das escritas (DB_WRITE_TIMEOUT_MS). No
+  SQLite as escritas são serializadas e não
+  sobram buracos.
+
+Rodar com `flask --app src.main outbox-relay` ou dentro do jobs-worker
+(OUTBOX_RELAY_IN_WORKER).
+"""
+
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta
+from importlib import import_module
+
+from sqlalchemy import delete, func, select, update
+
+from src.models.models import OutboxEvent, OutboxOffset
+
+# Módulos que registram consumidores; o relay os importa antes de começar
+CONSUMER_MODULES = ('src.utils.notifications', 'src.utils.rollups', 'src.utils.hotspots')
+
+Consumer = namedtuple('Consumer', 'func event_types')
+CONSUMERS = {}
+
+
+def consumer(name, event_types=None):
+    """Registra func(session, events, config) como o consumidor `name`; event_types filtra os eventos entregues"""
+    def register(func):
+        CONSUMERS[name] = Consumer(func, frozenset(event_types) if event_types else None)
+        return func
+    return register
+
+
+def load_consumers():
+    for module in CONSUMER_MODULES:
+        import_module(module)
+
+
+def get_offset(session, name):
+    offset = session.get(OutboxOffset, name)
+    if offset is None:
+        offset = OutboxOffset(consumer=name, last_event_id=0)
+        session.add(offset)
+        session.commit()
+    return offset.last_event_id
+
+
+def set_offset(session, name, last_event_id):
+    """Move a posição do consumidor (reprocessamento ou reconstrução), na transação atual"""
+    if session.get(OutboxOffset, name) is None:
+        session.add(OutboxOffset(consumer=name, last_event_id=last_event_id))
+    else:
+        session.execute(update(OutboxOffset).where(OutboxOffset.consumer == name).values(
+            last_event_id=last_event_id, updated_at=datetime.utcnow()
+        ))
+
+
+def read_batch(session, after_id, batch_size, lag_seconds, gap_timeout_seconds=0, now=None):
+    """
+    Próximos eventos depois de after_id, parando no primeiro mais novo que a
+    folga ou antes de um buraco recente na sequência de ids
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=lag_seconds)
+    gap_cutoff = now - timedelta(seconds=gap_timeout_seconds)
+    events = session.execute(
+        select(OutboxEvent).where(OutboxEvent.id > after_id).order_by(OutboxEvent.id).limit(batch_size)
+    ).scalars().all()
+    expected_id = after_id + 1
+    for index, event in enumerate(events):
+        if event.created_at > cutoff:
+            return events[:index]
+        # Id faltando: transação ainda aberta (ou desfeita); espera até o prazo
+        if event.id != expected_id and event.created_at > gap_cutoff:
+            return events[:index]
+        expected_id = event.id + 1
+    return events
+
+
+def deliver(session, name, config, batch_size):
+    """Entrega um lote ao consumidor; retorna quantos eventos avançou (0 se nada ou se outro relay entregou)"""
+    handler = CONSUMERS[name]
+    last_id = get_offset(session, name)
+    events = read_batch(session, last_id, batch_size, config['OUTBOX_RELAY_LAG_SECONDS'],
+                        config['OUTBOX_GAP_TIMEOUT_SECONDS'])
+    if not events:
+        session.rollback()
+        return 0
+    wanted = [event for event in events if handler.event_types is None or event.event_type in handler.event_types]
+    try:
+        if wanted:
+            handler.func(session, wanted, config)
+        moved = session.execute(update(OutboxOffset).where(
+            OutboxOffset.consumer == name, OutboxOffset.last_event_id == last_id
+        ).values(last_event_id=events[-1].id, updated_at=datetime.utcnow())).rowcount
+        if not moved:
+            session.rollback()
+            return 0
+        session.commit()
+        return len(events)
+    except Exception:
+        session.rollback()
+        raise
+
+
+def relay(session, config, batch_size=None, log=print):
+    """Uma rodada: um lote para cada consumidor. Retorna {consumidor: eventos entregues}."""
+    load_consumers()
+    batch_size = batch_size or config['OUTBOX_BATCH_SIZE']
+    delivered = {}
+    for name in sorted(CONSUMERS):
+        try:
+            delivered[name] = deliver(session, name, config, batch_size)
+        except Exception:
+            delivered[name] = 0
+            log(f'❌ Consumidor {name}: {traceback.format_exc(limit=3)}')
+    return delivered
+
+
+def prune_outbox(session, retention_days, now=None):
+    """Apaga eventos já entregues a todos os consumidores há mais de retention_days; retorna quantos"""
+    load_consumers()
+    now = now or datetime.utcnow()
+    positions = dict(session.execute(select(OutboxOffset.consumer, OutboxOffset.last_event_id)).all())
+    if any(name not in positions for name in CONSUMERS):
+        return 0
+    delivered = min(positions[name] for name in CONSUMERS) if CONSUMERS else 0
+    # O último entregue fica: sem ele o SQLite reaproveitaria ids já consumidos
+    removed = session.execute(delete(OutboxEvent).where(
+        OutboxEvent.id < delivered, OutboxEvent.created_at < now - timedelta(days=retention_days)
+    )).rowcount
+    session.commit()
+    return removed
+
+
+def run_relay(session, config, interval=None, batch_size=None, once=False, log=print):
+    """Laço do relay: repete as rodadas enquanto houver eventos e dorme `interval` quando esvazia"""
+    interval = config['OUTBOX_POLL_SECONDS'] if interval is None else interval
+    last_prune = 0.0
+    while True:
+        if time.monotonic() - last_prune >= 3600:
+            prune_outbox(session, config['OUTBOX_RETENTION_DAYS'])
+            last_prune = time.monotonic()
+        delivered = relay(session, config, batch_size, log)
+        if any(delivered.values()):
+            log(' '.join(f'{name}={count}' for name, count in delivered.items() if count))
+            continue
+        if once:
+            return
+        time.sleep(interval)
+
+
+def outbox_stats(session):
+    """Posição e atraso (eventos pendentes) de cada consumidor"""
+    load_consumers()
+    last_id = session.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+    positions = dict(session.execute(select(OutboxOffset.consumer, OutboxOffset.last_event_id)).all())
+    return {
+        'last_event_id': last_id,
+        'consumers': [
+            {'consumer': name, 'last_event_id': positions.get(name, 0), 'pending': last_id - positions.get(name, 0)}
+            for name in sorted(CONSUMERS)
+        ]
+    }
@@ -0,0 +1,23 @@
+"""
+Ordem das prioridades
+
+Os valores do enum ('low', 'medium', 'high', 'urgent') e os nomes gravados no
+SQLite ('LOW', ...) não ordenam pela importância; ordenar pela coluna põe
+"urgent" > "medium" > "low" > "high". Use PRIORITY_RANK em Python e
+priority_order() em consultas.
+"""
+
+from sqlalchemy import case
+
+from src.models.models import Occurrence, Priority
+
+PRIORITY_RANK = {Priority.LOW: 1, Priority.MEDIUM: 2, Priority.HIGH: 3, Priority.URGENT: 4}
+
+# Prazo de atendimento esperado por prioridade, em horas
+PRIORITY_TARGET_HOURS = {Priority.URGENT: 24, Priority.HIGH: 72, Priority.MEDIUM: 168, Priority.LOW: 336}
+
+
+def priority_order(column=Occurrence.priority):
+    """Expressão SQL com o peso da prioridade (1 = baixa, 4 = urgente)"""
+    # Comparações (e não case(value=...)) para o enum ser convertido ao gravar o parâmetro
+    return case(*[(column == priority, rank) for priority, rank in PRIORITY_RANK.items()], else_=0)
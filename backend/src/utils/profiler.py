@@ -0,0 +1,199 @@
+"""
+Profiler estatístico por amostragem para requisições em produção
+
+Amostra 1 a cada N requisições (ou as que casarem com uma rota ou com o
+cabeçalho de profiling) e, enquanto elas executam, uma thread de fundo lê a
+pilha da thread da requisição em intervalos fixos. As pilhas são agregadas em
+memória por rota, no formato "folded" usado por flamegraph.pl e speedscope,
+com limite de rotas e de pilhas distintas por rota.
+
+O dump para disco é feito por sinal (PROFILER_DUMP_SIGNAL, instalado no
+post_worker_init do gunicorn) ou pelo endpoint administrativo
+POST /api/admin/profiler/dump, sem reiniciar os workers.
+"""
+
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import request, g
+
+from src.utils.lazy_blueprint import matched_rule
+
+OVERFLOW_STACK = '[outros]'
+
+
+class SamplingProfiler:
+    def __init__(self, app=None):
+        self.enabled = False
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._active = {}   # thread_id -> rota
+        self._stacks = {}   # rota -> Counter(pilha -> amostras)
+        self._labels = {}   # code object -> rótulo do frame
+        self._profiled_requests = 0
+        self._dropped_samples = 0
+        self._thread = None
+        self._pid = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('PROFILER_ENABLED', False))
+        self.sample_rate = max(int(app.config.get('PROFILER_SAMPLE_RATE', 100)), 1)
+        self.routes = tuple(app.config.get('PROFILER_ROUTES', ()))
+        self.header = app.config.get('PROFILER_HEADER', 'X-Profile')
+        self.header_token = app.config.get('PROFILER_HEADER_TOKEN')
+        self.interval = float(app.config.get('PROFILER_INTERVAL_MS', 5)) / 1000
+        self.max_routes = int(app.config.get('PROFILER_MAX_ROUTES', 50))
+        self.max_stacks = int(app.config.get('PROFILER_MAX_STACKS_PER_ROUTE', 2000))
+        self.max_depth = int(app.config.get('PROFILER_MAX_DEPTH', 64))
+        self.dump_dir = app.config.get('PROFILER_DUMP_DIR', '/tmp/portal-profiles')
+        self.dump_signal = app.config.get('PROFILER_DUMP_SIGNAL', 'SIGUSR2')
+
+        app.extensions['sampling_profiler'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.teardown_request(self._end_request)
+
+    # Seleção das requisições
+
+    def _should_profile(self, route):
+        if self.header_token and request.headers.get(self.header) == self.header_token:
+            return True
+        if self.routes and any(route.startswith(prefix) for prefix in self.routes):
+            return True
+        return random.randrange(self.sample_rate) == 0
+
+    def _start_request(self):
+        # Blueprints adiados: a rota real, não o coringa <path:subpath>
+        rule = matched_rule() or request.path
+        if not self._should_profile(rule):
+            return
+
+        self._ensure_sampler()
+        with self._lock:
+            self._active[threading.get_ident()] = f'{request.method} {rule}'
+            self._profiled_requests += 1
+        g.profiled = True
+        self._wakeup.set()
+
+    def _end_request(self, exc=None):
+        if g.pop('profiled', False):
+            with self._lock:
+                self._active.pop(threading.get_ident(), None)
+
+    # Amostragem
+
+    def _ensure_sampler(self):
+        # Com preload_app a thread do master não sobrevive ao fork
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid:
+                self._active.clear()
+                self._stacks.clear()
+                self._profiled_requests = 0
+                self._dropped_samples = 0
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wakeup.clear()
+                if not self._active:
+                    self._wakeup.wait()
+                continue
+
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, route in list(self._active.items()):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._record(route, self._collapse(frame))
+            del frames
+            time.sleep(self.interval)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    def _record(self, route, stack):
+        counter = self._stacks.get(route)
+        if counter is None:
+            if len(self._stacks) >= self.max_routes:
+                self._dropped_samples += 1
+                return
+            counter = self._stacks[route] = Counter()
+        if stack not in counter and len(counter) >= self.max_stacks:
+            stack = OVERFLOW_STACK
+        counter[stack] += 1
+
+    # Consulta e dump
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pid': os.getpid(),
+                'profiled_requests': self._profiled_requests,
+                'dropped_samples': self._dropped_samples,
+                'routes': {
+                    route: {'samples': sum(counter.values()), 'stacks': len(counter)}
+                    for route, counter in self._stacks.items()
+                }
+            }
+
+    def dump(self, directory=None, reset=False):
+        """Grava as pilhas agregadas em formato folded e retorna um resumo."""
+        directory = directory or self.dump_dir
+        os.makedirs(directory, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(directory, f'profile-{os.getpid()}-{timestamp}.folded')
+
+        with self._lock:
+            snapshot = {route: dict(counter) for route, counter in self._stacks.items()}
+            if reset:
+                self._stacks.clear()
+                self._dropped_samples = 0
+
+        samples = 0
+        with open(path, 'w', encoding='utf-8') as output:
+            for route, counter in snapshot.items():
+                for stack, count in counter.items():
+                    output.write(f'{route};{stack} {count}\n')
+                    samples += count
+
+        return {'path': path, 'routes': len(snapshot), 'samples': samples}
+
+    def install_signal_handler(self):
+        """Instala o handler de dump; deve rodar na thread principal do worker."""
+        if not self.enabled or not self.dump_signal:
+            return
+        signum = getattr(signal, self.dump_signal)
+        signal.signal(signum, lambda *_: self.dump())
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,147 @@
+"""
+Agregados diários das ocorrências
+
+occurrence_daily_stats guarda, por dia local (LOCAL_TIMEZONE), categoria e
+bairro, quantas ocorrências foram registradas, triadas, resolvidas (execução
+concluída), fechadas e reabertas. Os dashboards e séries temporais leem
+algumas centenas de linhas em vez de varrer occurrences.
+
+O consumidor 'daily_stats' do outbox (src/utils/outbox.py) soma os eventos de
+cada lote com um único UPSERT (ON CONFLICT ... DO UPDATE com os valores
+somados); como a posição do consumidor avança na mesma transação, cada evento
+conta uma vez. Mesclagens de duplicatas não contam como fechamento.
+
+rebuild_daily_stats refaz a tabela a partir do histórico (datas das
+ocorrências e timeline) e posiciona o consumidor no último evento. Deve rodar
+com o relay parado.
+"""
+
+from collections import Counter
+from datetime import timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.models import Occurrence, OccurrenceDailyStat, OccurrenceStatus, OccurrenceTimeline, OutboxEvent
+from src.utils.address import extract_neighborhood
+from src.utils.outbox import consumer, set_offset
+from src.utils.transitions import CREATED_EVENT, MERGED_EVENT
+from src.utils.workload import ACTIVE_STATUSES
+
+CONSUMER = 'daily_stats'
+COUNTERS = ('created', 'triaged', 'resolved', 'closed', 'reopened')
+FINISHED = (OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED)
+UPSERT_CHUNK = 500  # linhas por INSERT (limite de parâmetros do SQLite)
+
+# Etapas da timeline gravadas antes do outbox, sem old_status/new_status
+LEGACY_STEPS = {
+    'Triagem e Atribuição Concluída': ('occurrence_triaged', None, OccurrenceStatus.IN_PROGRESS),
+    'Triagem Automática': ('occurrence_triaged', OccurrenceStatus.OPEN, OccurrenceStatus.IN_PROGRESS),
+    'Execução Concluída': (None, OccurrenceStatus.IN_PROGRESS, OccurrenceStatus.RESOLVED),
+    'Validação Concluída': (None, OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED),
+    'Validação Rejeitada': (None, OccurrenceStatus.RESOLVED, OccurrenceStatus.IN_PROGRESS),
+}
+
+
+def counters_for(event_type, old_status, new_status):
+    """Contadores que um evento incrementa"""
+    counts = []
+    if event_type == CREATED_EVENT:
+        counts.append('created')
+    if event_type == 'occurrence_triaged':
+        counts.append('triaged')
+    if event_type != MERGED_EVENT and new_status != old_status:
+        if new_status == OccurrenceStatus.RESOLVED:
+            counts.append('resolved')
+        elif new_status == OccurrenceStatus.CLOSED:
+            counts.append('closed')
+        elif old_status in FINISHED and new_status in ACTIVE_STATUSES:
+            counts.append('reopened')
+    return counts
+
+
+def local_day(moment, zone):
+    return moment.replace(tzinfo=timezone.utc).astimezone(zone).date()
+
+
+def dimensions(session, occurrence_ids):
+    """{id: (categoria, bairro)} das ocorrências"""
+    rows = session.execute(select(Occurrence.id, Occurrence.category_id, Occurrence.address).where(
+        Occurrence.id.in_(occurrence_ids)
+    )).all()
+    return {row.id: (row.category_id, (extract_neighborhood(row.address) or '')[:100]) for row in rows}
+
+
+def upsert_counts(session, totals):
+    """Soma {(dia, categoria, bairro): Counter} na tabela"""
+    rows = [
+        {'day': day, 'category_id': category_id, 'neighborhood': neighborhood,
+         **{name: counts.get(name, 0) for name in COUNTERS}}
+        for (day, category_id, neighborhood), counts in totals.items() if any(counts.values())
+    ]
+    if not rows:
+        return 0
+    module = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+    table = OccurrenceDailyStat.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        statement = module.insert(table).values(rows[start:start + UPSERT_CHUNK])
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['day', 'category_id', 'neighborhood'],
+            set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS}
+        ))
+    return len(rows)
+
+
+@consumer(CONSUMER)
+def apply_events(session, events, config):
+    zone = ZoneInfo(config['LOCAL_TIMEZONE'])
+    dims = dimensions(session, {event.occurrence_id for event in events})
+    totals = {}
+    for event in events:
+        counts = counters_for(event.event_type, event.old_status, event.new_status)
+        if not counts or event.occurrence_id not in dims:
+            continue
+        key = (local_day(event.created_at, zone), *dims[event.occurrence_id])
+        totals.setdefault(key, Counter()).update(counts)
+    return upsert_counts(session, totals)
+
+
+def rebuild_daily_stats(session, config, batch_size=5000):
+    """Recalcula a tabela a partir do histórico; retorna o número de linhas gravadas"""
+    zone = ZoneInfo(config['LOCAL_TIMEZONE'])
+    last_event_id = session.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+    dims = {}
+    totals = {}
+
+    def add(occurrence_id, moment, counts):
+        if counts and moment and occurrence_id in dims:
+            totals.setdefault((local_day(moment, zone), *dims[occurrence_id]), Counter()).update(counts)
+
+    for row in session.execute(
+        select(Occurrence.id, Occurrence.category_id, Occurrence.address, Occurrence.created_at)
+        .execution_options(yield_per=batch_size)
+    ):
+        dims[row.id] = (row.category_id, (extract_neighborhood(row.address) or '')[:100])
+        add(row.id, row.created_at, ['created'])
+
+    timeline = OccurrenceTimeline
+    for row in session.execute(
+        select(timeline.occurrence_id, timeline.action, timeline.status_change,
+               timeline.old_status, timeline.new_status, timeline.created_at)
+        .where(timeline.action != 'created')
+        .execution_options(yield_per=batch_size)
+    ):
+        event_type, old_status, new_status = LEGACY_STEPS.get(row.status_change, (None, None, None))
+        if row.action == 'auto_triaged':
+            event_type = 'occurrence_triaged'
+        elif row.action == 'merged':
+            event_type = MERGED_EVENT
+        add(row.occurrence_id, row.created_at,
+            counters_for(event_type, row.old_status or old_status, row.new_status or new_status))
+
+    session.execute(delete(OccurrenceDailyStat))
+    written = upsert_counts(session, totals)
+    set_offset(session, CONSUMER, last_event_id)
+    session.commit()
+    return written
@@ -0,0 +1,230 @@
+"""
+Roteiro de visitas de uma equipe
+
+As paradas são as ocorrências em andamento atribuídas à equipe e ainda não
+concluídas. A ordem minimiza
+
+    custo = km rodados + ROUTE_URGENCY_WEIGHT × Σ (peso × km até a parada)
+
+em que o peso é o da prioridade (1 a 4), dobrado quando o prazo vence em até
+24 h e triplicado quando já venceu: paradas urgentes ou atrasadas vêm antes
+mesmo que custem um desvio. O prazo é o SLA da ocorrência (src/utils/sla.py)
+ou, sem ele, o alvo da prioridade.
+
+Heurística: vizinho mais próximo ponderado (distância / peso) monta a rota
+inicial e o 2-opt inverte trechos enquanto o custo cair. As distâncias
+(haversine) são calculadas uma vez numa matriz. Cada inversão candidata é
+avaliada em O(1): os km mudam só nas quatro arestas das pontas (duas saem,
+duas entram) e a parcela de urgência sai de somas acumuladas da rota corrente
+(chegada, peso e peso × chegada), refeitas apenas quando uma inversão é aceita.
+
+O cache guarda a última rota de cada equipe, com uma impressão digital de
+(id, updated_at) das paradas, do ponto de partida arredondado e da hora
+corrente: atribuir, concluir ou repriorizar qualquer parada invalida a rota.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from src.models.models import Occurrence, OccurrenceStatus
+from src.utils.geo import haversine_m
+from src.utils.priority import PRIORITY_RANK, PRIORITY_TARGET_HOURS
+
+ALGORITHM = 'nearest_neighbor+2opt'
+CACHE_SIZE = 1000  # equipes
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def stop_weight(priority, due_at, now):
+    weight = PRIORITY_RANK.get(priority, 1)
+    if due_at is None:
+        return weight
+    if due_at <= now:
+        return weight * 3
+    if due_at <= now + timedelta(hours=24):
+        return weight * 2
+    return weight
+
+
+def distance_matrix(points):
+    """Distâncias em km entre todos os pontos [(lat, lon)]"""
+    size = len(points)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(i + 1, size):
+            matrix[i][j] = matrix[j][i] = haversine_m(*points[i], *points[j]) / 1000
+    return matrix
+
+
+def route_cost(order, matrix, weights, urgency):
+    travelled = weighted = 0.0
+    previous = 0
+    for stop in order:
+        travelled += matrix[previous][stop]
+        weighted += weights[stop] * travelled
+        previous = stop
+    return travelled + urgency * weighted
+
+
+def nearest_neighbor(matrix, weights):
+    remaining = set(range(1, len(matrix)))
+    order = []
+    current = 0
+    while remaining:
+        current = min(remaining, key=lambda stop: (matrix[current][stop] / weights[stop], stop))
+        remaining.remove(current)
+        order.append(current)
+    return order
+
+
+def prefix_sums(order, matrix, weights):
+    """Chegada (km), peso e peso × chegada acumulados; a posição 0 é a partida e p + 1 a parada order[p]"""
+    arrival, weight, weighted = [0.0], [0], [0.0]
+    previous = 0
+    for stop in order:
+        arrival.append(arrival[-1] + matrix[previous][stop])
+        weight.append(weight[-1] + weights[stop])
+        weighted.append(weighted[-1] + weights[stop] * arrival[-1])
+        previous = stop
+    return arrival, weight, weighted
+
+
+def reversal_delta(order, i, k, matrix, sums, urgency):
+    """Variação do custo ao inverter order[i:k + 1]"""
+    arrival, weight, weighted = sums
+    before = order[i - 1] if i else 0
+    first, last = order[i], order[k]
+    edges = matrix[before][last] - matrix[before][first]
+    if k + 1 < len(order):
+        edges += matrix[first][order[k + 1]] - matrix[last][order[k + 1]]
+    # No trecho invertido a parada que chegava em A passa a chegar em
+    # arrival[i] + matrix[before][last] + arrival[k + 1] - A; depois dele, tudo desloca `edges`
+    inside = (weight[k + 1] - weight[i]) * (arrival[i] + matrix[before][last] + arrival[k + 1]) \
+        - 2 * (weighted[k + 1] - weighted[i])
+    after = edges * (weight[-1] - weight[k + 1])
+    return edges + urgency * (inside + after)
+
+
+def two_opt(order, matrix, weights, urgency, max_passes=20):
+    order = list(order)
+    sums = prefix_sums(order, matrix, weights)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(order) - 1):
+            for k in range(i + 1, len(order)):
+                if reversal_delta(order, i, k, matrix, sums, urgency) < -1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    sums = prefix_sums(order, matrix, weights)
+                    improved = True
+        if not improved:
+            break
+    return order, route_cost(order, matrix, weights, urgency)
+
+
+def optimize(start, stops, urgency=0.1, two_opt_max_stops=80, now=None):
+    """
+    Ordena as paradas [{'latitude', 'longitude', 'priority', 'due_at', ...}]
+    a partir de start (lat, lon). Retorna (paradas ordenadas, resumo).
+    """
+    now = now or datetime.utcnow()
+    if not stops:
+        return [], {'total_km': 0.0, 'nearest_neighbor_km': 0.0, 'cost': 0.0}
+
+    matrix = distance_matrix([start] + [(stop['latitude'], stop['longitude']) for stop in stops])
+    weights = [1] + [stop_weight(stop['priority'], stop['due_at'], now) for stop in stops]
+    order = nearest_neighbor(matrix, weights)
+    nearest_km = route_cost(order, matrix, weights, 0)
+    if len(order) <= two_opt_max_stops:
+        order, cost = two_opt(order, matrix, weights, urgency)
+    else:
+        cost = route_cost(order, matrix, weights, urgency)
+
+    ordered = []
+    travelled = 0.0
+    previous = 0
+    for position, index in enumerate(order, start=1):
+        leg = matrix[previous][index]
+        travelled += leg
+        ordered.append(dict(stops[index - 1], order=position, leg_km=round(leg, 3),
+                            arrival_km=round(travelled, 3), weight=weights[index]))
+        previous = index
+    return ordered, {
+        'total_km': round(travelled, 3),
+        'nearest_neighbor_km': round(nearest_km, 3),
+        'cost': round(cost, 3)
+    }
+
+
+def crew_stops(session, user_id):
+    rows = session.query(
+        Occurrence.id, Occurrence.title, Occurrence.address, Occurrence.latitude, Occurrence.longitude,
+        Occurrence.priority, Occurrence.created_at, Occurrence.updated_at, Occurrence.started_at,
+        Occurrence.sla_due_at
+    ).filter(
+        Occurrence.assigned_to == user_id,
+        Occurrence.status == OccurrenceStatus.IN_PROGRESS,
+        Occurrence.completed_at.is_(None)
+    ).order_by(Occurrence.id).all()
+    return [
+        {
+            'id': row.id, 'title': row.title, 'address': row.address,
+            'latitude': row.latitude, 'longitude': row.longitude, 'priority': row.priority,
+            'started_at': row.started_at, 'updated_at': row.updated_at,
+            'due_at': row.sla_due_at or (
+                row.created_at + timedelta(hours=PRIORITY_TARGET_HOURS[row.priority]) if row.created_at else None
+            )
+        }
+        for row in rows
+    ]
+
+
+def plan_route(session, user_id, start, config, now=None):
+    """Rota da equipe a partir de start (lat, lon), com cache. Retorna um dict serializável."""
+    now = now or datetime.utcnow()
+    stops = crew_stops(session, user_id)
+    fingerprint = (
+        round(start[0], 3), round(start[1], 3), now.strftime('%Y%m%d%H'),
+        tuple((stop['id'], stop['updated_at']) for stop in stops)
+    )
+    with _cache_lock:
+        cached = _cache.get(user_id)
+        if cached is not None and cached[0] == fingerprint:
+            _cache.move_to_end(user_id)
+            return dict(cached[1], cached=True)
+
+    ordered, summary = optimize(
+        start, stops, urgency=config['ROUTE_URGENCY_WEIGHT'],
+        two_opt_max_stops=config['ROUTE_TWO_OPT_MAX_STOPS'], now=now
+    )
+    result = {
+        'user_id': user_id,
+        'start': {'latitude': start[0], 'longitude': start[1]},
+        'algorithm': ALGORITHM,
+        **summary,
+        'stops': [
+            {
+                'order': stop['order'],
+                'occurrence_id': stop['id'],
+                'title': stop['title'],
+                'address': stop['address'],
+                'latitude': stop['latitude'],
+                'longitude': stop['longitude'],
+                'priority': stop['priority'].value,
+                'due_at': stop['due_at'].isoformat() if stop['due_at'] else None,
+                'overdue': bool(stop['due_at'] and stop['due_at'] <= now),
+                'started': stop['started_at'] is not None,
+                'leg_km': stop['leg_km'],
+                'arrival_km': stop['arrival_km']
+            }
+            for stop in ordered
+        ]
+    }
+    with _cache_lock:
+        _cache[user_id] = (fingerprint, result)
+        _cache.move_to_end(user_id)
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(result, cached=False)
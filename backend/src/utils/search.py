@@ -0,0 +1,186 @@
+"""
+Busca textual em ocorrências (título, descrição, endereço e notas de execução)
+
+- SQLite: tabela virtual FTS5 `occurrence_search` (rowid = id da ocorrência)
+  com tokenizer unicode61 sem acentos. O texto é indexado já reduzido pelo
+  stemmer leve de português abaixo, aplicado também às consultas.
+- PostgreSQL: tabela `occurrence_search` com um tsvector ponderado
+  (configuração 'portuguese' + unaccent) e índice GIN.
+
+O índice é atualizado na mesma transação da escrita, por um listener de
+after_flush que reindexa apenas ocorrências novas ou com campos textuais
+alterados.
+"""
+
+import re
+import unicodedata
+
+from sqlalchemy import column, event, func, inspect, literal_column, table, text
+
+from src.models.models import Occurrence
+from src.utils.database import RoutingSession
+
+SEARCH_TABLE = 'occurrence_search'
+SEARCH_FIELDS = ('title', 'description', 'address', 'execution_notes')
+FIELD_WEIGHTS = {'title': 'A', 'description': 'B', 'address': 'C', 'execution_notes': 'D'}
+BM25_WEIGHTS = (10.0, 4.0, 2.0, 1.0)  # na ordem de SEARCH_FIELDS
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Plural e formas mais comuns, depois de remover os acentos
+PLURAL_SUFFIXES = (
+    ('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+    ('ns', 'm'), ('res', 'r'), ('ses', 's'), ('zes', 'z'), ('les', 'l'),
+)
+DERIVATIONAL_SUFFIXES = ('issimo', 'issima', 'mente', 'inho', 'inha', 'zinho', 'zinha')
+
+
+def fold(value):
+    """Minúsculas e sem acentos"""
+    normalized = unicodedata.normalize('NFKD', value.lower())
+    return ''.join(char for char in normalized if not unicodedata.combining(char))
+
+
+def stem(token):
+    """Stemmer leve de português: plural, alguns sufixos e a vogal temática final."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if token.endswith(suffix):
+            token = token[:-len(suffix)] + replacement
+            break
+    else:
+        if token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+    for suffix in DERIVATIONAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    if len(token) > 4 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+def analyze(value):
+    return [stem(token) for token in TOKEN_RE.findall(fold(value or ''))]
+
+
+def _dialect(session):
+    return session.get_bind().dialect.name
+
+
+def ensure_search_index(session):
+    """Cria a estrutura de busca se não existir (idempotente)"""
+    if _dialect(session) == 'postgresql':
+        session.execute(text('CREATE EXTENSION IF NOT EXISTS unaccent'))
+        session.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            ' occurrence_id INTEGER PRIMARY KEY REFERENCES occurrences(id) ON DELETE CASCADE,'
+            ' document TSVECTOR NOT NULL)'
+        ))
+        session.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)'
+        ))
+    else:
+        session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+        ))
+    session.commit()
+
+
+def _index_rows(connection, occurrences):
+    if connection.dialect.name == 'postgresql':
+        document = ' || '.join(
+            f"setweight(to_tsvector('portuguese', unaccent(coalesce(:{field}, ''))), '{weight}')"
+            for field, weight in FIELD_WEIGHTS.items()
+        )
+        statement = text(
+            f'INSERT INTO {SEARCH_TABLE} (occurrence_id, document) VALUES (:id, {document}) '
+            'ON CONFLICT (occurrence_id) DO UPDATE SET document = EXCLUDED.document'
+        )
+        rows = [{'id': occ.id, **{field: getattr(occ, field) for field in SEARCH_FIELDS}} for occ in occurrences]
+    else:
+        connection.execute(
+            text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = :id'),
+            [{'id': occ.id} for occ in occurrences]
+        )
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES (:id, {', '.join(':' + field for field in SEARCH_FIELDS)})"
+        )
+        rows = [
+            {'id': occ.id, **{field: ' '.join(analyze(getattr(occ, field))) for field in SEARCH_FIELDS}}
+            for occ in occurrences
+        ]
+    if rows:
+        connection.execute(statement, rows)
+
+
+def _delete_rows(connection, ids):
+    key = 'occurrence_id' if connection.dialect.name == 'postgresql' else 'rowid'
+    connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE {key} = :id'), [{'id': id_} for id_ in ids])
+
+
+def reindex_all(session, batch_size=1000):
+    """Reconstrói o índice inteiro em lotes; retorna o total indexado"""
+    connection = session.connection()
+    connection.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+    total = 0
+    last_id = 0
+    while True:
+        batch = Occurrence.query.filter(Occurrence.id > last_id).order_by(Occurrence.id).limit(batch_size).all()
+        if not batch:
+            break
+        _index_rows(connection, batch)
+        total += len(batch)
+        last_id = batch[-1].id
+        session.expunge_all()
+    session.commit()
+    return total
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _sync_search_index(session, flush_context):
+    changed = [
+        obj for obj in session.new | session.dirty
+        if isinstance(obj, Occurrence) and (
+            obj in session.new
+            or any(inspect(obj).attrs[field].history.has_changes() for field in SEARCH_FIELDS)
+        )
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Occurrence)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    if changed:
+        _index_rows(connection, changed)
+    if deleted:
+        _delete_rows(connection, deleted)
+
+
+def apply_search(query, terms, dialect):
+    """
+    Restringe `query` (sobre Occurrence) às ocorrências que casam com `terms`
+    e ordena por relevância. Retorna None se a consulta não tiver termos.
+    """
+    if dialect == 'postgresql':
+        search = table(SEARCH_TABLE, column('occurrence_id'), column('document'))
+        tsquery = func.websearch_to_tsquery('portuguese', func.unaccent(terms))
+        return query.join(search, search.c.occurrence_id == Occurrence.id).filter(
+            search.c.document.op('@@')(tsquery)
+        ).order_by(func.ts_rank(search.c.document, tsquery).desc(), Occurrence.created_at.desc())
+
+    tokens = analyze(terms)
+    if not tokens:
+        return None
+    # Todos os termos são obrigatórios; o último também casa como prefixo
+    match = ' '.join(f'"{token}"' for token in tokens[:-1])
+    match = f'{match} "{tokens[-1]}"*'.strip()
+
+    search = table(SEARCH_TABLE, column('rowid'))
+    rank = func.bm25(literal_column(SEARCH_TABLE), *BM25_WEIGHTS)
+    return query.join(search, search.c.rowid == Occurrence.id).filter(
+        literal_column(SEARCH_TABLE).op('MATCH')(match)
+    ).order_by(rank, Occurrence.created_at.desc())
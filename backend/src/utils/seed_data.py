@@ -1,6 +1,7 @@
 from src.models.models import db, User, Department, Category, Occurrence, OccurrenceTimeline, OccurrenceSupport, UserType, OccurrenceStatus, Priority
 from datetime import datetime, timedelta
 import random
+from src.utils.counters import reconcile_counters
 
 def create_initial_data():
     """Cria dados iniciais para demonstração se não existirem"""
@@ -306,6 +307,7 @@ def create_initial_data():
     
     # Commit todas as mudanças
     db.session.commit()
+    reconcile_counters(db.session)
     print("Dados iniciais criados com sucesso!")
     print(f"- {len(departments)} departamentos")
     print(f"- {len(categories)} categorias")
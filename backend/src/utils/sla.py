@@ -0,0 +1,328 @@
+"""
+Prazos de atendimento (SLA)
+
+As políticas (tabela sla_policies) definem o prazo em horas por categoria,
+departamento e/ou prioridade. Ficam compiladas num dicionário indexado por
+(categoria, departamento, prioridade), com None como curinga; a busca testa
+as combinações da mais específica para a mais genérica (categoria vence
+departamento, que vence prioridade). Sem política vale PRIORITY_TARGET_HOURS.
+
+O prazo (occurrences.sla_due_at) é calculado na triagem e contado a partir do
+registro. O índice (status, sla_due_at) atende as leituras sem varrer a
+tabela:
+
+- scan_sla lê com uma consulta de intervalo as ocorrências ativas que vencem
+  dentro da maior antecedência de aviso, registra uma única vez na timeline o
+  aviso ('sla_at_risk') e o estouro ('sla_breached'), marca sla_warned_at e
+  sla_breached_at e publica os eventos no outbox (src/utils/transitions.py);
+- at_risk_queue devolve a fila das ocorrências ativas com prazo mais próximo;
+- compliance agrupa por departamento as ocorrências com prazo numa janela.
+
+As políticas são recarregadas a cada SLA_POLICIES_TTL segundos em cada
+processo e, no processo que as alterou, imediatamente (invalidate_policies).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, bindparam, case, func, insert, or_, update
+
+from src.models.models import Department, Occurrence, OccurrenceStatus, OccurrenceTimeline, Priority, SlaPolicy, User
+from src.utils.priority import PRIORITY_TARGET_HOURS
+from src.utils.transitions import event_row, record_events
+from src.utils.workload import ACTIVE_STATUSES
+
+AT_RISK_ACTION = 'sla_at_risk'
+BREACHED_ACTION = 'sla_breached'
+
+MARK_CHUNK = 500  # ids por UPDATE (limite de parâmetros do SQLite)
+
+Policy = namedtuple('Policy', 'id hours at_risk_hours')
+
+
+class PolicyTable:
+    """Políticas ativas em memória"""
+
+    def __init__(self, policies, default_at_risk_hours):
+        self.default_at_risk_hours = default_at_risk_hours
+        self.by_scope = {}
+        for policy in policies:
+            self.by_scope.setdefault(
+                (policy.category_id, policy.department_id, policy.priority),
+                Policy(policy.id, policy.hours, policy.at_risk_hours or default_at_risk_hours)
+            )
+        self.max_at_risk_hours = max(
+            [policy.at_risk_hours for policy in self.by_scope.values()] + [default_at_risk_hours]
+        )
+
+    def __len__(self):
+        return len(self.by_scope)
+
+    def lookup(self, category_id, department_id, priority):
+        for category in (category_id, None):
+            for department in (department_id, None):
+                for level in (priority, None):
+                    policy = self.by_scope.get((category, department, level))
+                    if policy:
+                        return policy
+        return Policy(None, PRIORITY_TARGET_HOURS.get(priority, PRIORITY_TARGET_HOURS[Priority.MEDIUM]),
+                      self.default_at_risk_hours)
+
+    def due_at(self, category_id, department_id, priority, created_at):
+        return created_at + timedelta(hours=self.lookup(category_id, department_id, priority).hours)
+
+
+_table = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def load_policies(default_at_risk_hours):
+    policies = SlaPolicy.query.filter_by(is_active=True).order_by(SlaPolicy.id).all()
+    return PolicyTable(policies, default_at_risk_hours)
+
+
+def get_policies(config):
+    """Políticas do processo, recarregadas após o TTL"""
+    global _table, _loaded_at
+    table = _table
+    if table is not None and time.monotonic() - _loaded_at < config['SLA_POLICIES_TTL']:
+        return table
+    with _lock:
+        if _table is None or time.monotonic() - _loaded_at >= config['SLA_POLICIES_TTL']:
+            _table = load_policies(config['SLA_AT_RISK_HOURS'])
+            _loaded_at = time.monotonic()
+        return _table
+
+
+def invalidate_policies():
+    global _table
+    _table = None
+
+
+def sla_fields(table, category_id, department_id, priority, created_at):
+    """Colunas de SLA de uma ocorrência recém-triada (prazo novo, avisos zerados)"""
+    return {
+        'sla_due_at': table.due_at(category_id, department_id, priority, created_at or datetime.utcnow()),
+        'sla_warned_at': None,
+        'sla_breached_at': None
+    }
+
+
+def apply_sla(occurrence, config):
+    """Calcula o prazo de uma ocorrência do ORM que acabou de ser triada"""
+    for field, value in sla_fields(
+        get_policies(config), occurrence.category_id, occurrence.department_id,
+        occurrence.priority, occurrence.created_at
+    ).items():
+        setattr(occurrence, field, value)
+    return occurrence.sla_due_at
+
+
+def backfill_sla_due_dates(session, config, batch_size=1000):
+    """Calcula o prazo das ocorrências já triadas antes das políticas; retorna o total"""
+    table = load_policies(config['SLA_AT_RISK_HOURS'])
+    total = 0
+    last_id = 0
+    while True:
+        rows = session.query(
+            Occurrence.id, Occurrence.category_id, Occurrence.department_id, Occurrence.priority, Occurrence.created_at
+        ).filter(
+            Occurrence.department_id.isnot(None),
+            Occurrence.sla_due_at.is_(None),
+            Occurrence.id > last_id
+        ).order_by(Occurrence.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        # Tabela direta para não disparar o onupdate de updated_at
+        occurrences = Occurrence.__table__
+        session.execute(
+            update(occurrences).where(occurrences.c.id == bindparam('b_id')).values(sla_due_at=bindparam('b_due')),
+            [{'b_id': row.id, 'b_due': table.due_at(row.category_id, row.department_id, row.priority,
+                                                    row.created_at or datetime.utcnow())}
+             for row in rows]
+        )
+        total += len(rows)
+    session.commit()
+    return total
+
+
+def _format(moment):
+    return moment.strftime('%d/%m/%Y %H:%M')
+
+
+def _mark(session, ids, guard, values):
+    """Atualiza as ocorrências que ainda satisfazem a guarda; retorna {id: status} das atualizadas"""
+    occurrences = Occurrence.__table__
+    marked = {}
+    for start in range(0, len(ids), MARK_CHUNK):
+        marked.update(session.execute(
+            update(occurrences).where(occurrences.c.id.in_(ids[start:start + MARK_CHUNK]), *guard)
+            .values(**values).returning(occurrences.c.id, occurrences.c.status)
+        ).tuples().all())
+    return marked
+
+
+def scan_sla(session, config, now=None, apply=True):
+    """
+    Emite os avisos e estouros pendentes. Retorna a lista de eventos
+    [{event, occurrence_id, department_id, assigned_to, sla_due_at}].
+
+    As marcas são gravadas com a guarda "ainda não avisada/estourada" no
+    WHERE, e só as linhas de fato atualizadas (RETURNING) geram timeline e
+    evento: duas varreduras simultâneas não emitem o mesmo aviso duas vezes.
+    """
+    now = now or datetime.utcnow()
+    table = get_policies(config)
+    rows = session.query(
+        Occurrence.id, Occurrence.category_id, Occurrence.department_id, Occurrence.priority,
+        Occurrence.status, Occurrence.assigned_to, Occurrence.sla_due_at, Occurrence.sla_warned_at
+    ).filter(
+        Occurrence.status.in_(ACTIVE_STATUSES),
+        Occurrence.sla_due_at <= now + timedelta(hours=table.max_at_risk_hours),
+        Occurrence.sla_breached_at.is_(None)
+    ).order_by(Occurrence.sla_due_at).all()
+
+    found = []
+    for row in rows:
+        if row.sla_due_at <= now:
+            found.append((row, BREACHED_ACTION, 'Prazo de Atendimento Estourado'))
+            continue
+        policy = table.lookup(row.category_id, row.department_id, row.priority)
+        if not row.sla_warned_at and row.sla_due_at <= now + timedelta(hours=policy.at_risk_hours):
+            found.append((row, AT_RISK_ACTION, 'Prazo de Atendimento Próximo'))
+
+    if not apply:
+        session.rollback()
+        statuses = {row.id: row.status for row, event, status_change in found}
+    elif found:
+        occurrences = Occurrence.__table__
+        active = occurrences.c.status.in_(ACTIVE_STATUSES)
+        statuses = _mark(
+            session, [row.id for row, event, status_change in found if event == BREACHED_ACTION],
+            [active, occurrences.c.sla_breached_at.is_(None), occurrences.c.sla_due_at <= now],
+            {'sla_breached_at': now, 'sla_warned_at': func.coalesce(occurrences.c.sla_warned_at, now), 'updated_at': now}
+        )
+        statuses.update(_mark(
+            session, [row.id for row, event, status_change in found if event == AT_RISK_ACTION],
+            [active, occurrences.c.sla_warned_at.is_(None), occurrences.c.sla_breached_at.is_(None),
+             occurrences.c.sla_due_at > now],
+            {'sla_warned_at': now, 'updated_at': now}
+        ))
+
+    events = []
+    timeline_rows = []
+    for row, event, status_change in found:
+        if row.id not in statuses:
+            continue  # Outra varredura já marcou, ou a ocorrência mudou depois da leitura
+        events.append({
+            'event': event, 'occurrence_id': row.id, 'department_id': row.department_id,
+            'assigned_to': row.assigned_to, 'sla_due_at': row.sla_due_at.isoformat()
+        })
+        timeline_rows.append({
+            'occurrence_id': row.id, 'action': event,
+            'old_status': statuses[row.id], 'new_status': statuses[row.id],
+            'status_change': status_change,
+            'details': f'Prazo de atendimento: {_format(row.sla_due_at)} (UTC).',
+            'created_at': now
+        })
+
+    if apply and found:
+        if timeline_rows:
+            session.execute(insert(OccurrenceTimeline), timeline_rows)
+            record_events(session, [
+                event_row(row['occurrence_id'], row['action'], row['old_status'], row['new_status'],
+                          payload={'sla_due_at': item['sla_due_at']}, now=now)
+                for row, item in zip(timeline_rows, events)
+            ])
+        session.commit()
+    return events
+
+
+def at_risk_queue(session, hours, department_id=None, limit=100, now=None):
+    """Ocorrências ativas que vencem em até `hours` horas (ou já venceram), da mais urgente para a menos"""
+    now = now or datetime.utcnow()
+    query = session.query(
+        Occurrence.id, Occurrence.title, Occurrence.status, Occurrence.priority, Occurrence.department_id,
+        Department.name.label('department_name'), Occurrence.assigned_to, User.name.label('assigned_to_name'),
+        Occurrence.sla_due_at, Occurrence.sla_warned_at, Occurrence.sla_breached_at
+    ).outerjoin(Department, Department.id == Occurrence.department_id).outerjoin(
+        User, User.id == Occurrence.assigned_to
+    ).filter(
+        Occurrence.status.in_(ACTIVE_STATUSES),
+        Occurrence.sla_due_at <= now + timedelta(hours=hours)
+    )
+    if department_id:
+        query = query.filter(Occurrence.department_id == department_id)
+    return [
+        {
+            'id': row.id,
+            'title': row.title,
+            'status': row.status.value,
+            'priority': row.priority.value,
+            'department_id': row.department_id,
+            'department_name': row.department_name,
+            'assigned_to': row.assigned_to,
+            'assigned_to_name': row.assigned_to_name,
+            'sla_due_at': row.sla_due_at.isoformat(),
+            'hours_left': round((row.sla_due_at - now).total_seconds() / 3600, 1),
+            'breached': row.sla_due_at <= now,
+            'warned': row.sla_warned_at is not None
+        }
+        for row in query.order_by(Occurrence.sla_due_at, Occurrence.id).limit(limit)
+    ]
+
+
+def finished_at():
+    """Momento em que o atendimento foi entregue (conclusão da execução ou resolução)"""
+    return func.coalesce(Occurrence.completed_at, Occurrence.resolved_at, Occurrence.validated_at)
+
+
+def compliance(session, start, end, department_id=None, now=None):
+    """
+    Cumprimento do prazo das ocorrências com vencimento em [start, end), por
+    departamento: no prazo, fora do prazo (entregues depois ou vencidas sem
+    entrega) e ainda dentro do prazo. Retorna {'departments': [...], 'total': {...}}.
+    """
+    now = now or datetime.utcnow()
+    delivered = finished_at()
+    met = and_(delivered.isnot(None), delivered <= Occurrence.sla_due_at)
+    breached = or_(
+        and_(delivered.isnot(None), delivered > Occurrence.sla_due_at),
+        and_(delivered.is_(None), Occurrence.sla_due_at <= now)
+    )
+    query = session.query(
+        Occurrence.department_id, Department.name,
+        func.count(Occurrence.id).label('total'),
+        func.sum(case((met, 1), else_=0)).label('met'),
+        func.sum(case((breached, 1), else_=0)).label('breached')
+    ).outerjoin(Department, Department.id == Occurrence.department_id).filter(
+        # Todos os status no IN mantêm o índice (status, sla_due_at) utilizável
+        Occurrence.status.in_(list(OccurrenceStatus)),
+        Occurrence.sla_due_at >= start,
+        Occurrence.sla_due_at < end,
+        Occurrence.merged_into_id.is_(None)
+    )
+    if department_id:
+        query = query.filter(Occurrence.department_id == department_id)
+
+    def summary(total, met, breached):
+        decided = met + breached
+        return {
+            'total': total,
+            'met': met,
+            'breached': breached,
+            'pending': total - decided,
+            'compliance_rate': round(met / decided * 100, 1) if decided else None
+        }
+
+    departments = []
+    totals = [0, 0, 0]
+    for row in query.group_by(Occurrence.department_id, Department.name).order_by(Department.name):
+        counts = (row.total, int(row.met or 0), int(row.breached or 0))
+        totals = [a + b for a, b in zip(totals, counts)]
+        departments.append({'department_id': row.department_id, 'department_name': row.name, **summary(*counts)})
+    return {'departments': departments, 'total': summary(*totals)}
@@ -0,0 +1,94 @@
+"""
+Registro de apoios a ocorrências
+
+Um apoio por cidadão e ocorrência, garantido pelo índice único
+(occurrence_id, citizen_id): o INSERT usa ON CONFLICT DO NOTHING ... RETURNING,
+então toques duplos concorrentes não criam apoios repetidos nem incrementam o
+contador duas vezes. Na timeline os apoios de uma mesma janela de tempo são
+agrupados em uma única entrada, com chave única (ocorrência, janela): o
+primeiro apoio da janela a cria e os seguintes incrementam a contagem no
+mesmo INSERT ... ON CONFLICT DO UPDATE, sem ler antes.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.models import db, Occurrence, OccurrenceSupport, OccurrenceTimeline
+from src.utils.counters import increment_counter
+
+TIMELINE_ACTION = 'supported'
+EPOCH = datetime(1970, 1, 1)
+
+
+def _insert(dialect, table=OccurrenceSupport.__table__):
+    module = postgresql if dialect == 'postgresql' else sqlite
+    return module.insert(table)
+
+
+def window_key(now, window_minutes):
+    """Chave da janela de agrupamento (janelas fixas de window_minutes, em UTC)"""
+    minutes = int((now - EPOCH).total_seconds() // 60)
+    return f'{TIMELINE_ACTION}:{minutes - minutes % window_minutes}'
+
+
+def add_supports(citizen_id, occurrence_ids, now=None):
+    """
+    Registra o apoio do cidadão às ocorrências, ignorando as já apoiadas.
+    Retorna os ids das ocorrências em que o apoio foi de fato inserido.
+    """
+    if not occurrence_ids:
+        return []
+    now = now or datetime.utcnow()
+    table = OccurrenceSupport.__table__
+    statement = _insert(db.session.get_bind().dialect.name).values([
+        {'occurrence_id': occurrence_id, 'citizen_id': citizen_id, 'created_at': now}
+        for occurrence_id in occurrence_ids
+    ]).on_conflict_do_nothing(index_elements=['occurrence_id', 'citizen_id']).returning(table.c.occurrence_id)
+    inserted = db.session.execute(statement).scalars().all()
+    for occurrence_id in inserted:
+        increment_counter(occurrence_id, 'support_count')
+    return inserted
+
+
+def record_support_timeline(occurrence_id, user, window_minutes, now=None):
+    """
+    Agrupa os apoios na timeline: o primeiro da janela cria a entrada e os
+    seguintes apenas somam à contagem na descrição.
+    """
+    now = now or datetime.utcnow()
+    table = OccurrenceTimeline.__table__
+    count = table.c.group_count + 1
+    statement = _insert(db.session.get_bind().dialect.name, table).values(
+        occurrence_id=occurrence_id,
+        user_id=user.id,
+        action=TIMELINE_ACTION,
+        description=f'{user.name} apoiou esta ocorrência',
+        group_key=window_key(now, window_minutes),
+        group_count=1,
+        created_at=now
+    ).on_conflict_do_update(
+        index_elements=['occurrence_id', 'group_key'],
+        set_={
+            'group_count': count,
+            'description': cast(count, String) + ' cidadãos apoiaram esta ocorrência',
+            'details': f'Último apoio: {user.name}'
+        }
+    )
+    db.session.execute(statement)
+
+
+def remove_duplicate_supports(session):
+    """Apaga apoios repetidos (mantém o mais antigo) antes de criar o índice único"""
+    table = OccurrenceSupport.__table__
+    keep = select(func.min(table.c.id)).group_by(table.c.occurrence_id, table.c.citizen_id)
+    removed = session.execute(table.delete().where(table.c.id.not_in(keep))).rowcount
+    session.commit()
+    return removed
+
+
+def existing_occurrence_ids(occurrence_ids):
+    return set(db.session.execute(
+        select(Occurrence.id).where(Occurrence.id.in_(occurrence_ids))
+    ).scalars())
@@ -0,0 +1,184 @@
+"""
+Séries temporais das ocorrências registradas
+
+Os períodos (hora, dia, semana iniciada na segunda ou mês, no fuso
+LOCAL_TIMEZONE) são gerados em Python e preenchidos com zero; as consultas
+trazem só os períodos com registros.
+
+- dia, semana e mês, no total ou por categoria: somas de
+  occurrence_daily_stats (src/utils/rollups.py), uma linha por dia e categoria;
+- hora, ou qualquer período por status: contagem em occurrences por hora UTC
+  (e status), pelo índice ix_occurrences_created_at, somada depois nos
+  períodos locais. É exata para fusos com deslocamento de hora inteira.
+
+Por status conta o status atual de cada ocorrência, não o da época do registro.
+"""
+
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func
+
+from src.models.models import Category, Occurrence, OccurrenceDailyStat, OccurrenceStatus
+from src.utils.rollups import local_day
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+BREAKDOWNS = ('status', 'category')
+MAX_BUCKETS = 5000
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def utc_midnight(day, zone):
+    """Início do dia local, em UTC sem fuso (como as colunas de data)"""
+    return datetime.combine(day, time(), tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def buckets(start_day, end_day, granularity, zone):
+    """[(chave, rótulo)] de todos os períodos, do primeiro ao último"""
+    if granularity == 'hour':
+        moment, end = utc_midnight(start_day, zone), utc_midnight(end_day + timedelta(days=1), zone)
+        result = []
+        while moment < end:
+            label = moment.replace(tzinfo=timezone.utc).astimezone(zone).isoformat(timespec='minutes')
+            result.append((moment, label))
+            moment += timedelta(hours=1)
+        return result
+    day = bucket_start(start_day, granularity)
+    result = []
+    while day <= end_day:
+        result.append((day, day.isoformat()))
+        day = next_bucket(day, granularity)
+    return result
+
+
+def utc_hour(session, column):
+    if session.get_bind().dialect.name == 'postgresql':
+        return func.date_trunc('hour', column)
+    return func.strftime('%Y-%m-%d %H:00:00', column)
+
+
+def rollup_counts(session, start_day, end_day, granularity, by_category):
+    """{(período, categoria ou None): ocorrências} a partir dos agregados diários"""
+    columns = [OccurrenceDailyStat.day]
+    if by_category:
+        columns.append(OccurrenceDailyStat.category_id)
+    query = session.query(*columns, func.sum(OccurrenceDailyStat.created)).filter(
+        OccurrenceDailyStat.day >= start_day, OccurrenceDailyStat.day <= end_day
+    ).group_by(*columns)
+    counts = Counter()
+    for row in query:
+        counts[(bucket_start(row[0], granularity), row[1] if by_category else None)] += int(row[-1] or 0)
+    return counts
+
+
+def occurrence_counts(session, start_day, end_day, granularity, zone, dimension):
+    """{(período, valor da dimensão ou None): ocorrências} contando em occurrences por hora UTC"""
+    hour = utc_hour(session, Occurrence.created_at)
+    columns = [hour] + ([dimension] if dimension is not None else [])
+    query = session.query(*columns, func.count(Occurrence.id)).filter(
+        Occurrence.created_at >= utc_midnight(start_day, zone),
+        Occurrence.created_at < utc_midnight(end_day + timedelta(days=1), zone)
+    ).group_by(*columns)
+    counts = Counter()
+    for row in query:
+        moment = row[0] if isinstance(row[0], datetime) else datetime.fromisoformat(row[0])
+        key = moment if granularity == 'hour' else bucket_start(local_day(moment, zone), granularity)
+        value = row[1] if dimension is not None else None
+        counts[(key, getattr(value, 'value', value))] += row[-1]
+    return counts
+
+
+def parse_series_args(args, config, now=None):
+    """(granularidade, detalhamento, primeiro dia, último dia) da requisição; ValueError se inválidos"""
+    granularity = args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity deve ser um de: {', '.join(GRANULARITIES)}")
+    breakdown = args.get('breakdown') or None
+    if breakdown is not None and breakdown not in BREAKDOWNS:
+        raise ValueError(f"breakdown deve ser um de: {', '.join(BREAKDOWNS)}")
+    today = local_day(now or datetime.utcnow(), ZoneInfo(config['LOCAL_TIMEZONE']))
+    end_day = date.fromisoformat(args['end']) if args.get('end') else today
+    if args.get('start'):
+        start_day = date.fromisoformat(args['start'])
+    else:
+        days = int(args.get('days', 30))
+        if days < 1:
+            raise ValueError('days deve ser maior que zero')
+        start_day = end_day - timedelta(days=days - 1)
+    if start_day > end_day:
+        raise ValueError('start deve ser anterior a end')
+    return granularity, breakdown, start_day, end_day
+
+
+def occurrence_series(session, config, granularity='day', breakdown=None, start_day=None, end_day=None):
+    """
+    Ocorrências registradas por período de start_day a end_day (dias locais),
+    com zeros nos períodos sem registro e, opcionalmente, por status ou categoria.
+    """
+    zone = ZoneInfo(config['LOCAL_TIMEZONE'])
+    # Semanas e meses completos: o primeiro período começa na segunda ou no dia 1
+    start_day = bucket_start(start_day, granularity)
+    periods = buckets(start_day, end_day, granularity, zone)
+    if len(periods) > MAX_BUCKETS:
+        raise ValueError(f'O período pedido tem mais de {MAX_BUCKETS} pontos; use uma granularidade maior')
+
+    if granularity == 'hour' or breakdown == 'status':
+        source = 'occurrences'
+        dimension = {'status': Occurrence.status, 'category': Occurrence.category_id}.get(breakdown)
+        counts = occurrence_counts(session, start_day, end_day, granularity, zone, dimension)
+    else:
+        source = 'rollup'
+        counts = rollup_counts(session, start_day, end_day, granularity, breakdown == 'category')
+
+    series = None
+    if breakdown == 'status':
+        series = [{'key': status.value, 'label': status.value} for status in OccurrenceStatus]
+    elif breakdown == 'category':
+        names = dict(session.query(Category.id, Category.name))
+        series = [
+            {'key': str(category_id), 'label': names.get(category_id, str(category_id))}
+            for category_id in sorted({key[1] for key in counts})
+        ]
+
+    totals = Counter()
+    detail = {}
+    for (period, value), count in counts.items():
+        totals[period] += count
+        if series is not None:
+            detail.setdefault(period, Counter())[str(value)] += count
+
+    timeline = []
+    for period, label in periods:
+        point = {'date': label, 'count': totals.get(period, 0)}
+        if series is not None:
+            found = detail.get(period, {})
+            point['breakdown'] = {item['key']: found.get(item['key'], 0) for item in series}
+        timeline.append(point)
+
+    result = {
+        'granularity': granularity,
+        'start': start_day.isoformat(),
+        'end': end_day.isoformat(),
+        'source': source,
+        'timeline': timeline
+    }
+    if series is not None:
+        result['breakdown'] = breakdown
+        result['series'] = series
+    return result
@@ -0,0 +1,110 @@
+"""
+Transições de status das ocorrências
+
+Toda mudança de estado de uma ocorrência passa por aqui. A tabela TRANSITIONS
+define, para cada ação, de quais status ela pode partir, o status de destino
+e o evento publicado. transition() valida a ação, altera a ocorrência e grava,
+na mesma transação, a entrada da timeline e o evento do outbox
+(outbox_events). Quem consome os eventos (notificações, agregados diários) lê
+o outbox depois do commit (src/utils/outbox.py), então a rota não espera por
+eles e um evento nunca existe sem a alteração que o gerou, nem o contrário.
+
+Caminhos em lote (triagem em lote e automática, mesclagem de duplicatas,
+prazos) gravam as próprias linhas e publicam com record_events.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from src.models.models import OccurrenceStatus, OccurrenceTimeline, OutboxEvent
+
+OPEN = OccurrenceStatus.OPEN
+IN_PROGRESS = OccurrenceStatus.IN_PROGRESS
+RESOLVED = OccurrenceStatus.RESOLVED
+CLOSED = OccurrenceStatus.CLOSED
+
+CREATED_EVENT = 'occurrence_created'
+MERGED_EVENT = 'occurrence_merged'
+
+# sources None = qualquer status; target None = mantém o status (ou o informado em set_status)
+Transition = namedtuple('Transition', 'sources target event timeline_action error')
+
+TRANSITIONS = {
+    'triage': Transition((OPEN, IN_PROGRESS), IN_PROGRESS, 'occurrence_triaged', 'status_changed',
+                         'Ocorrência já finalizada'),
+    'auto_triage': Transition((OPEN,), IN_PROGRESS, 'occurrence_triaged', 'auto_triaged',
+                              'Ocorrência já triada'),
+    'start': Transition((IN_PROGRESS,), IN_PROGRESS, 'execution_started', 'status_changed',
+                        'A ocorrência não está em progresso para ser iniciada.'),
+    'complete': Transition((IN_PROGRESS,), RESOLVED, 'execution_completed', 'status_changed',
+                           'A ocorrência não está em progresso para ser concluída.'),
+    'approve': Transition((RESOLVED,), CLOSED, 'occurrence_closed', 'status_changed',
+                          'A ocorrência não está no status de RESOLVIDA para ser aprovada.'),
+    'reject': Transition((RESOLVED,), IN_PROGRESS, 'completion_rejected', 'status_changed',
+                         'A ocorrência não está no status de RESOLVIDA para ser rejeitada.'),
+    'rate': Transition((RESOLVED,), CLOSED, 'occurrence_rated', 'rated',
+                       'Apenas ocorrências resolvidas podem ser avaliadas'),
+    # Alteração manual do administrador: qualquer status para qualquer status
+    'set_status': Transition(None, None, 'status_changed', 'status_changed', 'Status inválido'),
+}
+
+
+class TransitionError(ValueError):
+    """Ação não permitida no status atual; a mensagem vai para a resposta (400)"""
+
+
+def check(action, status):
+    spec = TRANSITIONS[action]
+    if spec.sources is not None and status not in spec.sources:
+        raise TransitionError(spec.error)
+    return spec
+
+
+def event_row(occurrence_id, event_type, old_status=None, new_status=None, actor_id=None, payload=None, now=None):
+    return {
+        'occurrence_id': occurrence_id,
+        'event_type': event_type,
+        'old_status': old_status,
+        'new_status': new_status,
+        'actor_id': int(actor_id) if actor_id else None,
+        'payload': payload,
+        'created_at': now or datetime.utcnow()
+    }
+
+
+def record_events(session, rows):
+    """Publica eventos [event_row(...)] na transação da sessão"""
+    if rows:
+        session.execute(insert(OutboxEvent), rows)
+    return len(rows)
+
+
+def transition(session, occurrence, action, actor_id=None, to_status=None, fields=None, payload=None,
+               now=None, **timeline):
+    """
+    Aplica a ação à ocorrência do ORM: valida o status atual, muda o status,
+    copia `fields`, registra a timeline (kwargs restantes: description,
+    status_change, details) e publica o evento. Não faz commit. Retorna o
+    status anterior; TransitionError se a ação não é permitida.
+    """
+    now = now or datetime.utcnow()
+    spec = check(action, occurrence.status)
+    old_status = occurrence.status
+    new_status = spec.target or to_status or old_status
+    occurrence.status = new_status
+    for field, value in (fields or {}).items():
+        setattr(occurrence, field, value)
+    occurrence.updated_at = now
+    session.add(OccurrenceTimeline(
+        occurrence_id=occurrence.id,
+        user_id=actor_id,
+        action=spec.timeline_action,
+        old_status=old_status,
+        new_status=new_status,
+        created_at=now,
+        **timeline
+    ))
+    record_events(session, [event_row(occurrence.id, spec.event, old_status, new_status, actor_id, payload, now)])
+    return old_status
@@ -0,0 +1,268 @@
+"""
+Carga de trabalho das equipes e escolha do responsável
+
+Cada usuário guarda em colunas denormalizadas quantas ocorrências ativas
+(abertas ou em andamento) tem atribuídas e a soma das coordenadas delas; o
+centroide das tarefas atuais é a soma dividida pela contagem. Os valores
+mudam por UPDATE atômico (`active_jobs = active_jobs + delta`):
+
+- alterações feitas pelo ORM (assigned_to, status, latitude, longitude) são
+  capturadas por um listener de after_flush, na mesma transação;
+- gravações em lote (triagem em lote, triagem automática, mesclagem de
+  duplicatas) chamam apply_workload_changes com o estado anterior e o novo.
+
+reconcile_workloads recalcula tudo com uma consulta agrupada.
+
+A escolha lê só as equipes do departamento (índice em users.department_id) e
+minimiza custo = distância até o centroide das tarefas da equipe (ou
+ASSIGNMENT_IDLE_TRAVEL_KM, se está sem tarefas) + ASSIGNMENT_LOAD_WEIGHT_KM
+por tarefa ativa. Equipes no limite ASSIGNMENT_MAX_ACTIVE_JOBS ficam de fora.
+Para decidir muitas ocorrências de uma vez, WorkloadBoard carrega as equipes
+uma vez e atualiza os contadores em memória a cada atribuição.
+"""
+
+from sqlalchemy import bindparam, event, func, inspect, select, update
+
+from src.models.models import db, Occurrence, OccurrenceStatus, User, UserType
+from src.utils.database import RoutingSession
+from src.utils.geo import haversine_m
+
+ACTIVE_STATUSES = (OccurrenceStatus.OPEN, OccurrenceStatus.IN_PROGRESS)
+ASSIGNABLE_USER_TYPES = (UserType.SERVICE_PROVIDER, UserType.DEPARTMENT_MANAGER, UserType.ADMIN)
+WORKLOAD_FIELDS = ('assigned_to', 'status', 'latitude', 'longitude')
+
+
+def job_state(assigned_to, status, latitude, longitude):
+    """Contribuição de uma ocorrência para a carga: (usuário, lat, lon) ou None"""
+    if assigned_to is None or status not in ACTIVE_STATUSES:
+        return None
+    return (assigned_to, latitude or 0.0, longitude or 0.0)
+
+
+def workload_deltas(changes):
+    """[(estado anterior, estado novo)] -> {usuário: [tarefas, Δlat, Δlon]}"""
+    deltas = {}
+    for old, new in changes:
+        if old == new:
+            continue
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            delta = deltas.setdefault(state[0], [0, 0.0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * state[1]
+            delta[2] += sign * state[2]
+    return {user_id: delta for user_id, delta in deltas.items() if any(delta)}
+
+
+def apply_workload_changes(connection, changes):
+    """Aplica as variações de carga com um UPDATE atômico por usuário (executemany)"""
+    deltas = workload_deltas(changes)
+    if not deltas:
+        return
+    table = User.__table__
+    connection.execute(
+        update(table).where(table.c.id == bindparam('b_user')).values(
+            active_jobs=table.c.active_jobs + bindparam('b_jobs'),
+            active_jobs_lat_sum=table.c.active_jobs_lat_sum + bindparam('b_lat'),
+            active_jobs_lon_sum=table.c.active_jobs_lon_sum + bindparam('b_lon')
+        ),
+        # Ordem fixa de ids evita deadlock entre transações concorrentes
+        [{'b_user': user_id, 'b_jobs': jobs, 'b_lat': lat, 'b_lon': lon}
+         for user_id, (jobs, lat, lon) in sorted(deltas.items())]
+    )
+
+
+def _previous(attr):
+    history = attr.history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+# Carrega o valor anterior mesmo se o atributo estiver expirado ao ser alterado
+for _field in WORKLOAD_FIELDS:
+    event.listen(getattr(Occurrence, _field), 'set', lambda target, value, oldvalue, initiator: None,
+                 active_history=True)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _sync_workloads(session, flush_context):
+    changes = []
+    for obj in session.new | session.dirty | session.deleted:
+        if not isinstance(obj, Occurrence):
+            continue
+        state = inspect(obj)
+        current = job_state(obj.assigned_to, obj.status, obj.latitude, obj.longitude)
+        if obj in session.new:
+            changes.append((None, current))
+        elif obj in session.deleted:
+            changes.append((job_state(*(_previous(state.attrs[field]) for field in WORKLOAD_FIELDS)), None))
+        elif any(state.attrs[field].history.has_changes() for field in WORKLOAD_FIELDS):
+            changes.append((job_state(*(_previous(state.attrs[field]) for field in WORKLOAD_FIELDS)), current))
+    if changes:
+        apply_workload_changes(session.connection(), changes)
+
+
+def reconcile_workloads(session):
+    """Recalcula a carga de todos os usuários a partir das ocorrências; retorna quantos mudaram"""
+    table = User.__table__
+    actual = {
+        row.assigned_to: (row.jobs, row.lat, row.lon)
+        for row in session.execute(
+            select(
+                Occurrence.assigned_to, func.count(Occurrence.id).label('jobs'),
+                func.sum(Occurrence.latitude).label('lat'), func.sum(Occurrence.longitude).label('lon')
+            ).where(Occurrence.assigned_to.isnot(None), Occurrence.status.in_(ACTIVE_STATUSES))
+            .group_by(Occurrence.assigned_to)
+        )
+    }
+    rows = []
+    for user_id, jobs, lat_sum, lon_sum in session.execute(
+        select(table.c.id, table.c.active_jobs, table.c.active_jobs_lat_sum, table.c.active_jobs_lon_sum)
+    ):
+        expected_jobs, expected_lat, expected_lon = actual.get(user_id, (0, 0.0, 0.0))
+        if (jobs, round(lat_sum or 0, 6), round(lon_sum or 0, 6)) != (expected_jobs, round(expected_lat or 0, 6), round(expected_lon or 0, 6)):
+            rows.append({'b_user': user_id, 'b_jobs': expected_jobs, 'b_lat': expected_lat or 0.0, 'b_lon': expected_lon or 0.0})
+    if rows:
+        session.execute(
+            update(table).where(table.c.id == bindparam('b_user')).values(
+                active_jobs=bindparam('b_jobs'), active_jobs_lat_sum=bindparam('b_lat'),
+                active_jobs_lon_sum=bindparam('b_lon')
+            ),
+            rows
+        )
+    session.commit()
+    return len(rows)
+
+
+class Crew:
+    __slots__ = ('id', 'name', 'department_id', 'active_jobs', 'lat_sum', 'lon_sum')
+
+    def __init__(self, id, name, department_id, active_jobs, lat_sum, lon_sum):
+        self.id = id
+        self.name = name
+        self.department_id = department_id
+        self.active_jobs = active_jobs or 0
+        self.lat_sum = lat_sum or 0.0
+        self.lon_sum = lon_sum or 0.0
+
+    def centroid(self):
+        if self.active_jobs <= 0:
+            return None
+        return self.lat_sum / self.active_jobs, self.lon_sum / self.active_jobs
+
+
+class WorkloadBoard:
+    """Equipes de um ou mais departamentos em memória"""
+
+    def __init__(self, crews, config):
+        self.max_active_jobs = config['ASSIGNMENT_MAX_ACTIVE_JOBS']
+        self.load_weight_km = config['ASSIGNMENT_LOAD_WEIGHT_KM']
+        self.idle_travel_km = config['ASSIGNMENT_IDLE_TRAVEL_KM']
+        self.by_department = {}
+        for crew in crews:
+            self.by_department.setdefault(crew.department_id, []).append(crew)
+
+    @classmethod
+    def load(cls, session, config, department_ids=None):
+        query = session.query(
+            User.id, User.name, User.department_id, User.active_jobs,
+            User.active_jobs_lat_sum, User.active_jobs_lon_sum
+        ).filter(
+            User.is_active.is_(True),
+            User.user_type.in_(ASSIGNABLE_USER_TYPES),
+            User.department_id.isnot(None)
+        )
+        if department_ids is not None:
+            query = query.filter(User.department_id.in_(department_ids))
+        return cls([Crew(*row) for row in query], config)
+
+    def rank(self, department_id, latitude, longitude):
+        """[(custo, distância em km ou None, equipe)] do menor custo para o maior"""
+        ranked = []
+        for crew in self.by_department.get(department_id, ()):
+            if crew.active_jobs >= self.max_active_jobs:
+                continue
+            centroid = crew.centroid()
+            distance_km = haversine_m(latitude, longitude, *centroid) / 1000 if centroid else None
+            travel_km = self.idle_travel_km if distance_km is None else distance_km
+            ranked.append((travel_km + self.load_weight_km * crew.active_jobs, distance_km, crew))
+        ranked.sort(key=lambda item: (item[0], item[2].id))
+        return ranked
+
+    def assign(self, department_id, latitude, longitude):
+        """Escolhe a equipe e já conta a nova tarefa nela; None se não houver"""
+        ranked = self.rank(department_id, latitude, longitude)
+        if not ranked:
+            return None
+        crew = ranked[0][2]
+        crew.active_jobs += 1
+        crew.lat_sum += latitude
+        crew.lon_sum += longitude
+        return crew
+
+
+def suggest_assignees(session, config, department_id, latitude, longitude, limit=5):
+    board = WorkloadBoard.load(session, config, [department_id])
+    return [
+        {
+            'id': crew.id,
+            'name': crew.name,
+            'active_jobs': crew.active_jobs,
+            'distance_km': round(distance_km, 2) if distance_km is not None else None,
+            'score': round(cost, 3)
+        }
+        for cost, distance_km, crew in board.rank(department_id, latitude, longitude)[:limit]
+    ]
+
+
+def choose_assignee(session, config, department_id, latitude, longitude):
+    crew = WorkloadBoard.load(session, config, [department_id]).assign(department_id, latitude, longitude)
+    return crew.id if crew else None
+
+
+def assign_backlog(session, config, occurrence_ids=None, department_ids=None, apply=True, batch_size=500):
+    """
+    Atribui as ocorrências já triadas e sem responsável (em andamento ou
+    abertas com departamento), da mais antiga para a mais nova. Retorna a
+    lista de propostas [{occurrence_id, department_id, assigned_to, name}].
+    """
+    query = session.query(
+        Occurrence.id, Occurrence.department_id, Occurrence.status, Occurrence.latitude, Occurrence.longitude
+    ).filter(
+        Occurrence.assigned_to.is_(None),
+        Occurrence.department_id.isnot(None),
+        Occurrence.status.in_(ACTIVE_STATUSES)
+    )
+    if occurrence_ids is not None:
+        query = query.filter(Occurrence.id.in_(occurrence_ids))
+    if department_ids is not None:
+        query = query.filter(Occurrence.department_id.in_(department_ids))
+    rows = query.order_by(Occurrence.created_at, Occurrence.id).all()
+
+    board = WorkloadBoard.load(session, config, sorted({row.department_id for row in rows}))
+    proposals = []
+    for row in rows:
+        crew = board.assign(row.department_id, row.latitude, row.longitude)
+        if crew:
+            proposals.append({
+                'occurrence_id': row.id, 'department_id': row.department_id,
+                'assigned_to': crew.id, 'name': crew.name,
+                '_state': (job_state(None, row.status, row.latitude, row.longitude),
+                           job_state(crew.id, row.status, row.latitude, row.longitude))
+            })
+
+    if apply:
+        for start in range(0, len(proposals), batch_size):
+            batch = proposals[start:start + batch_size]
+            session.execute(update(Occurrence), [
+                {'id': item['occurrence_id'], 'assigned_to': item['assigned_to']} for item in batch
+            ])
+            apply_workload_changes(session.connection(), [item['_state'] for item in batch])
+            session.commit()
+    else:
+        session.rollback()
+    for item in proposals:
+        del item['_state']
+    return proposals
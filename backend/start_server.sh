@@ -8,11 +8,8 @@ echo "=================================================="
 # Diretório do backend
 cd /home/ubuntu/portal-cidadao-app/backend
 
-# Verificar se o banco de dados existe
-if [ ! -f "src/database/app.db" ]; then
-    echo "⚠️  Banco de dados não encontrado. Criando..."
-    python3.11 -c "from src.main import app; from src.utils.init_database import init_database; init_database(app)"
-fi
+# Criar tabelas e dados iniciais (idempotente, roda uma vez antes dos workers)
+python3.11 -m flask --app src.main init-db
 
 echo "✅ Banco de dados verificado"
 echo ""
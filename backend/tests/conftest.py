@@ -0,0 +1,47 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from src.main import create_app  # noqa: E402
+from src.models.models import db, User  # noqa: E402
+from src.utils.init_database import init_database  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Aplicação sobre um SQLite temporário, com as tabelas e os dados iniciais (sem demonstração)"""
+    def factory(**overrides):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'SQLALCHEMY_BINDS': {},
+            **overrides
+        })
+        init_database(app, demo_data=False)
+        return app
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Cria um usuário e retorna o cabeçalho com o token dele"""
+    numbers = itertools.count(1)
+
+    def factory(**fields):
+        with app.app_context():
+            number = next(numbers)
+            user = User(password_hash='x', **{'name': f'Teste {number}', 'email': f'teste{number}@teste.com', **fields})
+            db.session.add(user)
+            db.session.commit()
+            return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return factory
@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('duckdb')
+
+from src.models.models import (  # noqa: E402
+    db, Category, Occurrence, OccurrenceStatus, OccurrenceTimeline, Priority, User, UserType
+)
+from src.utils.analytics import export_analytics, parity  # noqa: E402
+
+STEPS = ['Triagem e Atribuição Concluída', 'Validação Concluída', 'Validação Rejeitada', 'Em Execução']
+
+
+def add_occurrences(count, rng, now):
+    citizen_ids = [row[0] for row in db.session.query(User.id).filter(User.user_type == UserType.CITIZEN)]
+    department_by_category = dict(db.session.query(Category.id, Category.department_id))
+    for _ in range(count):
+        created_at = now - timedelta(days=rng.uniform(0, 300))
+        status = rng.choice(list(OccurrenceStatus))
+        finished = status in (OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED)
+        category_id = rng.choice(list(department_by_category))
+        started_at = created_at + timedelta(hours=rng.uniform(1, 48)) if status != OccurrenceStatus.OPEN else None
+        occurrence = Occurrence(
+            title='Ocorrência de teste', description='Paridade do instantâneo', category_id=category_id,
+            department_id=department_by_category[category_id] if status != OccurrenceStatus.OPEN else None,
+            citizen_id=rng.choice(citizen_ids), status=status, priority=rng.choice(list(Priority)),
+            latitude=-21.245, longitude=-45.0, address=f'Rua {rng.randint(1, 9)}, 1, Bairro {rng.randint(1, 5)}',
+            rating=rng.randint(1, 5) if finished and rng.random() < 0.6 else None,
+            started_at=started_at,
+            completed_at=started_at + timedelta(hours=rng.uniform(1, 100)) if finished else None,
+            resolved_at=started_at + timedelta(hours=rng.uniform(100, 200)) if finished else None,
+            created_at=created_at, updated_at=now
+        )
+        db.session.add(occurrence)
+        db.session.flush()
+        for step in rng.sample(STEPS, rng.randint(0, 3)):
+            db.session.add(OccurrenceTimeline(
+                occurrence_id=occurrence.id, action='status_changed', status_change=step,
+                created_at=min(created_at + timedelta(hours=rng.uniform(0, 72)), now)
+            ))
+    db.session.commit()
+
+
+def test_snapshot_matches_database(app, tmp_path):
+    from src.routes.strategic_dashboard import LIVE_METRICS
+
+    rng = random.Random(7)
+    config = {**app.config, 'ANALYTICS_DIR': str(tmp_path / 'analytics')}
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'cidadao{i}@teste.com', 'password_hash': 'x', 'name': f'Cidadão {i}',
+             'user_type': UserType.CITIZEN, 'created_at': datetime.utcnow()}
+            for i in range(20)
+        ])
+        add_occurrences(300, rng, datetime.utcnow())
+
+        export_analytics(db.session, config, full=True, lag_seconds=0, log=lambda message: None)
+        for days in (30, 365):
+            assert parity(config, LIVE_METRICS, days) == {name: [] for name in LIVE_METRICS}
+
+        # A incremental regrava os meses alterados e acrescenta a timeline nova
+        changed = db.session.query(Occurrence).filter(Occurrence.status == OccurrenceStatus.OPEN).first()
+        changed.status = OccurrenceStatus.CLOSED
+        changed.resolved_at = changed.updated_at = datetime.utcnow()
+        db.session.commit()
+        add_occurrences(30, rng, datetime.utcnow())
+
+        export_analytics(db.session, config, lag_seconds=0, log=lambda message: None)
+        assert parity(config, LIVE_METRICS, 30) == {name: [] for name in LIVE_METRICS}
@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.models import db, Category, Occurrence, OccurrenceStatus, Priority, TriageRule
+from src.utils.auto_triage import Facts, RuleSet, hour_mask, invalidate_rules
+
+
+def rule(id, **fields):
+    return SimpleNamespace(**{
+        'id': id, 'position': id, 'category_ids': None, 'neighborhoods': None, 'keywords': None,
+        'min_support_count': None, 'hour_start': None, 'hour_end': None, 'department_id': None,
+        'priority': None, 'assigned_to': None, 'require_review': False, 'stop_processing': False, **fields
+    })
+
+
+def facts(**fields):
+    return Facts(**{'category_id': 1, 'neighborhood': 'centro', 'text': '', 'support_count': 0, 'hour': 12, **fields})
+
+
+@pytest.fixture(autouse=True)
+def fresh_rules():
+    invalidate_rules()
+    yield
+    invalidate_rules()
+
+
+def test_hour_mask_wraps_midnight():
+    mask = hour_mask(22, 6)
+    assert [hour for hour in range(24) if mask & 1 << hour] == [0, 1, 2, 3, 4, 5, 22, 23]
+
+
+def test_first_matching_rule_defines_each_action():
+    ruleset = RuleSet([
+        rule(1, category_ids=[2], department_id=9),
+        rule(2, keywords=['buraco fundo'], priority=Priority.HIGH),
+        rule(3, neighborhoods=['Centro'], department_id=5, priority=Priority.LOW),
+        rule(4, department_id=6),
+    ])
+
+    decision = ruleset.evaluate(facts(text='Há um buraco muito fundo na rua'))
+
+    assert decision.department_id == 5
+    assert decision.priority == Priority.HIGH
+    assert decision.rule_ids == [2, 3, 4]
+
+
+def test_conditions_filter_rules():
+    ruleset = RuleSet([
+        rule(1, category_ids=[2], department_id=1),
+        rule(2, neighborhoods=['Jardim América'], department_id=2),
+        rule(3, min_support_count=10, department_id=3),
+        rule(4, hour_start=22, hour_end=6, department_id=4),
+        rule(5, keywords=['desabamento'], department_id=5),
+    ])
+
+    assert ruleset.evaluate(facts()).rule_ids == []
+    assert ruleset.evaluate(facts(hour=23)).department_id == 4
+    assert ruleset.evaluate(facts(category_id=2)).department_id == 1
+    assert ruleset.evaluate(facts(support_count=10)).department_id == 3
+
+
+def test_stop_processing_and_review():
+    ruleset = RuleSet([
+        rule(1, keywords=['desabamento'], priority=Priority.URGENT, require_review=True, stop_processing=True),
+        rule(2, department_id=3),
+    ])
+
+    decision = ruleset.evaluate(facts(text='Risco de desabamento'))
+
+    assert decision == (None, Priority.URGENT, None, True, [1])
+
+
+def test_category_department_only_with_fallback():
+    rules = [rule(1, priority=Priority.HIGH)]
+
+    assert RuleSet(rules).evaluate(facts()).department_id is None
+    assert RuleSet(rules, {1: 7}).evaluate(facts()).department_id == 7
+
+
+def create(app, headers, title='Buraco na rua'):
+    with app.app_context():
+        category_id = db.session.query(Category.id).order_by(Category.id).first()[0]
+    response = app.test_client().post('/api/occurrences', headers=headers, json={
+        'title': title, 'description': 'Buraco grande em frente ao número 10', 'category_id': category_id,
+        'latitude': -21.245, 'longitude': -45.0, 'address': 'Rua de Teste, 10, Centro'
+    })
+    assert response.status_code == 201
+    with app.app_context():
+        occurrence = db.session.get(Occurrence, response.get_json()['occurrence']['id'])
+        return occurrence.status, occurrence.department_id, db.session.get(Category, category_id).department_id
+
+
+def test_auto_triage_is_opt_in(app, auth_headers):
+    status, department_id, _ = create(app, auth_headers())
+
+    assert (status, department_id) == (OccurrenceStatus.OPEN, None)
+
+
+def test_enabled_without_fallback_only_rules_triage(make_app, auth_headers):
+    app = make_app(AUTO_TRIAGE_ENABLED=True)
+
+    status, department_id, _ = create(app, auth_headers())
+
+    assert (status, department_id) == (OccurrenceStatus.OPEN, None)
+
+
+def test_enabled_rules_and_fallback_triage(make_app, auth_headers):
+    app = make_app(AUTO_TRIAGE_ENABLED=True, AUTO_TRIAGE_CATEGORY_FALLBACK=True)
+
+    headers = auth_headers()
+    status, department_id, category_department_id = create(app, headers)
+    assert (status, department_id) == (OccurrenceStatus.IN_PROGRESS, category_department_id)
+
+    with app.app_context():
+        db.session.add(TriageRule(name='Iluminação', keywords=['poste'], department_id=category_department_id + 1))
+        db.session.commit()
+    invalidate_rules()
+    status, department_id, _ = create(app, headers, title='Poste apagado')
+    assert (status, department_id) == (OccurrenceStatus.IN_PROGRESS, category_department_id + 1)
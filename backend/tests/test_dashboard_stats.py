@@ -0,0 +1,117 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src.models.models import db, Category, Department, Occurrence, OccurrenceStatus, Priority, User, UserType
+
+# Consultas por requisição: usuário do token + agregados (não crescem com o número de ocorrências)
+QUERY_BUDGET = {
+    '/api/admin/dashboard/stats': 3,
+    '/api/admin/dashboard/performance-by-department': 2,
+    '/api/political/dashboard/political-metrics': 1,
+    '/api/political/dashboard/performance-trends': 1,
+}
+
+
+@pytest.fixture
+def dashboard(app, auth_headers):
+    """Ocorrências variadas, as respostas de cada rota e as consultas feitas por elas"""
+    rng = random.Random(42)
+    headers = auth_headers(user_type=UserType.ADMIN)
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'cidadao{i}@teste.com', 'password_hash': 'x', 'name': f'Cidadão {i}',
+             'user_type': UserType.CITIZEN, 'created_at': now}
+            for i in range(40)
+        ])
+        db.session.commit()
+        citizen_ids = [row[0] for row in db.session.query(User.id).filter(User.user_type == UserType.CITIZEN)]
+        department_by_category = dict(db.session.query(Category.id, Category.department_id))
+        rows = []
+        for _ in range(600):
+            created_at = now - timedelta(days=rng.uniform(0, 240))
+            status = rng.choice(list(OccurrenceStatus))
+            resolved = status in (OccurrenceStatus.RESOLVED, OccurrenceStatus.CLOSED)
+            category_id = rng.choice(list(department_by_category))
+            rows.append({
+                'title': 'Ocorrência de teste', 'description': 'Dashboards',
+                'category_id': category_id, 'department_id': department_by_category[category_id],
+                'citizen_id': rng.choice(citizen_ids), 'status': status, 'priority': rng.choice(list(Priority)),
+                'latitude': -21.245, 'longitude': -45.0, 'address': 'Rua de Teste, 1, Centro',
+                'rating': rng.randint(1, 5) if resolved and rng.random() < 0.6 else None,
+                'resolved_at': created_at + timedelta(hours=rng.uniform(1, 400)) if resolved else None,
+                'created_at': created_at, 'updated_at': created_at
+            })
+        db.session.execute(Occurrence.__table__.insert(), rows)
+        db.session.commit()
+        names = dict(db.session.query(Department.id, Department.name))
+
+    statements = []
+    # O BEGIN explícito do SQLite (src/utils/database.py) não conta
+    listener = lambda conn, cursor, statement, *args: statement.startswith('SELECT') and statements.append(statement)
+    client = app.test_client()
+    responses, queries = {}, {}
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            for path in QUERY_BUDGET:
+                statements.clear()
+                response = client.get(path, headers=headers)
+                assert response.status_code == 200, path
+                responses[path] = response.get_json()
+                queries[path] = len(statements)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return {'now': now, 'rows': rows, 'names': names, 'citizens': len(citizen_ids),
+            'responses': responses, 'queries': queries}
+
+
+def test_dashboards_stay_within_query_budget(dashboard):
+    assert all(dashboard['queries'][path] <= budget for path, budget in QUERY_BUDGET.items()), dashboard['queries']
+
+
+def test_dashboards_match_python_reference(dashboard):
+    rows, now = dashboard['rows'], dashboard['now']
+    responses = dashboard['responses']
+    finished = [row for row in rows if row['resolved_at'] is not None]
+    rated = [row['rating'] for row in rows if row['rating'] is not None]
+    status_counts = Counter(row['status'] for row in rows)
+    priority_counts = Counter(row['priority'] for row in rows)
+    avg_hours = round(sum((row['resolved_at'] - row['created_at']).total_seconds() / 3600
+                          for row in finished) / len(finished), 1)
+    avg_rating = round(sum(rated) / len(rated), 1)
+
+    assert responses['/api/admin/dashboard/stats'] == {
+        'total_occurrences': len(rows),
+        'status_breakdown': {status.value: status_counts[status] for status in OccurrenceStatus},
+        'priority_breakdown': {'urgent': priority_counts[Priority.URGENT], 'high': priority_counts[Priority.HIGH]},
+        'recent_occurrences': sum(1 for row in rows if row['created_at'] >= now - timedelta(days=30)),
+        'avg_resolution_time_hours': avg_hours,
+        'avg_rating': avg_rating,
+        'total_citizens': dashboard['citizens']
+    }
+
+    metrics = responses['/api/political/dashboard/political-metrics']
+    assert metrics['total_occurrences'] == len(rows)
+    assert metrics['avg_resolution_hours'] == avg_hours
+    assert metrics['avg_rating'] == avg_rating
+    assert metrics['active_citizens'] == len({row['citizen_id'] for row in rows})
+
+    department_totals = Counter(row['department_id'] for row in rows)
+    department_resolved = Counter(row['department_id'] for row in finished)
+    assert {
+        item['name']: (item['total'], item['resolved'])
+        for item in responses['/api/admin/dashboard/performance-by-department']['departments']
+    } == {
+        dashboard['names'][department_id]: (total, department_resolved[department_id])
+        for department_id, total in department_totals.items()
+    }
+
+    six_months_ago = now - timedelta(days=180)
+    trends = responses['/api/political/dashboard/performance-trends']['trends']
+    assert sum(item['total'] for item in trends) == sum(1 for row in rows if row['created_at'] >= six_months_ago)
+    assert sum(item['resolved'] for item in trends) == sum(1 for row in finished if row['created_at'] >= six_months_ago)
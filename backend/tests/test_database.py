@@ -0,0 +1,50 @@
+from sqlalchemy import event, text
+
+from src.models.models import db
+from src.utils.database import write_intent
+
+
+def begin_statements(app, action):
+    statements = []
+    with app.app_context():
+        listener = lambda conn, cursor, statement, *args: statement.startswith('BEGIN') and statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            action()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return statements
+
+
+def select_one():
+    db.session.execute(text('SELECT 1'))
+    db.session.commit()
+
+
+def test_writer_processes_begin_immediate(app):
+    def action():
+        select_one()
+        write_intent()
+        select_one()
+
+    assert begin_statements(app, action) == ['BEGIN', 'BEGIN IMMEDIATE']
+
+
+def test_read_requests_begin_deferred(app):
+    client = app.test_client()
+
+    assert begin_statements(app, lambda: client.get('/api/admin/categories')) == ['BEGIN']
+
+
+def test_forked_children_do_not_reuse_parent_connections(app):
+    import os
+
+    with app.app_context():
+        select_one()
+        assert db.engine.pool.checkedin() > 0
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if db.engine.pool.checkedin() == 0 else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert db.engine.pool.checkedin() > 0
@@ -0,0 +1,129 @@
+import csv
+import io
+import zipfile
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+
+import pytest
+
+from src.models.models import (
+    db, Category, Occurrence, OccurrenceStatus, OccurrenceTimeline, Priority, User, UserType
+)
+from src.utils.export import OCCURRENCE_HEADERS, TIMELINE_HEADERS, xlsx_stream
+
+MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+TITLES = ['Buraco na rua', '=HYPERLINK("http://x","clique")', '+55 35 9999', '-1', '@SUM(A1)', '\tTabulação',
+          'Poste <apagado> & fios', 'Lixo\x01acumulado']
+
+
+@pytest.fixture
+def exported(app, auth_headers):
+    """Ocorrências variadas (status, prioridade, categoria, cidadão, apoios) com timeline; retorna o cabeçalho admin"""
+    with app.app_context():
+        categories = [row.id for row in db.session.query(Category.id).order_by(Category.id).limit(2)]
+        citizens = [
+            User(email=f'cidadao{i}@teste.com', password_hash='x', name=f'Cidadão {i}', user_type=UserType.CITIZEN)
+            for i in range(2)
+        ]
+        db.session.add_all(citizens)
+        db.session.flush()
+        start = datetime.utcnow() - timedelta(days=10)
+        statuses, priorities = list(OccurrenceStatus), list(Priority)
+        occurrences = [
+            Occurrence(title=title, description='Descrição de teste', category_id=categories[i % 2],
+                       citizen_id=citizens[i % 2 == 0].id, status=statuses[i % len(statuses)],
+                       priority=priorities[i % len(priorities)], support_count=(i * 3) % 5,
+                       latitude=-21.245, longitude=-45.0, address=f'Rua {i}, {i}, Centro',
+                       created_at=start + timedelta(hours=i))
+            for i, title in enumerate(TITLES)
+        ]
+        db.session.add_all(occurrences)
+        db.session.flush()
+        db.session.add_all(
+            OccurrenceTimeline(occurrence_id=occurrence.id, action='created', description='Ocorrência criada',
+                               created_at=occurrence.created_at)
+            for occurrence in occurrences
+        )
+        db.session.commit()
+    return auth_headers(user_type=UserType.ADMIN)
+
+
+def read_csv(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    text = response.get_data().decode('utf-8')
+    assert text.startswith('﻿')
+    return list(csv.reader(io.StringIO(text[1:])))
+
+
+def test_export_uses_the_list_filters_and_order(make_app, exported):
+    app = make_app(EXPORT_BATCH_SIZE=2)
+    client = app.test_client()
+    with app.app_context():
+        category_id = db.session.query(Category.id).order_by(Category.id).first().id
+        citizen_id = db.session.query(User.id).filter_by(email='cidadao0@teste.com').scalar()
+
+    for filters in ({}, {'status': 'open'}, {'priority': 'high'}, {'category_id': category_id},
+                    {'citizen_id': citizen_id}, {'sort': 'most_supported'},
+                    {'status': 'open', 'category_id': category_id}, {'search': 'buraco'}):
+        listed = client.get('/api/occurrences', query_string={**filters, 'per_page': 100}).get_json()
+        assert listed['occurrences'], filters
+        rows = read_csv(client.get('/api/occurrences/export', query_string=filters, headers=exported))
+        assert tuple(rows[0]) == OCCURRENCE_HEADERS
+        assert [int(row[0]) for row in rows[1:]] == [item['id'] for item in listed['occurrences']], filters
+
+        timeline = read_csv(client.get('/api/occurrences/export/timeline', query_string=filters, headers=exported))
+        assert tuple(timeline[0]) == TIMELINE_HEADERS
+        assert sorted(int(row[1]) for row in timeline[1:]) == sorted(item['id'] for item in listed['occurrences'])
+
+
+def test_csv_export_neutralizes_formulas(app, exported):
+    rows = read_csv(app.test_client().get('/api/occurrences/export', headers=exported))
+    titles = {row[OCCURRENCE_HEADERS.index('titulo')] for row in rows[1:]}
+    assert titles == {
+        'Buraco na rua', '\'=HYPERLINK("http://x","clique")', "'+55 35 9999", "'-1", "'@SUM(A1)",
+        "'\tTabulação", 'Poste <apagado> & fios', 'Lixo\x01acumulado'
+    }
+
+
+def sheet_rows(archive, name):
+    root = ElementTree.fromstring(archive.read(name))
+    return [
+        [cell.findtext(f'{MAIN}is/{MAIN}t') if cell.get('t') == 'inlineStr' else cell.findtext(f'{MAIN}v')
+         for cell in row]
+        for row in root.iter(f'{MAIN}row')
+    ]
+
+
+def test_xlsx_export_is_a_valid_workbook(app, exported):
+    response = app.test_client().get('/api/occurrences/export', query_string={'format': 'xlsx'}, headers=exported)
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].endswith('.xlsx"')
+
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        assert archive.testzip() is None
+        assert {'[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/_rels/workbook.xml.rels',
+                'xl/worksheets/sheet1.xml'} <= set(archive.namelist())
+        for name in archive.namelist():
+            ElementTree.fromstring(archive.read(name))
+        rows = sheet_rows(archive, 'xl/worksheets/sheet1.xml')
+
+    assert tuple(rows[0]) == OCCURRENCE_HEADERS
+    titles = {row[OCCURRENCE_HEADERS.index('titulo')] for row in rows[1:]}
+    # Caracteres de controle inválidos em XML saem; o texto não é interpretado como fórmula no XLSX
+    assert {'Poste <apagado> & fios', 'Lixoacumulado', '=HYPERLINK("http://x","clique")'} <= titles
+    assert len(rows) == len(TITLES) + 1
+
+
+def test_xlsx_continues_on_new_sheets():
+    rows = [(i, f'linha {i}') for i in range(7)]
+    data = b''.join(xlsx_stream('Ocorrências', ('id', 'titulo'), iter(rows), batch_size=2, max_rows=3))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        names = [sheet.get('name') for sheet in workbook.iter(f'{MAIN}sheet')]
+        assert names == ['Ocorrências', 'Ocorrências 2', 'Ocorrências 3']
+        content_types = archive.read('[Content_Types].xml').decode()
+        sheets = [sheet_rows(archive, f'xl/worksheets/sheet{index}.xml') for index in (1, 2, 3)]
+    assert all(f'/xl/worksheets/sheet{index}.xml' in content_types for index in (1, 2, 3))
+    assert all(sheet[0] == ['id', 'titulo'] for sheet in sheets)
+    assert [row for sheet in sheets for row in sheet[1:]] == [[str(i), f'linha {i}'] for i in range(7)]
@@ -0,0 +1,109 @@
+import multiprocessing
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from src.main import create_app
+from src.models.models import db, Job, JobStatus
+from src.utils.jobs import QUEUE_LOCK_CLASS, claim, lock_queue, queue_lock_key
+
+
+def add_jobs(count):
+    past = datetime.utcnow() - timedelta(seconds=1)
+    db.session.execute(Job.__table__.insert(), [
+        {'queue': 'teste', 'name': 'tarefa', 'status': JobStatus.PENDING, 'attempts': 0,
+         'max_attempts': 3, 'run_at': past, 'created_at': past}
+        for _ in range(count)
+    ])
+    db.session.commit()
+
+
+def test_claim_respects_queue_limit(make_app):
+    app = make_app(JOB_QUEUE_CONCURRENCY={'teste': 2})
+    with app.app_context():
+        add_jobs(3)
+
+        claimed = [claim(db.session, ['teste'], f'worker-{i}', app.config) for i in range(3)]
+
+        assert [row is not None for row in claimed] == [True, True, False]
+        assert Job.query.filter_by(status=JobStatus.RUNNING).count() == 2
+
+
+def claim_in_process(uri, start, results):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'SQLALCHEMY_BINDS': {}, 'JOB_QUEUE_CONCURRENCY': {'teste': 5}})
+    with app.app_context():
+        start.wait()
+        try:
+            claimed = [claim(db.session, ['teste'], f'worker-{i}', app.config) for i in range(10)]
+            results.put([row.id for row in claimed if row is not None])
+        except Exception as e:
+            results.put(repr(e))
+
+
+def test_concurrent_claims_from_processes(make_app, tmp_path):
+    app = make_app(JOB_QUEUE_CONCURRENCY={'teste': 5})
+    with app.app_context():
+        add_jobs(20)
+    context = multiprocessing.get_context('spawn')
+    start, results = context.Event(), context.Queue()
+    processes = [context.Process(target=claim_in_process, args=(app.config['SQLALCHEMY_DATABASE_URI'], start, results))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    start.set()
+    found = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert all(isinstance(ids, list) for ids in found), found
+    claimed = [job_id for ids in found for job_id in ids]
+    assert len(claimed) == len(set(claimed)) == 5
+    with app.app_context():
+        assert Job.query.filter_by(status=JobStatus.RUNNING).count() == 5
+
+
+def test_postgresql_claims_take_queue_advisory_lock():
+    statements = []
+    session = SimpleNamespace(
+        get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()),
+        execute=statements.append
+    )
+
+    lock_queue(session, 'notifications')
+
+    compiled = statements[0].compile(dialect=postgresql.dialect())
+    assert 'pg_advisory_xact_lock' in str(compiled)
+    assert list(compiled.params.values()) == [QUEUE_LOCK_CLASS, queue_lock_key('notifications')]
+    assert -2 ** 31 <= queue_lock_key('notifications') < 2 ** 31
+
+
+def test_sqlite_claims_skip_advisory_lock(app):
+    with app.app_context():
+        statements = []
+        session = SimpleNamespace(get_bind=db.session.get_bind, execute=statements.append)
+        lock_queue(session, 'notifications')
+        assert statements == []
+
+
+def test_worker_backs_off_when_database_is_busy(app, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from src.utils import jobs
+
+    calls, waits, messages = [], [], []
+
+    def busy_claim(session, queues, worker_id, config):
+        calls.append(1)
+        if len(calls) < 3:
+            raise OperationalError('UPDATE jobs', {}, Exception('database is locked'))
+        return None
+
+    monkeypatch.setattr(jobs, 'claim', busy_claim)
+    monkeypatch.setattr(jobs.time, 'sleep', waits.append)
+    with app.app_context():
+        stats = jobs.run_worker(db.session, app.config, ['teste'], burst=True, log=messages.append)
+
+    assert stats == {'done': 0, 'failed': 0}
+    assert len(calls) == 3
+    assert len(waits) == 2 and waits[0] < waits[1] * 1.5
+    assert all('database is locked' in message for message in messages)
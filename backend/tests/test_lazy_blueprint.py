@@ -0,0 +1,13 @@
+def test_each_request_matches_its_own_lazy_route(make_app):
+    app = make_app(LAZY_BLUEPRINTS=True)
+    client = app.test_client()
+
+    # Na mesma app context o g é compartilhado entre as requisições
+    with app.app_context():
+        first = client.get('/api/political/dashboard/political-metrics')
+        second = client.get('/api/political/dashboard/performance-trends')
+        missing = client.get('/api/political/nao-existe')
+
+    assert 'total_occurrences' in first.get_json()
+    assert 'trends' in second.get_json()
+    assert missing.status_code == 404
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from src.models.models import db, Category, Occurrence, OccurrencePhoto, User, UserType
+
+
+def add_occurrences(count, photos=0):
+    category = db.session.query(Category).first()
+    citizen = User(email='cidadao@teste.com', password_hash='x', name='Cidadão', user_type=UserType.CITIZEN)
+    db.session.add(citizen)
+    db.session.flush()
+    occurrences = [
+        Occurrence(title=f'Ocorrência {i}', description='Descrição de teste', category_id=category.id,
+                   citizen_id=citizen.id, latitude=-21.245, longitude=-45.0, address='Rua de Teste, 1, Centro',
+                   photo_count=photos)
+        for i in range(count)
+    ]
+    db.session.add_all(occurrences)
+    db.session.flush()
+    db.session.add_all(
+        OccurrencePhoto(occurrence_id=occurrence.id, filename=f'{occurrence.id}-{i}.jpg',
+                        original_filename='foto.jpg', uploaded_at=datetime.utcnow())
+        for occurrence in occurrences for i in range(photos)
+    )
+    db.session.commit()
+    return [occurrence.id for occurrence in occurrences]
+
+
+def test_list_reads_photo_count_without_loading_photos(app):
+    with app.app_context():
+        ids = add_occurrences(8, photos=2)
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *a: statements.append(statement))
+
+    response = app.test_client().get('/api/occurrences?per_page=20')
+    assert response.status_code == 200
+    items = response.get_json()['occurrences']
+    assert len(items) == len(ids)
+    assert all(item['photo_count'] == 2 and 'photos' not in item for item in items)
+    assert not [statement for statement in statements if 'occurrence_photos' in statement]
+
+    detail = app.test_client().get(f'/api/occurrences/{ids[0]}').get_json()['occurrence']
+    assert [photo['filename'] for photo in detail['photos']] == [f'{ids[0]}-0.jpg', f'{ids[0]}-1.jpg']
+
+
+def occurrence_payload(category_id, **fields):
+    return {
+        'title': 'Buraco grande na Rua das Flores', 'description': 'Buraco no asfalto em frente ao número 120',
+        'category_id': category_id, 'latitude': -21.2450, 'longitude': -45.0000,
+        'address': 'Rua das Flores, 120, Centro', **fields
+    }
+
+
+def test_similar_occurrence_nearby_suggests_support(app, auth_headers):
+    with app.app_context():
+        category_id, other_category_id = [row.id for row in db.session.query(Category.id).limit(2)]
+    client = app.test_client()
+    first = client.post('/api/occurrences', json=occurrence_payload(category_id), headers=auth_headers())
+    assert first.status_code == 201
+    original_id = first.get_json()['occurrence']['id']
+
+    # Mesmo problema a ~30 m, com o texto um pouco diferente
+    payload = occurrence_payload(category_id, title='Buraco grande na Rua das Flores!',
+                                 description='Buraco no asfalto em frente ao 120', latitude=-21.2452, longitude=-45.0002)
+    headers = auth_headers()
+    response = client.post('/api/occurrences', json=payload, headers=headers)
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body['suggestion'] == 'support'
+    assert [duplicate['id'] for duplicate in body['duplicates']] == [original_id]
+    assert body['duplicates'][0]['distance_m'] < 50
+    assert 0.5 <= body['duplicates'][0]['similarity'] <= 1
+
+    # Outra categoria, longe dali ou confirmada pelo cidadão: registra
+    assert client.post('/api/occurrences', json=dict(payload, category_id=other_category_id),
+                       headers=headers).status_code == 201
+    assert client.post('/api/occurrences', json=dict(payload, latitude=-21.2600),
+                       headers=headers).status_code == 201
+    assert client.post('/api/occurrences', json=dict(payload, force_create=True), headers=headers).status_code == 201
+    with app.app_context():
+        assert db.session.query(Occurrence).count() == 4
+
+
+def test_duplicate_detection_can_be_disabled(make_app, auth_headers):
+    app = make_app(DUPLICATE_DETECTION_ENABLED=False)
+    with app.app_context():
+        category_id = db.session.query(Category.id).first().id
+    client = app.test_client()
+    for _ in range(2):
+        assert client.post('/api/occurrences', json=occurrence_payload(category_id),
+                           headers=auth_headers()).status_code == 201
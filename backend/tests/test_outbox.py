@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from src.models.models import db, OutboxEvent
+from src.utils.outbox import CONSUMERS, Consumer, deliver, get_offset
+
+
+def add_event(event_id, created_at):
+    db.session.add(OutboxEvent(id=event_id, occurrence_id=1, event_type='occurrence_created', created_at=created_at))
+    db.session.commit()
+
+
+def test_lower_id_committed_late_is_still_delivered(make_app, monkeypatch):
+    app = make_app(OUTBOX_RELAY_LAG_SECONDS=0, OUTBOX_GAP_TIMEOUT_SECONDS=10)
+    received = []
+    monkeypatch.setitem(CONSUMERS, 'teste', Consumer(lambda session, events, config: received.extend(
+        event.id for event in events), None))
+
+    with app.app_context():
+        recent = datetime.utcnow() - timedelta(seconds=3)
+        add_event(1, recent)
+        add_event(2, recent)
+        assert deliver(db.session, 'teste', app.config, 100) == 2
+
+        # O 4 confirma antes do 3 (transação ainda aberta)
+        add_event(4, recent)
+        assert deliver(db.session, 'teste', app.config, 100) == 0
+        assert get_offset(db.session, 'teste') == 2
+
+        add_event(3, recent - timedelta(seconds=1))
+        assert deliver(db.session, 'teste', app.config, 100) == 2
+
+    assert received == [1, 2, 3, 4]
+
+
+def test_gap_is_skipped_after_timeout(make_app, monkeypatch):
+    app = make_app(OUTBOX_RELAY_LAG_SECONDS=0, OUTBOX_GAP_TIMEOUT_SECONDS=10)
+    received = []
+    monkeypatch.setitem(CONSUMERS, 'teste', Consumer(lambda session, events, config: received.extend(
+        event.id for event in events), None))
+
+    with app.app_context():
+        add_event(1, datetime.utcnow() - timedelta(minutes=1))
+        # O 2 foi desfeito; o 3 já espera além do prazo
+        add_event(3, datetime.utcnow() - timedelta(seconds=11))
+        add_event(5, datetime.utcnow())
+        assert deliver(db.session, 'teste', app.config, 100) == 2
+
+    assert received == [1, 3]
+
+
+def test_default_gap_timeout_is_short(app):
+    # Cada rollback no PostgreSQL deixa um buraco; a espera não pode parar os consumidores por minutos
+    assert app.config['OUTBOX_GAP_TIMEOUT_SECONDS'] <= 30
+    assert app.config['OUTBOX_GAP_TIMEOUT_SECONDS'] * 1000 > app.config['DB_WRITE_TIMEOUT_MS']
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from src.models.models import db, Category, Occurrence, Priority, User, UserType
+
+
+def test_department_queue_orders_by_priority(app, auth_headers):
+    with app.app_context():
+        category = Category.query.first()
+        department_id = category.department_id
+        citizen = User(email='cidadao@teste.local', password_hash='x', name='Cidadão')
+        db.session.add(citizen)
+        db.session.flush()
+        now = datetime.utcnow()
+        # Ordem alfabética dos nomes do enum seria HIGH, LOW, MEDIUM, URGENT
+        for offset, priority in enumerate([Priority.LOW, Priority.HIGH, Priority.URGENT, Priority.MEDIUM]):
+            db.session.add(Occurrence(
+                title=priority.value, description='Fila do departamento', category_id=category.id,
+                citizen_id=citizen.id, department_id=department_id, priority=priority,
+                latitude=-21.245, longitude=-45.0, address='Rua de Teste, 1, Centro',
+                created_at=now + timedelta(minutes=offset)
+            ))
+        db.session.commit()
+
+    headers = auth_headers(email='gestor@teste.local', user_type=UserType.DEPARTMENT_MANAGER,
+                           department_id=department_id)
+    response = app.test_client().get('/api/triage/department/my-occurrences', headers=headers)
+
+    assert response.status_code == 200
+    assert [item['priority'] for item in response.get_json()] == ['urgent', 'high', 'medium', 'low']
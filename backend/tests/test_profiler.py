@@ -0,0 +1,23 @@
+from src.utils.profiler import profiler
+
+
+def test_profiles_one_lazy_dashboard_route(make_app):
+    app = make_app(
+        LAZY_BLUEPRINTS=True,
+        PROFILER_ENABLED=True,
+        PROFILER_SAMPLE_RATE=10 ** 9,
+        PROFILER_ROUTES=('/api/strategic/heatmap',)
+    )
+    seen = []
+
+    # Registrado depois do profiler, roda antes dele no teardown
+    @app.teardown_request
+    def capture(exc):
+        seen.append(dict(profiler._active))
+
+    client = app.test_client()
+    client.get('/api/strategic/hotspots')
+    client.get('/api/strategic/heatmap')
+
+    assert [list(active.values()) for active in seen] == [[], ['GET /api/strategic/heatmap']]
+    assert profiler.stats()['profiled_requests'] == 1
@@ -0,0 +1,51 @@
+import random
+
+from src.utils.routing import distance_matrix, nearest_neighbor, prefix_sums, reversal_delta, route_cost, two_opt
+
+
+def instance(rng, size):
+    points = [(-21.245 + rng.uniform(-0.05, 0.05), -45.0 + rng.uniform(-0.05, 0.05)) for _ in range(size + 1)]
+    return distance_matrix(points), [1] + [rng.choice((1, 2, 3, 4, 6, 8, 12)) for _ in range(size)]
+
+
+def naive_two_opt(order, matrix, weights, urgency, max_passes=20):
+    """O 2-opt anterior, que recalculava a rota inteira a cada candidata"""
+    best = route_cost(order, matrix, weights, urgency)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(order) - 1):
+            for k in range(i + 1, len(order)):
+                candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                cost = route_cost(candidate, matrix, weights, urgency)
+                if cost < best - 1e-9:
+                    order, best = candidate, cost
+                    improved = True
+        if not improved:
+            break
+    return order, best
+
+
+def test_reversal_delta_matches_full_cost():
+    rng = random.Random(1)
+    for size in (2, 3, 7, 15):
+        matrix, weights = instance(rng, size)
+        order = rng.sample(range(1, size + 1), size)
+        sums = prefix_sums(order, matrix, weights)
+        for urgency in (0, 0.1, 2):
+            cost = route_cost(order, matrix, weights, urgency)
+            for i in range(size - 1):
+                for k in range(i + 1, size):
+                    candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                    expected = route_cost(candidate, matrix, weights, urgency) - cost
+                    assert abs(reversal_delta(order, i, k, matrix, sums, urgency) - expected) < 1e-9
+
+
+def test_two_opt_matches_full_recomputation():
+    rng = random.Random(2)
+    for size in (1, 5, 12, 30):
+        matrix, weights = instance(rng, size)
+        start = nearest_neighbor(matrix, weights)
+        order, cost = two_opt(start, matrix, weights, 0.1)
+        expected_order, expected_cost = naive_two_opt(start, matrix, weights, 0.1)
+        assert order == expected_order
+        assert abs(cost - expected_cost) < 1e-9
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from src.models.models import db, Category, Occurrence, OccurrenceStatus, OccurrenceTimeline, OutboxEvent, Priority
+from src.utils.sla import AT_RISK_ACTION, BREACHED_ACTION, PolicyTable, invalidate_policies, scan_sla
+
+
+def policy(id, hours, category_id=None, department_id=None, priority=None, at_risk_hours=None):
+    return SimpleNamespace(id=id, hours=hours, category_id=category_id, department_id=department_id,
+                           priority=priority, at_risk_hours=at_risk_hours)
+
+
+@pytest.fixture(autouse=True)
+def fresh_policies():
+    invalidate_policies()
+    yield
+    invalidate_policies()
+
+
+def test_most_specific_policy_wins():
+    table = PolicyTable([
+        policy(1, 100),
+        policy(2, 50, priority=Priority.URGENT),
+        policy(3, 40, department_id=2),
+        policy(4, 30, department_id=2, priority=Priority.URGENT, at_risk_hours=6),
+        policy(5, 20, category_id=7),
+    ], default_at_risk_hours=24)
+
+    assert table.lookup(7, 2, Priority.URGENT).id == 5
+    assert table.lookup(1, 2, Priority.URGENT) == (4, 30, 6)
+    assert table.lookup(1, 2, Priority.LOW).id == 3
+    assert table.lookup(1, 3, Priority.URGENT).id == 2
+    assert table.lookup(1, 3, Priority.LOW) == (1, 100, 24)
+    assert table.max_at_risk_hours == 24
+
+
+def test_without_policy_priority_target_applies():
+    table = PolicyTable([], default_at_risk_hours=12)
+    created_at = datetime(2026, 1, 1)
+
+    assert table.lookup(1, 1, Priority.URGENT) == (None, 24, 12)
+    assert table.due_at(1, 1, Priority.HIGH, created_at) == created_at + timedelta(hours=72)
+
+
+def add_occurrences(now, due_in_hours, **fields):
+    category = db.session.query(Category).first()
+    ids = []
+    for hours in due_in_hours:
+        occurrence = Occurrence(
+            title='Prazo', description='Teste de SLA', category_id=category.id, department_id=category.department_id,
+            citizen_id=1, status=OccurrenceStatus.IN_PROGRESS, priority=Priority.MEDIUM,
+            latitude=-21.245, longitude=-45.0, address='Rua de Teste, 1, Centro',
+            sla_due_at=now + timedelta(hours=hours), **fields
+        )
+        db.session.add(occurrence)
+        db.session.flush()
+        ids.append(occurrence.id)
+    db.session.commit()
+    return ids
+
+
+def test_scan_emits_each_warning_and_breach_once(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        breached, at_risk, later = add_occurrences(now, [-1, 2, 200])
+
+        found = scan_sla(db.session, app.config, now=now)
+        assert sorted((item['event'], item['occurrence_id']) for item in found) == [
+            (AT_RISK_ACTION, at_risk), (BREACHED_ACTION, breached)
+        ]
+        assert scan_sla(db.session, app.config, now=now) == []
+
+        marks = dict((row.id, (row.sla_warned_at, row.sla_breached_at)) for row in
+                     db.session.query(Occurrence.id, Occurrence.sla_warned_at, Occurrence.sla_breached_at))
+        assert marks[breached] == (now, now)
+        assert marks[at_risk] == (now, None)
+        assert marks[later] == (None, None)
+        assert db.session.query(OccurrenceTimeline).filter(
+            OccurrenceTimeline.action.in_([AT_RISK_ACTION, BREACHED_ACTION])).count() == 2
+        assert db.session.query(OutboxEvent).filter(
+            OutboxEvent.event_type.in_([AT_RISK_ACTION, BREACHED_ACTION])).count() == 2
+
+        # O aviso já emitido vira estouro depois do prazo
+        later_now = now + timedelta(hours=3)
+        assert [item['event'] for item in scan_sla(db.session, app.config, now=later_now)] == [BREACHED_ACTION]
+
+
+def test_dry_run_changes_nothing(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        add_occurrences(now, [-1])
+
+        assert len(scan_sla(db.session, app.config, now=now, apply=False)) == 1
+        assert db.session.query(Occurrence).filter(Occurrence.sla_breached_at.isnot(None)).count() == 0
+
+
+def test_rows_marked_after_the_read_are_not_emitted_again(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        first, second = add_occurrences(now, [-2, -1])
+
+        # Outra varredura marca a primeira entre a leitura e o UPDATE desta
+        def concurrent_scan(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('UPDATE occurrences') and not done:
+                done.append(1)
+                conn.exec_driver_sql('UPDATE occurrences SET sla_breached_at = ? WHERE id = ?', (now, first))
+
+        done = []
+        event.listen(db.engine, 'before_cursor_execute', concurrent_scan)
+        try:
+            found = scan_sla(db.session, app.config, now=now)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', concurrent_scan)
+
+        assert [item['occurrence_id'] for item in found] == [second]
+        assert db.session.query(OccurrenceTimeline).filter(OccurrenceTimeline.action == BREACHED_ACTION).count() == 1
@@ -0,0 +1,102 @@
+import multiprocessing
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from src.main import create_app
+from src.models.models import db, Category, Occurrence, OccurrenceSupport, OccurrenceTimeline, User, UserType
+from src.utils.supports import TIMELINE_ACTION, add_supports, record_support_timeline
+
+# Janela longa: os apoios do teste caem na mesma
+WINDOW_MINUTES = 10 ** 6
+
+
+def add_occurrence():
+    category = db.session.query(Category).first()
+    author = User(email='autor@teste.com', password_hash='x', name='Autor', user_type=UserType.CITIZEN)
+    db.session.add(author)
+    db.session.flush()
+    occurrence = Occurrence(
+        title='Buraco', description='Buraco na rua', category_id=category.id, citizen_id=author.id,
+        latitude=-21.245, longitude=-45.0, address='Rua de Teste, 1, Centro'
+    )
+    db.session.add(occurrence)
+    db.session.commit()
+    return occurrence.id
+
+
+def add_citizens(count, prefix):
+    db.session.execute(User.__table__.insert(), [
+        {'email': f'{prefix}{i}@teste.com', 'password_hash': 'x', 'name': f'Cidadão {prefix}{i}',
+         'user_type': UserType.CITIZEN, 'created_at': datetime.utcnow()}
+        for i in range(count)
+    ])
+    db.session.commit()
+    return db.session.query(User).filter(User.email.like(f'{prefix}%')).order_by(User.id).all()
+
+
+def support_entries(occurrence_id):
+    return db.session.query(OccurrenceTimeline).filter_by(
+        occurrence_id=occurrence_id, action=TIMELINE_ACTION
+    ).order_by(OccurrenceTimeline.id).all()
+
+
+def test_supports_in_a_window_share_one_timeline_entry(app):
+    with app.app_context():
+        occurrence_id = add_occurrence()
+        citizens = add_citizens(4, 'janela')
+        start = datetime(2026, 10, 19, 12, 0)
+        for minutes, citizen in zip((0, 10, 59, 60), citizens):
+            add_supports(citizen.id, [occurrence_id])
+            record_support_timeline(occurrence_id, citizen, 60, now=start + timedelta(minutes=minutes))
+        db.session.commit()
+
+        entries = support_entries(occurrence_id)
+        assert [(entry.group_count, entry.description) for entry in entries] == [
+            (3, '3 cidadãos apoiaram esta ocorrência'),
+            (1, f'{citizens[3].name} apoiou esta ocorrência'),
+        ]
+        assert entries[0].details == f'Último apoio: {citizens[2].name}'
+        assert entries[0].created_at == start
+
+
+def support_in_process(uri, tokens, occurrence_id, start, results):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'SQLALCHEMY_BINDS': {},
+                      'SUPPORT_TIMELINE_WINDOW_MINUTES': WINDOW_MINUTES})
+    client = app.test_client()
+    start.wait()
+    results.put([
+        client.post(f'/api/occurrences/{occurrence_id}/support',
+                    headers={'Authorization': f'Bearer {token}'}).status_code
+        for token in tokens
+    ])
+
+
+def test_concurrent_supports_keep_one_entry_with_exact_count(make_app):
+    app = make_app(SUPPORT_TIMELINE_WINDOW_MINUTES=WINDOW_MINUTES)
+    with app.app_context():
+        occurrence_id = add_occurrence()
+        tokens = [create_access_token(identity=str(citizen.id)) for citizen in add_citizens(24, 'carga')]
+
+    context = multiprocessing.get_context('spawn')
+    start, results = context.Event(), context.Queue()
+    processes = [
+        context.Process(target=support_in_process, args=(
+            app.config['SQLALCHEMY_DATABASE_URI'], tokens[i::4], occurrence_id, start, results
+        ))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    statuses = [status for _ in processes for status in results.get(timeout=60)]
+    for process in processes:
+        process.join()
+
+    assert statuses == [201] * len(tokens)
+    with app.app_context():
+        entries = support_entries(occurrence_id)
+        assert len(entries) == 1
+        assert entries[0].group_count == len(tokens)
+        assert db.session.query(OccurrenceSupport).filter_by(occurrence_id=occurrence_id).count() == len(tokens)
+        assert db.session.get(Occurrence, occurrence_id).support_count == len(tokens)
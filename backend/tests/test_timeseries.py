@@ -0,0 +1,128 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.models.models import db, Category, Occurrence, OccurrenceStatus, User, UserType
+from src.utils.rollups import rebuild_daily_stats
+from src.utils.timeseries import occurrence_series
+
+START, END = date(2026, 2, 20), date(2026, 3, 10)
+
+# Horários UTC em volta das viradas de dia, semana (segunda) e mês em America/Sao_Paulo (UTC-3)
+MOMENTS = [
+    datetime(2026, 2, 20, 2, 59),   # 19/02 23:59, quinta: antes do primeiro dia
+    datetime(2026, 3, 1, 2, 30),    # 28/02 23:30, sábado
+    datetime(2026, 3, 1, 3, 0),     # 01/03 00:00, domingo
+    datetime(2026, 3, 2, 2, 59),    # 01/03 23:59, domingo
+    datetime(2026, 3, 2, 3, 0),     # 02/03 00:00, segunda
+    datetime(2026, 3, 11, 3, 0),    # 11/03 00:00: depois do último dia
+]
+
+
+def add_occurrences(moments, statuses=(OccurrenceStatus.OPEN,)):
+    categories = [row.id for row in db.session.query(Category.id).order_by(Category.id).limit(2)]
+    citizen = User(email='cidadao@teste.com', password_hash='x', name='Cidadão', user_type=UserType.CITIZEN)
+    db.session.add(citizen)
+    db.session.flush()
+    db.session.add_all(
+        Occurrence(title=f'Ocorrência {i}', description='Descrição de teste', category_id=categories[i % 2],
+                   citizen_id=citizen.id, status=statuses[i % len(statuses)], latitude=-21.245, longitude=-45.0,
+                   address='Rua de Teste, 1, Centro', created_at=moment)
+        for i, moment in enumerate(moments)
+    )
+    db.session.commit()
+    rebuild_daily_stats(db.session, {'LOCAL_TIMEZONE': 'America/Sao_Paulo'})
+    return categories
+
+
+def nonzero(series):
+    return {point['date']: point['count'] for point in series['timeline'] if point['count']}
+
+
+@pytest.fixture
+def series(app):
+    with app.app_context():
+        categories = add_occurrences(MOMENTS, statuses=(OccurrenceStatus.OPEN, OccurrenceStatus.IN_PROGRESS))
+        yield categories, lambda granularity, breakdown=None: occurrence_series(
+            db.session, app.config, granularity, breakdown, START, END
+        )
+
+
+def test_days_are_local_and_zero_filled(series):
+    _, build = series
+    result = build('day')
+    assert result['source'] == 'rollup'
+    assert [point['date'] for point in result['timeline']][::9] == ['2026-02-20', '2026-03-01', '2026-03-10']
+    assert len(result['timeline']) == 19
+    assert nonzero(result) == {'2026-02-28': 1, '2026-03-01': 2, '2026-03-02': 1}
+
+
+def test_weeks_start_on_monday_and_cover_the_first_week(series):
+    _, build = series
+    result = build('week')
+    assert result['start'] == '2026-02-16'
+    assert [(point['date'], point['count']) for point in result['timeline']] == [
+        ('2026-02-16', 1), ('2026-02-23', 3), ('2026-03-02', 1), ('2026-03-09', 0)
+    ]
+
+
+def test_months_start_on_the_first_day(series):
+    _, build = series
+    result = build('month')
+    assert result['start'] == '2026-02-01'
+    assert [(point['date'], point['count']) for point in result['timeline']] == [('2026-02-01', 2), ('2026-03-01', 3)]
+
+
+def test_hours_are_labelled_in_local_time(series):
+    _, build = series
+    result = build('hour')
+    assert result['source'] == 'occurrences'
+    assert len(result['timeline']) == 19 * 24
+    assert result['timeline'][0]['date'] == '2026-02-20T00:00-03:00'
+    assert result['timeline'][-1]['date'] == '2026-03-10T23:00-03:00'
+    assert nonzero(result) == {
+        '2026-02-28T23:00-03:00': 1, '2026-03-01T00:00-03:00': 1,
+        '2026-03-01T23:00-03:00': 1, '2026-03-02T00:00-03:00': 1
+    }
+
+
+def test_breakdowns_add_up_to_the_totals(series):
+    categories, build = series
+    for granularity in ('day', 'week', 'month'):
+        totals = [point['count'] for point in build(granularity)['timeline']]
+        for breakdown in ('status', 'category'):
+            result = build(granularity, breakdown)
+            assert [sum(point['breakdown'].values()) for point in result['timeline']] == totals
+    by_status = build('week', 'status')
+    assert [item['key'] for item in by_status['series']] == [status.value for status in OccurrenceStatus]
+    assert by_status['timeline'][1]['breakdown'] == {'open': 1, 'in_progress': 2, 'resolved': 0, 'closed': 0}
+    by_category = build('month', 'category')
+    assert [item['key'] for item in by_category['series']] == [str(category) for category in categories]
+    assert by_category['timeline'][1]['breakdown'] == {str(categories[0]): 2, str(categories[1]): 1}
+
+
+def test_other_timezones_shift_the_buckets(make_app):
+    app = make_app(LOCAL_TIMEZONE='Asia/Tokyo')
+    with app.app_context():
+        # 28/02 15:00 UTC = 01/03 00:00 em Tóquio (UTC+9)
+        add_occurrences([datetime(2026, 2, 28, 14, 59), datetime(2026, 2, 28, 15, 0)])
+        hours = occurrence_series(db.session, app.config, 'hour', None, date(2026, 2, 28), date(2026, 3, 1))
+        assert hours['timeline'][0]['date'] == '2026-02-28T00:00+09:00'
+        assert nonzero(hours) == {'2026-02-28T23:00+09:00': 1, '2026-03-01T00:00+09:00': 1}
+        months = occurrence_series(db.session, app.config, 'month', 'status', date(2026, 2, 1), date(2026, 3, 31))
+        assert [(point['date'], point['count']) for point in months['timeline']] == [
+            ('2026-02-01', 1), ('2026-03-01', 1)
+        ]
+
+
+def test_series_endpoint_validates_arguments(app, auth_headers):
+    client = app.test_client()
+    headers = auth_headers(user_type=UserType.ADMIN)
+    url = '/api/admin/dashboard/occurrences-timeline'
+    result = client.get(url, query_string={'granularity': 'week', 'start': '2026-03-04', 'end': '2026-03-10'},
+                        headers=headers).get_json()
+    assert [point['date'] for point in result['timeline']] == ['2026-03-02', '2026-03-09']
+    assert len(client.get(url, query_string={'days': 7}, headers=headers).get_json()['timeline']) == 7
+    for args in ({'granularity': 'year'}, {'breakdown': 'city'}, {'days': 0},
+                 {'start': '2026-03-10', 'end': '2026-03-01'}, {'granularity': 'hour', 'days': 400}):
+        assert client.get(url, query_string=args, headers=headers).status_code == 400, args
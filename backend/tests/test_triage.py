@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.models import (
+    db, Category, Department, Occurrence, OccurrenceStatus, OccurrenceTimeline, OutboxEvent, Priority, User, UserType
+)
+from src.utils.sla import get_policies, invalidate_policies
+
+POINTS = [(-21.240, -45.010), (-21.250, -45.020), (-21.260, -45.030)]
+
+
+@pytest.fixture(autouse=True)
+def fresh_policies():
+    invalidate_policies()
+    yield
+    invalidate_policies()
+
+
+@pytest.fixture
+def backlog(app):
+    """Três ocorrências abertas, uma delas já com a equipe A, e duas equipes do primeiro departamento"""
+    with app.app_context():
+        department = db.session.query(Department).order_by(Department.id).first()
+        category = db.session.query(Category).first()
+        citizen = User(email='cidadao@teste.com', password_hash='x', name='Cidadão', user_type=UserType.CITIZEN)
+        crews = [
+            User(email=f'equipe{name}@teste.com', password_hash='x', name=f'Equipe {name}',
+                 user_type=UserType.SERVICE_PROVIDER, department_id=department.id)
+            for name in 'AB'
+        ]
+        db.session.add_all([citizen, *crews])
+        db.session.flush()
+        created_at = datetime.utcnow() - timedelta(hours=2)
+        occurrences = [
+            Occurrence(title=f'Ocorrência {i}', description='Descrição de teste', category_id=category.id,
+                       citizen_id=citizen.id, latitude=lat, longitude=lon, address='Rua de Teste, 1, Centro',
+                       created_at=created_at)
+            for i, (lat, lon) in enumerate(POINTS)
+        ]
+        occurrences[0].assigned_to = crews[0].id
+        db.session.add_all(occurrences)
+        db.session.commit()
+        return {
+            'department_id': department.id, 'category_id': category.id, 'created_at': created_at,
+            'crews': [crew.id for crew in crews], 'occurrences': [occurrence.id for occurrence in occurrences]
+        }
+
+
+def crew_load(user_id):
+    user = db.session.get(User, user_id)
+    return user.active_jobs, round(user.active_jobs_lat_sum, 6), round(user.active_jobs_lon_sum, 6)
+
+
+def test_bulk_assign_writes_items_and_side_effects(app, auth_headers, backlog):
+    crew_a, crew_b = backlog['crews']
+    first, second, third = backlog['occurrences']
+    response = app.test_client().post('/api/triage/occurrences/bulk-assign', headers=auth_headers(
+        user_type=UserType.ADMIN
+    ), json={'items': [
+        {'occurrence_id': first, 'department_id': backlog['department_id'], 'priority': 'HIGH',
+         'assigned_to_id': crew_b},
+        {'occurrence_id': second, 'department_id': backlog['department_id'], 'priority': 'urgent',
+         'assigned_to_id': crew_b, 'notes': 'Perto da escola'},
+        {'occurrence_id': third, 'department_id': 9999, 'priority': 'LOW'},
+        {'occurrence_id': second, 'department_id': backlog['department_id'], 'priority': 'LOW'},
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['succeeded'], body['failed']) == (2, 2)
+    assert [result['success'] for result in body['results']] == [True, True, False, False]
+    assert body['results'][2]['error'] == 'Departamento não encontrado'
+    assert body['results'][3]['error'] == 'Ocorrência repetida no lote'
+
+    with app.app_context():
+        policies = get_policies(app.config)
+        for occurrence_id, priority in ((first, Priority.HIGH), (second, Priority.URGENT)):
+            occurrence = db.session.get(Occurrence, occurrence_id)
+            assert (occurrence.status, occurrence.priority, occurrence.department_id, occurrence.assigned_to) == (
+                OccurrenceStatus.IN_PROGRESS, priority, backlog['department_id'], crew_b
+            )
+            assert occurrence.sla_due_at == policies.due_at(
+                backlog['category_id'], backlog['department_id'], priority, backlog['created_at']
+            )
+        assert db.session.get(Occurrence, third).status == OccurrenceStatus.OPEN
+
+        timeline = db.session.query(OccurrenceTimeline).filter_by(action='status_changed').all()
+        assert sorted(entry.occurrence_id for entry in timeline) == [first, second]
+        assert 'Perto da escola' in next(entry.details for entry in timeline if entry.occurrence_id == second)
+        events = db.session.query(OutboxEvent).filter_by(event_type='occurrence_triaged').all()
+        assert sorted(event.occurrence_id for event in events) == [first, second]
+
+        # A primeira ocorrência passa da equipe A para a B, que ganha também a segunda
+        assert crew_load(crew_a) == (0, 0, 0)
+        assert crew_load(crew_b) == (2, round(POINTS[0][0] + POINTS[1][0], 6), round(POINTS[0][1] + POINTS[1][1], 6))
+
+
+def test_atomic_bulk_assign_writes_nothing_on_invalid_item(app, auth_headers, backlog):
+    crew_a, crew_b = backlog['crews']
+    first, second, _ = backlog['occurrences']
+    response = app.test_client().post('/api/triage/occurrences/bulk-assign', headers=auth_headers(
+        user_type=UserType.ADMIN
+    ), json={'atomic': True, 'items': [
+        {'occurrence_id': first, 'department_id': backlog['department_id'], 'priority': 'HIGH',
+         'assigned_to_id': crew_b},
+        {'occurrence_id': second, 'department_id': backlog['department_id'], 'priority': 'SOON'},
+    ]})
+
+    assert response.status_code == 400
+    assert [result['success'] for result in response.get_json()['results']] == [True, False]
+    with app.app_context():
+        assert {occurrence.status for occurrence in db.session.query(Occurrence)} == {OccurrenceStatus.OPEN}
+        assert db.session.get(Occurrence, first).assigned_to == crew_a
+        assert db.session.query(OccurrenceTimeline).count() == 0
+        assert db.session.query(OutboxEvent).filter_by(event_type='occurrence_triaged').count() == 0
+        assert crew_load(crew_a) == (1, *POINTS[0])
+        assert crew_load(crew_b) == (0, 0, 0)
+
+
+def test_bulk_assign_requires_admin(app, auth_headers, backlog):
+    response = app.test_client().post('/api/triage/occurrences/bulk-assign', headers=auth_headers(), json={
+        'items': [{'occurrence_id': backlog['occurrences'][0], 'department_id': backlog['department_id'],
+                   'priority': 'HIGH'}]
+    })
+    assert response.status_code == 403
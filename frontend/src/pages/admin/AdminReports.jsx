@@ -34,6 +34,30 @@ const AdminReports = () => {
     }
   }
 
+  const [exporting, setExporting] = useState(null)
+
+  // Download das exportações em streaming do backend (CSV ou XLSX)
+  const downloadExport = async (path, format) => {
+    try {
+      setExporting(`${path}:${format}`)
+      const response = await api.get(path, { params: { format }, responseType: 'blob' })
+      const disposition = response.headers['content-disposition'] || ''
+      const match = disposition.match(/filename="?([^"]+)"?/)
+      const url = window.URL.createObjectURL(response.data)
+      const link = document.createElement('a')
+      link.href = url
+      link.download = match ? match[1] : `exportacao.${format}`
+      document.body.appendChild(link)
+      link.click()
+      link.remove()
+      window.URL.revokeObjectURL(url)
+    } catch (error) {
+      console.error('Erro ao exportar:', error)
+    } finally {
+      setExporting(null)
+    }
+  }
+
   const reportTypes = [
     {
       id: 'occurrences',
@@ -41,7 +65,12 @@ const AdminReports = () => {
       description: 'Relatório completo de todas as ocorrências por período',
       icon: FileText,
       color: 'blue',
-      stats: stats ? `${stats.total_occurrences} ocorrências` : '...'
+      stats: stats ? `${stats.total_occurrences} ocorrências` : '...',
+      exports: [
+        { label: 'CSV', path: '/occurrences/export', format: 'csv' },
+        { label: 'XLSX', path: '/occurrences/export', format: 'xlsx' },
+        { label: 'Timeline', path: '/occurrences/export/timeline', format: 'csv' }
+      ]
     },
     {
       id: 'performance',
@@ -140,16 +169,33 @@ const AdminReports = () => {
                     <div className="text-2xl font-bold">
                       {report.stats}
                     </div>
-                    <div className="flex gap-2">
-                      <Button className="flex-1" variant="outline">
-                        <Calendar className="w-4 h-4 mr-2" />
-                        Selecionar Período
-                      </Button>
-                      <Button className="flex-1">
-                        <Download className="w-4 h-4 mr-2" />
-                        Exportar
-                      </Button>
-                    </div>
+                    {report.exports ? (
+                      <div className="flex gap-2">
+                        {report.exports.map((item) => (
+                          <Button
+                            key={item.label}
+                            className="flex-1"
+                            variant={item.label === 'CSV' ? 'default' : 'outline'}
+                            disabled={exporting !== null}
+                            onClick={() => downloadExport(item.path, item.format)}
+                          >
+                            <Download className="w-4 h-4 mr-2" />
+                            {exporting === `${item.path}:${item.format}` ? 'Exportando...' : item.label}
+                          </Button>
+                        ))}
+                      </div>
+                    ) : (
+                      <div className="flex gap-2">
+                        <Button className="flex-1" variant="outline">
+                          <Calendar className="w-4 h-4 mr-2" />
+                          Selecionar Período
+                        </Button>
+                        <Button className="flex-1">
+                          <Download className="w-4 h-4 mr-2" />
+                          Exportar
+                        </Button>
+                      </div>
+                    )}
                   </div>
                 </CardContent>
               </Card>
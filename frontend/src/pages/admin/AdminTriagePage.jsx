@@ -39,6 +39,7 @@ const AdminTriagePage = () => {
   });
   const [departmentUsers, setDepartmentUsers] = useState([]);
   const [isSubmitting, setIsSubmitting] = useState(false);
+  const [selectedIds, setSelectedIds] = useState([]);
   const { toast } = useToast();
 
   const fetchPendingTriage = async () => {
@@ -99,6 +100,16 @@ const AdminTriagePage = () => {
     fetchDepartmentUsers(assignmentData.department_id);
   }, [assignmentData.department_id]);
 
+  const toggleSelected = (occurrenceId) => {
+    setSelectedIds(prev => prev.includes(occurrenceId) ? prev.filter(id => id !== occurrenceId) : [...prev, occurrenceId]);
+  };
+
+  // Remove da fila local as ocorrências triadas, sem recarregar a lista inteira
+  const removeTriaged = (triagedIds) => {
+    setOccurrences(prev => prev.filter(occ => !triagedIds.includes(occ.id)));
+    setSelectedIds(prev => prev.filter(id => !triagedIds.includes(id)));
+  };
+
   const handleTriageClick = (occurrence) => {
     setSelectedOccurrence(occurrence);
     setAssignmentData({
@@ -111,9 +122,13 @@ const AdminTriagePage = () => {
     setIsDialogOpen(true);
   };
 
+  const handleBulkTriageClick = () => {
+    handleTriageClick(null);
+  };
+
   const handleAssignment = async (e) => {
     e.preventDefault();
-    if (!selectedOccurrence || !assignmentData.department_id || !assignmentData.priority) {
+    if ((!selectedOccurrence && selectedIds.length === 0) || !assignmentData.department_id || !assignmentData.priority) {
       toast({
         title: 'Campos obrigatórios',
         description: 'Selecione o Departamento e a Prioridade.',
@@ -127,19 +142,36 @@ const AdminTriagePage = () => {
       const payload = {
         department_id: parseInt(assignmentData.department_id),
         priority: assignmentData.priority,
-        assigned_to_id: assignmentData.assigned_to_id ? parseInt(assignmentData.assigned_to_id) : null,
-        notes: assignmentData.notes, // Notas não são usadas na API, mas mantidas para futuro
+        // 'auto': o backend escolhe a equipe pela carga de trabalho e proximidade
+        assigned_to_id: assignmentData.assigned_to_id === 'auto'
+          ? 'auto'
+          : assignmentData.assigned_to_id ? parseInt(assignmentData.assigned_to_id) : null,
+        notes: assignmentData.notes, // Registradas na timeline junto com a triagem
       };
 
-      await api.post(`/triage/occurrences/${selectedOccurrence.id}/assign`, payload);
+      if (selectedOccurrence) {
+        await api.post(`/triage/occurrences/${selectedOccurrence.id}/assign`, payload);
 
-      toast({
-        title: 'Ocorrência Atribuída',
-        description: `A ocorrência #${selectedOccurrence.id} foi atribuída com sucesso.`,
-      });
+        toast({
+          title: 'Ocorrência Atribuída',
+          description: `A ocorrência #${selectedOccurrence.id} foi atribuída com sucesso.`,
+        });
+        removeTriaged([selectedOccurrence.id]);
+      } else {
+        // Triagem em lote: uma requisição e uma transação para todas as selecionadas
+        const response = await api.post('/triage/occurrences/bulk-assign', {
+          items: selectedIds.map(id => ({ occurrence_id: id, ...payload })),
+        });
+        const triagedIds = response.data.results.filter(result => result.success).map(result => result.occurrence_id);
+        removeTriaged(triagedIds);
+
+        toast({
+          title: `${response.data.succeeded} ocorrência(s) atribuída(s)`,
+          description: response.data.failed > 0 ? `${response.data.failed} não puderam ser atribuídas.` : undefined,
+          variant: response.data.failed > 0 ? 'destructive' : undefined,
+        });
+      }
 
-      // Recarregar a lista e fechar o modal
-      fetchPendingTriage();
       setIsDialogOpen(false);
     } catch (error) {
       const errorMessage = error.response?.data?.error || 'Erro desconhecido ao atribuir ocorrência.';
@@ -182,6 +214,18 @@ const AdminTriagePage = () => {
           Revise e atribua um departamento e prioridade para as novas ocorrências registradas pelos cidadãos.
         </p>
 
+        {selectedIds.length > 0 && (
+          <div className="flex items-center gap-3">
+            <Button onClick={handleBulkTriageClick}>
+              <Send className="mr-2 h-4 w-4" />
+              Triar selecionadas ({selectedIds.length})
+            </Button>
+            <Button variant="outline" onClick={() => setSelectedIds([])}>
+              Limpar seleção
+            </Button>
+          </div>
+        )}
+
         <div className="grid gap-4 md:grid-cols-2 lg:grid-cols-3">
           {occurrences.length === 0 ? (
             <Card className="col-span-full">
@@ -194,7 +238,13 @@ const AdminTriagePage = () => {
             occurrences.map((occurrence) => (
               <Card key={occurrence.id} className="hover:shadow-lg transition-shadow">
                 <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-                  <CardTitle className="text-sm font-medium">
+                  <CardTitle className="text-sm font-medium flex items-center gap-2">
+                    <input
+                      type="checkbox"
+                      checked={selectedIds.includes(occurrence.id)}
+                      onChange={() => toggleSelected(occurrence.id)}
+                      aria-label={`Selecionar ocorrência #${occurrence.id}`}
+                    />
                     Ocorrência #{occurrence.id}
                   </CardTitle>
                   <Badge variant="secondary">{occurrence.status}</Badge>
@@ -224,7 +274,9 @@ const AdminTriagePage = () => {
           <DialogHeader>
             <DialogTitle>Triagem e Atribuição</DialogTitle>
             <DialogDescription>
-              Ocorrência #{selectedOccurrence?.id}: {selectedOccurrence?.title}
+              {selectedOccurrence
+                ? `Ocorrência #${selectedOccurrence.id}: ${selectedOccurrence.title}`
+                : `${selectedIds.length} ocorrência(s) selecionada(s)`}
             </DialogDescription>
           </DialogHeader>
           <form onSubmit={handleAssignment}>
@@ -280,9 +332,10 @@ const AdminTriagePage = () => {
                     <SelectValue placeholder={!assignmentData.department_id ? "Selecione um departamento primeiro" : departmentUsers.length === 0 ? "Nenhum usuário disponível" : "Selecione um Usuário"} />
                   </SelectTrigger>
                   <SelectContent>
+                    <SelectItem value="auto">Automático (menor carga e mais próximo)</SelectItem>
                     {departmentUsers.map((user) => (
                       <SelectItem key={user.id} value={String(user.id)}>
-                        {user.name} ({user.user_type === 'admin' ? 'Admin' : 'Gestor/Prestador'})
+                        {user.name} ({user.user_type === 'admin' ? 'Admin' : 'Gestor/Prestador'}) · {user.active_jobs} ativa(s)
                       </SelectItem>
                     ))}
                   </SelectContent>
@@ -309,7 +362,7 @@ const AdminTriagePage = () => {
                 ) : (
                   <Send className="mr-2 h-4 w-4" />
                 )}
-                Atribuir Ocorrência
+                {selectedOccurrence ? 'Atribuir Ocorrência' : 'Atribuir Selecionadas'}
               </Button>
             </DialogFooter>
           </form>
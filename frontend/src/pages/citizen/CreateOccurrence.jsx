@@ -31,6 +31,8 @@ const CreateOccurrence = () => {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState(false)
+  const [duplicates, setDuplicates] = useState([])
+  const [supported, setSupported] = useState(false)
   const [photos, setPhotos] = useState([])
   const [loadingLocation, setLoadingLocation] = useState(false)
   
@@ -198,12 +200,17 @@ const CreateOccurrence = () => {
       return
     }
 
+    submitOccurrence(false)
+  }
+
+  const submitOccurrence = async (forceCreate) => {
     setLoading(true)
     setError('')
+    setDuplicates([])
 
     try {
       // Criar ocorrência
-      const response = await api.post('/occurrences', formData)
+      const response = await api.post('/occurrences', { ...formData, force_create: forceCreate })
       const occurrenceId = response.data.occurrence.id
 
       // Upload de fotos se houver
@@ -232,6 +239,11 @@ const CreateOccurrence = () => {
       }, 2000)
 
     } catch (occurrenceCreationError) {
+      // Ocorrência parecida já registrada por perto: oferecer apoio
+      if (occurrenceCreationError.response?.status === 409 && occurrenceCreationError.response.data?.duplicates) {
+        setDuplicates(occurrenceCreationError.response.data.duplicates)
+        return
+      }
       console.error("Erro ao criar ocorrência:", occurrenceCreationError)
       setError(occurrenceCreationError.response?.data?.error || "Erro ao criar ocorrência. Verifique os dados e tente novamente.")
     } finally {
@@ -239,6 +251,24 @@ const CreateOccurrence = () => {
     }
   }
 
+  const supportDuplicate = async (occurrenceId) => {
+    setLoading(true)
+    setError('')
+
+    try {
+      await api.post(`/occurrences/${occurrenceId}/support`)
+      setSupported(true)
+      setSuccess(true)
+      setTimeout(() => {
+        navigate("/citizen/occurrences")
+      }, 2000)
+    } catch (supportError) {
+      setError(supportError.response?.data?.error || "Erro ao registrar apoio.")
+    } finally {
+      setLoading(false)
+    }
+  }
+
   if (success) {
     return (
       <CitizenLayout>
@@ -250,11 +280,13 @@ const CreateOccurrence = () => {
                   <CheckCircle className="w-12 h-12 text-green-600" />
                 </div>
                 <h2 className="text-2xl font-bold text-green-900 mb-2">
-                  Ocorrência Criada com Sucesso!
+                  {supported ? 'Apoio Registrado com Sucesso!' : 'Ocorrência Criada com Sucesso!'}
                 </h2>
                 <p className="text-green-800 mb-4">
-                  Sua ocorrência foi registrada e será analisada pela equipe responsável.
-                  Você receberá atualizações sobre o progresso.
+                  {supported
+                    ? 'Seu apoio foi adicionado à ocorrência já existente e aumenta a prioridade dela.'
+                    : 'Sua ocorrência foi registrada e será analisada pela equipe responsável.'}
+                  {' '}Você receberá atualizações sobre o progresso.
                 </p>
                 <p className="text-sm text-green-700">
                   Redirecionando para suas ocorrências...
@@ -286,6 +318,35 @@ const CreateOccurrence = () => {
             </Alert>
           )}
 
+          {duplicates.length > 0 && (
+            <Card className="mb-6 border-yellow-200 bg-yellow-50">
+              <CardHeader>
+                <CardTitle className="text-yellow-900">Já existe uma ocorrência parecida por perto</CardTitle>
+              </CardHeader>
+              <CardContent className="space-y-3">
+                <p className="text-sm text-yellow-800">
+                  Apoiar a ocorrência existente ajuda a equipe a priorizá-la mais rápido.
+                </p>
+                {duplicates.map((duplicate) => (
+                  <div key={duplicate.id} className="flex items-center justify-between gap-4 p-3 bg-white rounded border">
+                    <div>
+                      <p className="font-medium text-gray-900">{duplicate.title}</p>
+                      <p className="text-sm text-gray-600">
+                        {duplicate.address} · {Math.round(duplicate.distance_m)} m daqui
+                      </p>
+                    </div>
+                    <Button type="button" disabled={loading} onClick={() => supportDuplicate(duplicate.id)}>
+                      Apoiar
+                    </Button>
+                  </div>
+                ))}
+                <Button type="button" variant="outline" disabled={loading} onClick={() => submitOccurrence(true)}>
+                  Não é o mesmo problema, criar mesmo assim
+                </Button>
+              </CardContent>
+            </Card>
+          )}
+
           <form onSubmit={handleSubmit} className="space-y-6">
             {/* Informações básicas */}
             <Card>
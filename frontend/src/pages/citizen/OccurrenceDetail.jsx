@@ -28,6 +28,8 @@ const OccurrenceDetail = () => {
   const [occurrence, setOccurrence] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const [timelinePage, setTimelinePage] = useState(null)
+  const [loadingTimeline, setLoadingTimeline] = useState(false)
 
   useEffect(() => {
     loadOccurrenceDetail()
@@ -40,6 +42,7 @@ const OccurrenceDetail = () => {
       
       const response = await api.get(`/occurrences/${id}`)
       setOccurrence(response.data.occurrence)
+      setTimelinePage(response.data.timeline_page)
     } catch (error) {
       console.error('Erro ao carregar detalhes da ocorrência:', error)
       setError('Erro ao carregar detalhes da ocorrência. Tente novamente.')
@@ -48,6 +51,25 @@ const OccurrenceDetail = () => {
     }
   }
 
+  // Timeline paginada (mais recentes primeiro): próximas páginas sob demanda
+  const loadMoreTimeline = async () => {
+    try {
+      setLoadingTimeline(true)
+      const response = await api.get(`/occurrences/${id}`, {
+        params: { timeline_page: timelinePage.current_page + 1 }
+      })
+      setOccurrence((current) => ({
+        ...current,
+        timeline: [...current.timeline, ...response.data.occurrence.timeline]
+      }))
+      setTimelinePage(response.data.timeline_page)
+    } catch (error) {
+      console.error('Erro ao carregar histórico:', error)
+    } finally {
+      setLoadingTimeline(false)
+    }
+  }
+
   const getStatusBadge = (status) => {
     const statusConfig = {
       open: { label: 'Aberta', color: 'bg-blue-100 text-blue-800', icon: AlertCircle },
@@ -250,6 +272,12 @@ const OccurrenceDetail = () => {
                     </div>
                   ))}
                 </div>
+                {timelinePage && timelinePage.current_page < timelinePage.pages && (
+                  <Button variant="outline" className="w-full mt-2" onClick={loadMoreTimeline} disabled={loadingTimeline}>
+                    {loadingTimeline && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                    Carregar histórico anterior ({timelinePage.total - occurrence.timeline.length} restantes)
+                  </Button>
+                )}
               </CardContent>
             </Card>
           )}
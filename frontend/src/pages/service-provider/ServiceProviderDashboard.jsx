@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
-import { Loader2, Play, CheckCircle, Wrench, NotebookPen, Upload, AlertCircle } from 'lucide-react';
+import { Loader2, Play, CheckCircle, Wrench, NotebookPen, Upload, AlertCircle, Navigation } from 'lucide-react';
 import { useToast } from '@/components/ui/use-toast';
 import api from '@/lib/api';
 import ServiceProviderLayout from '@/components/service-provider/ServiceProviderLayout';
@@ -32,6 +32,8 @@ const ServiceProviderDashboard = () => {
   const [photoPreview, setPhotoPreview] = useState(null);
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [error, setError] = useState('');
+  const [route, setRoute] = useState(null);
+  const [routeLoading, setRouteLoading] = useState(false);
   const { toast } = useToast();
 
   const fetchAssignments = async () => {
@@ -57,6 +59,40 @@ const ServiceProviderDashboard = () => {
     fetchAssignments();
   }, []);
 
+  // Ordem de visita otimizada a partir da posição atual (ou do ponto padrão do servidor)
+  const fetchRoute = async () => {
+    setRouteLoading(true);
+    const request = async (coords) => {
+      try {
+        const params = coords ? { lat: coords.latitude, lon: coords.longitude } : {};
+        const response = await api.get('/execution/my-route', { params });
+        setRoute(response.data);
+      } catch (error) {
+        toast({
+          title: 'Erro ao calcular rota',
+          description: error.response?.data?.error || 'Não foi possível calcular a rota.',
+          variant: 'destructive',
+        });
+      } finally {
+        setRouteLoading(false);
+      }
+    };
+    if (navigator.geolocation) {
+      navigator.geolocation.getCurrentPosition(
+        (position) => request(position.coords),
+        () => request(null),
+        { timeout: 5000 }
+      );
+    } else {
+      request(null);
+    }
+  };
+
+  const routeStops = Object.fromEntries((route?.stops || []).map(stop => [stop.occurrence_id, stop]));
+  const orderedAssignments = route
+    ? [...assignments].sort((a, b) => (routeStops[a.id]?.order ?? Infinity) - (routeStops[b.id]?.order ?? Infinity))
+    : assignments;
+
   const handleStartExecution = async (assignmentId) => {
     try {
       await api.post(`/execution/occurrence/${assignmentId}/start`);
@@ -168,9 +204,20 @@ const ServiceProviderDashboard = () => {
     <ServiceProviderLayout>
       <div className="p-6">
         {/* Header */}
-        <div className="mb-6">
-          <h1 className="text-3xl font-bold text-gray-900">Dashboard do Prestador</h1>
-          <p className="text-gray-600">Gerencie suas atribuições e registre execuções</p>
+        <div className="mb-6 flex items-start justify-between gap-4">
+          <div>
+            <h1 className="text-3xl font-bold text-gray-900">Dashboard do Prestador</h1>
+            <p className="text-gray-600">Gerencie suas atribuições e registre execuções</p>
+            {route && (
+              <p className="text-sm text-blue-700 mt-1">
+                Rota otimizada: {route.stops.length} parada(s), {route.total_km.toFixed(1)} km
+              </p>
+            )}
+          </div>
+          <Button variant="outline" onClick={fetchRoute} disabled={routeLoading || assignments.length === 0}>
+            {routeLoading ? <Loader2 className="w-4 h-4 mr-2 animate-spin" /> : <Navigation className="w-4 h-4 mr-2" />}
+            Otimizar rota
+          </Button>
         </div>
 
         {error && (
@@ -240,7 +287,7 @@ const ServiceProviderDashboard = () => {
               </CardContent>
             </Card>
           ) : (
-            assignments.map((assignment) => (
+            orderedAssignments.map((assignment) => (
               <Card key={assignment.id} className="hover:shadow-md transition-shadow">
                 <CardContent className="p-6">
                   <div className="flex items-start justify-between mb-4">
@@ -249,6 +296,11 @@ const ServiceProviderDashboard = () => {
                         <h3 className="text-lg font-semibold text-gray-900">
                           #{assignment.id} - {assignment.title}
                         </h3>
+                        {routeStops[assignment.id] && (
+                          <Badge variant="outline" className={routeStops[assignment.id].overdue ? 'border-red-300 text-red-700' : ''}>
+                            Parada {routeStops[assignment.id].order} · {routeStops[assignment.id].leg_km.toFixed(1)} km
+                          </Badge>
+                        )}
                         <Badge className={assignment.status === 'completed' ? 'bg-green-100 text-green-800' : assignment.status === 'in_progress' ? 'bg-blue-100 text-blue-800' : 'bg-gray-100 text-gray-800'}>
                           {assignment.status === 'completed' ? 'Concluída' : assignment.status === 'in_progress' ? 'Em Progresso' : 'Pendente'}
                         </Badge>